@@ -177,7 +177,7 @@ class ServiceStub(object):
         self.port = 0
         self.publish = publish
 
-    def register_metrics(self, table, data, key=None):
+    def register_metrics(self, table, data, key=None, encoder=None):
         self.metrics[table] += data
 
     @staticmethod
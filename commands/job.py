@@ -24,6 +24,7 @@ from django.db import connection as pg_conn
 from noc.core.mongo.connection import connect
 from noc.core.management.base import BaseCommand
 from noc.core.scheduler.scheduler import Scheduler
+from noc.core.scheduler.spread import get_spread_offset, get_start_histogram, get_histogram_stats
 from noc.core.service.loader import get_dcs
 from noc.core.ioloop.util import run_sync
 from noc.main.models.pool import Pool
@@ -39,6 +40,7 @@ class Command(BaseCommand):
 
     help = "Manage Jobs"
     default_time = timedelta(minutes=5)
+    SPREAD_CHUNK = 1000
     connect()
 
     @staticmethod
@@ -105,6 +107,30 @@ class Command(BaseCommand):
             "--force", default=False, action="store_true", help="Really do reschedule"
         )
         reschedule.add_argument("key", nargs=argparse.REMAINDER, help="List of job key")
+        # Spread jobs across interval
+        spread = subparsers.add_parser(
+            "spread", help="Spread jobs evenly across interval by job key"
+        )
+        spread.add_argument("--name", required=True, help="Job name in scheduler")
+        spread.add_argument("--interval", type=int, required=True, help="Job interval (in seconds)")
+        spread.add_argument(
+            "--force", default=False, action="store_true", help="Really do reschedule"
+        )
+        spread.add_argument("key", nargs=argparse.REMAINDER, help="List of job key")
+        # Job start histogram
+        start_histogram = subparsers.add_parser(
+            "start-histogram", help="Show histogram of planned job starts"
+        )
+        start_histogram.add_argument("--name", help="Job name in scheduler")
+        start_histogram.add_argument(
+            "--window", type=int, default=3600, help="Histogram window (in seconds)"
+        )
+        start_histogram.add_argument(
+            "--resolution", type=int, default=1, help="Bucket size (in seconds)"
+        )
+        start_histogram.add_argument(
+            "--detail", default=False, action="store_true", help="Show buckets"
+        )
         parser.add_argument("infile", nargs="?", type=argparse.FileType("r"), default=sys.stdin)
         # stats command
         stat_parser = subparsers.add_parser("stats", help="Show stats")
@@ -291,6 +317,87 @@ class Command(BaseCommand):
             scheduler.bulk_write(bulk)
             # Job.get_next_timestamp(64000)
 
+    def handle_spread(self, scheduler, *args, **options):
+        """
+        Reshape schedule of existing jobs according to spread policy.
+        Each job is shifted to its stable offset within interval
+        """
+        q = {"jcls": options["name"], "s": "W"}
+        if options.get("key"):
+            q["key"] = {"$in": [int(x) for x in options["key"]]}
+        interval = options["interval"]
+        if interval <= 0:
+            self.die("Interval must be positive")
+        now = time.time()
+        bulk = []
+        before = []
+        after = []
+        for j in scheduler.find(q, {"_id": 1, "jcls": 1, "key": 1, "ts": 1}):
+            offset = get_spread_offset(j["jcls"], j["key"])
+            ts = self.get_next_timestamp(interval, offset=offset, ts=now)
+            before += [j["ts"]]
+            after += [ts]
+            bulk += [UpdateOne({"_id": j["_id"]}, {"$set": {"o": offset, "ts": ts}})]
+        if not bulk:
+            self.print("No jobs found")
+            return
+        start = int(now)
+        # Overdue jobs are started immediately
+        before = [max(t.timestamp(), now) for t in before]
+        after = [t.timestamp() for t in after]
+        for title, ts in (("Before", before), ("After", after)):
+            stats = get_histogram_stats(
+                get_start_histogram(t for t in ts if start <= t < start + interval),
+                start=start,
+                end=start + interval,
+            )
+            self.print(
+                "%s: %d jobs. Starts per second: mean %.2f, max %d, stddev %.2f"
+                % (title, len(ts), stats["mean"], stats["max"], stats["stddev"])
+            )
+        if options.get("force", False):
+            self.print("Jobs will be reschedule")
+            for i in reversed(range(1, 10)):
+                self.print("%d\n" % i)
+                time.sleep(1)
+            for i in range(0, len(bulk), self.SPREAD_CHUNK):
+                scheduler.bulk_write(bulk[i : i + self.SPREAD_CHUNK])
+
+    def handle_start_histogram(self, scheduler, *args, **options):
+        """
+        Show histogram of planned job starts within window
+        """
+        resolution = max(options["resolution"], 1)
+        start = int(time.time()) // resolution * resolution
+        end = start + options["window"]
+        q = {
+            "ts": {
+                "$gte": datetime.fromtimestamp(start),
+                "$lt": datetime.fromtimestamp(end),
+            }
+        }
+        if options.get("name"):
+            q["jcls"] = options["name"]
+        hist = get_start_histogram(
+            (j["ts"] for j in scheduler.find(q, {"_id": 0, "ts": 1})), resolution=resolution
+        )
+        stats = get_histogram_stats(hist, resolution=resolution, start=start, end=end)
+        self.print(
+            "Jobs: %d, Buckets: %d x %ds\nStarts per bucket: mean %.2f, max %d, stddev %.2f"
+            % (
+                stats["total"],
+                stats["buckets"],
+                resolution,
+                stats["mean"],
+                stats["max"],
+                stats["stddev"],
+            )
+        )
+        if options.get("detail"):
+            for ts in range(start, end, resolution):
+                if hist.get(ts):
+                    self.print("%s %5d %s" % (datetime.fromtimestamp(ts), hist[ts], "#" * hist[ts]))
+
     @staticmethod
     def get_task_count():
         """
@@ -48,9 +48,21 @@ class Command(BaseCommand):
             help="Path output file unknown data",
         )
         parser.add_argument("--progress", action="store_true", help="Display progress")
+        parser.add_argument(
+            "--lookup", required=False, help="Rule lookup handler, overrides config setting"
+        )
 
     def handle(
-        self, paths, profile, format, report=None, reject=None, progress=False, *args, **options
+        self,
+        paths,
+        profile,
+        format,
+        report=None,
+        reject=None,
+        progress=False,
+        lookup=None,
+        *args,
+        **options,
     ):
         connect()
         assert profile_loader.has_profile(profile), "Invalid profile: %s" % profile
@@ -61,8 +73,9 @@ class Command(BaseCommand):
             report_writer.writerow(["message", "event class", "rule name", "vars"])
         t0 = time.time()
         ruleset = RuleSet()
-        ruleset.load()
+        ruleset.load(lookup_handler=lookup)
         self.print("Ruleset load in %.2fms" % ((time.time() - t0) * 1000))
+        self.print("Using rule lookup solution: %s" % ruleset.lookup_cls.__name__)
         reader = getattr(self, "read_%s" % format, None)
         assert reader, "Invalid format %s" % format
         self.managed_object = ManagedObject(
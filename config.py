@@ -112,6 +112,10 @@ class Config(BaseConfig):
         cache_class = StringParameter(default="noc.core.cache.mongo.MongoCache")
         default_ttl = SecondsParameter(default="1d")
         pool_size = IntParameter(default=8)
+        # Drop process-local model caches on changes in other processes
+        enable_invalidation = BooleanParameter(default=False)
+        # Scale size and TTL of invalidated model caches
+        invalidation_scale = IntParameter(default=10, min=1)
 
     class card(ConfigSection):
         language = StringParameter(default="en")
@@ -127,6 +131,9 @@ class Config(BaseConfig):
         #
         batch_size = IntParameter(default=50000, help="Size of one portion from queue")
         batch_delay_ms = IntParameter(default=10000, help="Send every period time")
+        flush_workers = IntParameter(default=4, min=1, help="Number of concurrent flush workers")
+        # Producers send records in RowBinary format, when supported
+        enable_rowbinary = BooleanParameter(default=False)
 
     class classifier(ConfigSection):
         lookup_handler = HandlerParameter(default="noc.services.classifier.rulelookup.RuleLookup")
@@ -134,6 +141,9 @@ class Config(BaseConfig):
         default_rule = StringParameter(default="Unknown | Default")
         allowed_time_drift = SecondsParameter(default="5M")
         allowed_async_cursor = BooleanParameter(default=True, help="Use Async Processed cursor")
+        shape_cache_size = IntParameter(
+            default=10000, min=0, help="Size of message shape -> rule cache. 0 - disable"
+        )
 
     class clickhouse(ConfigSection):
         rw_addresses = ServiceParameter(service="clickhouse", wait=True)
@@ -237,6 +247,8 @@ class Config(BaseConfig):
 
     class discovery(ConfigSection):
         max_threads = IntParameter(default=20)
+        # Maximal amount of concurrently running box discovery checks per object
+        check_concurrency = IntParameter(default=1, min=1)
         proxy_metric = BooleanParameter(
             default=False, help="Send metrics discovery result from self"
         )
@@ -363,6 +375,10 @@ class Config(BaseConfig):
         addresses = ServiceParameter(service="liftbridge", wait=True, near=True, full_result=False)
         max_message_size = IntParameter(default=921600, help="Max message size for GRPC client")
         publish_async_ack_timeout = IntParameter(default=10)
+        publish_window = IntParameter(default=16, min=1, help="Max publish requests in flight")
+        publish_queue_size = IntParameter(
+            default=10000, min=0, help="Block publishing threads when exceeded. 0 - unlimited"
+        )
         compression_threshold = IntParameter(default=524288)
         compression_method = StringParameter(choices=["", "zlib", "lzma"], default="zlib")
         enable_http_proxy = BooleanParameter(default=False)
@@ -549,6 +565,8 @@ class Config(BaseConfig):
         pm_templates = StringParameter(default="templates/ddash/")
         custom_path = StringParameter()
         mib_path = StringParameter(default="/var/lib/noc/mibs/")
+        # Local snapshots of datastream clients. Disabled if empty
+        datastream_snapshot = StringParameter()
 
     class pg(ConfigSection):
         addresses = ServiceParameter(service="postgres", wait=True, near=True, full_result=False)
@@ -603,12 +621,34 @@ class Config(BaseConfig):
         cache_default_ttl = SecondsParameter(default="1d")
         autointervaljob_interval = SecondsParameter(default="1d")
         autointervaljob_initial_submit_interval = SecondsParameter(default="1d")
+        # Prefetch jobs to the in-memory timing wheel instead of polling on every tick
+        use_wheel = BooleanParameter(default=False)
+        # Timing wheel prefetch window
+        wheel_window = SecondsParameter(default="5M")
+        # Timing wheel reconciliation with database interval
+        wheel_refresh_interval = SecondsParameter(default="1M")
+        # Maximal amount of prefetched jobs
+        wheel_max_jobs = IntParameter(default=100000, min=1)
+        # Track schedule changes using MongoDB change streams
+        wheel_change_stream = BooleanParameter(default=True)
+        # Spread periodic jobs across interval by consistent hashing of the key
+        spread_jobs = BooleanParameter(default=False)
+        # Random jitter of spread jobs, fraction of interval
+        spread_jitter = FloatParameter(default=0.02)
+        # Maximal jitter of spread jobs
+        spread_max_jitter = SecondsParameter(default="1M")
 
     class script(ConfigSection):
         timeout = SecondsParameter(default="2M", help="default sa script script timeout")
         session_idle_timeout = SecondsParameter(default="1M", help="default session timeout")
         caller_timeout = SecondsParameter(default="1M")
         calling_service = StringParameter(default="script")
+        snmp_sockets = IntParameter(
+            default=4, min=1, help="Shared SNMP engine sockets per TOS value"
+        )
+        snmp_check_source = BooleanParameter(
+            default=False, help="Accept SNMP responses only from the request's address"
+        )
 
     secret_key = StringParameter(default="12345")
 
@@ -637,6 +677,14 @@ class Config(BaseConfig):
         enable_freebind = BooleanParameter(default=False)
         # DataStream request limit
         ds_limit = IntParameter(default=1000)
+        # Process datagrams in batches up to given size, 0 - process one by one
+        batch_size = IntParameter(default=0, min=0)
+        # Max queued datagrams in batch mode, excessive ones are dropped
+        queue_size = IntParameter(default=10000, min=1)
+        # Decode datagrams in process pool in batch mode, 0 - decode in service process
+        decode_processes = IntParameter(default=0, min=0)
+        # Send messages, aggregated by per-source rate limit, every interval
+        aggregate_interval = SecondsParameter(default="10s")
 
     class icqsender(ConfigSection):
         token = SecretParameter()
@@ -665,6 +713,12 @@ class Config(BaseConfig):
         enable_freebind = BooleanParameter(default=False)
         # DataStream request limit
         ds_limit = IntParameter(default=1000)
+        # Process datagrams in batches up to given size, 0 - process one by one
+        batch_size = IntParameter(default=0, min=0)
+        # Max queued datagrams in batch mode, excessive ones are dropped
+        queue_size = IntParameter(default=10000, min=1)
+        # Decode datagrams in process pool in batch mode, 0 - decode in service process
+        decode_processes = IntParameter(default=0, min=0)
         # storm protection round duration in seconds
         storm_round_duration = SecondsParameter(default="60s")
         # conversion rate between ON and OFF storm protection thresholds
@@ -705,6 +759,14 @@ class Config(BaseConfig):
             default=30,
             help="The maximum time in seconds for the server to wait for changes before responding to a getMore operation",
         )
+        total_ttl = SecondsParameter(
+            default="10s",
+            help="Cache datastream total items count, returned in X-NOC-DataStream-Total header",
+        )
+        stream_keepalive = SecondsParameter(
+            default="30s",
+            help="Send keepalive to idle streaming (ndjson/sse) clients",
+        )
         enable_administrativedomain = BooleanParameter(default=False)
         enable_administrativedomain_wait = BooleanParameter(
             default=True,
@@ -0,0 +1,98 @@
+# ----------------------------------------------------------------------
+# Aho-Corasick multi-pattern string search
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Python modules
+from collections import deque
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+
+class AhoCorasick(object):
+    """
+    Aho-Corasick automaton. Finds all the occurrences of the set of keywords
+    in the single pass over the text.
+
+    Usage:
+    ```
+    ac = AhoCorasick()
+    ac.add("down", 1)
+    ac.add("up", 2)
+    ac.build()
+    ac.search("link down") -> {1}
+    ```
+    """
+
+    def __init__(self):
+        # State -> char -> State. State 0 is root
+        self.goto: List[Dict[str, int]] = [{}]
+        # State -> failure state
+        self.fail: List[int] = [0]
+        # State -> values of keywords, ending in state, including ones by failure links
+        self.out: List[Tuple[Any, ...]] = [()]
+        self.is_ready = False
+
+    def add(self, keyword: str, value: Any) -> None:
+        """
+        Add keyword to automaton
+
+        :param keyword: Non-empty keyword
+        :param value: Value, returned on keyword match
+        """
+        if not keyword:
+            raise ValueError("Empty keyword")
+        state = 0
+        for c in keyword:
+            next_state = self.goto[state].get(c)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][c] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append(())
+            state = next_state
+        self.out[state] += (value,)
+        self.is_ready = False
+
+    def build(self) -> None:
+        """
+        Build failure links. Must be called after all keywords are added
+        """
+        queue = deque(self.goto[0].values())
+        for state in queue:
+            self.fail[state] = 0
+        while queue:
+            state = queue.popleft()
+            for c, next_state in self.goto[state].items():
+                queue.append(next_state)
+                f = self.fail[state]
+                while f and c not in self.goto[f]:
+                    f = self.fail[f]
+                f = self.goto[f].get(c, 0)
+                self.fail[next_state] = f
+                self.out[next_state] += self.out[f]
+        self.is_ready = True
+
+    def iter_matches(self, text: str) -> Iterable[Any]:
+        """
+        Iterate values of all keywords found in text.
+        Value is yielded on every keyword occurrence
+        """
+        if not self.is_ready:
+            raise RuntimeError("Automaton is not built")
+        goto, fail, out = self.goto, self.fail, self.out
+        state = 0
+        for c in text:
+            while state and c not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(c, 0)
+            if out[state]:
+                yield from out[state]
+
+    def search(self, text: str) -> Set[Any]:
+        """
+        Get set of values of all keywords found in text
+        """
+        return set(self.iter_matches(text))
@@ -1,135 +1,172 @@
 # ----------------------------------------------------------------------
 # Decorators
 # ----------------------------------------------------------------------
-# Copyright (C) 2007-2020 The NOC Project
+# Copyright (C) 2007-2022 The NOC Project
 # See LICENSE for details
 # ----------------------------------------------------------------------
 
+# Python modules
+import contextlib
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
 # NOC modules
 from noc.core.perf import metrics
 from .base import cache as x_cache
 
 
-def cachedmethod(cache=None, key="cache-%s", lock=None, ttl=None, version=0):
+class NegativeEntry(object):
+    """
+    In-memory cache marker for None result, expiring separately
+    """
+
+    __slots__ = ("expires",)
+
+    def __init__(self, ttl: float):
+        self.expires = time.monotonic() + ttl
+
+    def is_expired(self) -> bool:
+        return self.expires <= time.monotonic()
+
+
+class Flight(object):
+    __slots__ = ("event", "value", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight(object):
+    """
+    Coalesce concurrent calls for same key.
+    Only first caller (leader) runs the function,
+    others wait for and share its result
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flights: Dict[str, Flight] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn or wait for running one
+        :param key: Coalescing key
+        :param fn: Callable without arguments
+        :return: (fn result, True if result is shared with the leader)
+        """
+        with self.lock:
+            flight = self.flights.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = Flight()
+                self.flights[key] = flight
+        if not is_leader:
+            flight.event.wait()
+            if flight.error:
+                raise flight.error
+            return flight.value, True
+        try:
+            flight.value = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.flights[key]
+            flight.event.set()
+        return flight.value, False
+
+
+def cachedmethod(cache=None, key="cache-%s", lock=None, ttl=None, version=0, negative_ttl=None):
     """
     Decorator to wrap class instance or method
-    with memoizing callable
+    with memoizing callable.
+    Concurrent calls with same key are coalesced into one.
     :param cache: In-memory function which follows dict protocol.
         None, when no in-memory caching required
     :param key: Key mask to convert args to string
     :param lock: Callable to get threading lock
     :param ttl: Record time-to-live
     :param version: External cache version
+    :param negative_ttl: Time-to-live of None result in in-memory cache.
+        None result is kept for in-memory cache lifetime if not set.
+        None result is never stored in external cache
     :return:
     """
 
     def decorator(method):
-        if lock:
-
-            def wrapper(self, *args, **kwargs):
-                perf_key = key.replace("-%s", "").replace("-", "_")
-                perf_key_requests = metrics["cache_requests", ("cache_key", perf_key)]
-                perf_key_l1_hits = metrics[
-                    "cache_hits", ("cache_key", perf_key), ("cache_level", "internal")
-                ]
-                perf_key_l2_hits = metrics[
-                    "cache_hits", ("cache_key", perf_key), ("cache_level", "external")
-                ]
-                perf_key_misses = metrics["cache_misses", ("cache_key", perf_key)]
-                perf_key_lock_acquires = metrics["cache_locks_acquires", ("cache_key", perf_key)]
-                perf_key_requests += 1
-                k = key % args
-                with lock(self):
-                    perf_key_lock_acquires += 1
-                    if cache:
-                        # Try in-memory cache
-                        c = cache(self)
-                        if c is not None:
-                            # In-memory cache provided
-                            try:
-                                v = c[k]
-                                perf_key_l1_hits += 1
-                                return v
-                            except KeyError:
-                                pass
-                # Try external cache
-                v = x_cache.get(k, version=version)
-                if v:
-                    perf_key_l2_hits += 1
-                    if cache:
-                        with lock(self):
-                            perf_key_lock_acquires += 1
-                            # Backfill in-memory cache
-                            try:
-                                c[k] = v
-                            except ValueError:
-                                pass  # Value too large
-                    return v
-                # Fallback to function
-                perf_key_misses += 1
-                v = method(self, *args, **kwargs)
-                with lock(self):
-                    perf_key_lock_acquires += 1
-                    if cache:
-                        # Backfill in-memory cache
-                        try:
-                            c[k] = v
-                        except ValueError:
-                            pass
-                    # Backfill external cache
-                    x_cache.set(k, v, ttl=ttl, version=version)
-                # Done
+        perf_key = key.replace("-%s", "").replace("-", "_")
+        flights = SingleFlight()
+
+        def get_lock(self):
+            if not lock:
+                return contextlib.nullcontext()
+            metrics["cache_locks_acquires", ("cache_key", perf_key)] += 1
+            return lock(self)
+
+        def set_cached(self, k, v):
+            """
+            Backfill in-memory cache
+            """
+            if not cache:
+                return
+            c = cache(self)
+            if c is None:
+                return
+            if v is None and negative_ttl:
+                v = NegativeEntry(negative_ttl)
+            with get_lock(self):
+                try:
+                    c[k] = v
+                except ValueError:
+                    pass  # Value too large
+
+        def load(self, k, *args, **kwargs):
+            # Try external cache
+            v = x_cache.get(k, version=version)
+            if v:
+                metrics["cache_hits", ("cache_key", perf_key), ("cache_level", "external")] += 1
+                set_cached(self, k, v)
                 return v
+            # Fallback to function
+            metrics["cache_misses", ("cache_key", perf_key)] += 1
+            v = method(self, *args, **kwargs)
+            set_cached(self, k, v)
+            if v is not None:
+                # Backfill external cache
+                x_cache.set(k, v, ttl=ttl, version=version)
+            return v
 
-        else:
-
-            def wrapper(self, *args, **kwargs):
-                perf_key = key.replace("-%s", "").replace("-", "_")
-                perf_key_requests = metrics["cache_requests", ("cache_key", perf_key)]
-                perf_key_l1_hits = metrics[
-                    "cache_hits", ("cache_key", perf_key), ("cache_level", "internal")
-                ]
-                perf_key_l2_hits = metrics[
-                    "cache_hits", ("cache_key", perf_key), ("cache_level", "external")
-                ]
-                perf_key_misses = metrics["cache_misses", ("cache_key", perf_key)]
-                perf_key_requests += 1
-                k = key % args
-                if cache:
-                    # Try in-memory cache
-                    c = cache(self)
-                    if c is not None:
-                        # In-memory cache provided
-                        try:
+        def wrapper(self, *args, **kwargs):
+            metrics["cache_requests", ("cache_key", perf_key)] += 1
+            k = key % args
+            if cache:
+                # Try in-memory cache
+                c = cache(self)
+                if c is not None:
+                    # In-memory cache provided
+                    try:
+                        with get_lock(self):
                             v = c[k]
-                            perf_key_l1_hits += 1
+                        if not isinstance(v, NegativeEntry):
+                            metrics[
+                                "cache_hits", ("cache_key", perf_key), ("cache_level", "internal")
+                            ] += 1
                             return v
-                        except KeyError:
-                            pass
-                # Try external cache
-                v = x_cache.get(k, version=version)
-                if v:
-                    perf_key_l2_hits += 1
-                    if cache:
-                        # Backfill in-memory cache
-                        try:
-                            c[k] = v
-                        except ValueError:
-                            pass  # Value too large
-                    return v
-                # Fallback to function
-                perf_key_misses += 1
-                v = method(self, *args, **kwargs)
-                if cache:
-                    # Backfill in-memory cache
-                    try:
-                        c[k] = v
-                    except ValueError:
+                        if not v.is_expired():
+                            metrics[
+                                "cache_hits", ("cache_key", perf_key), ("cache_level", "negative")
+                            ] += 1
+                            return None
+                    except KeyError:
                         pass
-                # Backfill external cache
-                x_cache.set(k, v, ttl=ttl, version=version)
-                # Done
-                return v
+            v, is_shared = flights.do(k, lambda: load(self, k, *args, **kwargs))
+            if is_shared:
+                metrics["cache_coalesced", ("cache_key", perf_key)] += 1
+            return v
 
         return wrapper
 
@@ -0,0 +1,103 @@
+# ----------------------------------------------------------------------
+# Cluster-wide invalidation of process-local model caches
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Python modules
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+# Third-party modules
+import cachetools
+import orjson
+
+# NOC modules
+from noc.config import config
+from noc.core.perf import metrics
+from noc.models import get_model_id
+
+INVALIDATION_STREAM = "cacheinvalidation"
+
+logger = logging.getLogger(__name__)
+
+# Model id -> model, having .invalidate_caches()
+_models: Dict[str, Any] = {}
+
+
+def cache_invalidation(model):
+    """
+    @cache_invalidation decorator. Model's process-local caches
+    are dropped in every process when the model is changed.
+    Model must be tracked by @change and implement classmethod
+    .invalidate_caches(id), dropping all caches when id is None
+    :param model:
+    :return:
+    """
+    if not hasattr(model, "invalidate_caches"):
+        raise ValueError(f"[{get_model_id(model)}] Missed .invalidate_caches")
+    _models[get_model_id(model)] = model
+    return model
+
+
+def has_cache_invalidation(model_id: str) -> bool:
+    """
+    Check if model's caches are invalidated on change
+    """
+    return model_id in _models
+
+
+def get_ttl_cache(maxsize: int, ttl: float) -> cachetools.TTLCache:
+    """
+    Process-local cache for model with @cache_invalidation.
+    Size and TTL are scaled when invalidation is enabled
+    :param maxsize: Cache size
+    :param ttl: Record time-to-live
+    :return:
+    """
+    if config.cache.enable_invalidation:
+        maxsize *= config.cache.invalidation_scale
+        ttl *= config.cache.invalidation_scale
+    return cachetools.TTLCache(maxsize=maxsize, ttl=ttl)
+
+
+def publish_invalidation(changes: List[Tuple[str, str]]) -> None:
+    """
+    Send invalidation to all processes
+    :param changes: List of (model id, item id)
+    :return:
+    """
+    from noc.core.service.loader import get_service
+
+    get_service().publish(value=orjson.dumps(changes), stream=INVALIDATION_STREAM, partition=0)
+
+
+def apply_invalidation(changes: List[Tuple[str, Optional[str]]]) -> None:
+    """
+    Drop process-local caches for changed items.
+    Models, not loaded by process, are ignored
+    :param changes: List of (model id, item id). Item id None drops all model caches
+    :return:
+    """
+    for model_id, item_id in changes:
+        model = _models.get(model_id)
+        if not model:
+            continue
+        if item_id is not None:
+            item_id = str(item_id)
+        logger.debug("[%s|%s] Invalidating caches", model_id, item_id)
+        try:
+            model.invalidate_caches(item_id)
+        except Exception as e:
+            logger.error("[%s|%s] Failed to invalidate caches: %s", model_id, item_id, e)
+            continue
+        metrics["cache_invalidations", ("model", model_id)] += 1
+
+
+def invalidate_all() -> None:
+    """
+    Drop all caches for all known models,
+    when invalidations may be lost
+    """
+    apply_invalidation([(model_id, None) for model_id in _models])
@@ -13,6 +13,7 @@ from typing import Optional, Any, Dict, List
 from .node.base import BaseCDAGNode
 from .node.loader import loader
 from .tx import Transaction
+from .plan import ExecutionPlan
 
 
 class CDAG(object):
@@ -59,6 +60,13 @@ class CDAG(object):
         """
         return Transaction(self)
 
+    def compile(self) -> ExecutionPlan:
+        """
+        Compile graph to the execution plan
+        :return:
+        """
+        return ExecutionPlan.compile(self.nodes.values())
+
     def get_node(self, name: str) -> Optional[BaseCDAGNode]:
         return self.nodes.get(name)
 
@@ -8,6 +8,9 @@
 # Python modules
 from typing import Optional
 
+# Third-party modules
+import numpy as np
+
 # NOC modules
 from .base import BaseCDAGNode, ValueType, Category
 
@@ -22,3 +25,6 @@ class AbsNode(BaseCDAGNode):
 
     def get_value(self, x: ValueType) -> Optional[ValueType]:
         return abs(x)
+
+    def get_value_batch(self, x: np.ndarray) -> np.ndarray:
+        return np.abs(x)
@@ -169,8 +169,8 @@ class BaseCDAGNode(object, metaclass=BaseCDAGNodeMetaclass):
         self._node_id = sys.intern(node_id)
         self._prefix = sys.intern(prefix) if prefix else None
         self.description = description
-        self.state = self.clean_state(state)
         self.config = self.clean_config(config)
+        self.state = self.clean_state(state)
         self._subscribers: Optional[Subscriber] = None
         self.bound_inputs: Optional[Set[str]] = None  # Lives until .freeze()
         self.dynamic_inputs: Optional[Dict[str, bool]] = None
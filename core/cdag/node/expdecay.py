@@ -11,6 +11,7 @@ from math import exp
 
 # Third-party modules
 from pydantic import BaseModel
+import numpy as np
 
 # NOC modules
 from .window import WindowNode, WindowConfig
@@ -38,9 +39,9 @@ class ExpDecayNode(WindowNode):
     config_cls = ExpDecayNodeConfig
     categories = [Category.WINDOW]
 
-    def get_window_value(
-        self, values: List[ValueType], timestamps: List[int]
-    ) -> Optional[ValueType]:
-        t0 = timestamps[-1] // NS
+    def get_window_value(self, values: np.ndarray, timestamps: np.ndarray) -> Optional[ValueType]:
+        t0 = timestamps[-1].item() // NS
         nk = self.config.k
-        return sum(v * exp(nk * t0 - ts // NS) for ts, v in zip(timestamps, values))
+        return sum(
+            v * exp(nk * t0 - ts // NS) for ts, v in zip(timestamps.tolist(), values.tolist())
+        )
@@ -6,7 +6,7 @@
 # ----------------------------------------------------------------------
 
 # Python modules
-from typing import Optional, List
+from typing import Optional
 
 # Third-party modules
 import numpy as np
@@ -36,17 +36,14 @@ class GaussNode(WindowNode):
     def get_missed_value(self) -> Optional[ValueType]:
         return self.config.true_level
 
-    def get_window_value(
-        self, values: List[ValueType], timestamps: List[int]
-    ) -> Optional[ValueType]:
+    def get_window_value(self, values: np.ndarray, timestamps: np.ndarray) -> Optional[ValueType]:
         if len(values) == 1:
             return self.config.true_level  # pragma: no cover
-        v = np.array(self.state.values[:-1])
+        v = values[:-1]
         mean = np.mean(v)
         std = np.std(v)
         if abs(values[-1] - mean) <= self.config.n_sigma * std:
             return self.config.true_level
         if self.config.skip_outliers:
-            del self.state.values[-1]
-            del self.state.timestamps[-1]
+            self.state.pop()
         return self.config.false_level
@@ -6,13 +6,14 @@
 # ----------------------------------------------------------------------
 
 # Python modules
-from typing import Optional, List
+from typing import Any, Optional, List, Dict
 
 # Third-party modules
 from pydantic import BaseModel
 import numpy as np
 
 # NOC modules
+from ..ringbuffer import RingBuffer
 from .base import BaseCDAGNode, ValueType, Category
 
 
@@ -20,6 +21,20 @@ class MeanNodeState(BaseModel):
     values: List[float] = []
 
 
+class MeanState(object):
+    """
+    Array-backed state. Serialized to the MeanNodeState format (newest values first)
+    """
+
+    __slots__ = ("values",)
+
+    def __init__(self, values: List[float], capacity: int):
+        self.values = RingBuffer(reversed(values), capacity=capacity, dtype=np.float64)
+
+    def dict(self) -> Dict[str, Any]:
+        return {"values": self.values.data[::-1].tolist()}
+
+
 class MeanNodeConfig(BaseModel):
     min_window: int = 3
     max_window: int = 100
@@ -35,16 +50,19 @@ class MeanNode(BaseCDAGNode):
     state_cls = MeanNodeState
     categories = [Category.STATISTICS]
 
+    def clean_state(self, state: Optional[Dict[str, Any]]) -> Optional[MeanState]:
+        state = super().clean_state(state)
+        return MeanState(state.values, capacity=self.config.max_window + 1 if self.config else 1)
+
     def get_stats(self, values: np.array) -> float:
         return np.mean(values)
 
     def get_value(self, x: ValueType) -> Optional[ValueType]:
-        self.state.values.insert(0, float(x))
+        self.state.values.push(float(x))
         # Trim
-        if len(self.state.values) >= self.config.max_window:
-            self.state.values = self.state.values[: self.config.max_window]
+        self.state.values.trim(self.config.max_window)
         # Check window is filled
         if len(self.state.values) < self.config.min_window:
             return None
-        values = np.array(self.state.values)
-        return self.get_stats(values)
+        # Newest values first
+        return self.get_stats(self.state.values.data[::-1])
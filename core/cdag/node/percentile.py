@@ -6,7 +6,10 @@
 # ----------------------------------------------------------------------
 
 # Python modules
-from typing import Optional, List
+from typing import Optional
+
+# Third-party modules
+import numpy as np
 
 # NOC modules
 from .base import ValueType, Category
@@ -25,10 +28,8 @@ class PercentileNode(WindowNode):
     name = "percentile"
     config_cls = PercentileNodeConfig
     categories = [Category.WINDOW]
+    use_order_statistics = True
 
-    def get_window_value(
-        self, values: List[ValueType], timestamps: List[int]
-    ) -> Optional[ValueType]:
-        wl = list(sorted(values))
-        i = len(wl) * self.config.percentile // 100
-        return wl[i]
+    def get_window_value(self, values: np.ndarray, timestamps: np.ndarray) -> Optional[ValueType]:
+        i = len(values) * self.config.percentile // 100
+        return self.state.order.nth(i)
@@ -6,9 +6,12 @@
 # ----------------------------------------------------------------------
 
 # Python modules
-from typing import Optional, List
+from typing import Optional
 from enum import Enum
 
+# Third-party modules
+import numpy as np
+
 # NOC modules
 from .base import ValueType, Category
 from .window import WindowNode, WindowConfig
@@ -33,11 +36,10 @@ class SumStepNode(WindowNode):
     config_cls = SumStepNodeConfig
     categories = [Category.WINDOW]
 
-    def get_window_value(
-        self, values: List[ValueType], timestamps: List[int]
-    ) -> Optional[ValueType]:
+    def get_window_value(self, values: np.ndarray, timestamps: np.ndarray) -> Optional[ValueType]:
+        steps = np.diff(values)
         if self.config.direction == StepDirection.INC:
-            return sum(x1 - x0 for x0, x1 in zip(values, values[1:]) if x1 > x0)
+            return steps[steps > 0].sum().item()
         if self.config.direction == StepDirection.DEC:
-            return sum(x0 - x1 for x0, x1 in zip(values, values[1:]) if x1 < x0)
-        return sum(abs(x1 - x0) for x0, x1 in zip(values, values[1:]))
+            return abs(steps[steps < 0].sum().item())
+        return np.abs(steps).sum().item()
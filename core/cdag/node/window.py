@@ -6,15 +6,17 @@
 # ----------------------------------------------------------------------
 
 # Python modules
-from typing import Optional, List
+from typing import Any, Optional, List, Dict
 from enum import Enum
 from time import time_ns
 
 # Third-party modules
 from pydantic import BaseModel
+import numpy as np
 
 # NOC modules
 from ..typing import ValueType, StrictValueType
+from ..ringbuffer import RingBuffer, OrderStatistics, DEFAULT_CAPACITY
 from .base import BaseCDAGNode, Category
 
 NS = 1_000_000_000
@@ -30,6 +32,52 @@ class WindowNodeState(BaseModel):
     values: List[StrictValueType] = []
 
 
+class WindowState(object):
+    """
+    Array-backed window state. Serialized to the WindowNodeState format
+    """
+
+    __slots__ = ("timestamps", "values", "order")
+
+    def __init__(
+        self,
+        timestamps: List[int],
+        values: List[ValueType],
+        capacity: int = DEFAULT_CAPACITY,
+        ordered: bool = False,
+    ):
+        self.timestamps = RingBuffer(timestamps, capacity=capacity, dtype=np.int64)
+        self.values = RingBuffer(values, capacity=capacity)
+        self.order = OrderStatistics(values) if ordered else None
+
+    def push(self, ts: int, value: ValueType) -> None:
+        self.timestamps.push(ts)
+        self.values.push(value)
+        if self.order is not None:
+            self.order.add(value)
+
+    def shift(self, n: int) -> None:
+        """
+        Remove `n` oldest items
+        """
+        self.timestamps.shift(n)
+        removed = self.values.shift(n)
+        if self.order is not None:
+            self.order.remove_many(removed.tolist())
+
+    def pop(self) -> None:
+        """
+        Remove newest item
+        """
+        self.timestamps.pop()
+        v = self.values.pop()
+        if self.order is not None:
+            self.order.remove(v)
+
+    def dict(self) -> Dict[str, Any]:
+        return {"timestamps": self.timestamps.tolist(), "values": self.values.tolist()}
+
+
 class WindowConfig(BaseModel):
     type: WindowType = WindowType.TICKS
     min_window: int = 1
@@ -41,10 +89,28 @@ class WindowNode(BaseCDAGNode):
     config_cls = WindowConfig
     state_cls = WindowNodeState
     categories = [Category.WINDOW]
+    # Maintain sorted values for order statistics
+    use_order_statistics = False
+
+    def clean_state(self, state: Optional[Dict[str, Any]]) -> Optional[WindowState]:
+        state = super().clean_state(state)
+        capacity = DEFAULT_CAPACITY
+        if self.config and self.config.type == WindowType.TICKS:
+            # Window is trimmed after push
+            capacity = self.config.max_window + 1
+        return WindowState(
+            state.timestamps, state.values, capacity=capacity, ordered=self.use_order_statistics
+        )
 
     def get_window_value(
-        self, values: List[ValueType], timestamps: List[int]
+        self, values: np.ndarray, timestamps: np.ndarray
     ) -> Optional[ValueType]:  # pragma: no cover
+        """
+        Calculate value over the window.
+        :param values: Ordered view of window values, from oldest to newest
+        :param timestamps: Ordered view of window timestamps
+        :return:
+        """
         raise NotImplementedError
 
     def is_filled_ticks(self) -> bool:
@@ -61,27 +127,25 @@ class WindowNode(BaseCDAGNode):
         """
         return (
             bool(self.state.timestamps)
-            and (ts - self.state.timestamps[0]) >= self.config.min_window * NS
+            and (ts - self.state.timestamps.first()) >= self.config.min_window * NS
         )
 
     def trim_ticks(self) -> None:
-        del self.state.values[: -self.config.max_window]
-        del self.state.timestamps[: -self.config.max_window]
+        n = len(self.state.values) - self.config.max_window
+        if n > 0:
+            self.state.shift(n)
 
     def trim_seconds(self, ts: int) -> None:
-        n = 0
         deadline = ts - self.config.max_window * NS
-        for t in self.state.timestamps:
-            if t >= deadline:
-                break
-            n += 1
-        if n:
-            del self.state.values[:n]
-            del self.state.timestamps[:n]
+        if not self.state.timestamps or self.state.timestamps.first() >= deadline:
+            return
+        # Count leading items before deadline
+        mask = self.state.timestamps.data >= deadline
+        n = int(mask.argmax()) if mask.any() else len(mask)
+        self.state.shift(n)
 
     def push(self, ts: int, value: ValueType) -> None:
-        self.state.values.append(value)
-        self.state.timestamps.append(ts)
+        self.state.push(ts, value)
 
     def get_value(self, x: ValueType) -> Optional[ValueType]:
         # Fill the window
@@ -101,7 +165,7 @@ class WindowNode(BaseCDAGNode):
         else:
             self.trim_seconds(ts)
         # Calculate value
-        return self.get_window_value(self.state.values, self.state.timestamps)
+        return self.get_window_value(self.state.values.data, self.state.timestamps.data)
 
     def get_missed_value(self) -> Optional[ValueType]:
         return None
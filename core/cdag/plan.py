@@ -0,0 +1,430 @@
+# ----------------------------------------------------------------------
+# Compiled execution plan
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Python modules
+from typing import Any, Dict, List, Iterable, Optional, Tuple
+from collections import deque
+
+# Third-party modules
+import numpy as np
+
+# NOC modules
+from .typing import ValueType
+from .node.base import BaseCDAGNode, IN_OPTIONAL, IN_REQUIRED
+
+# Minimal amount of ready samples to calculate node by .get_value_batch()
+BATCH_MIN_SIZE = 32
+# Integers, exactly representable by float
+MAX_EXACT_INT = 1 << 53
+
+
+class ExecutionPlan(object):
+    """
+    Frozen subgraph compiled to the flat, topologically ordered arrays.
+    Nodes are referenced by index, so the transaction keeps inputs
+    in the preallocated lists instead of per-node dicts.
+    The plan must be rebuilt after any change of the graph structure.
+    """
+
+    __slots__ = (
+        "nodes",
+        "index",
+        "initial_inputs",
+        "req_count",
+        "input_types",
+        "subscribers",
+        "has_state",
+        "req_inputs",
+    )
+
+    def __init__(self, nodes: List[BaseCDAGNode]):
+        self.nodes = nodes
+        self.index: Dict[BaseCDAGNode, int] = {node: i for i, node in enumerate(nodes)}
+        self.initial_inputs: List[Optional[Dict[str, ValueType]]] = []
+        self.req_count: List[int] = []
+        self.input_types: List[Dict[str, int]] = []
+        self.subscribers: List[Tuple[Tuple[int, str], ...]] = []
+        self.has_state: List[bool] = []
+        # Required inputs, not set by initial inputs
+        self.req_inputs: List[Tuple[str, ...]] = []
+        for node in nodes:
+            initial = node.get_initial_inputs()
+            self.initial_inputs.append(initial or None)
+            self.req_count.append(
+                node.req_inputs_count - sum(1 for n in initial if node.is_required_input(n))
+            )
+            self.input_types.append({n: node.get_input_type(n) for n in node.iter_inputs()})
+            self.subscribers.append(
+                tuple((self.index[s.node], s.input) for s in node.iter_subscribers())
+            )
+            self.has_state.append(hasattr(node, "state_cls"))
+            self.req_inputs.append(
+                tuple(
+                    n
+                    for n, t in self.input_types[-1].items()
+                    if t == IN_REQUIRED and initial.get(n) is None
+                )
+            )
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    @classmethod
+    def compile(cls, roots: Iterable[BaseCDAGNode]) -> "ExecutionPlan":
+        """
+        Compile all nodes reachable from roots
+        :param roots: Entry nodes
+        :return:
+        """
+        # Collect reachable nodes
+        seen = set()
+        order: List[BaseCDAGNode] = []
+        stack = list(roots)
+        while stack:
+            node = stack.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            order.append(node)
+            stack.extend(s.node for s in node.iter_subscribers())
+        # Topological sort
+        in_degree: Dict[BaseCDAGNode, int] = {node: 0 for node in order}
+        for node in order:
+            for s in node.iter_subscribers():
+                in_degree[s.node] += 1
+        queue = deque(node for node in order if not in_degree[node])
+        nodes: List[BaseCDAGNode] = []
+        while queue:
+            node = queue.popleft()
+            nodes.append(node)
+            for s in node.iter_subscribers():
+                in_degree[s.node] -= 1
+                if not in_degree[s.node]:
+                    queue.append(s.node)
+        if len(nodes) != len(order):
+            raise ValueError("Graph contains cycles")
+        return ExecutionPlan(nodes)
+
+    def begin(self) -> "PlanTransaction":
+        """
+        Start new transaction over the plan
+        """
+        return PlanTransaction(self)
+
+    def begin_batch(self, size: int) -> "BatchTransaction":
+        """
+        Start new batch transaction over the plan
+        :param size: Number of samples
+        """
+        return BatchTransaction(self, size)
+
+
+class PlanTransaction(object):
+    """
+    Transaction over compiled plan.
+    Keeps the activation semantics of the `Transaction`:
+    node is calculated as soon as all required inputs are activated
+    """
+
+    __slots__ = ("plan", "inputs", "req_left", "_states")
+
+    def __init__(self, plan: ExecutionPlan):
+        self.plan = plan
+        self.inputs: List[Optional[Dict[str, ValueType]]] = [None] * len(plan)
+        self.req_left: List[int] = plan.req_count[:]
+        self._states: Dict[str, Any] = {}
+
+    def activate(self, node: BaseCDAGNode, name: str, value: ValueType) -> None:
+        """
+        Activate node input
+        :param node: Node instance
+        :param name: Input name
+        :param value: Input value
+        :return:
+        """
+        self.activate_index(self.plan.index[node], name, value)
+
+    def activate_index(self, idx: int, name: str, value: ValueType) -> None:
+        """
+        Activate node input by node index
+        """
+        plan = self.plan
+        in_type = plan.input_types[idx].get(name)
+        if in_type is None:
+            raise KeyError(f"Invalid input {name}")
+        inputs = self.inputs[idx]
+        if inputs is None:
+            initial = plan.initial_inputs[idx]
+            inputs = initial.copy() if initial else {}
+            self.inputs[idx] = inputs
+        if inputs.get(name) is not None:
+            return  # Already activated
+        inputs[name] = value
+        # Optional inputs cannot trigger the activation
+        if in_type == IN_OPTIONAL:
+            return
+        left = self.req_left[idx]
+        if left > 1:
+            self.req_left[idx] = left - 1
+            return  # Not all required inputs are activated
+        # Calculate value
+        node = plan.nodes[idx]
+        value = node.get_value(**inputs)
+        if plan.has_state[idx]:
+            self.update_state(node)
+        if value is not None:
+            for s_idx, s_input in plan.subscribers[idx]:
+                self.activate_index(s_idx, s_input, value)
+
+    def get_inputs(self, node: BaseCDAGNode) -> Dict[str, ValueType]:
+        """
+        Get node's actual inputs
+        """
+        return self.inputs[self.plan.index[node]] or {}
+
+    def update_state(self, node: BaseCDAGNode) -> None:
+        state = node.get_state()
+        if not state:
+            return
+        d = state.dict()
+        if d:
+            self._states[node.node_id] = d
+
+    def get_changed_state(self) -> Dict[str, Any]:
+        """
+        Get side effect of transaction
+        """
+        return self._states
+
+
+class BatchTransaction(object):
+    """
+    Transaction over compiled plan for the sequence of samples.
+    Equivalent to the sequence of `PlanTransaction`, one per sample,
+    but the nodes are calculated column-wise: in plan order,
+    each node for all the samples at once. Every node sees the samples
+    in original order, so stateful nodes get the same sequence of values.
+    Nodes having `.get_value_batch()` are calculated by NumPy in bulk,
+    when enough samples are ready and all the inputs are floats.
+
+    The activation order within the sample is tracked by the logical clock,
+    incremented on every external activation. Node is ready at the time
+    of the last required input, and its outputs inherit the time.
+    Optional inputs, activated later, are not passed to the node,
+    like in `PlanTransaction`. None values are ignored.
+    """
+
+    __slots__ = ("plan", "size", "columns", "clock", "_states")
+
+    def __init__(self, plan: ExecutionPlan, size: int):
+        self.plan = plan
+        self.size = size
+        # Node index -> input name -> (value per sample, activation time per sample)
+        self.columns: List[Optional[Dict[str, Tuple[List[Any], List[int]]]]] = [None] * len(plan)
+        self.clock: List[int] = [0] * size
+        self._states: Dict[str, Any] = {}
+
+    def get_column(self, idx: int, name: str) -> Optional[Tuple[List[Any], List[int]]]:
+        """
+        Get input's values and times. None if the input is set by initial inputs
+        """
+        columns = self.columns[idx]
+        if columns is None:
+            columns = {}
+            self.columns[idx] = columns
+        column = columns.get(name)
+        if column is None:
+            initial = self.plan.initial_inputs[idx]
+            if initial and initial.get(name) is not None:
+                return None
+            column = ([None] * self.size, [0] * self.size)
+            columns[name] = column
+        return column
+
+    def activate(self, node: BaseCDAGNode, name: str, value: ValueType, sample: int) -> None:
+        """
+        Activate node input for the sample. Nodes are not calculated until .commit()
+        :param node: Node instance
+        :param name: Input name
+        :param value: Input value
+        :param sample: Sample index
+        :return:
+        """
+        self.activate_sample(sample, [(node, name, value)])
+
+    def activate_sample(
+        self, sample: int, activations: Iterable[Tuple[BaseCDAGNode, str, ValueType]]
+    ) -> None:
+        """
+        Activate the sequence of node inputs for the sample
+        :param sample: Sample index
+        :param activations: Iterable of (node, input name, value)
+        :return:
+        """
+        index = self.plan.index
+        input_types = self.plan.input_types
+        all_columns = self.columns
+        t = self.clock[sample]
+        for node, name, value in activations:
+            idx = index[node]
+            if name not in input_types[idx]:
+                raise KeyError(f"Invalid input {name}")
+            t += 1
+            if value is None:
+                continue
+            columns = all_columns[idx]
+            column = columns.get(name) if columns else None
+            if column is None:
+                column = self.get_column(idx, name)
+                if column is None:
+                    continue  # Set by initial inputs
+            values, times = column
+            if values[sample] is None:  # First activation wins
+                values[sample] = value
+                times[sample] = t
+        self.clock[sample] = t
+
+    def commit(self) -> None:
+        """
+        Calculate all the nodes for all the samples
+        """
+        plan = self.plan
+        for idx in range(len(plan)):
+            columns = self.columns[idx]
+            if columns is None:
+                continue  # Not activated
+            req = plan.req_inputs[idx]
+            if not req or not columns.keys() >= set(req):
+                continue  # Cannot be activated
+            # Find ready samples and the readiness time
+            if len(req) == 1:
+                values, times = columns[req[0]]
+                ready = [s for s, x in enumerate(values) if x is not None]
+                ready_times = [times[s] for s in ready]
+            else:
+                ready = []
+                ready_times = []
+                for s, (row, row_times) in enumerate(
+                    zip(
+                        zip(*(columns[name][0] for name in req)),
+                        zip(*(columns[name][1] for name in req)),
+                    )
+                ):
+                    if None not in row:
+                        ready.append(s)
+                        ready_times.append(max(row_times))
+            if not ready:
+                continue
+            node = plan.nodes[idx]
+            results = None
+            if len(ready) >= BATCH_MIN_SIZE and hasattr(node, "get_value_batch"):
+                results = self.get_batch(idx, node, ready)
+            if results is None:
+                results = self.get_values(idx, node, ready, ready_times)
+            if plan.has_state[idx]:
+                self.update_state(node)
+            # Pass results to subscribers
+            for s_idx, s_input in plan.subscribers[idx]:
+                s_columns = self.columns[s_idx]
+                column = s_columns.get(s_input) if s_columns else None
+                if column is None:
+                    column = self.get_column(s_idx, s_input)
+                    if column is None:
+                        continue  # Set by initial inputs
+                s_values, s_times = column
+                for s, t, value in zip(ready, ready_times, results):
+                    if value is not None and (s_values[s] is None or s_times[s] > t):
+                        s_values[s] = value
+                        s_times[s] = t
+
+    def get_values(
+        self, idx: int, node: BaseCDAGNode, ready: List[int], ready_times: List[int]
+    ) -> List[Optional[ValueType]]:
+        """
+        Calculate node for ready samples, one by one
+        """
+        initial = self.plan.initial_inputs[idx]
+        columns = self.columns[idx]
+        names = list(columns)
+        get_value = node.get_value
+        r = []
+        if len(names) == len(self.plan.req_inputs[idx]):
+            # Required inputs only, all are set for the ready samples
+            value_lists = [columns[name][0] for name in names]
+            if len(ready) == self.size:
+                rows = zip(*value_lists)
+            else:
+                rows = zip(*([values[s] for s in ready] for values in value_lists))
+            for row in rows:
+                inputs = dict(zip(names, row))
+                if initial:
+                    inputs.update(initial)
+                r.append(get_value(**inputs))
+            return r
+        # Pass optional inputs, activated before the node is ready
+        items = list(columns.items())
+        for s, t in zip(ready, ready_times):
+            inputs = {
+                name: x
+                for name, (values, times) in items
+                if (x := values[s]) is not None and times[s] <= t
+            }
+            if initial:
+                inputs.update(initial)
+            r.append(get_value(**inputs))
+        return r
+
+    def get_inputs(self, node: BaseCDAGNode, sample: int) -> Dict[str, ValueType]:
+        """
+        Get node's actual inputs for the sample
+        """
+        idx = self.plan.index[node]
+        initial = self.plan.initial_inputs[idx]
+        inputs = initial.copy() if initial else {}
+        for name, (values, _) in (self.columns[idx] or {}).items():
+            if values[sample] is not None:
+                inputs[name] = values[sample]
+        return inputs
+
+    def get_batch(
+        self, idx: int, node: BaseCDAGNode, ready: List[int]
+    ) -> Optional[List[ValueType]]:
+        """
+        Calculate node for ready samples by NumPy.
+        Returns None, when inputs are not suitable for vectorization
+        """
+        inputs: Dict[str, Any] = {}
+        initial = self.plan.initial_inputs[idx] or {}
+        for name in self.plan.input_types[idx]:
+            x = initial.get(name)
+            if x is not None:
+                # Integer is converted to float exactly, like Python does for mixed operands
+                if not (type(x) is float or (type(x) is int and abs(x) <= MAX_EXACT_INT)):
+                    return None
+                inputs[name] = x  # Broadcast const
+                continue
+            values, _ = self.columns[idx][name]
+            column = [values[s] for s in ready]
+            if any(type(x) is not float for x in column):
+                return None
+            inputs[name] = np.array(column, dtype=np.float64)
+        with np.errstate(all="ignore"):
+            return node.get_value_batch(**inputs).tolist()
+
+    def update_state(self, node: BaseCDAGNode) -> None:
+        state = node.get_state()
+        if not state:
+            return
+        d = state.dict()
+        if d:
+            self._states[node.node_id] = d
+
+    def get_changed_state(self) -> Dict[str, Any]:
+        """
+        Get side effect of transaction
+        """
+        return self._states
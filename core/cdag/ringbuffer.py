@@ -0,0 +1,179 @@
+# ----------------------------------------------------------------------
+# Array-backed window buffers
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Python modules
+from typing import Optional, List, Iterable
+from bisect import bisect_left, insort
+
+# Third-party modules
+import numpy as np
+
+# NOC modules
+from .typing import ValueType
+
+DEFAULT_CAPACITY = 16
+
+
+class RingBuffer(object):
+    """
+    Fixed-capacity, numpy-backed FIFO buffer.
+
+    Items are stored in the array of the doubled capacity. New items are
+    appended to the tail, old ones are removed from the head by moving
+    the start pointer. When the tail reaches the end of the array,
+    live items are moved to the array's head. So the live items are
+    always contiguous and the `data` is the zero-copy view,
+    while the amortized cost of push is O(1).
+
+    Buffer grows when the amount of live items exceeds the capacity.
+    Integer buffers are promoted to float ones on first float value.
+    """
+
+    __slots__ = ("_data", "_start", "_end")
+
+    def __init__(
+        self,
+        items: Optional[Iterable[ValueType]] = None,
+        capacity: int = DEFAULT_CAPACITY,
+        dtype=None,
+    ):
+        items = list(items) if items else []
+        if dtype is None:
+            dtype = self.get_dtype(items)
+        capacity = max(capacity, len(items), 1)
+        self._data = np.empty(capacity * 2, dtype=dtype)
+        self._start = 0
+        self._end = len(items)
+        if items:
+            self._data[: self._end] = items
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def __bool__(self) -> bool:
+        return self._end > self._start
+
+    def __getitem__(self, item):
+        return self.data[item]
+
+    @staticmethod
+    def get_dtype(items: List[ValueType]):
+        if all(isinstance(x, int) and -(2**63) <= x < 2**63 for x in items):
+            return np.int64
+        return np.float64
+
+    @property
+    def capacity(self) -> int:
+        return len(self._data) // 2
+
+    @property
+    def data(self) -> np.ndarray:
+        """
+        Ordered (from oldest to newest) view of the live items
+        """
+        return self._data[self._start : self._end]
+
+    def first(self) -> ValueType:
+        return self._data[self._start].item()
+
+    def last(self) -> ValueType:
+        return self._data[self._end - 1].item()
+
+    def _rebuild(self, capacity: int, dtype=None) -> None:
+        """
+        Move live items to the head of the new array
+        """
+        data = np.empty(capacity * 2, dtype=dtype or self._data.dtype)
+        size = len(self)
+        data[:size] = self.data
+        self._data = data
+        self._start = 0
+        self._end = size
+
+    def push(self, value: ValueType) -> None:
+        """
+        Append value to the tail
+        """
+        if self._data.dtype.kind == "i" and not isinstance(value, (int, np.integer)):
+            # Promote to float
+            self._rebuild(self.capacity, dtype=np.float64)
+        if self._end == len(self._data):
+            size = len(self)
+            capacity = self.capacity
+            self._rebuild(capacity * 2 if size >= capacity else capacity)
+        try:
+            self._data[self._end] = value
+        except OverflowError:
+            # Integer out of int64 range
+            self._rebuild(self.capacity, dtype=np.float64)
+            self._data[self._end] = value
+        self._end += 1
+
+    def shift(self, n: int = 1) -> np.ndarray:
+        """
+        Remove `n` oldest items. Return view of removed items.
+        View is valid until next push
+        """
+        n = min(n, len(self))
+        r = self._data[self._start : self._start + n]
+        self._start += n
+        if self._start == self._end:
+            self._start = self._end = 0
+        return r
+
+    def pop(self) -> ValueType:
+        """
+        Remove and return newest item
+        """
+        self._end -= 1
+        r = self._data[self._end].item()
+        if self._start == self._end:
+            self._start = self._end = 0
+        return r
+
+    def trim(self, n: int) -> np.ndarray:
+        """
+        Leave only `n` newest items. Return view of removed items
+        """
+        return self.shift(max(len(self) - n, 0))
+
+    def tolist(self) -> List[ValueType]:
+        return self.data.tolist()
+
+
+class OrderStatistics(object):
+    """
+    Sorted multiset of values. Insertion and removal find the position
+    in O(log n) by bisection, followed by single memmove,
+    n-th smallest value is O(1).
+    """
+
+    __slots__ = ("_values",)
+
+    def __init__(self, items: Optional[Iterable[ValueType]] = None):
+        self._values: List[ValueType] = sorted(items) if items else []
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def add(self, value: ValueType) -> None:
+        insort(self._values, value)
+
+    def remove(self, value: ValueType) -> None:
+        i = bisect_left(self._values, value)
+        if i < len(self._values) and self._values[i] == value:
+            del self._values[i]
+
+    def remove_many(self, values: Iterable[ValueType]) -> None:
+        for v in values:
+            self.remove(v)
+
+    def nth(self, n: int) -> ValueType:
+        """
+        Get n-th smallest value
+        """
+        return self._values[n]
@@ -18,6 +18,7 @@ from mongoengine.queryset.visitor import Q
 # NOC modules
 from noc.models import get_model
 from noc.core.service.loader import get_service
+from noc.core.cache.invalidation import has_cache_invalidation, publish_invalidation
 from noc.config import config
 
 logger = getLogger(__name__)
@@ -35,12 +36,14 @@ def on_change(
     :param kwargs:
     :return:
     """
-    # Datastream changes
-    ds_changes: DefaultDict[str, Set[str]] = defaultdict(set)
+    # Datastream changes: datastream name -> object id -> changed models
+    ds_changes: DefaultDict[str, DefaultDict[str, Set[str]]] = defaultdict(lambda: defaultdict(set))
     # BI Dictionary changes
     bi_dict_changes: DefaultDict[str, Set[Tuple[str, float]]] = defaultdict(set)
     # Sensors object
     sensors_changes: DefaultDict[str, Set[str]] = defaultdict(set)
+    # Process-local caches invalidation
+    cache_changes: List[Tuple[str, str]] = []
     # Iterate over changes
     for op, model_id, item_id, changed_fields, ts in changes:
         # Resolve item
@@ -49,6 +52,8 @@ def on_change(
         if not model_cls:
             logger.error("[%s|%s] Invalid model. Skipping", model_id, item_id)
             return
+        if config.cache.enable_invalidation and has_cache_invalidation(model_id):
+            cache_changes += [(model_id, str(item_id))]
         if op == "delete":
             item = None
         else:
@@ -65,7 +70,7 @@ def on_change(
         # Process datastreams
         if hasattr(item, "iter_changed_datastream"):
             for ds_name, ds_id in item.iter_changed_datastream(changed_fields=changed_fields_old):
-                ds_changes[ds_name].add(ds_id)
+                ds_changes[ds_name][ds_id].add(model_id)
         # Proccess BI Dictionary
         if item:
             bi_dict_changes[model_id].add((item, ts))
@@ -86,12 +91,15 @@ def on_change(
     #
     if sensors_changes:
         apply_sync_sensors(sensors_changes)
+    #
+    if cache_changes:
+        publish_invalidation(cache_changes)
 
 
-def apply_datastream(ds_changes: DefaultDict[str, Set[str]]) -> None:
+def apply_datastream(ds_changes: DefaultDict[str, DefaultDict[str, Set[str]]]) -> None:
     """
     Apply datastream changes
-    :param ds_changes:
+    :param ds_changes: datastream name -> object id -> changed models
     :return:
     """
     from noc.core.datastream.loader import loader
@@ -101,7 +109,7 @@ def apply_datastream(ds_changes: DefaultDict[str, Set[str]]) -> None:
         if not ds:
             logger.error("Invalid datastream: %s", ds_name)
             continue
-        ds.bulk_update(sorted(items))
+        ds.bulk_update(sorted(items), sections=ds.get_changed_sections(items))
 
 
 def apply_ch_dictionary(bi_dict_changes: DefaultDict[str, Set[Tuple[str, float]]]) -> None:
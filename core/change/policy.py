@@ -9,6 +9,7 @@
 import contextlib
 from contextvars import ContextVar
 import time
+import threading
 from collections import defaultdict
 from typing import Optional, Tuple, List, Dict, Literal
 from abc import ABCMeta, abstractmethod
@@ -152,6 +153,8 @@ class BulkChangeTrackerPolicy(BaseChangeTrackerPolicy):
             Tuple[str, str],
             Tuple[Literal["create", "delete", "update"], Optional[List[ChangeField]], float],
         ] = {}
+        # Changes may be registered from concurrent threads
+        self.lock = threading.Lock()
 
     def register(
         self,
@@ -174,28 +177,29 @@ class BulkChangeTrackerPolicy(BaseChangeTrackerPolicy):
             return r
 
         t0 = time.time()
-        prev = self.changes.get((model, id))
-        if prev is None:
-            # First change
-            self.changes[model, id] = (op, fields, t0)
-            return
-        # Series of change
-        if op == "delete":
-            # Delete overrides any operation
-            self.changes[model, id] = (op, None, t0)
-            return
-        if op == "create":
-            raise RuntimeError("create must be first update")
-        # Update
-        prev_op = prev[0]
-        if prev_op == "create":
-            # Create + Update -> Create with merged fields
-            self.changes[model, id] = ("create", merge_fields(prev[1], fields), t0)
-        elif prev_op == "update":
-            # Update + Update -> Update with merged fields
-            self.changes[model, id] = ("update", merge_fields(prev[1], fields), t0)
-        elif prev_op == "delete":
-            raise RuntimeError("Cannot update after delete")
+        with self.lock:
+            prev = self.changes.get((model, id))
+            if prev is None:
+                # First change
+                self.changes[model, id] = (op, fields, t0)
+                return
+            # Series of change
+            if op == "delete":
+                # Delete overrides any operation
+                self.changes[model, id] = (op, None, t0)
+                return
+            if op == "create":
+                raise RuntimeError("create must be first update")
+            # Update
+            prev_op = prev[0]
+            if prev_op == "create":
+                # Create + Update -> Create with merged fields
+                self.changes[model, id] = ("create", merge_fields(prev[1], fields), t0)
+            elif prev_op == "update":
+                # Update + Update -> Update with merged fields
+                self.changes[model, id] = ("update", merge_fields(prev[1], fields), t0)
+            elif prev_op == "delete":
+                raise RuntimeError("Cannot update after delete")
 
     def commit(self) -> None:
         # Split to buckets
@@ -0,0 +1,351 @@
+# ----------------------------------------------------------------------
+# ClickHouse RowBinary encoder
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Python modules
+import struct
+import datetime
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# NOC modules
+from noc.config import config
+
+ROWBINARY = "RowBinary"
+# Liftbridge message headers for binary-encoded chunks
+CH_FORMAT_HEADER = "CH-Format"
+CH_COLUMNS_HEADER = "CH-Columns"
+CH_RECORDS_HEADER = "CH-Records"
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+Writer = Callable[[bytearray, Any], None]
+
+
+def _struct_writer(fmt: str, cast: Callable[[Any], Any]) -> Writer:
+    pack = struct.Struct(fmt).pack
+
+    def write(buf: bytearray, value: Any) -> None:
+        buf += pack(cast(value) if value is not None else 0)
+
+    return write
+
+
+def _write_varint(buf: bytearray, n: int) -> None:
+    while n > 0x7F:
+        buf.append((n & 0x7F) | 0x80)
+        n >>= 7
+    buf.append(n)
+
+
+def _write_string(buf: bytearray, value: Any) -> None:
+    if value is None:
+        buf.append(0)
+        return
+    if not isinstance(value, bytes):
+        value = str(value).encode("utf-8")
+    _write_varint(buf, len(value))
+    buf += value
+
+
+def _to_bytes(value: Any) -> bytes:
+    if value is None:
+        return b""
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode("utf-8")
+
+
+@lru_cache(maxsize=4096)
+def _get_length(n: int) -> bytes:
+    """
+    Get string length prefix
+    """
+    buf = bytearray()
+    _write_varint(buf, n)
+    return bytes(buf)
+
+
+def _encode_string_array(value: Any) -> bytes:
+    if not value:
+        return b"\x00"
+    r = [_get_length(len(value))]
+    for v in value:
+        v = v.encode("utf-8") if v.__class__ is str else _to_bytes(v)
+        r += [_get_length(len(v)), v]
+    return b"".join(r)
+
+
+def _write_string_array(buf: bytearray, value: Any) -> None:
+    buf += _encode_string_array(value)
+
+
+@lru_cache(maxsize=1024)
+def _parse_days(value: str) -> int:
+    if not value or value.startswith("0000"):
+        return 0
+    return datetime.date.fromisoformat(value[:10]).toordinal() - EPOCH_ORDINAL
+
+
+@lru_cache(maxsize=4096)
+def _parse_timestamp(value: str) -> int:
+    if not value or value.startswith("0000"):
+        return 0
+    return _datetime_to_timestamp(datetime.datetime.fromisoformat(value))
+
+
+def _datetime_to_timestamp(value: datetime.datetime) -> int:
+    if not value.tzinfo:
+        value = config.timezone.localize(value)
+    return int(value.timestamp())
+
+
+def _to_days(value: Any) -> int:
+    if isinstance(value, str):
+        return _parse_days(value)
+    elif isinstance(value, datetime.datetime):
+        value = value.date()
+    elif isinstance(value, (int, float)):
+        return int(value)
+    return value.toordinal() - EPOCH_ORDINAL
+
+
+def _to_timestamp(value: Any) -> int:
+    """
+    Convert DateTime value to UNIX timestamp.
+    Strings and naive datetimes are considered in configured timezone,
+    like ClickHouse does when parsing JSONEachRow
+    """
+    if isinstance(value, str):
+        return _parse_timestamp(value)
+    if isinstance(value, datetime.datetime):
+        return _datetime_to_timestamp(value)
+    if value is None:
+        return 0
+    return int(value)
+
+
+def _write_uint128(buf: bytearray, value: Any) -> None:
+    buf += int(value or 0).to_bytes(16, "little")
+
+
+# Fixed-size types: db type -> (struct format, cast)
+FIXED_TYPES: Dict[str, Tuple[str, Callable[[Any], Any]]] = {
+    "UInt8": ("B", int),
+    "UInt16": ("H", int),
+    "UInt32": ("I", int),
+    "UInt64": ("Q", int),
+    "Int8": ("b", int),
+    "Int16": ("h", int),
+    "Int32": ("i", int),
+    "Int64": ("q", int),
+    "Float32": ("f", float),
+    "Float64": ("d", float),
+    "Date": ("H", _to_days),
+    "DateTime": ("I", _to_timestamp),
+}
+
+# Cached parsers for string values of fixed-size types
+PARSERS: Dict[str, Callable[[str], int]] = {"Date": _parse_days, "DateTime": _parse_timestamp}
+
+SIMPLE_WRITERS: Dict[str, Writer] = {
+    **{db_type: _struct_writer(f"<{fmt}", cast) for db_type, (fmt, cast) in FIXED_TYPES.items()},
+    "String": _write_string,
+    "UInt128": _write_uint128,
+}
+
+
+def _strip_low_cardinality(db_type: str) -> str:
+    db_type = db_type.strip()
+    if db_type.startswith("LowCardinality(") and db_type.endswith(")"):
+        return db_type[15:-1].strip()
+    return db_type
+
+
+def _get_encoder(writer: Writer) -> Callable[[Any], bytes]:
+    """
+    Wrap writer to function returning encoded value
+    """
+
+    def encode(value: Any) -> bytes:
+        buf = bytearray()
+        writer(buf, value)
+        return bytes(buf)
+
+    return encode
+
+
+def get_writer(db_type: str) -> Writer:
+    """
+    Build writer function for ClickHouse column type
+
+    :param db_type: ClickHouse type, like `Array(LowCardinality(String))`
+    :returns: Callable, appending encoded value to the buffer
+    """
+    db_type = db_type.strip()
+    writer = SIMPLE_WRITERS.get(db_type)
+    if writer:
+        return writer
+    if db_type.endswith(")") and "(" in db_type:
+        wrapper, inner = db_type[:-1].split("(", 1)
+        if wrapper == "LowCardinality":
+            # RowBinary has no special LowCardinality representation
+            return get_writer(inner)
+        if wrapper == "Nullable":
+            inner_writer = get_writer(inner)
+
+            def write_nullable(buf: bytearray, value: Any) -> None:
+                if value is None:
+                    buf.append(1)
+                    return
+                buf.append(0)
+                inner_writer(buf, value)
+
+            return write_nullable
+        if wrapper == "Array":
+            if _strip_low_cardinality(inner) == "String":
+                return _write_string_array
+            item_writer = get_writer(inner)
+
+            def write_array(buf: bytearray, value: Any) -> None:
+                if not value:
+                    buf.append(0)
+                    return
+                _write_varint(buf, len(value))
+                for v in value:
+                    item_writer(buf, v)
+
+            return write_array
+    raise ValueError(f"Unsupported type for RowBinary: {db_type}")
+
+
+class RowBinaryEncoder(object):
+    """
+    Encode JSON-like rows to ClickHouse RowBinary format.
+    Missed values are encoded as type defaults.
+
+    Row encoder is compiled for the fields list: adjacent fixed-size
+    columns are packed by single struct call and strings are written inline.
+    """
+
+    format = ROWBINARY
+
+    def __init__(self, fields: Iterable[Tuple[str, str]]):
+        self.fields: List[Tuple[str, str]] = list(fields)
+        self.writers: List[Tuple[str, Writer]] = [
+            (name, get_writer(db_type)) for name, db_type in self.fields
+        ]
+        self.encode_row: Callable[[Dict[str, Any]], bytes] = self.compile()
+
+    @classmethod
+    def from_model(cls, model) -> "RowBinaryEncoder":
+        """
+        Build encoder from the ClickHouse model fields.
+        Materialized columns are calculated by ClickHouse and skipped
+
+        :param model: Model class
+        :return:
+        """
+        return cls(
+            (name, db_type)
+            for name, db_type in model.iter_create_sql()
+            if " MATERIALIZED " not in db_type
+        )
+
+    def compile(self) -> Callable[[Dict[str, Any]], bytes]:
+        """
+        Generate and compile row encoding function.
+        Row is encoded as the concatenation of parts, one per run
+        of fixed-size columns or per variable-size column
+
+        :return: Callable, encoding dict to bytes
+        """
+        ctx: Dict[str, Any] = {"_to_bytes": _to_bytes, "_get_length": _get_length}
+        body: List[str] = []
+        parts: List[str] = []
+        # Pending fixed-size columns: (struct format, expression)
+        fixed: List[Tuple[str, str]] = []
+
+        def flush_fixed() -> None:
+            if not fixed:
+                return
+            pack = f"pack_{len(parts)}"
+            ctx[pack] = struct.Struct("<" + "".join(fmt for fmt, _ in fixed)).pack
+            parts.append(f"{pack}({', '.join(expr for _, expr in fixed)})")
+            fixed.clear()
+
+        for i, (name, db_type) in enumerate(self.fields):
+            body.append(f"    v{i} = get({name!r})")
+            db_type = _strip_low_cardinality(db_type)
+            if db_type in FIXED_TYPES:
+                fmt, cast = FIXED_TYPES[db_type]
+                ctx[f"cast_{i}"] = cast
+                # Pass values of expected type as is, parse strings with cache
+                if db_type in PARSERS:
+                    ctx[f"parse_{i}"] = PARSERS[db_type]
+                    expr = f"parse_{i}(v{i}) if v{i}.__class__ is str else cast_{i}(v{i} or 0)"
+                else:
+                    expr = f"v{i} if v{i}.__class__ is {cast.__name__} else cast_{i}(v{i} or 0)"
+                fixed.append((fmt, expr))
+                continue
+            flush_fixed()
+            if db_type == "String":
+                body.append(
+                    f"    v{i} = v{i}.encode('utf-8') if v{i}.__class__ is str else _to_bytes(v{i})"
+                )
+                parts += [f"_get_length(len(v{i}))", f"v{i}"]
+            elif self.writers[i][1] is _write_string_array:
+                ctx[f"encode_{i}"] = _encode_string_array
+                parts.append(f"encode_{i}(v{i})")
+            else:
+                ctx[f"encode_{i}"] = _get_encoder(self.writers[i][1])
+                parts.append(f"encode_{i}(v{i})")
+        flush_fixed()
+        code = ["def encode_row(row):", "    get = row.get"]
+        code += body
+        code += [f"    return b''.join(({', '.join(parts)},))"]
+        l_vars: Dict[str, Any] = {}
+        exec(compile("\n".join(code), "<rowbinary>", "exec"), ctx, l_vars)
+        return l_vars["encode_row"]
+
+    def get_columns(self) -> str:
+        """
+        Get columns list for INSERT query
+        """
+        return ",".join(f"`{name}`" for name, _ in self.fields)
+
+    def get_headers(self, records: int) -> Dict[str, bytes]:
+        """
+        Get message headers describing the encoded chunk
+
+        :param records: Number of records in chunk
+        :return:
+        """
+        return {
+            CH_FORMAT_HEADER: self.format.encode("utf-8"),
+            CH_COLUMNS_HEADER: self.get_columns().encode("utf-8"),
+            CH_RECORDS_HEADER: str(records).encode("utf-8"),
+        }
+
+    def encode(self, rows: Iterable[Dict[str, Any]]) -> bytes:
+        return b"".join(map(self.encode_row, rows))
+
+
+@lru_cache(maxsize=None)
+def _get_model_encoder(model) -> RowBinaryEncoder:
+    return RowBinaryEncoder.from_model(model)
+
+
+def get_model_encoder(model) -> Optional[RowBinaryEncoder]:
+    """
+    Get RowBinary encoder for the ClickHouse model,
+    when binary ingestion is enabled
+
+    :param model: Model class
+    :return: Encoder or None, when records must be sent as JSON
+    """
+    if not config.chwriter.enable_rowbinary:
+        return None
+    return _get_model_encoder(model)
@@ -7,10 +7,12 @@
 
 # Python modules
 import hashlib
+import uuid
 import datetime
 import re
 import logging
 from collections import defaultdict
+from contextvars import ContextVar
 
 # Third-party modules
 import orjson
@@ -18,7 +20,7 @@ import bson
 import bson.errors
 import pymongo
 import dateutil.parser
-from typing import Optional, Dict, Any, List, Union, Iterable, Tuple, Callable
+from typing import Optional, Dict, Any, List, Union, Iterable, Tuple, Callable, Set
 
 # NOC modules
 from noc.core.perf import metrics
@@ -31,6 +33,11 @@ from noc.core.wf.diagnostic import DiagnosticState
 
 logger = logging.getLogger(__name__)
 
+# Related data, prefetched for the current bulk_update chunk
+cv_prefetched: ContextVar[Optional[Dict[Any, Dict[str, Any]]]] = ContextVar(
+    "cv_prefetched", default=None
+)
+
 
 class DataStream(object):
     """
@@ -66,6 +73,10 @@ class DataStream(object):
 
     DIAGNOSTIC: str = None
 
+    # Source model id -> sections of the stream object, affected by model changes.
+    # Changes of models not listed here cause full object rebuild
+    model_sections: Dict[str, List[str]] = {}
+
     _collections: Dict[str, pymongo.collection.Collection] = {}
     _collections_async: Dict[str, pymongo.collection.Collection] = {}
 
@@ -159,7 +170,75 @@ class DataStream(object):
         return hashlib.sha256(orjson.dumps(data)).hexdigest()[: DataStream.HASH_LEN]
 
     @classmethod
-    def bulk_update(cls, objects: List[Union[id, str, bson.ObjectId]]) -> None:
+    def get_object_sections(cls, id, sections: Set[str], current: Dict[str, Any]):
+        """
+        Generate datastream object for given id, rebuilding only
+        given sections and reusing the rest of current object.
+        Raise KeyError if object is not found.
+        Streams with .model_sections must override
+        :param id: Object id
+        :param sections: Set of sections to rebuild
+        :param current: Current object data
+        :return: dict containing object data
+        """
+        return cls.get_object(id)
+
+    @classmethod
+    def prefetch(
+        cls, ids: List[Any], sections: Optional[Set[str]] = None
+    ) -> Optional[Dict[Any, Dict[str, Any]]]:
+        """
+        Bulk load related data for the chunk of objects.
+        Result is available within .get_object() via .get_prefetched()
+        :param ids: List of object ids
+        :param sections: Set of sections to be rebuilt, None for full rebuild
+        :return: object id -> prefetched data
+        """
+        return None
+
+    @classmethod
+    def get_prefetched(cls, id) -> Optional[Dict[str, Any]]:
+        """
+        Get related data, prefetched by .prefetch()
+        :param id: Object id
+        :return: Prefetched data or None, if object is outside of current chunk
+        """
+        prefetched = cv_prefetched.get()
+        if not prefetched:
+            return None
+        return prefetched.get(id)
+
+    @classmethod
+    def get_changed_sections(cls, changes: Dict[Any, Set[str]]) -> Dict[Any, Set[str]]:
+        """
+        Resolve sections to rebuild for changed objects
+        :param changes: object id -> set of changed model ids
+        :return: object id -> set of sections. Objects, which must be rebuilt
+            completely, are omitted
+        """
+        r = {}
+        for obj_id, models in changes.items():
+            if not models or not all(m in cls.model_sections for m in models):
+                continue
+            r[obj_id] = set()
+            for m in models:
+                r[obj_id].update(cls.model_sections[m])
+        return r
+
+    @classmethod
+    def bulk_update(
+        cls,
+        objects: List[Union[id, str, bson.ObjectId]],
+        sections: Optional[Dict[Any, Set[str]]] = None,
+    ) -> None:
+        """
+        Generate and update objects in stream
+        :param objects: List of object ids
+        :param sections: object id -> set of sections for partial rebuild.
+            Objects not listed are rebuilt completely
+        :return:
+        """
+        sections = sections or {}
         coll = cls.get_collection()
         # Get possible formats
         fmt_coll: Dict[str, pymongo.collection.Collection] = {}
@@ -170,22 +249,37 @@ class DataStream(object):
         # Process objects
         while objects:
             chunk, objects = objects[: cls.BULK_SIZE], objects[cls.BULK_SIZE :]
+            fields = {cls.F_ID: 1, cls.F_HASH: 1, cls.F_META: 1}
+            if all(obj_id in sections for obj_id in chunk):
+                chunk_sections = set()
+                for obj_id in chunk:
+                    chunk_sections.update(sections[obj_id])
+            else:
+                chunk_sections = None
+            if any(obj_id in sections for obj_id in chunk):
+                # Partial rebuild, current data is required
+                fields[cls.F_DATA] = 1
             current_state = {
-                doc[cls.F_ID]: doc
-                for doc in coll.find(
-                    {cls.F_ID: {"$in": chunk}}, {cls.F_ID: 1, cls.F_HASH: 1, cls.F_META: 1}
-                )
+                doc[cls.F_ID]: doc for doc in coll.find({cls.F_ID: {"$in": chunk}}, fields)
             }
             bulk = []
             fmt_data = defaultdict(list)
             fmt_bulk = {}
             # Apply default format
-            for obj_id in chunk:
-                data, meta = cls._get_current_data(obj_id)
-                cls._update_object(data=data, meta=meta, state=current_state, bulk=bulk)
-                # Process formats
-                for fmt in fmt_handler:
-                    fmt_data[fmt] += list(fmt_handler[fmt](data))
+            token = cv_prefetched.set(cls.prefetch(chunk, sections=chunk_sections))
+            try:
+                for obj_id in chunk:
+                    data, meta = cls._get_current_data(
+                        obj_id,
+                        sections=sections.get(obj_id),
+                        current=current_state.get(cls.clean_id(obj_id)),
+                    )
+                    cls._update_object(data=data, meta=meta, state=current_state, bulk=bulk)
+                    # Process formats
+                    for fmt in fmt_handler:
+                        fmt_data[fmt] += list(fmt_handler[fmt](data))
+            finally:
+                cv_prefetched.reset(token)
             # Apply formats
             for fmt in fmt_data:
                 fmt_ids = [data["id"] for data in fmt_data[fmt]]
@@ -309,12 +403,26 @@ class DataStream(object):
 
     @classmethod
     def _get_current_data(
-        cls, obj_id, delete=False
+        cls,
+        obj_id,
+        delete=False,
+        sections: Optional[Set[str]] = None,
+        current: Optional[Dict[str, Any]] = None,
     ) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
         if delete:
             return cls.get_deleted_object(obj_id), None
+        if sections and current and current.get(cls.F_DATA):
+            current = orjson.loads(current[cls.F_DATA])
+            if "$deleted" in current:
+                # Cannot reuse, rebuild completely
+                sections = None
+        else:
+            sections = None
         try:
-            data = cls.get_object(obj_id)
+            if sections:
+                data = cls.get_object_sections(obj_id, sections, current)
+            else:
+                data = cls.get_object(obj_id)
             meta = cls.get_meta(data)
             if cls.DIAGNOSTIC:
                 cls.update_diagnostic_state(obj_id, state=DiagnosticState.unknown)
@@ -325,14 +433,20 @@ class DataStream(object):
             return cls.get_deleted_object(obj_id), None
 
     @classmethod
-    def update_object(cls, id, delete=False) -> bool:
+    def update_object(cls, id, delete=False, sections: Optional[Set[str]] = None) -> bool:
         """
         Generate and update object in stream
         :param id: Object id
         :param delete: Object must be marked as deleted
+        :param sections: Rebuild only given sections, reusing the rest of current object
         :return: True if object has been updated
         """
-        data, meta = cls._get_current_data(id, delete=delete)
+        current = None
+        if sections and not delete:
+            current = cls.get_collection().find_one(
+                {cls.F_ID: cls.clean_id(id)}, {cls.F_ID: 0, cls.F_DATA: 1}
+            )
+        data, meta = cls._get_current_data(id, delete=delete, sections=sections, current=current)
         r = cls._update_object(data=data, meta=meta)
         for fmt, handler in cls.iter_formats():
             for f_data in handler(data):
@@ -370,6 +484,32 @@ class DataStream(object):
         """
         return cls.get_collection(fmt).estimated_document_count()
 
+    @classmethod
+    async def get_total_async(cls, fmt=None):
+        """
+        Return total amount of items in datastream
+        :return:
+        """
+        return await cls.get_collection_async(fmt).estimated_document_count()
+
+    @classmethod
+    async def get_epoch_async(cls, fmt=None) -> Optional[str]:
+        """
+        Return datastream epoch, changed when datastream collection is recreated.
+        Clients must drop local state on epoch change
+        :return: Collection UUID or None, if not supported
+        """
+        coll = cls.get_collection_async(fmt)
+        cursor = await coll.database.list_collections(filter={"name": coll.name})
+        async for c in cursor:
+            epoch = c.get("info", {}).get("uuid")
+            if isinstance(epoch, uuid.UUID):
+                return str(epoch)
+            if epoch:
+                # bson.Binary with unspecified UUID representation
+                return str(uuid.UUID(bytes=bytes(epoch)))
+        return None
+
     @classmethod
     def clean_change_id(cls, change_id):
         """
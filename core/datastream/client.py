@@ -8,7 +8,8 @@
 # Python modules
 import asyncio
 import logging
-from typing import Optional
+import os
+from typing import Optional, List, Dict, Any
 
 # Third-party modules
 import orjson
@@ -17,6 +18,9 @@ import orjson
 from noc.core.http.client import fetch, ERR_READ_TIMEOUT, ERR_TIMEOUT
 from noc.core.error import NOCError, ERR_DS_BAD_CODE, ERR_DS_PARSE_ERROR
 from noc.core.dcs.error import ResolutionError
+from noc.core.hash import hash_str
+from noc.config import config
+from .snapshot import DataStreamSnapshot
 
 logger = logging.getLogger(__name__)
 
@@ -24,10 +28,12 @@ logger = logging.getLogger(__name__)
 class DataStreamClient(object):
     RETRY_TIMEOUT = 1.0
 
-    def __init__(self, name, service=None):
+    def __init__(self, name, service=None, use_snapshot: bool = True):
         self.name = name
         self.service = service
         self._is_ready = False
+        # Keep local snapshot, when `path.datastream_snapshot` is set
+        self.use_snapshot = use_snapshot and bool(config.path.datastream_snapshot)
 
     async def on_change(self, data):
         """
@@ -56,6 +62,37 @@ class DataStreamClient(object):
         :return:
         """
 
+    def get_snapshot(
+        self, filters: Optional[List[str]] = None, filter_policy: Optional[str] = None
+    ) -> Optional[DataStreamSnapshot]:
+        """
+        Open local snapshot for query
+
+        :return: Snapshot instance or None, if snapshot is not available
+        """
+        key: Dict[str, Any] = {
+            "stream": self.name,
+            "filters": filters or [],
+            "filter_policy": filter_policy,
+        }
+        service = self.service.name if self.service else "noc"
+        path = os.path.join(
+            config.path.datastream_snapshot,
+            f"{service}-{self.name}-{hash_str(repr(key)).hex()}.snapshot",
+        )
+        snapshot = DataStreamSnapshot(path, key)
+        if not snapshot.open():
+            return None
+        return snapshot
+
+    async def replay_snapshot(self, snapshot: DataStreamSnapshot) -> None:
+        """
+        Pass snapshot items to consumer, as if they are received from datastream
+        """
+        logger.info("[%s] Replaying %d items from snapshot", self.name, len(snapshot.items))
+        for item in snapshot.iter_items():
+            await self.on_change(item)
+
     async def query(
         self,
         change_id: Optional[str] = None,
@@ -88,59 +125,91 @@ class DataStreamClient(object):
             base_qs += [f"filter_policy={filter_policy}"]
         req_headers = {"X-NOC-API-Access": f"datastream:{self.name}"}
         loop = asyncio.get_running_loop()
-        # Continue until finish
-        while True:
-            # Build URL
-            # *datastream* host name will be resolved with *resolve* method
-            qs = base_qs[:]
-            if change_id:
-                qs += [f"from={change_id}"]
-            if qs:
-                jqs = "&".join(qs)
-                url = f"{base_url}?{jqs}"
-            else:
-                url = base_url
-            # Get data
-            logger.debug("Request: %s", url)
-            t0 = loop.time()
-            code, headers, data = await fetch(url, resolver=self.resolve, headers=req_headers)
-            dt = loop.time() - t0
-            logger.debug("Response: %s %s [%.2fms]", code, headers, dt * 1000)
-            if code == ERR_TIMEOUT or code == ERR_READ_TIMEOUT:
-                if dt < self.RETRY_TIMEOUT:
-                    await asyncio.sleep(self.RETRY_TIMEOUT - dt)
-                continue  # Retry on timeout
-            elif code != 200:
-                logger.info("Invalid response code: %s", code)
-                raise NOCError(code=ERR_DS_BAD_CODE, msg=f"Invalid response code {code}")
-            # Parse response
-            try:
-                data = orjson.loads(data)
-            except ValueError as e:
-                logger.info("Cannot parse response: %s", e)
-                raise NOCError(code=ERR_DS_PARSE_ERROR, msg=f"Cannot parse response: {e}")
-            # Process result
-            for item in data:
-                if "$deleted" in item:
-                    await self.on_delete(item)
-                elif "$moved" in item:
-                    await self.on_move(item)
+        # Continue from local snapshot
+        snapshot = None
+        to_replay = False
+        if self.use_snapshot and not change_id:
+            snapshot = self.get_snapshot(filters, filter_policy)
+            if snapshot and snapshot.change_id:
+                change_id = snapshot.change_id
+                to_replay = True
+        try:
+            # Continue until finish
+            while True:
+                # Build URL
+                # *datastream* host name will be resolved with *resolve* method
+                qs = base_qs[:]
+                if change_id:
+                    qs += [f"from={change_id}"]
+                if qs:
+                    jqs = "&".join(qs)
+                    url = f"{base_url}?{jqs}"
                 else:
-                    await self.on_change(item)
-            #
-            if not self._is_ready and "X-NOC-DataStream-More" not in headers:
-                await self.on_ready()
-                self._is_ready = True
-            # Continue from last change
-            if "X-NOC-DataStream-Last-Change" in headers:
-                change_id = headers["X-NOC-DataStream-Last-Change"]
-                continue
-            if block and self._is_ready:
-                # Do not set block=1 before is_ready, otherwise
-                # without data in datastream process will be blocked by _is_ready signal
-                base_qs += ["block=1"]
-            if not block:
-                break  # No data, Stop if non-blocking mode
+                    url = base_url
+                # Get data
+                logger.debug("Request: %s", url)
+                t0 = loop.time()
+                code, headers, data = await fetch(url, resolver=self.resolve, headers=req_headers)
+                dt = loop.time() - t0
+                logger.debug("Response: %s %s [%.2fms]", code, headers, dt * 1000)
+                if code == ERR_TIMEOUT or code == ERR_READ_TIMEOUT:
+                    if dt < self.RETRY_TIMEOUT:
+                        await asyncio.sleep(self.RETRY_TIMEOUT - dt)
+                    continue  # Retry on timeout
+                elif code != 200:
+                    logger.info("Invalid response code: %s", code)
+                    raise NOCError(code=ERR_DS_BAD_CODE, msg=f"Invalid response code {code}")
+                # Parse response
+                try:
+                    data = orjson.loads(data)
+                except ValueError as e:
+                    logger.info("Cannot parse response: %s", e)
+                    raise NOCError(code=ERR_DS_PARSE_ERROR, msg=f"Cannot parse response: {e}")
+                if snapshot:
+                    epoch = headers.get("X-NOC-DataStream-Epoch")
+                    if epoch != snapshot.epoch:
+                        # Datastream is recreated, records from previous epoch are not valid
+                        logger.info(
+                            "[%s] Datastream epoch is changed (%s -> %s). Full resync",
+                            self.name,
+                            snapshot.epoch,
+                            epoch,
+                        )
+                        has_data = bool(snapshot.change_id)
+                        snapshot.reset(epoch)
+                        to_replay = False
+                        if has_data and change_id:
+                            change_id = None
+                            continue
+                    if to_replay:
+                        await self.replay_snapshot(snapshot)
+                        to_replay = False
+                    snapshot.append(data)
+                # Process result
+                for item in data:
+                    if "$deleted" in item:
+                        await self.on_delete(item)
+                    elif "$moved" in item:
+                        await self.on_move(item)
+                    else:
+                        await self.on_change(item)
+                #
+                if not self._is_ready and "X-NOC-DataStream-More" not in headers:
+                    await self.on_ready()
+                    self._is_ready = True
+                # Continue from last change
+                if "X-NOC-DataStream-Last-Change" in headers:
+                    change_id = headers["X-NOC-DataStream-Last-Change"]
+                    continue
+                if block and self._is_ready:
+                    # Do not set block=1 before is_ready, otherwise
+                    # without data in datastream process will be blocked by _is_ready signal
+                    base_qs += ["block=1"]
+                if not block:
+                    break  # No data, Stop if non-blocking mode
+        finally:
+            if snapshot:
+                snapshot.close()
 
     async def resolve(self, host):
         try:
@@ -0,0 +1,56 @@
+# ----------------------------------------------------------------------
+# Datastream changes notifier
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Python modules
+import asyncio
+from typing import Optional
+
+
+class ChangeNotifier(object):
+    """
+    Wake up all coroutines, waiting for datastream changes.
+    Changes are counted by generation, so changes between
+    query and wait are not lost.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.generation = 0
+        self.event = asyncio.Event()
+        self.is_pending = False
+
+    def notify(self) -> None:
+        """
+        Notify waiters. Called from waiter thread,
+        sequential changes are coalesced into single notification
+        """
+        if self.is_pending:
+            return
+        self.is_pending = True
+        self.loop.call_soon_threadsafe(self._notify)
+
+    def _notify(self) -> None:
+        self.is_pending = False
+        self.generation += 1
+        event, self.event = self.event, asyncio.Event()
+        event.set()
+
+    async def wait(self, generation: int, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for changes after generation
+
+        :param generation: Generation, seen before last query
+        :param timeout: Wait timeout, in seconds
+        :return: True, if datastream is changed, False on timeout
+        """
+        if generation != self.generation:
+            return True
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
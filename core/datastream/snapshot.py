@@ -0,0 +1,199 @@
+# ----------------------------------------------------------------------
+# DataStream client's local snapshot
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Python modules
+import os
+import fcntl
+import logging
+import zlib
+from typing import Optional, Dict, Any, List, Iterable, BinaryIO
+
+# Third-party modules
+import orjson
+
+logger = logging.getLogger(__name__)
+
+
+class DataStreamSnapshot(object):
+    """
+    Append-only compacted log of datastream records, persisted between restarts.
+
+    File consists of lines `<crc32> <json>`. First line is a header,
+    holding snapshot key (stream, filters, etc.), stream's epoch and
+    last change id at the moment of compaction.
+    Following lines are datastream records in order of receiving.
+    Last record for id wins, deleted records are removed from snapshot.
+    Torn tail is truncated, any other damage invalidates the snapshot.
+    """
+
+    VERSION = 1
+    # Compact log when it has more than COMPACT_RATIO records per live item
+    COMPACT_RATIO = 2
+    # Do not compact small logs
+    COMPACT_MIN_RECORDS = 1000
+
+    def __init__(self, path: str, key: Dict[str, Any]):
+        self.path = path
+        self.key = {"version": self.VERSION, **key}
+        self.items: Dict[str, Dict[str, Any]] = {}
+        self.change_id: Optional[str] = None
+        self.epoch: Optional[str] = None
+        self.records = 0
+        self.file: Optional[BinaryIO] = None
+
+    def open(self) -> bool:
+        """
+        Open and lock snapshot file, load existing records
+
+        :return: True, if snapshot is ready to use, False if snapshot is locked
+            by another process or cannot be opened
+        """
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self.file = open(self.path, "a+b")
+        except OSError as e:
+            logger.error("[%s] Cannot open snapshot: %s", self.path, e)
+            return False
+        try:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            logger.error("[%s] Snapshot is locked by another process", self.path)
+            self.file.close()
+            self.file = None
+            return False
+        if not self.load():
+            self.reset()
+        return True
+
+    def close(self) -> None:
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    @staticmethod
+    def encode(data: Dict[str, Any]) -> bytes:
+        payload = orjson.dumps(data)
+        return b"%08x %s\n" % (zlib.crc32(payload), payload)
+
+    @staticmethod
+    def decode(line: bytes) -> Optional[Dict[str, Any]]:
+        """
+        Decode line, check integrity
+
+        :return: Decoded data or None, if line is damaged
+        """
+        if len(line) < 10 or line[8:9] != b" " or not line.endswith(b"\n"):
+            return None
+        payload = line[9:-1]
+        try:
+            if int(line[:8], 16) != zlib.crc32(payload):
+                return None
+            return orjson.loads(payload)
+        except ValueError:
+            return None
+
+    def load(self) -> bool:
+        """
+        Load records from file
+
+        :return: True, if snapshot is loaded, False if snapshot must be reset
+        """
+        self.file.seek(0)
+        header = self.decode(self.file.readline())
+        if not header:
+            return False
+        if header.get("key") != self.key:
+            logger.info("[%s] Snapshot key mismatch, resetting", self.path)
+            return False
+        self.epoch = header.get("epoch")
+        self.change_id = header.get("change_id")
+        offset = self.file.tell()
+        for line in self.file:
+            item = self.decode(line)
+            if item is None:
+                if line.endswith(b"\n"):
+                    logger.error("[%s] Snapshot is damaged at offset %d", self.path, offset)
+                    return False
+                # Torn write
+                logger.info("[%s] Truncating incomplete record at offset %d", self.path, offset)
+                self.file.truncate(offset)
+                break
+            self.apply(item)
+            self.records += 1
+            offset += len(line)
+        logger.info(
+            "[%s] Snapshot is loaded: %d items, change id %s",
+            self.path,
+            len(self.items),
+            self.change_id,
+        )
+        return True
+
+    def reset(self, epoch: Optional[str] = None) -> None:
+        """
+        Drop all records and start with new epoch
+        """
+        self.items = {}
+        self.change_id = None
+        self.epoch = epoch
+        self.records = 0
+        self.file.truncate(0)
+        self.file.write(self.encode({"key": self.key, "epoch": epoch}))
+        self.file.flush()
+
+    def apply(self, item: Dict[str, Any]) -> None:
+        if "$deleted" in item or "$moved" in item:
+            self.items.pop(item["id"], None)
+        else:
+            self.items[item["id"]] = item
+        if item.get("change_id"):
+            self.change_id = item["change_id"]
+
+    def append(self, items: List[Dict[str, Any]]) -> None:
+        """
+        Append received records to snapshot
+        """
+        if not items:
+            return
+        for item in items:
+            self.apply(item)
+        self.file.write(b"".join(self.encode(item) for item in items))
+        self.file.flush()
+        self.records += len(items)
+        if self.records > self.COMPACT_MIN_RECORDS and self.records > self.COMPACT_RATIO * len(
+            self.items
+        ):
+            self.compact()
+
+    def compact(self) -> None:
+        """
+        Rewrite log, leaving only live items
+        """
+        logger.info("[%s] Compacting snapshot: %d records", self.path, self.records)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            # Preserve position, when last records are deleted
+            f.write(
+                self.encode({"key": self.key, "epoch": self.epoch, "change_id": self.change_id})
+            )
+            for item in self.iter_items():
+                f.write(self.encode(item))
+            f.flush()
+            os.fsync(f.fileno())
+        # Locked new file before replacing
+        new_file = open(tmp_path, "a+b")
+        fcntl.flock(new_file.fileno(), fcntl.LOCK_EX)
+        os.replace(tmp_path, self.path)
+        self.file.close()
+        self.file = new_file
+        self.records = len(self.items)
+
+    def iter_items(self) -> Iterable[Dict[str, Any]]:
+        """
+        Iterate live items in order of change
+        """
+        yield from sorted(self.items.values(), key=lambda x: x.get("change_id") or "")
@@ -1,7 +1,7 @@
 # ----------------------------------------------------------------------
 # SNMP methods implementation
 # ----------------------------------------------------------------------
-# Copyright (C) 2007-2020 The NOC Project
+# Copyright (C) 2007-2022 The NOC Project
 # See LICENSE for details
 # ----------------------------------------------------------------------
 
@@ -10,10 +10,14 @@ import logging
 import socket
 import errno
 import asyncio
-from typing import Optional, Callable, Any, Dict, Union
+import threading
+from typing import Optional, Callable, Any, Dict, Union, List, Tuple
+
+# Third-party modules
+import cachetools
 
 # NOC modules
-from noc.core.snmp.version import SNMP_v2c
+from noc.core.snmp.version import SNMP_v1, SNMP_v2c
 from noc.core.snmp.get import (
     get_pdu,
     getnext_pdu,
@@ -25,6 +29,7 @@ from noc.core.snmp.get import (
 from noc.core.snmp.set import set_pdu
 from noc.core.snmp.error import (
     NO_ERROR,
+    TOO_BIG,
     NO_SUCH_NAME,
     SNMPError,
     TIMED_OUT,
@@ -33,13 +38,28 @@ from noc.core.snmp.error import (
     END_OID_TREE,
     BAD_VALUE,
 )
-from noc.core.ioloop.udp import UDPSocket, UDPSocketContext
+from noc.core.ioloop.udp import UDPSocket
+from noc.core.ioloop.snmpengine import get_engine
 from noc.core.comp import smart_text
 from noc.core.ratelimit.asyncio import AsyncRateLimit
 
 _ERRNO_WOULDBLOCK = (errno.EWOULDBLOCK, errno.EAGAIN)
 logger = logging.getLogger(__name__)
 BULK_MAX_REPETITIONS = 20
+# Upper limit of adaptive GETBULK max-repetitions
+WALK_MAX_REPETITIONS = 64
+# Desired GETBULK response size, in octets
+WALK_RESPONSE_SIZE = 4096
+# Table columns, requested by the single PDU
+WALK_MAX_COLUMNS = 4
+# Concurrent requests per table walk
+WALK_CONCURRENCY = 4
+# tooBig errors before the GETBULK limit is lowered,
+# and timeouts before max-repetitions is reduced for the request
+WALK_SHRINK_FAILURES = 2
+# address -> learned max-repetitions limit
+_bulk_limits = cachetools.TTLCache(maxsize=10000, ttl=86400)
+_bulk_limits_lock = threading.Lock()
 
 
 def _get_parser(
@@ -50,6 +70,36 @@ def _get_parser(
     return parser or parse_get_response
 
 
+def _get_request_id(udp_socket: Optional[UDPSocket] = None) -> Optional[int]:
+    if udp_socket:
+        return None  # Generated by PDU builder
+    return get_engine().get_request_id()
+
+
+async def _send_and_receive(
+    pdu: bytes,
+    address: str,
+    port: int,
+    request_id: Optional[int],
+    timeout: float,
+    tos: Optional[int] = None,
+    udp_socket: Optional[UDPSocket] = None,
+) -> bytes:
+    """
+    Send request and wait for response.
+    Dedicated socket is used when passed, shared SNMP engine otherwise
+
+    :raises asyncio.TimeoutError:
+    :raises OSError:
+    """
+    if udp_socket:
+        data, addr = await asyncio.wait_for(
+            udp_socket.send_and_receive(pdu, (address, port)), timeout
+        )
+        return data
+    return await get_engine().send_and_receive(pdu, (address, port), request_id, timeout, tos=tos)
+
+
 async def snmp_get(
     address,
     oids,
@@ -79,98 +129,98 @@ async def snmp_get(
     logger.debug("[%s] SNMP GET %s", address, oids)
     parser = _get_parser(response_parser, raw_varbinds)
     # Send GET PDU
-    pdu = get_pdu(community=community, oids=oids, version=version)
+    request_id = _get_request_id(udp_socket)
+    pdu = get_pdu(community=community, oids=oids, request_id=request_id, version=version)
     if rate_limit:
         await rate_limit.wait()
-    with UDPSocketContext(udp_socket, tos=tos) as sock:
-        try:
-            data, addr = await asyncio.wait_for(
-                sock.send_and_receive(pdu, (address, port)), timeout
-            )
-        except asyncio.TimeoutError:
-            raise SNMPError(code=TIMED_OUT, oid=oids[0])
-        except socket.gaierror as e:
-            logger.debug("[%s] Cannot resolve address: %s", address, e)
-            raise SNMPError(code=UNREACHABLE, oid=oids[0])
-        except OSError as e:
-            logger.debug("[%s] Socket error: %s", address, e)
-            raise SNMPError(code=UNREACHABLE, oid=oids[0])
-        try:
-            resp = parser(data, display_hints)
-        except ValueError:
-            # Broken response
-            raise SNMPError(code=BER_ERROR, oid=oids[0])
-        if resp.error_status == NO_ERROR:
-            # Success
-            if oid_map:
-                result = {}
-                for k, v in resp.varbinds:
-                    if k in oid_map:
-                        result[oid_map[k]] = v
-                    else:
-                        logger.error("[%s] Invalid oid %s returned in reply", address, k)
-            elif resp.varbinds:
-                result = resp.varbinds[0][1]
-            else:
-                # Device return empty varbinds, perhaps need more info
-                raise SNMPError(code=BAD_VALUE, oid=oids)
-            logger.debug("[%s] GET result: %r", address, result)
-            return result
-        elif resp.error_status == NO_SUCH_NAME and resp.varbinds and len(oids) > 1:
-            # One or more invalid oids
-            b_idx = resp.error_index - 1
-            logger.debug(
-                "[%s] Invalid oid %s detected, trying to exclude", address, resp.varbinds[b_idx][0]
-            )
+    try:
+        data = await _send_and_receive(
+            pdu, address, port, request_id, timeout, tos=tos, udp_socket=udp_socket
+        )
+    except asyncio.TimeoutError:
+        raise SNMPError(code=TIMED_OUT, oid=oids[0])
+    except socket.gaierror as e:
+        logger.debug("[%s] Cannot resolve address: %s", address, e)
+        raise SNMPError(code=UNREACHABLE, oid=oids[0])
+    except OSError as e:
+        logger.debug("[%s] Socket error: %s", address, e)
+        raise SNMPError(code=UNREACHABLE, oid=oids[0])
+    try:
+        resp = parser(data, display_hints)
+    except ValueError:
+        # Broken response
+        raise SNMPError(code=BER_ERROR, oid=oids[0])
+    if resp.error_status == NO_ERROR:
+        # Success
+        if oid_map:
             result = {}
-            oid_parts = []
-            if b_idx:
-                # Oids before b_idx are probable correct
-                oid_parts += [[vb[0] for vb in resp.varbinds[:b_idx]]]
-            if b_idx < len(resp.varbinds) - 1:
-                # Some oids after b_idx may be correct
-                oid_parts += [[vb[0] for vb in resp.varbinds[b_idx + 1 :]]]
-            for new_oids in oid_parts:
-                try:
-                    new_result = await snmp_get(
-                        address=address,
-                        oids={k: k for k in new_oids},
-                        port=port,
-                        community=community,
-                        version=version,
-                        timeout=timeout,
-                        tos=tos,
-                        udp_socket=sock,
-                    )
-                except SNMPError as e:
-                    if e.code == NO_SUCH_NAME and len(new_oids) == 1:
-                        # Ignore NO_SUCH_VALUE for last oid in list
-                        new_result = {}
-                    else:
-                        raise
-                for k in new_result:
-                    if k in oid_map:
-                        result[oid_map[k]] = new_result[k]
-                    else:
-                        logger.info("[%s] Invalid oid %s returned in reply", address, k)
-            if result:
-                logger.debug("[%s] GET result: %r", address, result)
-                return result
-            else:
-                # All oids excluded as broken
-                logger.debug("[%s] All oids are broken", address)
-                raise SNMPError(code=NO_SUCH_NAME, oid=oids[0])
+            for k, v in resp.varbinds:
+                if k in oid_map:
+                    result[oid_map[k]] = v
+                else:
+                    logger.error("[%s] Invalid oid %s returned in reply", address, k)
+        elif resp.varbinds:
+            result = resp.varbinds[0][1]
         else:
-            oid = None
-            if resp.error_index and resp.varbinds:
-                if resp.error_index & 0x8000:
-                    # Some broken SNMP servers (i.e. Huawei) returns
-                    # negative error index. Try to negotiate silently
-                    oid = resp.varbinds[min(65536 - resp.error_index, len(resp.varbinds) - 1)][0]
+            # Device return empty varbinds, perhaps need more info
+            raise SNMPError(code=BAD_VALUE, oid=oids)
+        logger.debug("[%s] GET result: %r", address, result)
+        return result
+    elif resp.error_status == NO_SUCH_NAME and resp.varbinds and len(oids) > 1:
+        # One or more invalid oids
+        b_idx = resp.error_index - 1
+        logger.debug(
+            "[%s] Invalid oid %s detected, trying to exclude", address, resp.varbinds[b_idx][0]
+        )
+        result = {}
+        oid_parts = []
+        if b_idx:
+            # Oids before b_idx are probable correct
+            oid_parts += [[vb[0] for vb in resp.varbinds[:b_idx]]]
+        if b_idx < len(resp.varbinds) - 1:
+            # Some oids after b_idx may be correct
+            oid_parts += [[vb[0] for vb in resp.varbinds[b_idx + 1 :]]]
+        for new_oids in oid_parts:
+            try:
+                new_result = await snmp_get(
+                    address=address,
+                    oids={k: k for k in new_oids},
+                    port=port,
+                    community=community,
+                    version=version,
+                    timeout=timeout,
+                    tos=tos,
+                    udp_socket=udp_socket,
+                )
+            except SNMPError as e:
+                if e.code == NO_SUCH_NAME and len(new_oids) == 1:
+                    # Ignore NO_SUCH_VALUE for last oid in list
+                    new_result = {}
                 else:
-                    oid = resp.varbinds[resp.error_index - 1][0]
-            logger.debug("[%s] SNMP error: %s %s", address, oid, resp.error_status)
-            raise SNMPError(code=resp.error_status, oid=oid)
+                    raise
+            for k in new_result:
+                if k in oid_map:
+                    result[oid_map[k]] = new_result[k]
+                else:
+                    logger.info("[%s] Invalid oid %s returned in reply", address, k)
+        if result:
+            logger.debug("[%s] GET result: %r", address, result)
+            return result
+        else:
+            # All oids excluded as broken
+            logger.debug("[%s] All oids are broken", address)
+            raise SNMPError(code=NO_SUCH_NAME, oid=oids[0])
+    else:
+        oid = None
+        if resp.error_index and resp.varbinds:
+            if resp.error_index & 0x8000:
+                # Some broken SNMP servers (i.e. Huawei) returns
+                # negative error index. Try to negotiate silently
+                oid = resp.varbinds[min(65536 - resp.error_index, len(resp.varbinds) - 1)][0]
+            else:
+                oid = resp.varbinds[resp.error_index - 1][0]
+        logger.debug("[%s] SNMP error: %s %s", address, oid, resp.error_status)
+        raise SNMPError(code=resp.error_status, oid=oid)
 
 
 async def snmp_count(
@@ -200,50 +250,55 @@ async def snmp_count(
         filter = true
     poid = oid + "."
     result = 0
-    with UDPSocketContext(udp_socket, tos=tos) as sock:
-        while True:
-            if rate_limit:
-                await rate_limit.wait()
-            # Get PDU
-            if bulk:
-                pdu = getbulk_pdu(community, oid, max_repetitions=max_repetitions, version=version)
-            else:
-                pdu = getnext_pdu(community, oid, version=version)
-            # Send request and wait for response
-            try:
-                data, addr = await asyncio.wait_for(
-                    sock.send_and_receive(pdu, (address, port)), timeout
-                )
-            except asyncio.TimeoutError:
-                raise SNMPError(code=TIMED_OUT, oid=oid)
-            except socket.gaierror as e:
-                logger.debug("[%s] Cannot resolve address: %s", address, e)
-                raise SNMPError(code=UNREACHABLE, oid=oid)
-            except OSError as e:
-                logger.debug("[%s] Socket error: %s", address, e)
-                raise SNMPError(code=UNREACHABLE, oid=oid)
-            # Parse response
-            try:
-                resp = parse_get_response(data)
-            except ValueError:
-                raise SNMPError(code=BER_ERROR, oid=oid)
-            if resp.error_status == NO_SUCH_NAME:
-                # NULL result
-                break
-            elif resp.error_status != NO_ERROR:
-                # Error
-                raise SNMPError(code=resp.error_status, oid=oid)
-            else:
-                # Success value
-                for oid, v in resp.varbinds:
-                    if oid.startswith(poid):
-                        # Next value
-                        if filter(oid, v):
-                            result += 1
-                    else:
-                        logger.debug("[%s] COUNT result: %s", address, result)
-                        sock.close()
-                        return result
+    while True:
+        if rate_limit:
+            await rate_limit.wait()
+        # Get PDU
+        request_id = _get_request_id(udp_socket)
+        if bulk:
+            pdu = getbulk_pdu(
+                community,
+                oid,
+                request_id=request_id,
+                max_repetitions=max_repetitions,
+                version=version,
+            )
+        else:
+            pdu = getnext_pdu(community, oid, request_id=request_id, version=version)
+        # Send request and wait for response
+        try:
+            data = await _send_and_receive(
+                pdu, address, port, request_id, timeout, tos=tos, udp_socket=udp_socket
+            )
+        except asyncio.TimeoutError:
+            raise SNMPError(code=TIMED_OUT, oid=oid)
+        except socket.gaierror as e:
+            logger.debug("[%s] Cannot resolve address: %s", address, e)
+            raise SNMPError(code=UNREACHABLE, oid=oid)
+        except OSError as e:
+            logger.debug("[%s] Socket error: %s", address, e)
+            raise SNMPError(code=UNREACHABLE, oid=oid)
+        # Parse response
+        try:
+            resp = parse_get_response(data)
+        except ValueError:
+            raise SNMPError(code=BER_ERROR, oid=oid)
+        if resp.error_status == NO_SUCH_NAME:
+            # NULL result
+            break
+        elif resp.error_status != NO_ERROR:
+            # Error
+            raise SNMPError(code=resp.error_status, oid=oid)
+        else:
+            # Success value
+            for oid, v in resp.varbinds:
+                if oid.startswith(poid):
+                    # Next value
+                    if filter(oid, v):
+                        result += 1
+                else:
+                    logger.debug("[%s] COUNT result: %s", address, result)
+                    return result
 
 
 async def snmp_getnext(
@@ -279,80 +334,81 @@ async def snmp_getnext(
     poid = oid + "."
     result = []
     parser = _get_parser(response_parser, raw_varbinds)
-    with UDPSocketContext(udp_socket, tos=tos) as sock:
-        first_oid = None
-        last_oid = None
-        while True:
-            if rate_limit:
-                await rate_limit.wait()
-            # Get PDU
-            if bulk:
-                pdu = getbulk_pdu(
-                    community,
-                    oid,
-                    max_repetitions=max_repetitions or BULK_MAX_REPETITIONS,
-                    version=version,
-                )
-            else:
-                pdu = getnext_pdu(community, oid, version=version)
-            # Send request and wait for response
-            try:
-                data, addr = await asyncio.wait_for(
-                    sock.send_and_receive(pdu, (address, port)), timeout
-                )
-            except asyncio.TimeoutError:
-                if not max_retries:
-                    raise SNMPError(code=TIMED_OUT, oid=oid)
-                max_retries -= 1
-                continue
-            except socket.gaierror as e:
-                logger.debug("[%s] Cannot resolve address: %s", address, e)
-                raise SNMPError(code=UNREACHABLE, oid=oid)
-            except OSError as e:
-                logger.debug("[%s] Socket error: %s", address, e)
-                raise SNMPError(code=UNREACHABLE, oid=oid)
-            # Parse response
-            try:
-                resp = parser(data, display_hints)
-            except ValueError:
-                raise SNMPError(code=BER_ERROR, oid=oid)
-            if resp.error_status == NO_SUCH_NAME:
-                # NULL result
-                break
-            elif resp.error_status == END_OID_TREE:
-                # End OID Tree
-                return result
-            elif resp.error_status != NO_ERROR:
-                # Error
-                raise SNMPError(code=resp.error_status, oid=oid)
-            elif not raw_varbinds:
-                # Success value
-                for oid, v in resp.varbinds:
-                    if oid == first_oid:
-                        logger.warning("[%s] GETNEXT Oid wrap detected", address)
-                        return result
-                    elif oid.startswith(poid) and not (only_first and result) and oid != last_oid:
-                        # Next value
-                        if filter(oid, v):
-                            result += [(oid, v)]
-                        last_oid = oid
-                        first_oid = first_oid or oid
-                    else:
-                        logger.debug("[%s] GETNEXT result: %s", address, result)
-                        return result
-            else:
-                # Raw varbinds
-                for oid, v in resp.varbinds:
-                    s_oid = smart_text(oid)
-                    if s_oid.startswith(poid) and not (only_first and result) and oid != last_oid:
-                        # Next value
-                        if filter(s_oid, v):
-                            result += [(oid, v)]
-                        last_oid = oid
-                        first_oid = first_oid or oid
-                    else:
-                        logger.debug("[%s] GETNEXT result: %s", address, result)
-                        return result
+    first_oid = None
+    last_oid = None
+    while True:
+        if rate_limit:
+            await rate_limit.wait()
+        # Get PDU
+        request_id = _get_request_id(udp_socket)
+        if bulk:
+            pdu = getbulk_pdu(
+                community,
+                oid,
+                request_id=request_id,
+                max_repetitions=max_repetitions or BULK_MAX_REPETITIONS,
+                version=version,
+            )
+        else:
+            pdu = getnext_pdu(community, oid, request_id=request_id, version=version)
+        # Send request and wait for response
+        try:
+            data = await _send_and_receive(
+                pdu, address, port, request_id, timeout, tos=tos, udp_socket=udp_socket
+            )
+        except asyncio.TimeoutError:
+            if not max_retries:
+                raise SNMPError(code=TIMED_OUT, oid=oid)
+            max_retries -= 1
+            continue
+        except socket.gaierror as e:
+            logger.debug("[%s] Cannot resolve address: %s", address, e)
+            raise SNMPError(code=UNREACHABLE, oid=oid)
+        except OSError as e:
+            logger.debug("[%s] Socket error: %s", address, e)
+            raise SNMPError(code=UNREACHABLE, oid=oid)
+        # Parse response
+        try:
+            resp = parser(data, display_hints)
+        except ValueError:
+            raise SNMPError(code=BER_ERROR, oid=oid)
+        if resp.error_status == NO_SUCH_NAME:
+            # NULL result
+            break
+        elif resp.error_status == END_OID_TREE:
+            # End OID Tree
+            return result
+        elif resp.error_status != NO_ERROR:
+            # Error
+            raise SNMPError(code=resp.error_status, oid=oid)
+        elif not raw_varbinds:
+            # Success value
+            for oid, v in resp.varbinds:
+                if oid == first_oid:
+                    logger.warning("[%s] GETNEXT Oid wrap detected", address)
+                    return result
+                elif oid.startswith(poid) and not (only_first and result) and oid != last_oid:
+                    # Next value
+                    if filter(oid, v):
+                        result += [(oid, v)]
+                    last_oid = oid
+                    first_oid = first_oid or oid
+                else:
+                    logger.debug("[%s] GETNEXT result: %s", address, result)
+                    return result
+        else:
+            # Raw varbinds
+            for oid, v in resp.varbinds:
+                s_oid = smart_text(oid)
+                if s_oid.startswith(poid) and not (only_first and result) and oid != last_oid:
+                    # Next value
+                    if filter(s_oid, v):
+                        result += [(oid, v)]
+                    last_oid = oid
+                    first_oid = first_oid or oid
+                else:
+                    logger.debug("[%s] GETNEXT result: %s", address, result)
+                    return result
 
 
 async def snmp_set(
@@ -363,7 +419,7 @@ async def snmp_set(
     version=SNMP_v2c,
     timeout=10,
     tos=None,
-    udp_socket=None,
+    udp_socket: Optional[UDPSocket] = None,
     rate_limit: Optional[AsyncRateLimit] = None,
 ):
     """
@@ -372,33 +428,308 @@ async def snmp_set(
     """
     logger.debug("[%s] SNMP SET %s", address, varbinds)
     # Send GET PDU
-    pdu = set_pdu(community=community, varbinds=varbinds, version=version)
+    request_id = _get_request_id(udp_socket)
+    pdu = set_pdu(community=community, varbinds=varbinds, request_id=request_id, version=version)
     if rate_limit:
         await rate_limit.wait()
     # Wait for result
-    with UDPSocketContext(udp_socket, tos=tos) as sock:
-        try:
-            data, addr = await asyncio.wait_for(
-                sock.send_and_receive(pdu, (address, port)), timeout
-            )
-        except asyncio.TimeoutError:
-            raise SNMPError(code=TIMED_OUT, oid=varbinds[0][0])
-        except socket.gaierror as e:
-            logger.debug("[%s] Cannot resolve address: %s", address, e)
-            raise SNMPError(code=UNREACHABLE, oid=varbinds[0][0])
-        except OSError as e:
-            logger.debug("[%s] Socket error: %s", address, e)
-            raise SNMPError(code=UNREACHABLE, oid=varbinds[0][0])
-        try:
-            resp = parse_get_response(data)
-        except ValueError:
-            raise SNMPError(code=BER_ERROR, oid=varbinds[0][0])
-        if resp.error_status != NO_ERROR:
-            oid = None
-            if resp.error_index and resp.varbinds:
-                oid = resp.varbinds[resp.error_index - 1][0]
-            logger.debug("[%s] SNMP error: %s %s", address, oid, resp.error_status)
-            raise SNMPError(code=resp.error_status, oid=oid)
+    try:
+        data = await _send_and_receive(
+            pdu, address, port, request_id, timeout, tos=tos, udp_socket=udp_socket
+        )
+    except asyncio.TimeoutError:
+        raise SNMPError(code=TIMED_OUT, oid=varbinds[0][0])
+    except socket.gaierror as e:
+        logger.debug("[%s] Cannot resolve address: %s", address, e)
+        raise SNMPError(code=UNREACHABLE, oid=varbinds[0][0])
+    except OSError as e:
+        logger.debug("[%s] Socket error: %s", address, e)
+        raise SNMPError(code=UNREACHABLE, oid=varbinds[0][0])
+    try:
+        resp = parse_get_response(data)
+    except ValueError:
+        raise SNMPError(code=BER_ERROR, oid=varbinds[0][0])
+    if resp.error_status != NO_ERROR:
+        oid = None
+        if resp.error_index and resp.varbinds:
+            oid = resp.varbinds[resp.error_index - 1][0]
+        logger.debug("[%s] SNMP error: %s %s", address, oid, resp.error_status)
+        raise SNMPError(code=resp.error_status, oid=oid)
+    else:
+        logger.debug("[%s] SET result: OK", address)
+        return True
+
+
+def get_bulk_limit(address: str) -> Optional[int]:
+    """
+    Get learned GETBULK max-repetitions limit for device
+    """
+    with _bulk_limits_lock:
+        return _bulk_limits.get(address)
+
+
+def set_bulk_limit(address: str, limit: int) -> None:
+    """
+    Remember GETBULK max-repetitions limit for device
+    """
+    with _bulk_limits_lock:
+        _bulk_limits[address] = limit
+
+
+class _WalkColumn(object):
+    """
+    Table column walk state
+    """
+
+    __slots__ = ("oid", "prefix", "current", "first", "result", "is_done")
+
+    def __init__(self, oid: str):
+        self.oid = oid
+        self.prefix = oid + "."
+        self.current = oid
+        self.first: Optional[str] = None
+        self.result: List[Tuple[Any, Any]] = []
+        self.is_done = False
+
+    def feed(self, oid: Any, value: Any) -> None:
+        s_oid = smart_text(oid)
+        if not s_oid.startswith(self.prefix) or s_oid == self.current or s_oid == self.first:
+            # Column is over, end of MIB view or oid wrap
+            self.is_done = True
+            return
+        self.result.append((oid, value))
+        self.current = s_oid
+        self.first = self.first or s_oid
+
+
+class TableWalker(object):
+    """
+    Walk several table columns at once.
+
+    Columns are packed into the single GETNEXT/GETBULK PDU,
+    up to `max_columns` per request, and the column groups are walked concurrently,
+    sharing the rate limit. GETBULK max-repetitions is adjusted to the observed
+    response size and reduced on tooBig errors and, once per column group, on timeout.
+    Limit, lowered by repeated tooBig errors, is remembered for the device.
+    Timeouts may be transient, so they never lower the remembered limit.
+    max-repetitions, set by caller, is used as is.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        port: int = 161,
+        community: str = "public",
+        version: int = SNMP_v2c,
+        timeout: float = 10,
+        bulk: bool = False,
+        max_repetitions: Optional[int] = None,
+        max_retries: int = 0,
+        tos: Optional[int] = None,
+        udp_socket: Optional[UDPSocket] = None,
+        raw_varbinds: bool = False,
+        display_hints: Optional[
+            Dict[str, Optional[Callable[[str, bytes], Union[str, bytes]]]]
+        ] = None,
+        response_parser: Optional[_ResponseParser] = None,
+        rate_limit: Optional[AsyncRateLimit] = None,
+        max_columns: int = WALK_MAX_COLUMNS,
+        concurrency: int = WALK_CONCURRENCY,
+    ):
+        self.address = address
+        self.port = port
+        self.community = community
+        self.version = version
+        self.timeout = timeout
+        self.bulk = bulk and version != SNMP_v1
+        self.max_retries = max_retries
+        self.tos = tos
+        self.udp_socket = udp_socket
+        self.display_hints = display_hints
+        self.parser = _get_parser(response_parser, raw_varbinds)
+        self.rate_limit = rate_limit
+        self.max_columns = max(max_columns, 1)
+        self.concurrency = max(concurrency, 1)
+        # Fixed by caller, not learned
+        self.is_fixed = bool(max_repetitions)
+        self.limit = max_repetitions or get_bulk_limit(address) or WALK_MAX_REPETITIONS
+        self.initial_limit = self.limit
+        self.too_big_failures = 0
+
+    async def walk(self, oids: List[str]) -> List[List[Tuple[Any, Any]]]:
+        """
+        Walk table columns
+
+        :param oids: List of column oids
+        :return: List of (oid, value) per column
+        """
+        columns = [_WalkColumn(oid) for oid in oids]
+        sem = asyncio.Semaphore(self.concurrency)
+
+        async def walk_group(group: List[_WalkColumn]) -> None:
+            async with sem:
+                await self.walk_group(group)
+
+        await asyncio.gather(
+            *[
+                walk_group(columns[i : i + self.max_columns])
+                for i in range(0, len(columns), self.max_columns)
+            ]
+        )
+        if self.limit < self.initial_limit and not self.is_fixed:
+            logger.debug("[%s] Learned GETBULK limit: %d", self.address, self.limit)
+            set_bulk_limit(self.address, self.limit)
+        return [c.result for c in columns]
+
+    def shrink(self, reps: int) -> int:
+        """
+        Reduce max-repetitions after tooBig error.
+        Lower the limit when the errors are repeated
+        """
+        reps = max(reps // 2, 1)
+        self.too_big_failures += 1
+        if self.too_big_failures >= WALK_SHRINK_FAILURES:
+            self.limit = min(self.limit, reps)
+        return reps
+
+    def adapt(self, reps: int, size: int, n_varbinds: int, n_columns: int) -> int:
+        """
+        Fit max-repetitions to the desired response size
+        """
+        if not n_varbinds:
+            return reps
+        row_size = float(size) * n_columns / n_varbinds
+        return max(min(int(WALK_RESPONSE_SIZE / row_size), self.limit), 1)
+
+    async def walk_group(self, columns: List[_WalkColumn]) -> None:
+        """
+        Walk group of columns sequentially, until all columns are over
+        """
+        if self.is_fixed:
+            reps = self.limit
         else:
-            logger.debug("[%s] SET result: OK", address)
-            return True
+            reps = min(self.limit, BULK_MAX_REPETITIONS)
+        is_adaptive = self.bulk and not self.is_fixed
+        retries = self.max_retries
+        has_response = False
+        # Request is reduced on timeout
+        is_shrunk = False
+        while True:
+            active = [c for c in columns if not c.is_done]
+            if not active:
+                return
+            oids = [c.current for c in active]
+            if self.rate_limit:
+                await self.rate_limit.wait()
+            # Get PDU
+            request_id = _get_request_id(self.udp_socket)
+            if self.bulk:
+                pdu = getbulk_pdu(
+                    self.community,
+                    oids,
+                    request_id=request_id,
+                    max_repetitions=reps,
+                    version=self.version,
+                )
+            else:
+                pdu = getnext_pdu(self.community, oids, request_id=request_id, version=self.version)
+            # Send request and wait for response
+            try:
+                data = await _send_and_receive(
+                    pdu,
+                    self.address,
+                    self.port,
+                    request_id,
+                    self.timeout,
+                    tos=self.tos,
+                    udp_socket=self.udp_socket,
+                )
+            except asyncio.TimeoutError:
+                if is_adaptive and has_response and not is_shrunk and reps > 1:
+                    # Device is alive, probably the response is too large.
+                    # Retry with reduced request once per walk, so the silent device
+                    # fails after the single extra timeout. The limit is kept
+                    reps = max(reps // 2, 1)
+                    is_shrunk = True
+                    continue
+                if not retries:
+                    raise SNMPError(code=TIMED_OUT, oid=oids[0])
+                retries -= 1
+                continue
+            except socket.gaierror as e:
+                logger.debug("[%s] Cannot resolve address: %s", self.address, e)
+                raise SNMPError(code=UNREACHABLE, oid=oids[0])
+            except OSError as e:
+                logger.debug("[%s] Socket error: %s", self.address, e)
+                raise SNMPError(code=UNREACHABLE, oid=oids[0])
+            # Parse response
+            try:
+                resp = self.parser(data, self.display_hints)
+            except ValueError:
+                raise SNMPError(code=BER_ERROR, oid=oids[0])
+            has_response = True
+            if resp.error_status == TOO_BIG and is_adaptive and reps > 1:
+                reps = self.shrink(reps)
+                continue
+            elif resp.error_status == NO_SUCH_NAME and 0 < resp.error_index <= len(active):
+                # SNMPv1 end of MIB for one of the columns
+                active[resp.error_index - 1].is_done = True
+                continue
+            elif resp.error_status in (NO_SUCH_NAME, END_OID_TREE) or (
+                resp.error_status == NO_ERROR and not resp.varbinds
+            ):
+                return
+            elif resp.error_status != NO_ERROR:
+                raise SNMPError(code=resp.error_status, oid=oids[0])
+            # Varbinds are ordered by rows, one varbind per column in the row
+            n_columns = len(active)
+            for i, (oid, v) in enumerate(resp.varbinds):
+                column = active[i % n_columns]
+                if not column.is_done:
+                    column.feed(oid, v)
+            if is_adaptive:
+                reps = self.adapt(reps, len(data), len(resp.varbinds), n_columns)
+
+
+async def snmp_walk_tables(
+    address: str,
+    oids: List[str],
+    port: int = 161,
+    community: str = "public",
+    version: int = SNMP_v2c,
+    timeout: float = 10,
+    bulk: bool = False,
+    max_repetitions: Optional[int] = None,
+    max_retries: int = 0,
+    tos: Optional[int] = None,
+    udp_socket: Optional[UDPSocket] = None,
+    raw_varbinds: bool = False,
+    display_hints: Optional[Dict[str, Optional[Callable[[str, bytes], Union[str, bytes]]]]] = None,
+    response_parser: Optional[_ResponseParser] = None,
+    rate_limit: Optional[AsyncRateLimit] = None,
+    max_columns: int = WALK_MAX_COLUMNS,
+) -> List[List[Tuple[Any, Any]]]:
+    """
+    Walk several table columns using multi-column GETNEXT/BULK requests
+
+    :returns: List of (oid, value) for each column in `oids`
+    """
+    logger.debug("[%s] SNMP WALK %s", address, oids)
+    walker = TableWalker(
+        address,
+        port=port,
+        community=community,
+        version=version,
+        timeout=timeout,
+        bulk=bulk,
+        max_repetitions=max_repetitions,
+        max_retries=max_retries,
+        tos=tos,
+        udp_socket=udp_socket,
+        raw_varbinds=raw_varbinds,
+        display_hints=display_hints,
+        response_parser=response_parser,
+        rate_limit=rate_limit,
+        max_columns=max_columns,
+    )
+    return await walker.walk(oids)
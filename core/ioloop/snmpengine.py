@@ -0,0 +1,389 @@
+# ----------------------------------------------------------------------
+# Shared multiplexed SNMP transport
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Python modules
+import asyncio
+import errno
+import logging
+import random
+import selectors
+import socket
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+# NOC modules
+from noc.core.validators import is_ipv4
+from noc.core.perf import metrics
+
+logger = logging.getLogger(__name__)
+
+_ERRNO_WOULDBLOCK = (errno.EWOULDBLOCK, errno.EAGAIN)
+# Timer wheel resolution, in seconds
+WHEEL_TICK = 0.1
+# Number of wheel slots. Longer timeouts take several wheel turns
+WHEEL_SLOTS = 1024
+MAX_REQUEST_ID = 0x7FFFFFFF
+DEFAULT_POOL_SIZE = 4
+
+# Request ids must not be guessable
+_random = random.SystemRandom()
+
+RequestKey = int  # request id
+
+
+def _read_tlv(data: bytes, offset: int) -> Tuple[int, int, int]:
+    """
+    Read BER TLV header
+    :param data: Message
+    :param offset: TLV start
+    :return: tag, value offset, value length
+    """
+    tag = data[offset]
+    length = data[offset + 1]
+    offset += 2
+    if length & 0x80:
+        n = length & 0x7F
+        length = int.from_bytes(data[offset : offset + n], "big")
+        offset += n
+    return tag, offset, length
+
+
+def get_request_id(data: bytes) -> Optional[int]:
+    """
+    Extract request id from SNMP v1/v2c message without full decoding
+
+    :param data: Message
+    :return: Request id or None for malformed message
+    """
+    try:
+        tag, offset, _ = _read_tlv(data, 0)  # Message sequence
+        if tag != 0x30:
+            return None
+        _, offset, length = _read_tlv(data, offset)  # Version
+        _, offset, length = _read_tlv(data, offset + length)  # Community
+        _, offset, length = _read_tlv(data, offset + length)  # PDU
+        tag, offset, length = _read_tlv(data, offset)  # Request id
+        if tag != 0x02 or not length:
+            return None
+        return int.from_bytes(data[offset : offset + length], "big", signed=True)
+    except IndexError:
+        return None
+
+
+class _Request(object):
+    __slots__ = ("key", "future", "loop", "deadline", "address")
+
+    def __init__(
+        self,
+        key: RequestKey,
+        future: asyncio.Future,
+        loop: asyncio.AbstractEventLoop,
+        deadline: int,
+        address: Optional[Tuple[str, int]] = None,
+    ):
+        self.key = key
+        self.future = future
+        self.loop = loop
+        self.deadline = deadline
+        # Expected response source, when checked
+        self.address = address
+
+
+def _set_result(future: asyncio.Future, data: bytes) -> None:
+    if not future.done():
+        future.set_result(data)
+
+
+def _set_timeout(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_exception(asyncio.TimeoutError())
+
+
+class SNMPEngine(object):
+    """
+    Process-wide SNMP transport.
+
+    Requests from all the threads and event loops are sent over the small pool
+    of shared UDP sockets. Responses are received by the single reader thread
+    and matched to the pending requests by request id only, as devices
+    may reply from another address (multi-homed or NATed ones).
+    Source address check may be enabled by `check_source`.
+    Timeouts are tracked by the timer wheel, driven by the same thread.
+
+    Usage:
+    ```
+    engine = get_engine()
+    request_id = engine.get_request_id()
+    pdu = get_pdu(community, oids, request_id=request_id)
+    data = await engine.send_and_receive(pdu, (address, 161), request_id, timeout=10)
+    ```
+    """
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, check_source: bool = False):
+        self.pool_size = pool_size
+        self.check_source = check_source
+        self.lock = threading.Lock()
+        self.selector = selectors.DefaultSelector()
+        # tos -> sockets
+        self.pools: Dict[Optional[int], List[socket.socket]] = {}
+        self.pool_rr = 0
+        self.requests: Dict[RequestKey, _Request] = {}
+        self.wheel: List[Set[RequestKey]] = [set() for _ in range(WHEEL_SLOTS)]
+        self.tick = self.get_tick()
+        self.thread: Optional[threading.Thread] = None
+        self.to_shutdown = False
+
+    @staticmethod
+    def get_tick() -> int:
+        return int(time.monotonic() / WHEEL_TICK)
+
+    def get_request_id(self) -> int:
+        """
+        Generate random request id, not used by in-flight requests
+        """
+        with self.lock:
+            while True:
+                request_id = _random.randint(1, MAX_REQUEST_ID)
+                if request_id not in self.requests:
+                    return request_id
+
+    def get_socket(self, tos: Optional[int] = None) -> socket.socket:
+        """
+        Get pooled socket with given TOS. Must be called under lock
+        """
+        pool = self.pools.get(tos)
+        if pool is None:
+            pool = []
+            self.pools[tos] = pool
+        if len(pool) < self.pool_size:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            if tos:
+                sock.setsockopt(socket.IPPROTO_IP, socket.IP_TOS, tos)
+            sock.setblocking(False)
+            self.selector.register(sock, selectors.EVENT_READ)
+            pool.append(sock)
+            metrics["snmp_engine_sockets"] += 1
+            return sock
+        self.pool_rr += 1
+        return pool[self.pool_rr % len(pool)]
+
+    def start(self) -> None:
+        """
+        Start reader thread. Must be called under lock
+        """
+        if self.thread:
+            return
+        self.to_shutdown = False
+        self.thread = threading.Thread(target=self.run, name="snmp-engine", daemon=True)
+        self.thread.start()
+
+    def shutdown(self) -> None:
+        """
+        Stop reader thread and close sockets
+        """
+        with self.lock:
+            self.to_shutdown = True
+            thread, self.thread = self.thread, None
+        if thread:
+            thread.join()
+        with self.lock:
+            for pool in self.pools.values():
+                for sock in pool:
+                    self.selector.unregister(sock)
+                    sock.close()
+            self.pools = {}
+            for req in self.requests.values():
+                self.wake(req, None)
+            self.requests = {}
+            self.wheel = [set() for _ in range(WHEEL_SLOTS)]
+
+    async def send_and_receive(
+        self,
+        data: bytes,
+        address: Tuple[str, int],
+        request_id: int,
+        timeout: float,
+        tos: Optional[int] = None,
+    ) -> bytes:
+        """
+        Send request and wait for the response with same request id
+
+        :param data: Encoded SNMP message
+        :param address: (address, port) tuple
+        :param request_id: Request id, encoded into message
+        :param timeout: Response timeout, in seconds
+        :param tos: IP TOS
+        :return: Response message
+        :raises asyncio.TimeoutError: On timeout
+        :raises OSError: On socket errors
+        """
+        addr, port = address
+        loop = asyncio.get_running_loop()
+        if not is_ipv4(addr):
+            addr = await self.resolve(addr, port)
+        key = request_id
+        future = loop.create_future()
+        deadline = self.get_tick() + max(int(timeout / WHEEL_TICK), 1)
+        req = _Request(key, future, loop, deadline, (addr, port) if self.check_source else None)
+        with self.lock:
+            if key in self.requests:
+                raise ValueError("Duplicated request id")
+            self.requests[key] = req
+            self.wheel[deadline % WHEEL_SLOTS].add(key)
+            sock = self.get_socket(tos)
+            self.start()
+        try:
+            await self.sendto(sock, data, (addr, port))
+            metrics["snmp_engine_requests"] += 1
+            return await future
+        finally:
+            if not future.done() or future.cancelled():
+                # Send error or cancelled by caller
+                self.discard(req)
+
+    @staticmethod
+    async def resolve(host: str, port: int) -> str:
+        """
+        Resolve host name to IPv4 address without blocking the loop
+
+        :raises OSError: On resolution failure
+        """
+        loop = asyncio.get_running_loop()
+        r = await loop.getaddrinfo(host, port, family=socket.AF_INET, type=socket.SOCK_DGRAM)
+        if not r:
+            raise OSError(errno.EHOSTUNREACH, "Cannot resolve %s" % host)
+        return r[0][4][0]
+
+    @staticmethod
+    async def sendto(sock: socket.socket, data: bytes, address: Tuple[str, int]) -> None:
+        """
+        Send datagram, waiting for socket's writeability when the send buffer is full
+        """
+        while True:
+            try:
+                sock.sendto(data, address)
+                return
+            except OSError as e:
+                if e.errno not in _ERRNO_WOULDBLOCK:
+                    raise
+            loop = asyncio.get_running_loop()
+            write_ev = asyncio.Event()
+            loop.add_writer(sock.fileno(), write_ev.set)
+            try:
+                await write_ev.wait()
+            finally:
+                loop.remove_writer(sock.fileno())
+
+    def discard(self, req: _Request) -> None:
+        """
+        Forget pending request
+        """
+        with self.lock:
+            if self.requests.get(req.key) is req:
+                del self.requests[req.key]
+                self.wheel[req.deadline % WHEEL_SLOTS].discard(req.key)
+
+    @staticmethod
+    def wake(req: _Request, data: Optional[bytes]) -> None:
+        """
+        Pass the response or the timeout to the request's loop
+        """
+        try:
+            if data is None:
+                req.loop.call_soon_threadsafe(_set_timeout, req.future)
+            else:
+                req.loop.call_soon_threadsafe(_set_result, req.future, data)
+        except RuntimeError:
+            pass  # Loop is already closed
+
+    def run(self) -> None:
+        """
+        Reader thread
+        """
+        logger.debug("Starting SNMP engine")
+        while not self.to_shutdown:
+            for skey, _ in self.selector.select(WHEEL_TICK):
+                self.read_socket(skey.fileobj)
+            self.expire()
+        logger.debug("SNMP engine is stopped")
+
+    def read_socket(self, sock: socket.socket) -> None:
+        """
+        Read all pending datagrams from socket
+        """
+        while True:
+            try:
+                data, (addr, port) = sock.recvfrom(65536)
+            except OSError as e:
+                if e.errno not in _ERRNO_WOULDBLOCK:
+                    logger.debug("Socket error: %s", e)
+                return
+            request_id = get_request_id(data)
+            if request_id is None:
+                metrics["snmp_engine_malformed"] += 1
+                continue
+            key = request_id
+            with self.lock:
+                req = self.requests.get(key)
+                if req and req.address and req.address != (addr, port):
+                    req = None  # Spoofed or stray response
+                if req:
+                    del self.requests[key]
+                    self.wheel[req.deadline % WHEEL_SLOTS].discard(key)
+            if req:
+                self.wake(req, data)
+            else:
+                # Late or duplicated response
+                metrics["snmp_engine_unexpected"] += 1
+
+    def expire(self) -> None:
+        """
+        Process timer wheel slots up to current tick
+        """
+        now = self.get_tick()
+        expired: List[_Request] = []
+        with self.lock:
+            # Do not turn more than one wheel per call
+            for tick in range(max(self.tick + 1, now - WHEEL_SLOTS + 1), now + 1):
+                slot = self.wheel[tick % WHEEL_SLOTS]
+                if not slot:
+                    continue
+                for key in list(slot):
+                    req = self.requests[key]
+                    if req.deadline <= now:
+                        slot.discard(key)
+                        del self.requests[key]
+                        expired.append(req)
+            self.tick = now
+        for req in expired:
+            self.wake(req, None)
+        if expired:
+            metrics["snmp_engine_timeouts"] += len(expired)
+
+
+_engine: Optional[SNMPEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> SNMPEngine:
+    """
+    Get process-wide SNMP engine
+    """
+    global _engine
+
+    if _engine:
+        return _engine
+    with _engine_lock:
+        if not _engine:
+            from noc.config import config
+
+            _engine = SNMPEngine(
+                pool_size=config.script.snmp_sockets,
+                check_source=config.script.snmp_check_source,
+            )
+        return _engine
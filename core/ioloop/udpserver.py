@@ -13,10 +13,21 @@ import os
 import platform
 import socket
 import sys
-from typing import Iterable, List, Tuple, Optional, Any
+from collections import deque
+from concurrent.futures import Executor
+from typing import Iterable, List, Tuple, Optional, Any, Deque, Dict
+
+# NOC modules
+from noc.core.perf import metrics
+from noc.core.ioloop.timers import PeriodicCallback
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_QUEUE_SIZE = 10000
+# Kernel drop counters update interval, in milliseconds
+DROPS_UPDATE_INTERVAL = 10000
+
 
 class UDPServerProtocol(asyncio.DatagramProtocol):
     def __init__(self, server):
@@ -209,3 +220,124 @@ class UDPServer(object):
         if sys.platform == "linux2":
             return 15
         return None
+
+
+class BatchUDPServer(UDPServer):
+    """
+    UDP server, processing received datagrams in batches.
+
+    Datagrams are queued by protocol and drained by the separate task,
+    passing up to `batch_size` datagrams to `on_batch` at once.
+    Datagrams are dropped when queue is full. Queue and kernel drops are
+    exposed as `udp_queue_dropped` and `udp_kernel_dropped` metrics.
+    Batch processing may offload CPU-bound work to the `executor`.
+    """
+
+    name = "udp"
+
+    def __init__(
+        self,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        executor: Optional[Executor] = None,
+    ):
+        super().__init__()
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.executor = executor
+        self.queue: Deque[Tuple[bytes, Tuple[str, int]]] = deque()
+        self.ready: Optional[asyncio.Event] = None
+        self.drain_task: Optional[asyncio.Task] = None
+        self.drops_callback: Optional[PeriodicCallback] = None
+        self.dropped = 0
+
+    def start(self):
+        self.ready = asyncio.Event()
+        if self.queue:
+            self.ready.set()
+        self.drain_task = asyncio.get_running_loop().create_task(self.drain())
+        if sys.platform.startswith("linux"):
+            self.drops_callback = PeriodicCallback(self.update_kernel_drops, DROPS_UPDATE_INTERVAL)
+            self.drops_callback.start()
+
+    def stop(self):
+        super().stop()
+        if self.drain_task:
+            self.drain_task.cancel()
+            self.drain_task = None
+        if self.drops_callback:
+            self.drops_callback.stop()
+            self.drops_callback = None
+        if self.executor:
+            self.executor.shutdown(wait=False)
+
+    def on_read(self, data: bytes, address: Tuple[str, int]):
+        if len(self.queue) >= self.queue_size:
+            self.dropped += 1
+            metrics["udp_queue_dropped", ("server", self.name)] += 1
+            return
+        self.queue.append((data, address))
+        if self.ready:
+            self.ready.set()
+
+    async def drain(self) -> None:
+        """
+        Pass queued datagrams to `on_batch`
+        """
+        while True:
+            await self.ready.wait()
+            self.ready.clear()
+            while self.queue:
+                batch = [self.queue.popleft() for _ in range(min(len(self.queue), self.batch_size))]
+                metrics["udp_batches", ("server", self.name)] += 1
+                try:
+                    await self.on_batch(batch)
+                except Exception as e:
+                    logger.error("[%s] Failed to process batch: %s", self.name, e)
+
+    async def on_batch(self, batch: List[Tuple[bytes, Tuple[str, int]]]) -> None:
+        """
+        To be overriden
+        """
+
+    async def run_in_executor(self, fn, *args) -> Any:
+        """
+        Run function in executor, if set. Call directly otherwise
+        """
+        if not self.executor:
+            return fn(*args)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    def get_kernel_drops(self) -> Optional[int]:
+        """
+        Get amount of datagrams, dropped by kernel on listening sockets
+        due to receive buffer overflow. Linux only.
+
+        :return: Dropped datagrams or None, if not supported
+        """
+        inodes = set()
+        for transport in self._transports:
+            sock = transport.get_extra_info("socket")
+            if sock:
+                inodes.add(str(os.fstat(sock.fileno()).st_ino))
+        if not inodes:
+            return None
+        drops: Dict[str, int] = {}
+        for path in ("/proc/net/udp", "/proc/net/udp6"):
+            try:
+                with open(path) as f:
+                    next(f)  # Skip header
+                    for line in f:
+                        parts = line.split()
+                        if len(parts) > 12 and parts[9] in inodes:
+                            drops[parts[9]] = int(parts[12])
+            except OSError:
+                continue
+        if not drops:
+            return None
+        return sum(drops.values())
+
+    async def update_kernel_drops(self) -> None:
+        drops = self.get_kernel_drops()
+        if drops is not None:
+            metrics["udp_kernel_dropped", ("server", self.name)] = drops
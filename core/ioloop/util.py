@@ -1,7 +1,7 @@
 # ----------------------------------------------------------------------
 # Various IOLoop utilities
 # ----------------------------------------------------------------------
-# Copyright (C) 2007-2020 The NOC Project
+# Copyright (C) 2007-2022 The NOC Project
 # See LICENSE for details
 # ----------------------------------------------------------------------
 
@@ -9,6 +9,7 @@
 import sys
 import asyncio
 import logging
+import threading
 
 # Third-party modules
 from typing import Callable, TypeVar, Tuple, Any, Optional
@@ -32,14 +33,28 @@ if config.features.use_uvloop:
 
 
 class IOLoopContext(object):
-    def __init__(self, suppress_trace=False):
+    """
+    Run event loop in synchronous code.
+
+    Fresh event loop is created for each context by default.
+    `persistent` context reuses the thread's persistent event loop
+    (see `get_thread_loop`), which is left open on exit.
+    Tasks left after context exit are cancelled in both cases.
+    """
+
+    def __init__(self, suppress_trace=False, persistent=False):
         self.prev_loop = None
         self.new_loop = None
         self.suppress_trace = suppress_trace
+        self.persistent = persistent
+        self.is_persistent = False
 
     def get_context(self):
         self.prev_loop = asyncio._get_running_loop()
-        self.new_loop = asyncio.new_event_loop()
+        thread_loop = get_thread_loop() if self.persistent else None
+        # Persistent loop cannot be reentered
+        self.is_persistent = thread_loop is not None and thread_loop is not self.prev_loop
+        self.new_loop = thread_loop if self.is_persistent else asyncio.new_event_loop()
         if self.prev_loop:
             # Reset running loop
             asyncio._set_running_loop(None)
@@ -47,15 +62,11 @@ class IOLoopContext(object):
 
     def drop_context(self):
         # Cancel all tasks
-        to_cancel = asyncio.all_tasks(self.new_loop)
-        for task in to_cancel:
-            task.cancel()
-        asyncio.gather(*to_cancel, loop=self.new_loop, return_exceptions=True)
-        self.new_loop.run_until_complete(self.new_loop.shutdown_asyncgens())
-        #
-        self.new_loop.close()
+        cancel_tasks(self.new_loop)
+        if not self.is_persistent:
+            self.new_loop.run_until_complete(self.new_loop.shutdown_asyncgens())
+            self.new_loop.close()
         self.new_loop = None
-        asyncio._set_running_loop(self.prev_loop)
         if self.prev_loop:
             asyncio._set_running_loop(self.prev_loop)
         else:
@@ -75,13 +86,68 @@ class IOLoopContext(object):
             return True
 
 
-def run_sync(cb: Callable[..., T], close_all: bool = True) -> T:
+def cancel_tasks(loop: asyncio.AbstractEventLoop) -> None:
+    """
+    Cancel all loop's tasks and wait for cancellation
+
+    :param loop: Event loop, not running
+    """
+    to_cancel = asyncio.all_tasks(loop)
+    if not to_cancel:
+        return
+    for task in to_cancel:
+        task.cancel()
+    loop.run_until_complete(asyncio.gather(*to_cancel, return_exceptions=True))
+
+
+_thread_local = threading.local()
+
+
+def get_thread_loop() -> asyncio.AbstractEventLoop:
+    """
+    Get persistent event loop of the current thread.
+    Loop is created on first call and reused by the persistent `IOLoopContext`
+    and `run_sync` calls until `close_thread_loop`, saving the loop setup
+    and teardown on every synchronous I/O call.
+
+    :return: Event loop
+    """
+    loop = getattr(_thread_local, "loop", None)
+    if loop is None or loop.is_closed():
+        if not _setup_completed:
+            setup_asyncio()
+        loop = asyncio.new_event_loop()
+        _thread_local.loop = loop
+    return loop
+
+
+def close_thread_loop() -> None:
+    """
+    Close persistent event loop of the current thread, if any
+    """
+    loop = getattr(_thread_local, "loop", None)
+    _thread_local.loop = None
+    if loop is None or loop.is_closed():
+        return
+    prev_loop = asyncio._get_running_loop()
+    if prev_loop:
+        asyncio._set_running_loop(None)
+    try:
+        cancel_tasks(loop)
+        loop.run_until_complete(loop.shutdown_asyncgens())
+    finally:
+        loop.close()
+        asyncio._set_running_loop(prev_loop)
+
+
+def run_sync(cb: Callable[..., T], close_all: bool = True, persistent: bool = False) -> T:
     """
     Run callable on dedicated IOLoop in safe manner
     and return result or raise error
 
     :param cb: Callable to be runned on IOLoop
     :param close_all: Close all file descriptors
+    :param persistent: Run on the thread's persistent IOLoop
     :return: Callable result
     """
     global _setup_completed
@@ -99,7 +165,7 @@ def run_sync(cb: Callable[..., T], close_all: bool = True) -> T:
     result: Optional[T] = None
     error: Optional[Tuple[Any, Any, Any]] = None
 
-    with IOLoopContext() as loop:
+    with IOLoopContext(persistent=persistent) as loop:
         loop.run_until_complete(wrapper())
     if error:
         reraise(*error)
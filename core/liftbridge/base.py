@@ -144,6 +144,7 @@ STREAM_CONFIG: Dict[str, StreamConfig] = {
         ),
     ),
     "revokedtokens": StreamConfig(partitions=1),
+    "cacheinvalidation": StreamConfig(partitions=1),
     "jobs": StreamConfig(
         slot="worker",
         retention_policy=RetentionPolicy(
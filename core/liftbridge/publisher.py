@@ -0,0 +1,163 @@
+# ----------------------------------------------------------------------
+# Pipelined LiftBridge publisher
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Python modules
+import asyncio
+import logging
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+# NOC modules
+from noc.core.perf import metrics
+from .api_pb2 import PublishRequest
+from .base import LiftBridgeClient
+from .error import LiftbridgeError
+from .queue import LiftBridgeQueue
+
+logger = logging.getLogger(__name__)
+
+# Streams, containing newline-delimited records, which can be safely merged
+COALESCE_PREFIX = "ch."
+
+
+class PublishPipeline(object):
+    """
+    Publish requests from the queue, keeping up to `window` requests in flight.
+    Requests are dispatched to the lanes by (stream, partition).
+    Each lane sends its requests one by one, so the order within the partition is kept,
+    while the different partitions are published concurrently.
+    """
+
+    def __init__(self, queue: LiftBridgeQueue, window: int, max_message_size: int):
+        self.queue = queue
+        self.window = asyncio.Semaphore(window)
+        self.max_message_size = max_message_size
+        self.lanes: Dict[Tuple[str, int], Deque[PublishRequest]] = {}
+        # Requests taken from queue and not sent yet
+        self.pending: int = 0
+        self.drain_waiter: Optional[asyncio.Event] = None
+
+    async def run(self, client: LiftBridgeClient) -> None:
+        """
+        Dispatch requests from queue until shutdown
+        :param client: LiftBridgeClient instance
+        :return:
+        """
+        while not self.queue.to_shutdown:
+            await self.window.acquire()
+            req = await self.queue.get(timeout=1)
+            if not req:
+                self.window.release()
+                continue  # Timeout or shutdown
+            self.pending += 1
+            key = (req.stream, req.partition)
+            lane = self.lanes.get(key)
+            if lane is None:
+                # Start new lane
+                lane = deque()
+                self.lanes[key] = lane
+                asyncio.create_task(self.run_lane(client, key, lane))
+            lane.append(req)
+
+    async def run_lane(
+        self, client: LiftBridgeClient, key: Tuple[str, int], lane: Deque[PublishRequest]
+    ) -> None:
+        """
+        Publish lane's requests in order. Lane is stopped when became empty.
+        Requests, failed with unexpected error, are dropped
+        """
+        n_reqs = 0  # Requests in flight
+        try:
+            while lane:
+                req = lane.popleft()
+                n_reqs = 1
+                if req.stream.startswith(COALESCE_PREFIX):
+                    req, n_reqs = self.coalesce(req, lane)
+                try:
+                    await client.publish_sync(req, wait_for_stream=True)
+                except LiftbridgeError as e:
+                    logger.error("Failed to publish message: %s", e)
+                    logger.error("Retry message")
+                    await asyncio.sleep(1)
+                    lane.appendleft(req)
+                    self.release(n_reqs - 1)
+                    n_reqs = 0
+                    continue
+                except Exception as e:
+                    logger.error(
+                        "[%s:%s] Unexpected error when publishing, dropping message: %s",
+                        key[0],
+                        key[1],
+                        e,
+                    )
+                    metrics["liftbridge_publish_dropped"] += n_reqs
+                self.release(n_reqs)
+                n_reqs = 0
+        finally:
+            if self.lanes.get(key) is lane:
+                del self.lanes[key]
+            # Free slots of requests left by cancelled lane
+            if n_reqs or lane:
+                logger.error("[%s:%s] Lane is stopped, dropping messages", key[0], key[1])
+                metrics["liftbridge_publish_dropped"] += n_reqs + len(lane)
+                self.release(n_reqs + len(lane))
+                lane.clear()
+            if self.drain_waiter and not self.pending:
+                self.drain_waiter.set()
+
+    def release(self, n: int) -> None:
+        """
+        Mark `n` requests as completed and free the window slots
+        """
+        for _ in range(n):
+            self.window.release()
+        self.pending -= n
+
+    def coalesce(
+        self, req: PublishRequest, lane: Deque[PublishRequest]
+    ) -> Tuple[PublishRequest, int]:
+        """
+        Merge small queued requests into one.
+        Only plain requests (without key and headers, including compression one) are merged
+
+        :param req: First request
+        :param lane: Lane's queue
+        :return: Merged request, number of merged requests
+        """
+        if req.key or req.headers:
+            return req, 1
+        parts = [req.value]
+        size = len(req.value)
+        while lane:
+            nr = lane[0]
+            if nr.key or nr.headers or size + len(nr.value) + 1 > self.max_message_size:
+                break
+            lane.popleft()
+            parts.append(nr.value)
+            size += len(nr.value) + 1
+        if len(parts) == 1:
+            return req, 1
+        metrics["liftbridge_publish_coalesced"] += len(parts) - 1
+        merged = PublishRequest()
+        merged.CopyFrom(req)
+        merged.value = b"\n".join(parts)
+        return merged, len(parts)
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until all dispatched requests are sent
+        :return:
+        """
+        if not self.pending:
+            return True
+        self.drain_waiter = asyncio.Event()
+        try:
+            await asyncio.wait_for(self.drain_waiter.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self.drain_waiter = None
+        return not self.pending
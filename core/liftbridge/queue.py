@@ -7,7 +7,7 @@
 
 # Python modules
 from collections import deque
-from threading import Lock
+from threading import Lock, Condition
 import asyncio
 from typing import Optional, Dict, Any
 
@@ -16,14 +16,19 @@ from .api_pb2 import PublishRequest
 
 
 class LiftBridgeQueue(object):
-    def __init__(self, loop: Optional[asyncio.BaseEventLoop] = None):
+    def __init__(self, loop: Optional[asyncio.BaseEventLoop] = None, max_size: int = 0):
         self.queue: deque = deque()
         self.lock = Lock()
+        # Signalled when queue has free space
+        self.not_full = Condition(self.lock)
+        # Max queue size, 0 - unlimited
+        self.max_size = max_size
         self.waiter: Optional[asyncio.Event] = None
         self.drain_waiter: Optional[asyncio.Event] = None
         self.loop: Optional[asyncio.BaseEventLoop] = loop
         self.req_puts: int = 0
         self.req_gets: int = 0
+        self.req_blocked: int = 0
         self.to_shutdown: bool = False
 
     def _notify_waiter(self, waiter: asyncio.Event) -> None:
@@ -32,23 +37,35 @@ class LiftBridgeQueue(object):
         else:
             waiter.set()
 
-    def put(self, req: PublishRequest, fifo: bool = True) -> None:
+    def put(
+        self, req: PublishRequest, fifo: bool = True, block: bool = False, timeout: float = 1.0
+    ) -> bool:
         """
         Put request into queue
         :param req:
         :param fifo:
-        :return:
+        :param block: Wait until queue has free space. Must not be used from event loop thread
+        :param timeout: Max time to wait for free space
+        :return: False, if request is not enqueued, as the queue is still full
+            after timeout or on shutdown
         """
         with self.lock:
+            if block and self.max_size and len(self.queue) >= self.max_size:
+                self.req_blocked += 1
+                self.not_full.wait_for(
+                    lambda: len(self.queue) < self.max_size or self.to_shutdown, timeout
+                )
+                if len(self.queue) >= self.max_size:
+                    return False
             if fifo:
                 self.queue.append(req)
             else:
                 self.queue.appendleft(req)
             self.req_puts += 1
             # Notify waiters
-            if not self.waiter:
-                return
-            self._notify_waiter(self.waiter)
+            if self.waiter:
+                self._notify_waiter(self.waiter)
+            return True
 
     async def get(self, timeout: Optional[float] = None) -> Optional[PublishRequest]:
         """
@@ -61,6 +78,7 @@ class LiftBridgeQueue(object):
             # Direct path, in case the queue is not empty
             if len(self.queue):
                 self.req_gets += 1
+                self.not_full.notify()
                 return self.queue.popleft()
             self.waiter = asyncio.Event()
         # Wait until waiter is set
@@ -77,6 +95,7 @@ class LiftBridgeQueue(object):
                 self._notify_waiter(self.drain_waiter)
             self.waiter = None
             self.req_gets += 1
+            self.not_full.notify()
             try:
                 return self.queue.popleft()
             except IndexError:
@@ -88,6 +107,7 @@ class LiftBridgeQueue(object):
                 "liftbridge_publish_puts": self.req_puts,
                 "liftbridge_publish_gets": self.req_gets,
                 "liftbridge_publish_queue": len(self.queue),
+                "liftbridge_publish_blocked": self.req_blocked,
             }
         )
 
@@ -95,7 +115,8 @@ class LiftBridgeQueue(object):
         with self.lock:
             if self.waiter:
                 self._notify_waiter(self.waiter)
-        self.to_shutdown = True
+            self.to_shutdown = True
+            self.not_full.notify_all()
 
     async def drain(self, timeout: Optional[float] = None) -> bool:
         """
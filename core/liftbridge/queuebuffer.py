@@ -7,7 +7,7 @@
 
 # Python modules
 from collections import defaultdict
-from typing import List, Tuple, DefaultDict, Dict, Any, Optional, Iterable
+from typing import List, Tuple, DefaultDict, Dict, Any, Optional, Iterable, TYPE_CHECKING
 from threading import Lock
 
 # Third-party modules
@@ -16,6 +16,9 @@ import orjson
 # Python modules
 from noc.config import config
 
+if TYPE_CHECKING:
+    from noc.core.clickhouse.rowbinary import RowBinaryEncoder
+
 
 class QBuffer(object):
     """
@@ -23,23 +26,35 @@ class QBuffer(object):
     """
 
     def __init__(self, max_size: Optional[int] = None):
-        self.buf: DefaultDict[Tuple[str, int], List[bytes]] = defaultdict(list)
+        self.buf: DefaultDict[
+            Tuple[str, int, Optional["RowBinaryEncoder"]], List[bytes]
+        ] = defaultdict(list)
         self.lock = Lock()
         self.max_size = max_size or config.liftbridge.max_message_size
 
-    def put(self, stream: str, partition: int, data: List[Dict[str, Any]]):
+    def put(
+        self,
+        stream: str,
+        partition: int,
+        data: List[Dict[str, Any]],
+        encoder: Optional["RowBinaryEncoder"] = None,
+    ):
         """
         Put block of data to buffer
         :param stream:
         :param partition:
         :param data:
+        :param encoder: Binary encoder, JSON lines are used when not set
         :return:
         """
         if not data:
             return
-        d = [orjson.dumps(x) for x in data]
+        if encoder:
+            d = [encoder.encode_row(x) for x in data]
+        else:
+            d = [orjson.dumps(x) for x in data]
         with self.lock:
-            self.buf[stream, partition] += d
+            self.buf[stream, partition, encoder] += d
 
     @staticmethod
     def _iter_chunks(data: List[bytes], max_size: int) -> Iterable[bytes]:
@@ -56,15 +71,38 @@ class QBuffer(object):
         if r:
             yield b"\n".join(r)
 
-    def iter_slice(self) -> Iterable[Tuple[str, int, bytes]]:
+    @staticmethod
+    def _iter_binary_chunks(data: List[bytes], max_size: int) -> Iterable[Tuple[bytes, int]]:
+        """
+        Iterate concatenated binary rows and their amount
+        """
+        r: List[bytes] = []
+        size = 0
+        for d in data:
+            ld = len(d)
+            if size + ld > max_size and r:
+                yield b"".join(r), len(r)
+                r = []
+                size = 0
+            r.append(d)
+            size += ld
+        if r:
+            yield b"".join(r), len(r)
+
+    def iter_slice(self) -> Iterable[Tuple[str, int, bytes, Optional[Dict[str, bytes]]]]:
         """
-        Iterates tuple of (stream, partition, data)
+        Iterates tuple of (stream, partition, data, headers).
+        Headers are set only for binary encoded data
         :return:
         """
         with self.lock:
-            for (stream, partition), out in self.buf.items():
+            for (stream, partition, encoder), out in self.buf.items():
+                if encoder:
+                    for chunk, records in self._iter_binary_chunks(out, self.max_size):
+                        yield stream, partition, chunk, encoder.get_headers(records)
+                    continue
                 for chunk in self._iter_chunks(out, self.max_size):
-                    yield stream, partition, chunk
+                    yield stream, partition, chunk, None
             self.buf = defaultdict(list)
 
     def is_empty(self) -> bool:
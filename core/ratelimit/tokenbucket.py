@@ -0,0 +1,43 @@
+# ----------------------------------------------------------------------
+# TokenBucket
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Python modules
+from typing import Optional
+from time import monotonic
+
+
+class TokenBucket(object):
+    """
+    Non-blocking token bucket. Allows `rate` requests per second
+    on average and bursts up to `burst` requests.
+    """
+
+    __slots__ = ("rate", "burst", "tokens", "last")
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst or max(rate, 1.0)
+        self.tokens = self.burst
+        self.last: Optional[float] = None
+
+    def consume(self, n: float = 1.0, ts: Optional[float] = None) -> bool:
+        """
+        Try to consume `n` tokens
+
+        :param n: Number of tokens
+        :param ts: Current monotonic time, in seconds
+        :return: True if tokens are consumed, False if rate is exceeded
+        """
+        if ts is None:
+            ts = monotonic()
+        if self.last is not None and ts > self.last:
+            self.tokens = min(self.burst, self.tokens + (ts - self.last) * self.rate)
+        self.last = ts
+        if self.tokens < n:
+            return False
+        self.tokens -= n
+        return True
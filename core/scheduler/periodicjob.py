@@ -1,12 +1,17 @@
 # ----------------------------------------------------------------------
 # Periodic Job Class
 # ----------------------------------------------------------------------
-# Copyright (C) 2007-2017 The NOC Project
+# Copyright (C) 2007-2022 The NOC Project
 # See LICENSE for details
 # ----------------------------------------------------------------------
 
+# Python modules
+import datetime
+
 # NOC modules
+from noc.config import config
 from .job import Job
+from .spread import get_spread_offset, get_jitter
 
 
 class PeriodicJob(Job):
@@ -14,7 +19,8 @@ class PeriodicJob(Job):
     interval = 1
     # Interval after failure (S_FAIL)
     failed_interval = 1
-    # Shift start time to random offset
+    # Spread runs of the class across interval by consistent hashing of the key,
+    # when scheduler.spread_jobs is enabled
     use_offset = False
 
     def get_interval(self):
@@ -26,6 +32,28 @@ class PeriodicJob(Job):
     def get_failed_interval(self):
         return self.failed_interval
 
+    def get_offset(self) -> float:
+        """
+        Returns job's offset within interval [0 .. 1]
+        """
+        if self.use_offset and config.scheduler.spread_jobs:
+            return get_spread_offset(self.attrs[self.ATTR_CLASS], self.attrs[self.ATTR_KEY])
+        return self.attrs[self.ATTR_OFFSET]
+
+    def get_next_run(self, interval):
+        """
+        Returns next run timestamp
+        """
+        ts = self.get_next_timestamp(interval, self.get_offset())
+        if self.use_offset and config.scheduler.spread_jobs:
+            jitter = get_jitter(
+                interval, config.scheduler.spread_jitter, config.scheduler.spread_max_jitter
+            )
+            if jitter:
+                # Never shift to the past
+                ts = max(ts + datetime.timedelta(seconds=jitter), datetime.datetime.now())
+        return ts
+
     def schedule_next(self, status):
         if status in (self.E_SUCCESS, self.E_EXCEPTION):
             interval = self.get_interval()
@@ -41,7 +69,7 @@ class PeriodicJob(Job):
             self.remove_job()
             return
         # Schedule next run
-        ts = self.get_next_timestamp(interval, self.attrs[self.ATTR_OFFSET])
+        ts = self.get_next_run(interval)
         # Store context
         if self.context_version:
             ctx = self.context or None
@@ -1,7 +1,7 @@
 # ----------------------------------------------------------------------
 # Scheduler Job Class
 # ----------------------------------------------------------------------
-# Copyright (C) 2007-2020 The NOC Project
+# Copyright (C) 2007-2022 The NOC Project
 # See LICENSE for details
 # ----------------------------------------------------------------------
 
@@ -17,7 +17,7 @@ import asyncio
 # Third-party modules
 import pymongo.errors
 from pymongo import DeleteOne, UpdateOne
-from typing import Optional
+from typing import Optional, Dict, Any, List
 
 # NOC modules
 from noc.core.mongo.connection import get_db
@@ -26,6 +26,8 @@ from noc.core.threadpool import ThreadPoolExecutor
 from noc.core.perf import metrics
 from noc.config import config
 from .job import Job
+from .wheel import TimingWheel
+from .spread import get_spread_offset, get_histogram_stats
 
 
 class Scheduler(object):
@@ -36,6 +38,10 @@ class Scheduler(object):
     UPDATES_PER_CHECK = config.scheduler.updates_per_check
 
     CACHE_DEFAULT_TTL = config.scheduler.cache_default_ttl
+    # Jobs loaded to timing wheel per query
+    WHEEL_LOAD_CHUNK = 1000
+    # Job start histogram depth, in seconds
+    START_HISTOGRAM_DEPTH = 60
 
     def __init__(
         self,
@@ -49,6 +55,7 @@ class Scheduler(object):
         filter=None,
         service=None,
         sample=0,
+        use_wheel=None,
     ):
         """
         Create scheduler
@@ -67,6 +74,9 @@ class Scheduler(object):
         :param tracing_sample: Tracing sample rate. 0 - do not sample,
            1 - sample every job
            N > 1 - sample very Nth job
+        :param use_wheel: Prefetch jobs to the in-memory timing wheel
+            instead of polling database on every tick.
+            Use config.scheduler.use_wheel if not set
         """
         self.logger = logging.getLogger("scheduler.%s" % name)
         self.name = name
@@ -109,6 +119,20 @@ class Scheduler(object):
         else:
             self.scheduler_id = "standalone scheduler"
         self.sample = sample
+        # Timing wheel mode
+        self.use_wheel = config.scheduler.use_wheel if use_wheel is None else use_wheel
+        self.wheel: Optional[TimingWheel] = None
+        self.wheel_lock = threading.Lock()
+        # Local change sequence, to distinguish local and database changes
+        self.wheel_seq = 0
+        # Job id -> attrs for dispatched jobs
+        self.wheel_running: Dict[Any, Dict[str, Any]] = {}
+        self.wheel_window_end = 0.0
+        self.wheel_next_refresh = 0.0
+        self.wheel_watcher: Optional[threading.Thread] = None
+        # Second -> number of started jobs
+        self.start_histogram: Dict[int, int] = {}
+        self.start_histogram_lock = threading.Lock()
 
     def get_cache(self):
         with self.cache_lock:
@@ -221,6 +245,21 @@ class Scheduler(object):
                 await asyncio.sleep(dt / 1000.0)
         self.apply_ops()
 
+    def get_job(self, attrs: Dict[str, Any]) -> Optional[Job]:
+        """
+        Get job instance for scheduler's collection record.
+        Remove jobs with invalid class
+        """
+        attrs[Job.ATTR_SAMPLE] = self.sample
+        try:
+            jcls = get_handler(attrs[Job.ATTR_CLASS])
+            return jcls(self, attrs)
+        except ImportError as e:
+            self.logger.error("Invalid job class %s", attrs[Job.ATTR_CLASS])
+            self.logger.error("Error: %s", e)
+            self.remove_job_by_id(attrs[Job.ATTR_ID])
+            return None
+
     def iter_pending_jobs(self, limit):
         """
         Yields pending jobs
@@ -240,14 +279,9 @@ class Scheduler(object):
         )
         try:
             for job in qs:
-                job[Job.ATTR_SAMPLE] = self.sample
-                try:
-                    jcls = get_handler(job[Job.ATTR_CLASS])
-                    yield jcls(self, job)
-                except ImportError as e:
-                    self.logger.error("Invalid job class %s", job[Job.ATTR_CLASS])
-                    self.logger.error("Error: %s", e)
-                    self.remove_job_by_id(job[Job.ATTR_ID])
+                job = self.get_job(job)
+                if job:
+                    yield job
         except pymongo.errors.CursorNotFound:
             self.logger.info("Server cursor timed out. Waiting for next cycle")
         except pymongo.errors.OperationFailure as e:
@@ -260,8 +294,9 @@ class Scheduler(object):
         """
         Read and launch all pending jobs
         """
+        if self.use_wheel:
+            return self.run_pending_wheel()
         executor = self.get_executor()
-        collection = self.get_collection()
         n = 0
         if not executor.may_submit():
             return 0
@@ -283,50 +318,7 @@ class Scheduler(object):
             rl = min(sum(1 for j in jobs if j.attrs[Job.ATTR_TS] <= now), free_workers)
             rjobs, jobs = jobs[:rl], jobs[rl:]
             if rjobs:
-                jids = [j.attrs[Job.ATTR_ID] for j in rjobs]
-                self.logger.debug(
-                    "update({_id: {$in: %s}}, {$set: {%s: '%s'}})", jids, Job.ATTR_STATUS, Job.S_RUN
-                )
-                r = collection.update_many(
-                    {"_id": {"$in": jids}}, {"$set": {Job.ATTR_STATUS: Job.S_RUN}}
-                )
-                if r.acknowledged:
-                    if r.modified_count != len(jids):
-                        self.logger.error(
-                            "Failed to update all running statuses: %d of %d",
-                            r.modified_count,
-                            len(jids),
-                        )
-                else:
-                    self.logger.error("Failed to update running status")
-                # Fetch contexts
-                # version -> key -> job
-                cjobs = {}
-                for j in rjobs:
-                    if not j.context_version:
-                        continue
-                    if j.context_version not in cjobs:
-                        cjobs[j.context_version] = {}
-                    cjobs[j.context_version][j.get_context_cache_key()] = j
-                if cjobs:
-                    for v in cjobs:
-                        try:
-                            ctx = self.get_cache().get_many(cjobs[v], version=v) or {}
-                        except Exception as e:
-                            self.logger.error("Failed to restore context: %s", e)
-                            ctx = {}
-                        for k in cjobs[v]:
-                            cjobs[v][k].load_context(ctx.get(k, {}))
-                #
-                for job in rjobs:
-                    if job.is_retries_exceeded():
-                        metrics["%s_jobs_retries_exceeded" % self.name] += 1
-                    in_label = None
-                    if config.features.forensic:
-                        in_label = "%s:%s" % (job.attrs[Job.ATTR_CLASS], job.attrs[Job.ATTR_KEY])
-                    executor.submit(job.run, _in_label=in_label)
-                    metrics["%s_jobs_started" % self.name] += 1
-                    n += 1
+                n += self.dispatch_jobs(rjobs)
             if jobs:
                 # Wait for next job within check_interval
                 njts = jobs[0].attrs[Job.ATTR_TS]
@@ -338,6 +330,278 @@ class Scheduler(object):
                     time.sleep(dt)
         return n
 
+    def dispatch_jobs(self, rjobs: List[Job]) -> int:
+        """
+        Mark jobs as running, restore contexts and submit jobs to executor
+
+        :param rjobs: List of jobs
+        :return: Number of submitted jobs
+        """
+        executor = self.get_executor()
+        n = 0
+        jids = [j.attrs[Job.ATTR_ID] for j in rjobs]
+        self.logger.debug(
+            "update({_id: {$in: %s}}, {$set: {%s: '%s'}})", jids, Job.ATTR_STATUS, Job.S_RUN
+        )
+        r = self.get_collection().update_many(
+            {"_id": {"$in": jids}}, {"$set": {Job.ATTR_STATUS: Job.S_RUN}}
+        )
+        if r.acknowledged:
+            if r.modified_count != len(jids):
+                self.logger.error(
+                    "Failed to update all running statuses: %d of %d",
+                    r.modified_count,
+                    len(jids),
+                )
+        else:
+            self.logger.error("Failed to update running status")
+        # Fetch contexts
+        # version -> key -> job
+        cjobs = {}
+        for j in rjobs:
+            if not j.context_version:
+                continue
+            if j.context_version not in cjobs:
+                cjobs[j.context_version] = {}
+            cjobs[j.context_version][j.get_context_cache_key()] = j
+        if cjobs:
+            for v in cjobs:
+                try:
+                    ctx = self.get_cache().get_many(cjobs[v], version=v) or {}
+                except Exception as e:
+                    self.logger.error("Failed to restore context: %s", e)
+                    ctx = {}
+                for k in cjobs[v]:
+                    cjobs[v][k].load_context(ctx.get(k, {}))
+        #
+        for job in rjobs:
+            if job.is_retries_exceeded():
+                metrics["%s_jobs_retries_exceeded" % self.name] += 1
+            in_label = None
+            if config.features.forensic:
+                in_label = "%s:%s" % (job.attrs[Job.ATTR_CLASS], job.attrs[Job.ATTR_KEY])
+            executor.submit(job.run, _in_label=in_label)
+            metrics["%s_jobs_started" % self.name] += 1
+            n += 1
+        self.register_starts(n)
+        return n
+
+    def register_starts(self, n: int) -> None:
+        """
+        Update per-second job start histogram
+        """
+        if not n:
+            return
+        now = int(time.time())
+        with self.start_histogram_lock:
+            self.start_histogram[now] = self.start_histogram.get(now, 0) + n
+            if len(self.start_histogram) > self.START_HISTOGRAM_DEPTH:
+                for ts in [
+                    ts for ts in self.start_histogram if ts <= now - self.START_HISTOGRAM_DEPTH
+                ]:
+                    del self.start_histogram[ts]
+
+    def run_pending_wheel(self) -> int:
+        """
+        Launch jobs expired in the timing wheel.
+        Database is queried only on wheel refresh
+        """
+        executor = self.get_executor()
+        if not executor.may_submit():
+            return 0
+        now = time.time()
+        if now >= self.wheel_next_refresh:
+            self.refresh_wheel()
+            self.start_wheel_watcher()
+        jobs, self.jobs_burst = self.jobs_burst, []
+        with self.wheel_lock:
+            seen = set(self.wheel_running)
+            seen.update(j.attrs[Job.ATTR_ID] for j in jobs)
+            for _, attrs in self.wheel.advance(now):
+                if attrs[Job.ATTR_ID] in seen:
+                    continue  # Already running or waiting for workers
+                seen.add(attrs[Job.ATTR_ID])
+                job = self.get_job(attrs)
+                if job:
+                    jobs.append(job)
+        if not jobs:
+            return 0
+        free_workers = executor.get_free_workers()
+        rjobs, self.jobs_burst = jobs[:free_workers], jobs[free_workers:]
+        if self.jobs_burst:
+            self.logger.info("All workers are busy. Sending %d jobs to burst", len(self.jobs_burst))
+        if not rjobs:
+            return 0
+        # Apply pending reschedules before marking jobs as running
+        self.apply_bulk_ops()
+        with self.wheel_lock:
+            for job in rjobs:
+                self.wheel_running[job.attrs[Job.ATTR_ID]] = job.attrs
+        return self.dispatch_jobs(rjobs)
+
+    def wheel_add(self, attrs: Dict[str, Any]) -> None:
+        """
+        Add or reschedule job in the timing wheel. Must be called under wheel_lock
+        """
+        self.wheel_seq += 1
+        self.wheel.add(attrs[Job.ATTR_ID], attrs[Job.ATTR_TS].timestamp(), (self.wheel_seq, attrs))
+
+    def refresh_wheel(self) -> None:
+        """
+        Load waiting jobs within prefetch window to the timing wheel
+        and drop the ones rescheduled beyond the window or removed.
+        """
+        # Flush local reschedules
+        self.apply_bulk_ops()
+        now = time.time()
+        window_end = now + config.scheduler.wheel_window
+        max_jobs = config.scheduler.wheel_max_jobs
+        with self.wheel_lock:
+            if not self.wheel:
+                self.wheel = TimingWheel(self.check_time / 1000.0, now=now)
+            seq = self.wheel_seq
+        # Get schedule within window
+        current: Dict[Any, datetime.datetime] = {}
+        for d in (
+            self.get_collection()
+            .find(
+                self.get_query(
+                    {
+                        Job.ATTR_TS: {"$lte": datetime.datetime.fromtimestamp(window_end)},
+                        Job.ATTR_STATUS: Job.S_WAIT,
+                    }
+                ),
+                {Job.ATTR_ID: 1, Job.ATTR_TS: 1},
+            )
+            .sort(Job.ATTR_TS)
+            .limit(max_jobs)
+        ):
+            current[d[Job.ATTR_ID]] = d[Job.ATTR_TS]
+        if len(current) >= max_jobs:
+            # Shrink window to the loaded jobs
+            window_end = max(current.values()).timestamp()
+        with self.wheel_lock:
+            burst = set(j.attrs[Job.ATTR_ID] for j in self.jobs_burst)
+            to_load = []
+            for jid, ts in current.items():
+                if jid in self.wheel_running or jid in burst:
+                    continue
+                r = self.wheel.get(jid)
+                if not r or (r[1][0] <= seq and r[1][1][Job.ATTR_TS] != ts):
+                    to_load.append(jid)  # New or changed job
+            # Drop stale jobs, unless changed locally since refresh start
+            removed = 0
+            for jid in self.wheel.keys():
+                if jid not in current and self.wheel.get(jid)[1][0] <= seq:
+                    self.wheel.remove(jid)
+                    removed += 1
+        # Load jobs
+        loaded = 0
+        for i in range(0, len(to_load), self.WHEEL_LOAD_CHUNK):
+            docs = list(
+                self.get_collection().find(
+                    {Job.ATTR_ID: {"$in": to_load[i : i + self.WHEEL_LOAD_CHUNK]}}
+                )
+            )
+            with self.wheel_lock:
+                for attrs in docs:
+                    jid = attrs[Job.ATTR_ID]
+                    r = self.wheel.get(jid)
+                    if jid in self.wheel_running or (r and r[1][0] > seq):
+                        continue  # Changed locally
+                    if attrs.get(Job.ATTR_STATUS) != Job.S_WAIT:
+                        continue
+                    attrs[Job.ATTR_SAMPLE] = self.sample
+                    self.wheel_add(attrs)
+                    loaded += 1
+        self.wheel_window_end = window_end
+        self.wheel_next_refresh = now + config.scheduler.wheel_refresh_interval
+        metrics["%s_wheel_refreshes" % self.name] += 1
+        self.logger.info(
+            "Timing wheel refreshed: %d jobs, %d loaded, %d removed",
+            len(self.wheel),
+            loaded,
+            removed,
+        )
+
+    def wheel_reschedule(self, jid, set_op: Dict[str, Any], inc_op: Dict[str, Any]) -> None:
+        """
+        Apply set_next_run changes to the dispatched job and return it to the timing wheel
+        """
+        with self.wheel_lock:
+            attrs = self.wheel_running.pop(jid, None)
+            if attrs is None or not self.wheel:
+                return
+            attrs.update(set_op)
+            for k, v in inc_op.items():
+                attrs[k] = attrs.get(k, 0) + v
+            if attrs[Job.ATTR_TS].timestamp() <= self.wheel_window_end:
+                self.wheel_add(attrs)
+
+    def start_wheel_watcher(self) -> None:
+        """
+        Start thread tracking database changes
+        """
+        if self.wheel_watcher or not config.scheduler.wheel_change_stream:
+            return
+        self.wheel_watcher = threading.Thread(
+            target=self.wheel_watch, name="%s-watcher" % self.name, daemon=True
+        )
+        self.wheel_watcher.start()
+
+    def wheel_watch(self) -> None:
+        """
+        Apply database changes to the timing wheel using change stream.
+        Changes are tracked by periodic refresh only, when change streams
+        are not supported
+        """
+        match = {Job.ATTR_STATUS: Job.S_WAIT}
+        if self.filter:
+            match.update(self.filter)
+        pipeline = [
+            {
+                "$match": {
+                    "$or": [
+                        {"operationType": "delete"},
+                        {
+                            "operationType": {"$in": ["insert", "update", "replace"]},
+                            **{"fullDocument.%s" % k: v for k, v in match.items()},
+                        },
+                        {
+                            "operationType": "update",
+                            "fullDocument.%s" % Job.ATTR_STATUS: {"$ne": Job.S_WAIT},
+                        },
+                    ]
+                }
+            }
+        ]
+        self.logger.info("Tracking schedule changes")
+        try:
+            with self.get_collection().watch(pipeline, full_document="updateLookup") as stream:
+                for change in stream:
+                    if self.to_shutdown:
+                        break
+                    self.on_wheel_change(change)
+        except pymongo.errors.PyMongoError as e:
+            self.logger.info("Change stream is not available, using periodic refresh: %s", e)
+
+    def on_wheel_change(self, change: Dict[str, Any]) -> None:
+        jid = change["documentKey"]["_id"]
+        attrs = change.get("fullDocument")
+        metrics["%s_wheel_changes" % self.name] += 1
+        with self.wheel_lock:
+            if not self.wheel or jid in self.wheel_running:
+                return
+            if (
+                attrs
+                and attrs.get(Job.ATTR_STATUS) == Job.S_WAIT
+                and attrs[Job.ATTR_TS].timestamp() <= self.wheel_window_end
+            ):
+                attrs[Job.ATTR_SAMPLE] = self.sample
+                self.wheel_add(attrs)
+            else:
+                self.wheel.remove(jid)
+
     def apply_bulk_ops(self):
         if not self.bulk:
             return  # Nothing to apply
@@ -379,6 +643,11 @@ class Scheduler(object):
         self.logger.info("Remove job %s", jid)
         with self.bulk_lock:
             self.bulk += [DeleteOne({Job.ATTR_ID: jid})]
+        if self.use_wheel:
+            with self.wheel_lock:
+                self.wheel_running.pop(jid, None)
+                if self.wheel:
+                    self.wheel.remove(jid)
 
     def submit(self, jcls, key=None, data=None, ts=None, delta=None, keep_ts=False, max_runs=None):
         """
@@ -399,7 +668,9 @@ class Scheduler(object):
             Job.ATTR_STATUS: Job.S_WAIT,
             Job.ATTR_RUNS: 0,
             Job.ATTR_FAULTS: 0,
-            Job.ATTR_OFFSET: random.random(),
+            Job.ATTR_OFFSET: get_spread_offset(jcls, key)
+            if config.scheduler.spread_jobs
+            else random.random(),
         }
         if max_runs is not None:
             iset_op[Job.ATTR_MAX_RUNS] = max_runs
@@ -473,6 +744,8 @@ class Scheduler(object):
                 inc_op[Job.ATTR_FAULTS] = 1
         if context_version is not None:
             self.cache_set(key=context_key, value=context, version=context_version)
+        if self.use_wheel:
+            self.wheel_reschedule(jid, set_op, inc_op)
         op = {}
         if set_op:
             op["$set"] = set_op
@@ -515,6 +788,21 @@ class Scheduler(object):
         if self.executor:
             self.executor.apply_metrics(d)
         d.update({"%s_jobs_burst" % self.name: len(self.jobs_burst)})
+        if self.wheel:
+            d.update({"%s_wheel_jobs" % self.name: len(self.wheel)})
+        # Job starts per second over last complete seconds
+        now = int(time.time())
+        # Histogram is updated from executor threads
+        with self.start_histogram_lock:
+            hist = self.start_histogram.copy()
+        stats = get_histogram_stats(hist, start=now - self.START_HISTOGRAM_DEPTH, end=now)
+        d.update(
+            {
+                "%s_jobs_start_rate_max" % self.name: stats["max"],
+                "%s_jobs_start_rate_mean" % self.name: round(stats["mean"], 2),
+                "%s_jobs_start_rate_stddev" % self.name: round(stats["stddev"], 2),
+            }
+        )
 
     def shutdown(self, sync=False):
         self.to_shutdown = True
@@ -0,0 +1,102 @@
+# ----------------------------------------------------------------------
+# Job schedule spreading
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Python modules
+import random
+import datetime
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Optional, Union
+
+# NOC modules
+from noc.core.hash import hash_int
+
+OFFSET_BITS = 48
+OFFSET_MASK = (1 << OFFSET_BITS) - 1
+
+
+def get_spread_offset(jcls: str, key: Any) -> float:
+    """
+    Get stable offset for job by consistent hashing of the key.
+    Jobs of the same class are spread evenly across the interval,
+    and the job keeps its phase across restarts and resubmits.
+
+    :param jcls: Job class name
+    :param key: Job key
+    :return: Offset in [0 .. 1) range
+    """
+    return float(hash_int("%s:%s" % (jcls, key)) & OFFSET_MASK) / float(1 << OFFSET_BITS)
+
+
+def get_jitter(interval: float, jitter: float, max_jitter: float) -> float:
+    """
+    Get random shift, bounded by both `jitter` fraction of interval and `max_jitter`
+
+    :param interval: Job interval, in seconds
+    :param jitter: Jitter, fraction of interval
+    :param max_jitter: Maximal jitter, in seconds
+    :return: Shift in [-limit .. limit] range, in seconds
+    """
+    limit = interval * jitter
+    if max_jitter:
+        limit = min(limit, max_jitter)
+    if limit <= 0:
+        return 0.0
+    return random.uniform(-limit, limit)
+
+
+def get_start_histogram(
+    timestamps: Iterable[Union[float, datetime.datetime]], resolution: int = 1
+) -> Dict[int, int]:
+    """
+    Build job start histogram
+
+    :param timestamps: Iterable of start timestamps
+    :param resolution: Bucket size, in seconds
+    :return: Dict of bucket start timestamp -> number of starts
+    """
+    r: Dict[int, int] = defaultdict(int)
+    for ts in timestamps:
+        if isinstance(ts, datetime.datetime):
+            ts = ts.timestamp()
+        r[int(ts) // resolution * resolution] += 1
+    return r
+
+
+def get_histogram_stats(
+    hist: Dict[int, int],
+    resolution: int = 1,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+) -> Dict[str, float]:
+    """
+    Get histogram flatness statistics. Empty buckets within [start .. end)
+    range are taken into account
+
+    :param hist: Histogram, as returned by `get_start_histogram`
+    :param resolution: Bucket size, in seconds
+    :param start: Range start, first bucket if not set
+    :param end: Range end (exclusive), next to last bucket if not set
+    :return: Dict of total, buckets, mean, max and stddev
+    """
+    if not hist:
+        return {"total": 0, "buckets": 0, "mean": 0.0, "max": 0, "stddev": 0.0}
+    if start is None:
+        start = min(hist)
+    if end is None:
+        end = max(hist) + resolution
+    values = [v for k, v in hist.items() if start <= k < end]
+    buckets = max((end - start + resolution - 1) // resolution, 1)
+    total = sum(values)
+    mean = float(total) / buckets
+    var = (sum((v - mean) ** 2 for v in values) + (buckets - len(values)) * mean**2) / buckets
+    return {
+        "total": total,
+        "buckets": buckets,
+        "mean": mean,
+        "max": max(values, default=0),
+        "stddev": var**0.5,
+    }
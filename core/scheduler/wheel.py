@@ -0,0 +1,167 @@
+# ----------------------------------------------------------------------
+# Hierarchical timing wheel
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Python modules
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+
+class TimingWheel(object):
+    """
+    Hierarchical timing wheel.
+
+    Level 0 consists of `slots` buckets of `resolution` seconds each.
+    Every bucket of level N covers the whole turn of level N - 1.
+    Items are placed to the lowest level able to hold them and are cascaded
+    down to the lower levels when the time approaches. Items beyond the top level
+    are kept in overflow list and are rechecked on every top level cascade.
+
+    Adding, removing and expiring items take O(1) time.
+
+    Usage:
+    ```
+    wheel = TimingWheel(1.0, now=time.time())
+    wheel.add("job1", time.time() + 10, job1)
+    ...
+    for job in wheel.advance(time.time()):
+        ...
+    ```
+    """
+
+    def __init__(
+        self, resolution: float, slots: int = 64, levels: int = 3, now: Optional[float] = None
+    ):
+        self.resolution = resolution
+        self.slots = slots
+        self.levels = levels
+        self.spans = [slots**level for level in range(levels)]
+        self.current = self.get_tick(now or 0.0)
+        # level -> bucket -> key -> (tick, ts, item)
+        self.buckets: List[List[Dict[Hashable, Tuple[int, float, Any]]]] = [
+            [{} for _ in range(slots)] for _ in range(levels)
+        ]
+        self.overflow: Dict[Hashable, Tuple[int, float, Any]] = {}
+        # key -> (level, bucket), level -1 for overflow
+        self.index: Dict[Hashable, Tuple[int, int]] = {}
+        # Items with expired time, added after last advance
+        self.expired: Dict[Hashable, Tuple[int, float, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self.index) + len(self.expired)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.index or key in self.expired
+
+    def keys(self) -> List[Hashable]:
+        """
+        Get keys of all items
+        """
+        return list(self.index) + list(self.expired)
+
+    def get_tick(self, ts: float) -> int:
+        return int(ts / self.resolution)
+
+    def add(self, key: Hashable, ts: float, item: Any) -> None:
+        """
+        Add or reschedule item
+
+        :param key: Unique item key
+        :param ts: Expiration time, in seconds
+        :param item: Item
+        """
+        self.remove(key)
+        self._place(key, self.get_tick(ts), ts, item)
+
+    def _place(self, key: Hashable, tick: int, ts: float, item: Any) -> None:
+        entry = (tick, ts, item)
+        if tick <= self.current:
+            self.expired[key] = entry
+            return
+        for level, span in enumerate(self.spans):
+            if tick // span - self.current // span < self.slots:
+                bucket = (tick // span) % self.slots
+                self.buckets[level][bucket][key] = entry
+                self.index[key] = (level, bucket)
+                return
+        self.overflow[key] = entry
+        self.index[key] = (-1, 0)
+
+    def remove(self, key: Hashable) -> Optional[Any]:
+        """
+        Remove item
+
+        :param key: Item key
+        :return: Removed item or None
+        """
+        pos = self.index.pop(key, None)
+        if pos is None:
+            entry = self.expired.pop(key, None)
+            return entry[2] if entry else None
+        level, bucket = pos
+        if level < 0:
+            return self.overflow.pop(key)[2]
+        return self.buckets[level][bucket].pop(key)[2]
+
+    def get(self, key: Hashable) -> Optional[Tuple[float, Any]]:
+        """
+        Get scheduled time and item
+
+        :param key: Item key
+        :return: (ts, item) or None
+        """
+        pos = self.index.get(key)
+        if pos is None:
+            entry = self.expired.get(key)
+        elif pos[0] < 0:
+            entry = self.overflow[key]
+        else:
+            entry = self.buckets[pos[0]][pos[1]][key]
+        return (entry[1], entry[2]) if entry else None
+
+    def _cascade(self, level: int) -> None:
+        if level == self.levels:
+            entries, self.overflow = self.overflow, {}
+        else:
+            bucket = (self.current // self.spans[level]) % self.slots
+            entries = self.buckets[level][bucket]
+            self.buckets[level][bucket] = {}
+        for key, (tick, ts, item) in entries.items():
+            del self.index[key]
+            self._place(key, tick, ts, item)
+
+    def advance(self, now: float) -> List[Any]:
+        """
+        Advance wheel and return expired items, ordered by expiration time
+
+        :param now: Current time, in seconds
+        :return: List of expired items
+        """
+        target = self.get_tick(now)
+        expired = list(self.expired.values())
+        self.expired = {}
+        while self.current < target:
+            if not self.index:
+                # Nothing to cascade, fast forward
+                self.current = target
+                break
+            self.current += 1
+            # Cascade higher levels first
+            for level in range(self.levels, 0, -1):
+                if self.current % (self.slots**level) == 0:
+                    self._cascade(level)
+            # Collect level 0
+            bucket = self.current % self.slots
+            entries = self.buckets[0][bucket]
+            if entries:
+                self.buckets[0][bucket] = {}
+                for key, entry in entries.items():
+                    del self.index[key]
+                    expired.append(entry)
+            if self.expired:
+                expired += self.expired.values()
+                self.expired = {}
+        expired.sort(key=lambda x: x[1])
+        return [item for _, _, item in expired]
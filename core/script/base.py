@@ -22,6 +22,7 @@ from noc.core.handler import get_handler
 from noc.core.mac import MAC
 from noc.config import config
 from noc.core.span import Span
+from noc.core.ioloop.util import close_thread_loop
 from noc.core.matcher import match
 from noc.core.comp import smart_bytes, smart_text
 from .context import (
@@ -335,6 +336,8 @@ class BaseScript(object, metaclass=BaseScriptMetaclass):
                         self.close_rtsp_stream()
                         # Close HTTP Client
                         self.http.close()
+                        # Close persistent event loop
+                        close_thread_loop()
             # Clean result
             result = self.clean_output(result)
             self.logger.debug("Result: %s", result)
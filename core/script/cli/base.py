@@ -38,7 +38,7 @@ class BaseCLI(object):
         if self.stream:
             self.logger.debug("Closing stream")
             if self.is_started and self.profile.command_exit:
-                with IOLoopContext(suppress_trace=True) as loop:
+                with IOLoopContext(suppress_trace=True, persistent=True) as loop:
                     loop.run_until_complete(self.send(smart_bytes(self.profile.command_exit)))
             self.stream.close()
             self.stream = None
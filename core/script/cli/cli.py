@@ -1,7 +1,7 @@
 # ----------------------------------------------------------------------
 # CLI FSM
 # ----------------------------------------------------------------------
-# Copyright (C) 2007-2020 The NOC Project
+# Copyright (C) 2007-2022 The NOC Project
 # See LICENSE for details
 # ----------------------------------------------------------------------
 
@@ -10,7 +10,7 @@ import re
 import functools
 from functools import reduce
 import asyncio
-from typing import Optional, Any, Type, Callable, Dict
+from typing import Optional, Any, Type, Callable, Dict, Tuple, Pattern
 
 # NOC modules
 from noc.core.text import replace_re_group
@@ -37,6 +37,37 @@ from .error import (
 from .base import BaseCLI
 
 
+rx_named_group = re.compile(rb"\(\?P<[^>]+>")
+rx_named_backref = re.compile(rb"\(\?P=[^)]+\)")
+rx_backref = re.compile(rb"\\[1-9]")
+
+
+@functools.lru_cache(maxsize=1024)
+def get_prefilter(patterns: Tuple[Tuple[bytes, int], ...]) -> Optional[Pattern]:
+    """
+    Combine expect patterns to the single regular expression,
+    matching when any of patterns matches. Named groups are stripped
+    to avoid name clashes and named backreferences are relaxed,
+    so the result is used only to check there is something to match.
+
+    :param patterns: Tuple of (pattern, flags)
+    :return: Compiled expression or None, if patterns cannot be combined
+    """
+    if len(patterns) < 2 or len({flags for _, flags in patterns}) != 1:
+        return None
+    parts = []
+    for pattern, _ in patterns:
+        if not isinstance(pattern, bytes) or b"(?(" in pattern or rx_backref.search(pattern):
+            return None  # Numbered groups are referenced
+        pattern = rx_named_group.sub(b"(?:", pattern)
+        pattern = rx_named_backref.sub(b"(?s:.*?)", pattern)
+        parts += [b"(?:%s)" % pattern]
+    try:
+        return re.compile(b"|".join(parts), patterns[0][1])
+    except re.error:
+        return None
+
+
 class CLI(BaseCLI):
     name = "cli"
     BUFFER_SIZE = config.activator.buffer_size
@@ -54,10 +85,12 @@ class CLI(BaseCLI):
         self.command = None
         self.prompt_stack = []
         self.patterns = self.profile.patterns.copy()
-        self.buffer: bytes = b""
+        self.buffer = bytearray()
         self.result = None
         self.error = None
         self.pattern_table = None
+        # Combined expression of pattern_table
+        self.prefilter: Optional[Pattern] = None
         self.collected_data = []
         self.setup_complete = False
         self.to_raise_privileges = script.credentials.get("raise_privileges", True)
@@ -83,7 +116,7 @@ class CLI(BaseCLI):
         ignore_errors: bool = False,
         allow_empty_response: bool = True,
     ) -> str:
-        self.buffer = b""
+        self.buffer = bytearray()
         self.command = cmd
         self.error = None
         self.ignore_errors = ignore_errors
@@ -97,7 +130,7 @@ class CLI(BaseCLI):
         with Span(
             server=self.script.credentials.get("address"), service=self.name, in_label=cmd
         ) as s:
-            with IOLoopContext() as loop:
+            with IOLoopContext(persistent=True) as loop:
                 loop.run_until_complete(self.submit(parser))
             if self.error:
                 if s:
@@ -209,18 +242,21 @@ class CLI(BaseCLI):
                 self.script.push_cli_tracking(r, self.state)
             self.logger.debug("Received: %r", r)
             # Clean input
-            if self.buffer.find(b"\x1b", -self.MATCH_MISSED_CONTROL_TAIL) != -1:
-                self.buffer = self.cleaned_input(self.buffer + r)
-            else:
-                self.buffer += self.cleaned_input(r)
-            # Try to find matched pattern
+            self.feed_buffer(r)
+            # Try to find matched pattern within the buffer's tail.
+            # Window starts one byte earlier to keep ^ semantics
             offset = max(0, len(self.buffer) - self.MATCH_TAIL)
+            base = max(0, offset - 1)
+            window = bytes(self.buffer[base:])
+            pos = offset - base
+            if self.prefilter and not self.prefilter.search(window, pos):
+                continue  # No pattern matches
             for rx, handler in self.pattern_table.items():
-                match = rx.search(self.buffer, offset)
+                match = rx.search(window, pos)
                 if match:
                     self.logger.debug("Match: %s", rx.pattern)
-                    matched = self.buffer[: match.start()]
-                    self.buffer = self.buffer[match.end() :]
+                    matched = bytes(self.buffer[: base + match.start()])
+                    del self.buffer[: base + match.end()]
                     if isinstance(handler, tuple):
                         metrics["cli_state", ("state", handler[0].__name__)] += 1
                         r = await handler[0](matched, match, *handler[1:])
@@ -231,6 +267,20 @@ class CLI(BaseCLI):
                         return r
                     break  # This state is processed
 
+    def feed_buffer(self, data: bytes) -> None:
+        """
+        Clean up received data and append to the buffer.
+        Only the incomplete control sequence at the end of buffer
+        is cleaned again along with the new data
+        """
+        idx = self.buffer.find(b"\x1b", -self.MATCH_MISSED_CONTROL_TAIL)
+        if idx == -1:
+            self.buffer += self.cleaned_input(data)
+        else:
+            tail = bytes(self.buffer[idx:])
+            del self.buffer[idx:]
+            self.buffer += self.cleaned_input(tail + data)
+
     async def parse_object_stream(self, parser=None, cmd_next=None, cmd_stop=None):
         """
         :param parser: callable accepting buffer and returning
@@ -344,8 +394,15 @@ class CLI(BaseCLI):
             if not rx:
                 continue
             self.pattern_table[rx] = patterns[pattern_name]
+        self.update_prefilter()
         self.set_timeout(timeout, error=error)
 
+    def update_prefilter(self) -> None:
+        """
+        Rebuild combined expression after pattern_table change
+        """
+        self.prefilter = get_prefilter(tuple((rx.pattern, rx.flags) for rx in self.pattern_table))
+
     async def on_start(self, data=None, match=None):
         self.set_state("start")
         if self.profile.setup_sequence and not self.setup_complete:
@@ -457,7 +514,7 @@ class CLI(BaseCLI):
     async def on_failure(self, data, match, error_cls=None):
         self.set_state("failure")
         error_cls = error_cls or CLIError
-        raise error_cls(self.buffer or data or None)
+        raise error_cls(bytes(self.buffer) or data or None)
 
     async def on_prompt(self, data, match):
         self.set_state("prompt")
@@ -579,6 +636,7 @@ class CLI(BaseCLI):
         self.prompt_stack += [self.patterns["prompt"]]
         self.patterns["prompt"] = re.compile(pattern, re.DOTALL | re.MULTILINE)
         self.pattern_table[self.patterns["prompt"]] = self.on_prompt
+        self.update_prefilter()
 
     def pop_prompt_pattern(self):
         """
@@ -588,6 +646,7 @@ class CLI(BaseCLI):
         pattern = self.prompt_stack.pop(-1)
         self.patterns["prompt"] = pattern
         self.pattern_table[self.patterns["prompt"]] = self.on_prompt
+        self.update_prefilter()
 
     def get_motd(self):
         """
@@ -177,7 +177,7 @@ class RTSPBase(BaseCLI):
         with Span(
             server=self.script.credentials.get("address"), service=self.name, in_label=self.method
         ) as s:
-            with IOLoopContext() as loop:
+            with IOLoopContext(persistent=True) as loop:
                 loop.run_until_complete(self.submit())
             if self.error:
                 if s:
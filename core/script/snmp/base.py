@@ -1,16 +1,23 @@
 # ----------------------------------------------------------------------
 # SNMP methods implementation
 # ----------------------------------------------------------------------
-# Copyright (C) 2007-2020 The NOC Project
+# Copyright (C) 2007-2022 The NOC Project
 # See LICENSE for details
 # ----------------------------------------------------------------------
 
 # Python modules
-from typing import Optional, Dict, Callable, List, Union
+from typing import Optional, Dict, Callable, List, Union, Tuple, Any
 import weakref
 
 # NOC modules
-from noc.core.ioloop.snmp import snmp_get, snmp_count, snmp_getnext, snmp_set
+from noc.core.ioloop.snmp import (
+    snmp_get,
+    snmp_count,
+    snmp_getnext,
+    snmp_set,
+    snmp_walk_tables,
+    WALK_MAX_COLUMNS,
+)
 from noc.core.snmp.error import SNMPError, TIMED_OUT
 from noc.core.snmp.version import SNMP_v1, SNMP_v2c, SNMP_v3
 from noc.core.log import PrefixLoggerAdapter
@@ -37,6 +44,8 @@ class SNMP(object):
         default_msg = "Fatal SNMP Timeout"
 
     SNMPError = SNMPError
+    # Table columns, requested at once by walk_tables
+    walk_columns = WALK_MAX_COLUMNS
 
     def __init__(self, script, rate: Optional[float] = None):
         self._script = weakref.ref(script)
@@ -67,11 +76,12 @@ class SNMP(object):
             self.socket.close()
             self.socket = None
 
-    def get_socket(self):
-        if not self.socket:
-            self.logger.debug("Create UDP socket")
-            self.socket = UDPSocket(tos=self.script.tos)
-        return self.socket
+    def get_socket(self) -> Optional[UDPSocket]:
+        """
+        Get dedicated socket for requests.
+        None means requests are sent over the shared SNMP engine
+        """
+        return None
 
     def _get_snmp_version(self, version=None):
         if version is not None:
@@ -141,7 +151,7 @@ class SNMP(object):
         if display_hints is None:
             display_hints = self._get_display_hints()
         version = self._get_snmp_version(version)
-        return run_sync(run, close_all=False)
+        return run_sync(run, close_all=False, persistent=True)
 
     def set(self, *args):
         """
@@ -175,7 +185,7 @@ class SNMP(object):
             raise ValueError("Invalid varbinds")
         if "snmp_ro" not in self.script.credentials:
             raise SNMPError(code=ERR_SNMP_BAD_COMMUNITY)
-        return run_sync(run, close_all=False)
+        return run_sync(run, close_all=False, persistent=True)
 
     def count(self, oid, filter=None, version=None):
         """
@@ -207,7 +217,7 @@ class SNMP(object):
         if "snmp_ro" not in self.script.credentials:
             raise SNMPError(code=ERR_SNMP_BAD_COMMUNITY)
         version = self._get_snmp_version(version)
-        return run_sync(run, close_all=False)
+        return run_sync(run, close_all=False, persistent=True)
 
     def getnext(
         self,
@@ -273,16 +283,70 @@ class SNMP(object):
         if display_hints is None:
             display_hints = self._get_display_hints()
         version = self._get_snmp_version(version)
-        return run_sync(run, close_all=False)
+        return run_sync(run, close_all=False, persistent=True)
+
+    def walk_tables(
+        self,
+        oids: List[str],
+        bulk: Optional[bool] = None,
+        max_repetitions: Optional[int] = None,
+        version: Optional[str] = None,
+        max_retries: int = 0,
+        timeout: int = 10,
+        display_hints: Optional[Dict[str, Callable]] = None,
+    ) -> List[List[Tuple[str, Any]]]:
+        """
+        Walk several table columns at once.
+        Columns are requested by the multi-oid GETNEXT/GETBULK requests,
+        GETBULK max-repetitions is adjusted to the device
+
+        :param oids: List of column oids
+        :param bulk: False - disable GetBulk, None - Enable by 'SNMP | Bulk' capabilities
+        :param max_repetitions: Fixed max-repetitions, adaptive when None
+        :param version: SNMP Version: 0 - v1, 1 - v2c
+        :param max_retries: Mac count trying when no response
+        :param timeout: Timeout for SNMP Response
+        :param display_hints: Dict of  oid -> render_function. See BaseProfile.snmp_display_hints for details
+        :returns: List of (oid, value) per column
+        """
+
+        async def run():
+            try:
+                return await snmp_walk_tables(
+                    address=self.script.credentials["address"],
+                    oids=oids,
+                    community=str(self.script.credentials["snmp_ro"]),
+                    bulk=self.script.has_snmp_bulk() if bulk is None else bulk,
+                    max_repetitions=max_repetitions,
+                    tos=self.script.tos,
+                    udp_socket=self.get_socket(),
+                    version=version,
+                    max_retries=max_retries,
+                    timeout=timeout,
+                    display_hints=display_hints,
+                    response_parser=self.script.profile.get_snmp_response_parser(self.script),
+                    rate_limit=self.rate_limit,
+                    max_columns=self.walk_columns,
+                )
+            except SNMPError as e:
+                if e.code == TIMED_OUT:
+                    raise self.TimeOutError()
+                else:
+                    raise
+
+        if "snmp_ro" not in self.script.credentials:
+            raise SNMPError(code=ERR_SNMP_BAD_COMMUNITY)
+        if display_hints is None:
+            display_hints = self._get_display_hints()
+        version = self._get_snmp_version(version)
+        return run_sync(run, close_all=False, persistent=True)
 
     def get_table(self, oid, community_suffix=None, cached=False, display_hints=None):
         """
         GETNEXT wrapper. Returns a hash of <index> -> <value>
         """
         r = {}
-        for o, v in self.getnext(
-            oid, community_suffix=community_suffix, cached=cached, display_hints=display_hints
-        ):
+        for o, v in self.walk_tables([oid], display_hints=display_hints)[0]:
             r[int(o.split(".")[-1])] = v
         return r
 
@@ -332,22 +396,21 @@ class SNMP(object):
         :return:
         """
 
-        def gen_table(oid):
+        def gen_table(oid, column):
             line = len(oid) + 1
-            for o, v in self.getnext(
-                oid,
-                community_suffix=community_suffix,
-                cached=cached,
-                bulk=bulk,
-                max_repetitions=max_repetitions,
-                max_retries=max_retries,
-                display_hints=display_hints,
-                timeout=timeout,
-            ):
+            for o, v in column:
                 yield tuple([int(x) for x in o[line:].split(".")]), v
 
         # Retrieve tables
-        tables = [dict(gen_table(oid)) for oid in oids]
+        columns = self.walk_tables(
+            oids,
+            bulk=bulk,
+            max_repetitions=max_repetitions,
+            max_retries=max_retries,
+            display_hints=display_hints,
+            timeout=timeout,
+        )
+        tables = [dict(gen_table(oid, column)) for oid, column in zip(oids, columns)]
         # Generate index
         index = set()
         for t in tables:
@@ -369,7 +432,9 @@ class SNMP(object):
 
         Yield records of (<index>, <value1>, ..., <valueN>)
         """
-        tables = [self.get_table(o, community_suffix=community_suffix, cached=cached) for o in oids]
+        tables = [
+            {int(o.split(".")[-1]): v for o, v in column} for column in self.walk_tables(oids)
+        ]
         if join == "left":
             lt = tables[1:]
             for k in sorted(tables[0]):
@@ -1,7 +1,7 @@
 # ----------------------------------------------------------------------
 # SNMP Beef
 # ----------------------------------------------------------------------
-# Copyright (C) 2007-2020 The NOC Project
+# Copyright (C) 2007-2022 The NOC Project
 # See LICENSE for details
 # ----------------------------------------------------------------------
 
@@ -24,6 +24,8 @@ from .base import SNMP
 
 class BeefSNMP(SNMP):
     name = "beef_snmp"
+    # Beef responds to single-oid requests only
+    walk_columns = 1
 
     def get_socket(self):
         if not self.socket:
@@ -31,6 +31,7 @@ from typing import (
 )
 
 # Third-party modules
+import orjson
 import setproctitle
 
 # NOC modules
@@ -45,15 +46,17 @@ from noc.core.threadpool import ThreadPoolExecutor
 from noc.core.span import get_spans, span_to_dict
 from noc.core.tz import setup_timezone
 from noc.core.liftbridge.base import LiftBridgeClient, StartPosition
-from noc.core.liftbridge.error import LiftbridgeError
 from noc.core.liftbridge.queue import LiftBridgeQueue
+from noc.core.liftbridge.publisher import PublishPipeline
 from noc.core.liftbridge.queuebuffer import QBuffer
+from noc.core.clickhouse.rowbinary import RowBinaryEncoder
 from noc.core.liftbridge.message import Message
 from noc.core.router.base import Router
 from noc.core.ioloop.util import setup_asyncio
 from noc.core.ioloop.timers import PeriodicCallback
 from noc.core.error import NOCError
 from noc.core.mx import MX_METRICS_SCOPE, MX_METRICS_TYPE, MX_STREAM
+from noc.core.cache.invalidation import INVALIDATION_STREAM, apply_invalidation, invalidate_all
 from .rpc import RPCProxy
 from .loader import set_service
 from ..router.datastream import RouteDataStreamClient
@@ -138,6 +141,7 @@ class BaseService(object):
         self.scheduler = None
         # Liftbridge publisher
         self.publish_queue: Optional[LiftBridgeQueue] = None
+        self.publish_pipeline: Optional[PublishPipeline] = None
         self.publisher_start_lock = threading.Lock()
         # Metrics publisher buffer
         self.metrics_queue: Optional[QBuffer] = None
@@ -475,6 +479,8 @@ class BaseService(object):
             tags=self.get_register_tags(),
         )
         if r:
+            if config.cache.enable_invalidation:
+                self.loop.create_task(self.subscribe_cache_invalidation())
             # Finally call on_activate
             await self.on_activate()
             self.logger.info("Service is active (in %.2fms)", self.uptime() * 1000)
@@ -642,6 +648,26 @@ class BaseService(object):
         if self.subscriber_shutdown_waiter and not self.active_subscribers:
             self.subscriber_shutdown_waiter.set()
 
+    async def subscribe_cache_invalidation(self) -> None:
+        """
+        Drop process-local model caches on changes in other processes.
+        Do not block subscriptions shutdown, as stream may be idle for long
+        """
+        while True:
+            try:
+                async with LiftBridgeClient() as client:
+                    async for msg in client.subscribe(
+                        stream=INVALIDATION_STREAM,
+                        partition=0,
+                        start_position=StartPosition.NEW_ONLY,
+                    ):
+                        apply_invalidation(orjson.loads(msg.value))
+            except Exception as e:
+                self.logger.error("Cache invalidation subscription failed: %s", e)
+            # Invalidations may be lost until resubscription
+            invalidate_all()
+            await asyncio.sleep(1)
+
     def _init_publisher(self):
         """
         Spin-up publisher and queue
@@ -650,7 +676,9 @@ class BaseService(object):
         with self.publisher_start_lock:
             if self.publish_queue:
                 return  # Created in concurrent thread
-            self.publish_queue = LiftBridgeQueue(self.loop)
+            self.publish_queue = LiftBridgeQueue(
+                self.loop, max_size=config.liftbridge.publish_queue_size
+            )
             self.metrics_queue = QBuffer(max_size=config.liftbridge.max_message_size)
             self.loop.create_task(self.publisher())
             self.loop.create_task(self.publish_metrics(self.metrics_queue))
@@ -682,21 +710,35 @@ class BaseService(object):
             headers=headers,
             auto_compress=bool(config.liftbridge.compression_method),
         )
-        self.publish_queue.put(req)
+        # Apply backpressure to the publishing threads, event loop must not be blocked
+        if self.is_loop_thread():
+            self.publish_queue.put(req)
+            return
+        while not self.publish_queue.put(req, block=True):
+            if self.publish_queue.to_shutdown:
+                self.logger.error(
+                    "[%s] Publish queue is full on shutdown, dropping message", stream
+                )
+                return
+            self.logger.info("[%s] Publish queue is full, waiting", stream)
+
+    def is_loop_thread(self) -> bool:
+        """
+        Check if called from thread running event loop
+        """
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
 
     async def publisher(self):
+        self.publish_pipeline = PublishPipeline(
+            self.publish_queue,
+            window=config.liftbridge.publish_window,
+            max_message_size=config.liftbridge.max_message_size,
+        )
         async with LiftBridgeClient() as client:
-            while not self.publish_queue.to_shutdown:
-                req = await self.publish_queue.get(timeout=1)
-                if not req:
-                    continue  # Timeout or shutdown
-                try:
-                    await client.publish_sync(req, wait_for_stream=True)
-                except LiftbridgeError as e:
-                    self.logger.error("Failed to publish message: %s", e)
-                    self.logger.error("Retry message")
-                    await asyncio.sleep(1)
-                    self.publish_queue.put(req, fifo=False)
+            await self.publish_pipeline.run(client)
 
     async def shutdown_executors(self):
         if self.executors:
@@ -726,6 +768,13 @@ class BaseService(object):
                     "Unclean shutdown of liftbridge queue. Up to %d messages may be lost",
                     self.publish_queue.qsize(),
                 )
+            if self.publish_pipeline:
+                r = await self.publish_pipeline.drain(5.0)
+                if not r:
+                    self.logger.info(
+                        "Unclean shutdown of publisher. Up to %d messages may be lost",
+                        self.publish_pipeline.pending,
+                    )
             self.publish_queue.shutdown()
 
     def get_executor(self, name: str) -> ThreadPoolExecutor:
@@ -754,7 +803,16 @@ class BaseService(object):
     ) -> None:
         while not (self.publish_queue.to_shutdown and queue.is_empty()):
             t0 = perf_counter()
-            for stream, partititon, chunk in queue.iter_slice():
+            for stream, partititon, chunk, chunk_headers in queue.iter_slice():
+                if chunk_headers:
+                    # Binary encoded chunk
+                    self.publish(
+                        chunk,
+                        stream=stream,
+                        partition=partititon,
+                        headers={**headers, **chunk_headers} if headers else chunk_headers,
+                    )
+                    continue  # Message stream accepts JSON only
                 self.publish(chunk, stream=stream, partition=partititon, headers=headers)
                 table_name = stream.split(".")[1]
                 if config.message.enable_metrics and table_name in self.mx_metrics_scopes:
@@ -769,7 +827,11 @@ class BaseService(object):
                     await asyncio.sleep(to_sleep)
 
     def register_metrics(
-        self, table: str, metrics: List[Dict[str, Any]], key: Optional[int] = None
+        self,
+        table: str,
+        metrics: List[Dict[str, Any]],
+        key: Optional[int] = None,
+        encoder: Optional[RowBinaryEncoder] = None,
     ):
         """
         Schedule metrics to be sent to the `table`.
@@ -777,6 +839,7 @@ class BaseService(object):
         :param table: Table name
         :param metrics: List of dicts containing metrics records
         :param key: Sharding key, None for round-robin distribution
+        :param encoder: Optional RowBinary encoder to send records in binary form
         :return:
         """
         if key is None:
@@ -786,7 +849,10 @@ class BaseService(object):
         if not self.publish_queue:
             self._init_publisher()
         self.metrics_queue.put(
-            stream=f"ch.{table}", partition=key % self.n_metrics_partitions, data=metrics
+            stream=f"ch.{table}",
+            partition=key % self.n_metrics_partitions,
+            data=metrics,
+            encoder=encoder,
         )
 
     def start_telemetry_callback(self) -> None:
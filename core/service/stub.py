@@ -70,7 +70,13 @@ class ServiceStub(object):
         for t in config.rpc.retry_timeout.split(","):
             yield float(t)
 
-    def register_metrics(self, table: str, data: List[Dict[str, Any]], key: Optional[int] = None):
+    def register_metrics(
+        self,
+        table: str,
+        data: List[Dict[str, Any]],
+        key: Optional[int] = None,
+        encoder: Optional[Any] = None,
+    ):
         self._metrics[table] += data
 
     def publish(
@@ -15,8 +15,23 @@ from typing import Tuple, Any, List, Optional
 
 # NOC modules
 from noc.core.comp import smart_bytes, smart_text
-from noc.speedup.ber import parse_tlv_header, parse_p_oid, encode_int, encode_oid
 from noc.core.mib import mib
+from .error import UnsupportedMessage
+
+try:
+    from noc.speedup.ber import (
+        parse_tlv_header,
+        parse_p_oid,
+        encode_int,
+        encode_oid,
+        decode_message,
+    )
+
+    HAS_SPEEDUP = True
+except ImportError:
+    from .pyber import parse_tlv_header, parse_p_oid, encode_int, encode_oid, decode_message
+
+    HAS_SPEEDUP = False
 
 
 def did(tag_class: int, is_constructed: int, tag_id: int) -> int:
@@ -487,6 +502,29 @@ def decode(
     return data, decoder.raw_pdu, decoder.raw_varbinds
 
 
+def decode_fast(msg: bytes, display_hints=None) -> Optional[List[Any]]:
+    """
+    Decode SNMP v1/v2c message in single pass.
+    Result is the same as of BERDecoder: [version, community, [pdu type, *fields, varbinds]]
+
+    :param msg: Message
+    :param display_hints: Dict of oid -> render_function
+    :return: Decoded message or None, if message contains types,
+        not supported by fast decoder. BERDecoder must be used then
+    :raises ValueError: Malformed message
+    """
+    try:
+        version, community, pdu_type, header, varbinds = decode_message(msg)
+    except UnsupportedMessage:
+        return None
+    # OCTET STRING values are rendered according to varbind's oid
+    varbinds = [
+        [oid, mib.render(oid, value, display_hints) if tag == 0x04 else value]
+        for oid, tag, value in varbinds
+    ]
+    return [version, community, [pdu_type] + header + [varbinds]]
+
+
 # Calculate bitsting cache
 # value -> string of bits
 BITSTING = {}
@@ -71,3 +71,10 @@ class SNMPError(Exception):
 
     def __repr__(self):
         return "<SNMPError code=%s oid=%s>" % (self.code, self.oid)
+
+
+class UnsupportedMessage(ValueError):
+    """
+    Message layout or type is not supported by fast decoder,
+    full BERDecoder must be used
+    """
@@ -1,7 +1,7 @@
 # ----------------------------------------------------------------------
 # SNMP GET PDU generator
 # ----------------------------------------------------------------------
-# Copyright (C) 2007-2019 The NOC Project
+# Copyright (C) 2007-2022 The NOC Project
 # See LICENSE for details
 # ----------------------------------------------------------------------
 
@@ -11,7 +11,7 @@ from collections import namedtuple
 from typing import Optional, Callable, Dict, Union
 
 # NOC modules
-from .ber import parse_p_oid, BERDecoder, encoder
+from .ber import parse_p_oid, BERDecoder, encoder, decode_fast
 from .consts import PDU_GET_REQUEST, PDU_GETNEXT_REQUEST, PDU_RESPONSE, PDU_GETBULK_REQUEST
 from .version import SNMP_v1, SNMP_v2c
 from noc.core.perf import metrics
@@ -68,10 +68,11 @@ def getnext_pdu(community, oid, request_id=None, version=SNMP_v2c):
     Generate SNMP v2c GETNEXT PDU
     :param version:
     :param community:
-    :param oids:
+    :param oid: Oid or list of oids
     :return:
     """
-    return _build_pdu(community, PDU_GETNEXT_REQUEST, [oid], request_id, version)
+    oids = [oid] if isinstance(oid, str) else oid
+    return _build_pdu(community, PDU_GETNEXT_REQUEST, oids, request_id, version)
 
 
 def getbulk_pdu(
@@ -79,12 +80,13 @@ def getbulk_pdu(
 ):
     """
     Generate SNMP v2c GETBULK PDU
+    :param oid: Oid or list of oids
     """
     if version == SNMP_v1:
         raise ValueError("SNMPv1 does not define GETBULK")
     if not request_id:
         request_id = random.randint(0, 0x7FFFFFFF)
-    oids = [oid]
+    oids = [oid] if isinstance(oid, str) else oid
     # Encode variable bindings
     varbinds = encoder.encode_sequence(
         [encoder.encode_sequence([encoder.encode_oid(o), encoder.encode_null()]) for o in oids]
@@ -120,8 +122,10 @@ def parse_get_response(pdu: bytes, display_hints: Optional[_DisplayHints] = None
     :param display_hints:
     :return:
     """
-    decoder = BERDecoder(display_hints=display_hints)
-    data = decoder.parse_sequence(pdu)[0]
+    data = decode_fast(pdu, display_hints)
+    if data is None:
+        decoder = BERDecoder(display_hints=display_hints)
+        data = decoder.parse_sequence(pdu)[0]
     pdu = data[2]
     if pdu[0] != PDU_RESPONSE:
         raise ValueError("Invalid response PDU type: %s" % pdu[0])
@@ -0,0 +1,230 @@
+# ----------------------------------------------------------------------
+# Pure-Python counterparts of noc.speedup.ber
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Python modules
+from typing import Any, List, Tuple
+
+# NOC modules
+from noc.core.snmp.error import UnsupportedMessage
+
+INT_TAGS = {
+    0x02,  # INTEGER
+    0x0A,  # ENUMERATED
+    0x41,  # Counter32
+    0x42,  # Gauge32
+    0x43,  # TimeTicks
+    0x46,  # Counter64
+}
+
+
+def parse_tlv_header(msg: bytes) -> Tuple[int, int, int, bool, bool, int, int]:
+    """
+    Parse TLV header
+    :returns decoder_id, tag_class, tag_id, is_primitive, is implicit, offset, length
+    """
+    v = msg[0]
+    tag_class = v & 0xC0
+    is_constructed = bool(v & 0x20)
+    is_implicit = False
+    tag_id = v & 0x1F
+    decoder_id = (v & 0xE0) >> 5
+    skip = 1
+    if tag_id == 0x1F:
+        # high-tag number form
+        tag_id = 0
+        while True:
+            c = msg[skip]
+            skip += 1
+            tag_id = (tag_id << 7) + (c & 0x7F)
+            if not (c & 0x80):
+                break
+    elif v & 0x80:
+        # Implicit types
+        tag_class = 0
+        if not is_constructed and msg[1] == 0:
+            tag_id = 5
+        else:
+            is_implicit = True
+        # Recalculate decoder_id
+        decoder_id = 1 if is_constructed else 0
+    # Parse length
+    ln = msg[skip]
+    skip += 1
+    if ln & 0x80:
+        # Long form
+        tl = ln & 0x7F
+        if tl > 4:
+            raise ValueError("Malformed TLV")
+        ln = int.from_bytes(msg[skip : skip + tl], "big")
+        skip += tl
+        if ln + skip > len(msg):
+            raise ValueError("Malformed TLV length")
+    # Apply tag_id to decoder id
+    decoder_id = decoder_id | (tag_id << 3)
+    return decoder_id, tag_class, tag_id, is_constructed, is_implicit, skip, ln
+
+
+def parse_p_oid(msg: bytes) -> bytes:
+    """
+    >>> parse_p_oid(b"+\\x06\\x01\\x02\\x01\\x01\\x05\\x00")
+    b"1.3.6.1.2.1.1.5.0"
+    """
+    return _decode_oid(msg, 0, len(msg)).encode("ascii")
+
+
+def encode_oid(msg: bytes) -> bytes:
+    """
+    >>> encode_oid(b"1.3.6.1.2.1.1.5.0")
+    b'\\x06\\x08+\\x06\\x01\\x02\\x01\\x01\\x05\\x00'
+    """
+    parts = [int(x) for x in msg.split(b".")]
+    r = bytearray([(parts[0] * 40 + parts[1]) & 0xFF])
+    for v in parts[2:]:
+        if v < 0x80:
+            r.append(v)
+            continue
+        chunk = bytearray()
+        while v:
+            chunk.append((v & 0x7F) | 0x80)
+            v >>= 7
+        chunk[0] &= 0x7F
+        chunk.reverse()
+        r += chunk
+    return bytes([0x06, len(r)]) + bytes(r)
+
+
+def encode_int(value: int) -> bytes:
+    """
+    Encode non-negative INTEGER
+    """
+    if value == 0:
+        return b"\x02\x01\x00"
+    data = value.to_bytes((value.bit_length() + 8) // 8, "big")
+    return bytes([0x02, len(data)]) + data
+
+
+def _read_tlv(msg: bytes, pos: int, end: int) -> Tuple[int, int, int]:
+    """
+    Read TLV header at `pos`
+    :return: tag, value offset, value length
+    """
+    if pos + 2 > end:
+        raise ValueError("Malformed TLV")
+    tag = msg[pos]
+    if tag & 0x1F == 0x1F:
+        raise UnsupportedMessage("High tag number form")
+    ln = msg[pos + 1]
+    pos += 2
+    if ln & 0x80:
+        # Long form
+        n = ln & 0x7F
+        if n < 1 or n > 4:
+            raise UnsupportedMessage("Unsupported TLV length form")
+        if pos + n > end:
+            raise ValueError("Malformed TLV length")
+        ln = int.from_bytes(msg[pos : pos + n], "big")
+        pos += n
+    if pos + ln > end:
+        raise ValueError("Malformed TLV length")
+    return tag, pos, ln
+
+
+def _decode_oid(msg: bytes, pos: int, ln: int) -> str:
+    if ln < 1 or ln > 128:
+        raise UnsupportedMessage("Unsupported OID length")
+    v = msg[pos]
+    parts = ["1.3" if v == 0x2B else "%d.%d" % (v // 40, v % 40)]
+    b = 0
+    for v in msg[pos + 1 : pos + ln]:
+        b = ((b << 7) + (v & 0x7F)) & 0xFFFFFFFF
+        if not (v & 0x80):
+            parts.append(str(b))
+            b = 0
+    return ".".join(parts)
+
+
+def _decode_value(msg: bytes, tag: int, pos: int, ln: int) -> Any:
+    if tag in INT_TAGS:
+        return int.from_bytes(msg[pos : pos + ln], "big", signed=True)
+    if tag == 0x04:
+        # OCTET STRING
+        return msg[pos : pos + ln]
+    if tag == 0x05:
+        # NULL
+        return None
+    if tag == 0x06:
+        # OBJECT IDENTIFIER
+        return _decode_oid(msg, pos, ln)
+    if tag == 0x40 and ln == 4:
+        # IpAddress
+        return "%d.%d.%d.%d" % (msg[pos], msg[pos + 1], msg[pos + 2], msg[pos + 3])
+    if 0x80 <= tag <= 0x82 and not ln:
+        # noSuchObject, noSuchInstance, endOfMibView
+        return None
+    raise UnsupportedMessage("Unsupported type 0x%x" % tag)
+
+
+def decode_message(msg: bytes) -> Tuple[int, bytes, int, List[Any], List[Tuple[str, int, Any]]]:
+    """
+    Decode SNMP v1/v2c message in single pass.
+    Only common types are supported, UnsupportedMessage is raised
+    for the others, so the caller may fall back to the full decoder.
+    OCTET STRING values are returned as is.
+
+    :returns: version, community, pdu type, list of pdu header fields,
+        list of (oid, tag, value)
+    """
+    end = len(msg)
+    # Message
+    tag, pos, ln = _read_tlv(msg, 0, end)
+    if tag != 0x30 or pos + ln != end:
+        raise UnsupportedMessage("Unsupported message layout")
+    # Version
+    tag, pos, ln = _read_tlv(msg, pos, end)
+    if tag != 0x02:
+        raise UnsupportedMessage("Unsupported message layout")
+    version = _decode_value(msg, tag, pos, ln)
+    # Community
+    tag, pos, ln = _read_tlv(msg, pos + ln, end)
+    if tag != 0x04:
+        raise UnsupportedMessage("Unsupported message layout")
+    community = msg[pos : pos + ln]
+    # PDU
+    tag, pos, ln = _read_tlv(msg, pos + ln, end)
+    if tag & 0xE0 != 0xA0 or pos + ln != end:
+        raise UnsupportedMessage("Unsupported message layout")
+    pdu_type = tag & 0x1F
+    # v1 Trap-PDU: enterprise, agent-addr, generic-trap, specific-trap, time-stamp
+    # Others: request-id, error-status, error-index
+    header = []
+    for _ in range(5 if pdu_type == 4 else 3):
+        tag, pos, ln = _read_tlv(msg, pos, end)
+        if tag == 0x04 or tag == 0x30:
+            raise UnsupportedMessage("Unsupported message layout")
+        header.append(_decode_value(msg, tag, pos, ln))
+        pos += ln
+    # Varbinds
+    tag, pos, ln = _read_tlv(msg, pos, end)
+    if tag != 0x30 or pos + ln != end:
+        raise UnsupportedMessage("Unsupported message layout")
+    varbinds = []
+    while pos < end:
+        tag, pos, ln = _read_tlv(msg, pos, end)
+        if tag != 0x30:
+            raise UnsupportedMessage("Unsupported varbind layout")
+        vb_end = pos + ln
+        tag, pos, ln = _read_tlv(msg, pos, vb_end)
+        if tag != 0x06:
+            raise UnsupportedMessage("Unsupported varbind layout")
+        oid = _decode_oid(msg, pos, ln)
+        tag, pos, ln = _read_tlv(msg, pos + ln, vb_end)
+        value = _decode_value(msg, tag, pos, ln)
+        pos += ln
+        if pos != vb_end:
+            raise UnsupportedMessage("Unsupported varbind layout")
+        varbinds.append((oid, tag, value))
+    return version, community, pdu_type, header, varbinds
@@ -6,7 +6,7 @@
 # ----------------------------------------------------------------------
 
 # NOC modules
-from .ber import decode
+from .ber import decode, decode_fast
 
 
 class InvalidSNMPPacket(Exception):
@@ -23,7 +23,11 @@ def decode_trap(packet, raw=False):
     :param raw:
     :return:
     """
-    (version, community, pdu), raw_pdu, raw_varbinds = decode(packet, include_raw=raw)
+    data = None if raw else decode_fast(packet)
+    if data:
+        (version, community, pdu), raw_pdu, raw_varbinds = data, None, []
+    else:
+        (version, community, pdu), raw_pdu, raw_varbinds = decode(packet, include_raw=raw)
     decoder = PDU_PARSERS.get(version)
     if decoder is None:
         raise UnsupportedSNMPVersion("Unsupported SNMP version %s" % version)
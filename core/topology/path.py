@@ -7,13 +7,18 @@
 
 # Python modules
 from collections import defaultdict
+from threading import Lock
 import operator
+import heapq
+import itertools
 
 # Third-party modules
 from typing import Optional, Iterable, List, Dict, Set, Tuple, DefaultDict, NamedTuple
 from bson import ObjectId
+import cachetools
 
 # NOC modules
+from noc.core.cache.invalidation import get_ttl_cache
 from noc.inv.models.networksegment import NetworkSegment
 from noc.inv.models.link import Link
 from noc.sa.models.managedobject import ManagedObject
@@ -22,11 +27,80 @@ from .goal.managedobject import ManagedObjectGoal
 from .constraint.base import BaseConstraint
 
 MAX_PATH_LENGTH = 0xFFFFFFFF
+SEGMENT_LINKS_TTL = 60
 PathInfo = NamedTuple(
     "PathInfo",
     [("start", ManagedObject), ("end", ManagedObject), ("links", List[Link]), ("l2_cost", int)],
 )
 
+# Segment id -> managed object id -> links
+_segment_links: cachetools.TTLCache = get_ttl_cache(1000, SEGMENT_LINKS_TTL)
+# Link id -> ids of segments, having link in snapshot
+_link_segments: DefaultDict[str, Set[ObjectId]] = defaultdict(set)
+_segment_links_lock = Lock()
+
+
+def get_segment_links(segment_id: ObjectId) -> Dict[int, Set[Link]]:
+    """
+    Get in-memory adjacency snapshot of the segment.
+    Snapshot is shared between path finders of the process.
+    Snapshots are dropped on link changes by Link.on_save/on_delete
+    in the same process, and by Link.invalidate_caches in other processes,
+    when cluster-wide cache invalidation is enabled (`cache.enable_invalidation`).
+    Otherwise, changes made by other processes are seen after SEGMENT_LINKS_TTL seconds.
+    Links, added to the segment by other processes, are seen after TTL too,
+    as they are not in the snapshot yet
+
+    :param segment_id: Network Segment id
+    :return: Managed Object id -> set of links
+    """
+    with _segment_links_lock:
+        snapshot = _segment_links.get(segment_id)
+    if snapshot is not None:
+        return snapshot
+    snapshot: DefaultDict[int, Set[Link]] = defaultdict(set)
+    link_ids: Set[str] = set()
+    for link in Link.objects.filter(linked_segments=segment_id):
+        link_ids.add(str(link.id))
+        for l_mo in link.linked_objects:
+            snapshot[l_mo].add(link)
+    snapshot = dict(snapshot)
+    with _segment_links_lock:
+        _segment_links[segment_id] = snapshot
+        for link_id in link_ids:
+            _link_segments[link_id].add(segment_id)
+    return snapshot
+
+
+def invalidate_segment_links(segment_ids: Optional[Iterable[ObjectId]] = None) -> None:
+    """
+    Drop adjacency snapshots
+
+    :param segment_ids: List of segment ids, None - drop all snapshots
+    """
+    with _segment_links_lock:
+        if segment_ids is None:
+            _segment_links.clear()
+            _link_segments.clear()
+            return
+        for s_id in segment_ids:
+            _segment_links.pop(s_id, None)
+
+
+def invalidate_link_segments(link_id: str) -> None:
+    """
+    Drop adjacency snapshots, containing the changed link.
+    Called from the cache invalidation subscriber, so the in-memory index
+    is used only, without database queries. Link, not found in any snapshot,
+    has nothing to drop
+
+    :param link_id: Link id
+    """
+    with _segment_links_lock:
+        segment_ids = _link_segments.pop(link_id, None)
+    if segment_ids:
+        invalidate_segment_links(segment_ids)
+
 
 def get_shortest_path(start: ManagedObject, goal: ManagedObject) -> List[ManagedObject]:
     """
@@ -59,6 +133,7 @@ class KSPFinder(object):
         constraint: Optional[BaseConstraint] = None,
         max_depth: Optional[int] = MAX_PATH_LENGTH,
         n_shortest: Optional[int] = 1,
+        use_snapshot: bool = False,
     ) -> None:
         self.start: ManagedObject = start
         self.goal: BaseGoal = goal
@@ -73,6 +148,8 @@ class KSPFinder(object):
         self.mo_links: DefaultDict[int, Set[Link]] = defaultdict(set)
         # Segments with valid cached links
         self.cached_seg_links: Set[ObjectId] = set()
+        # Use shared in-memory adjacency snapshots of segments instead of querying links
+        self.use_snapshot = use_snapshot
 
     def find_shortest_path(self) -> List[PathInfo]:
         """
@@ -130,7 +207,13 @@ class KSPFinder(object):
                     return True
             return False
 
-        def iter_links(current_mo: ManagedObject) -> Iterable[Link]:
+        def load_links(current_mo: ManagedObject) -> None:
+            if self.use_snapshot:
+                # Get links from shared segment's snapshot
+                self.mo_links[current_mo.id] = get_segment_links(current_mo.segment.id).get(
+                    current_mo.id, set()
+                )
+                return
             if (
                 current_mo.id in self.mo_links
                 and current_mo.segment.id not in self.cached_seg_links
@@ -143,6 +226,9 @@ class KSPFinder(object):
                     for l_mo in link.linked_objects:
                         self.mo_links[l_mo].add(link)
                     self.cached_seg_links.add(current_mo.segment.id)
+
+        def iter_links(current_mo: ManagedObject) -> Iterable[Link]:
+            load_links(current_mo)
             for link in self.mo_links[current_mo.id]:
                 # Prune excluded links
                 if pruned_links and link.id in pruned_links:
@@ -164,54 +250,52 @@ class KSPFinder(object):
                 full_path += [PathInfo(mo1, mo2, links, cost)]
             return full_path
 
-        def current_path_len(current_mo: ManagedObject) -> int:
-            n = 0
-            while current_mo != start:
-                current_mo = came_from.get(current_mo)
-                assert current_mo
-                n += 1
-            return n
-
         # Effective search depth limitation
         max_depth = min(max_depth, self.max_depth)
         # Already evaluated nodes, contains MO ids
-        closed_set = set()  # type: Set[int]
-        # Currently discovered nodes than are not evaluated yet.
-        # Start node is already known
-        open_set = {start}  # type: Set[ManagedObject]
+        closed_set: Set[int] = set()
+        # Currently discovered nodes than are not evaluated yet, as the binary heap
+        # of (f_score, seq, node). Sequence number breaks ties between the nodes.
+        # Obsolete items are left in heap and skipped on pop.
+        seq = itertools.count()
+        open_heap: List[Tuple[int, int, ManagedObject]] = []
         # For each node, which node it can most efficiently be reached from.
         # If a node can be reached from many nodes, came_from will eventually contain the
         # most efficient previous step.
-        came_from = {}  # type: Dict[ManagedObject, ManagedObject]
+        came_from: Dict[ManagedObject, ManagedObject] = {}
+        # For each node, the number of hops from the start node along the best path
+        depth: Dict[ManagedObject, int] = {start: 0}
         # For each node, the cost of getting from the start node to that node.
         # Default value is infinity
-        g_score = defaultdict(max_path_length)  # type: DefaultDict[ManagedObject, int]
+        g_score: DefaultDict[ManagedObject, int] = defaultdict(max_path_length)
         # The cost of going from start to start is zero.
         g_score[start] = 0
         # For each node, the total cost of getting from the start node to the goal
         # by passing by that node. That value is partly known, partly heuristic.
-        f_score = defaultdict(max_path_length)  # type: Dict[ManagedObject, int]
+        f_score: DefaultDict[ManagedObject, int] = defaultdict(max_path_length)
         # For the first node, that value is completely heuristic.
         f_score[start] = self.goal.cost_estimate(start)
+        heapq.heappush(open_heap, (f_score[start], next(seq), start))
         # Find solution
-        while open_set:
-            # Current is the node in open_set having the lowest f_score value
-            current = sorted(open_set, key=lambda x: f_score[x])[0]
+        while open_heap:
+            # Current is the node in open set having the lowest f_score value
+            current_f, _, current = heapq.heappop(open_heap)
+            if current.id in closed_set or current_f > f_score[current]:
+                continue  # Obsolete heap item
             # If current matches goal, solution found
             if self.goal.is_goal(current):
                 return reconstruct_path(current)
-            # Move current from open_set to closed_set
-            open_set.remove(current)
+            # Move current from open set to closed_set
             closed_set.add(current.id)
             # Discard if drop cost
-            if f_score[current] >= self.goal.DROP_COST:
+            if current_f >= self.goal.DROP_COST:
                 continue
             # Restrict path length
-            if current_path_len(current) >= max_depth:
+            if depth[current] >= max_depth:
                 continue
             # Get neighbors of current and their distances
-            seen_neighbors = set()  # type: Set[int]
-            dist = {}  # type: Dict[int, int]
+            seen_neighbors: Set[int] = set()
+            dist: Dict[int, int] = {}
             for ll in iter_links(current):
                 new_neighbors = (
                     set(ll.linked_objects) - closed_set
@@ -223,16 +307,16 @@ class KSPFinder(object):
             for neighbor in iter_neighbors(seen_neighbors):
                 if self.constraint and not self.constraint.is_valid_neighbor(current, neighbor):
                     continue  # Skip invalid neighbors
-                if neighbor not in open_set:
-                    open_set.add(neighbor)  # Discover a new node
                 # The distance from start to a neighbor
                 tentative_g_score = g_score[current] + dist[neighbor.id]
                 if tentative_g_score >= g_score[neighbor]:
                     continue  # Not a better path
                 # This path is best until now, record it
                 came_from[neighbor] = current
+                depth[neighbor] = depth[current] + 1
                 g_score[neighbor] = tentative_g_score
                 f_score[neighbor] = tentative_g_score + self.goal.cost_estimate(neighbor, current)
+                heapq.heappush(open_heap, (f_score[neighbor], next(seq), neighbor))
         raise ValueError("Path not found")
 
     def iter_shortest_paths(self) -> Iterable[List[PathInfo]]:
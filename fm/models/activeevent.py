@@ -182,12 +182,12 @@ class ActiveEvent(Document):
         self.save()
 
     @classmethod
-    def log_suppression(cls, event_id: ObjectId, timestamp: datetime.datetime):
+    def log_suppression(cls, event_id: ObjectId, timestamp: datetime.datetime, repeats: int = 1):
         """
         Increase repeat count and update timestamp, if required
         """
         ActiveEvent._get_collection().update_one(
-            {"_id": event_id}, {"$inc": {"repeats": 1}, "$set": {"timestamp": timestamp}}
+            {"_id": event_id}, {"$inc": {"repeats": repeats}, "$set": {"timestamp": timestamp}}
         )
 
     @property
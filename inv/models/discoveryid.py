@@ -136,7 +136,10 @@ class DiscoveryID(Document):
 
     @classmethod
     @cachedmethod(
-        operator.attrgetter("_mac_cache"), key="discoveryid-mac-%s", lock=lambda _: mac_lock
+        operator.attrgetter("_mac_cache"),
+        key="discoveryid-mac-%s",
+        lock=lambda _: mac_lock,
+        negative_ttl=10,
     )
     def get_by_mac(cls, mac):
         return cls._get_collection().find_one({"macs": int(MAC(mac))}, {"_id": 0, "object": 1})
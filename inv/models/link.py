@@ -19,6 +19,7 @@ from noc.config import config
 from noc.core.mongo.fields import PlainReferenceListField
 from noc.core.model.decorator import on_delete, on_save
 from noc.core.change.decorator import change
+from noc.core.cache.invalidation import cache_invalidation
 from noc.core.comp import smart_text
 from noc.main.models.label import Label
 
@@ -26,6 +27,7 @@ from noc.main.models.label import Label
 @on_delete
 @on_save
 @change
+@cache_invalidation
 class Link(Document):
     """
     Network links.
@@ -196,8 +198,10 @@ class Link(Document):
 
     def on_save(self):
         from noc.sa.models.managedobject import ManagedObject
+        from noc.core.topology.path import invalidate_segment_links
 
         if not hasattr(self, "_changed_fields") or "interfaces" in self._changed_fields:
+            invalidate_segment_links(self.linked_segments)
             self.update_topology()
             Label.add_model_labels(
                 "inv.Interface", ["noc::is_linked::="], filter_ids=[i.id for i in self.interfaces]
@@ -209,11 +213,26 @@ class Link(Document):
 
     def on_delete(self):
         from noc.sa.models.managedobject import ManagedObject
+        from noc.core.topology.path import invalidate_segment_links
 
+        invalidate_segment_links(self.linked_segments)
         self.update_topology()
         self.reset_label()
         ManagedObject.update_links(self.linked_objects, exclude_link_ids=[self.id])
 
+    @classmethod
+    def invalidate_caches(cls, link_id: Optional[str] = None) -> None:
+        """
+        Drop segment adjacency snapshots, when link is changed by another process
+        :param link_id: Link's id. Drop all snapshots if None
+        """
+        from noc.core.topology.path import invalidate_segment_links, invalidate_link_segments
+
+        if link_id is None:
+            invalidate_segment_links()
+        else:
+            invalidate_link_segments(link_id)
+
     @property
     def managed_objects(self):
         """
@@ -34,6 +34,7 @@ import orjson
 from noc.core.model.decorator import on_save, on_delete
 from noc.core.mongo.fields import ForeignKeyField, PlainReferenceField
 from noc.core.change.decorator import change
+from noc.core.cache.invalidation import cache_invalidation, get_ttl_cache
 from noc.main.models.handler import Handler
 from noc.main.models.remotesystem import RemoteSystem
 from noc.models import get_model, is_document, LABEL_MODELS
@@ -104,6 +105,7 @@ class PrefixFilterItem(EmbeddedDocument):
 
 @on_save
 @change
+@cache_invalidation
 @on_delete
 class Label(Document):
     """
@@ -220,10 +222,10 @@ class Label(Document):
     # Object id in remote system
     remote_id = StringField()
     # Caches
-    _id_cache = cachetools.TTLCache(maxsize=100, ttl=120)
-    _name_cache = cachetools.TTLCache(maxsize=1000, ttl=120)
-    _setting_cache = cachetools.TTLCache(maxsize=1000, ttl=300)
-    _rx_labels_cache = cachetools.TTLCache(maxsize=100, ttl=120)
+    _id_cache = get_ttl_cache(maxsize=100, ttl=120)
+    _name_cache = get_ttl_cache(maxsize=1000, ttl=120)
+    _setting_cache = get_ttl_cache(maxsize=1000, ttl=300)
+    _rx_labels_cache = get_ttl_cache(maxsize=100, ttl=120)
     _rx_cache = cachetools.TTLCache(maxsize=100, ttl=600)
 
     def __str__(self):
@@ -294,6 +296,26 @@ class Label(Document):
         except KeyError:
             pass
 
+    @classmethod
+    def invalidate_caches(cls, lid: Optional[str] = None) -> None:
+        """
+        Drop process-local caches, when label is changed by another process.
+        Settings and regex labels may depend on any label, so they are dropped completely
+        :param lid: Label's id. Drop all caches if None
+        """
+        with id_lock:
+            for c in (cls._id_cache, cls._name_cache):
+                if lid is None:
+                    c.clear()
+                    continue
+                for key, label in list(c.items()):
+                    if (label and str(label.id) == lid) or key == (lid,):
+                        c.pop(key, None)
+        with setting_lock:
+            cls._setting_cache.clear()
+        with rx_labels_lock:
+            cls._rx_labels_cache.clear()
+
     def iter_changed_datastream(self, changed_fields=None):
         from noc.sa.models.managedobject import ManagedObject
 
@@ -0,0 +1,26 @@
+# ----------------------------------------------------------------------
+# ManagedObjectProfile Syslogcollector rate limit
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Third-party modules
+from django.db import models
+
+# NOC modules
+from noc.core.migration.base import BaseMigration
+
+
+class Migration(BaseMigration):
+    def migrate(self):
+        self.db.add_column(
+            "sa_managedobjectprofile",
+            "syslogcollector_rate_limit",
+            models.IntegerField(default=0),
+        )
+        self.db.add_column(
+            "sa_managedobjectprofile",
+            "syslogcollector_rate_burst",
+            models.IntegerField(default=0),
+        )
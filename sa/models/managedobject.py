@@ -102,6 +102,7 @@ from noc.inv.models.capability import Capability
 from noc.core.defer import call_later
 from noc.core.cache.decorator import cachedmethod
 from noc.core.cache.base import cache
+from noc.core.cache.invalidation import cache_invalidation, get_ttl_cache
 from noc.core.script.caller import SessionContext, ScriptCaller
 from noc.core.bi.decorator import bi_sync
 from noc.core.script.scheme import SCHEME_CHOICES
@@ -203,6 +204,7 @@ logger = logging.getLogger(__name__)
 @on_save
 @on_delete
 @change
+@cache_invalidation
 @resourcegroup
 @Label.model
 @on_delete_check(
@@ -670,8 +672,9 @@ class ManagedObject(NOCModel):
     BOX_DISCOVERY_JOB = "noc.services.discovery.jobs.box.job.BoxDiscoveryJob"
     PERIODIC_DISCOVERY_JOB = "noc.services.discovery.jobs.periodic.job.PeriodicDiscoveryJob"
 
-    _id_cache = cachetools.TTLCache(maxsize=1000, ttl=60)
-    _bi_id_cache = cachetools.TTLCache(maxsize=1000, ttl=60)
+    _id_cache = get_ttl_cache(maxsize=1000, ttl=60)
+    _bi_id_cache = get_ttl_cache(maxsize=1000, ttl=60)
+    # Effective labels depend on related models, keep short TTL
     _e_labels_cache = cachetools.TTLCache(maxsize=1000, ttl=60)
     _neighbor_cache = cachetools.TTLCache(1000, ttl=300)
 
@@ -712,6 +715,7 @@ class ManagedObject(NOCModel):
         key="managedobject-id-%s",
         lock=lambda _: id_lock,
         version=MANAGEDOBJECT_CACHE_VERSION,
+        negative_ttl=10,
     )
     def get_by_id(cls, oid: int) -> "Optional[ManagedObject]":
         """
@@ -2080,13 +2084,34 @@ class ManagedObject(NOCModel):
         except KeyError:
             pass
         try:
-            del cls._e_labels_cache[mo_id]
+            del cls._e_labels_cache[str(mo_id)]
         except KeyError:
             pass
         cache.delete(f"managedobject-id-{mo_id}", version=MANAGEDOBJECT_CACHE_VERSION)
         if credential:
             cache.delete(f"cred-{mo_id}", version=CREDENTIAL_CACHE_VERSION)
 
+    @classmethod
+    def invalidate_caches(cls, mo_id: Optional[str] = None) -> None:
+        """
+        Drop process-local caches, when object is changed by another process
+        :param mo_id: Managed Object's id. Drop all caches if None
+        """
+        with id_lock:
+            if mo_id is None:
+                cls._id_cache.clear()
+                cls._bi_id_cache.clear()
+            else:
+                cls._id_cache.pop(f"managedobject-id-{mo_id}", None)
+                for bi_id, mo in list(cls._bi_id_cache.items()):
+                    if mo and str(mo.id) == mo_id:
+                        cls._bi_id_cache.pop(bi_id, None)
+        with e_labels_lock:
+            if mo_id is None:
+                cls._e_labels_cache.clear()
+            else:
+                cls._e_labels_cache.pop(mo_id, None)
+
     @property
     def events_stream_and_partition(self) -> Tuple[str, int]:
         """
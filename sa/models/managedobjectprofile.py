@@ -724,6 +724,10 @@ class ManagedObjectProfile(NOCModel):
     )
     # Trapcollector Storm Threshold
     trapcollector_storm_threshold = models.IntegerField(default=1000)
+    # Syslogcollector per-source rate limit, messages per second. 0 - unlimited
+    syslogcollector_rate_limit = models.IntegerField(default=0)
+    # Syslogcollector per-source burst size. 0 - same as rate limit
+    syslogcollector_rate_burst = models.IntegerField(default=0)
 
     _id_cache = cachetools.TTLCache(maxsize=100, ttl=60)
     _bi_id_cache = cachetools.TTLCache(maxsize=100, ttl=60)
@@ -786,7 +790,12 @@ class ManagedObjectProfile(NOCModel):
             ):
                 yield "cfgping", mo_id
         if config.datastream.enable_cfgsyslog and changed_fields.intersection(
-            {"event_processing_policy", "syslog_archive_policy"}
+            {
+                "event_processing_policy",
+                "syslog_archive_policy",
+                "syslogcollector_rate_limit",
+                "syslogcollector_rate_burst",
+            }
         ):
             for mo_id in ManagedObject.objects.filter(object_profile=self).values_list(
                 "id", flat=True
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# ---------------------------------------------------------------------
+# BER decoder micro-benchmarks
+# ---------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ---------------------------------------------------------------------
+"""
+Compare full BERDecoder with single-pass message decoders.
+Usage:
+    ./scripts/bench-ber.py [--number N] [--varbinds N]
+"""
+
+# Python modules
+import argparse
+import timeit
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+# NOC modules
+from noc.core.snmp.ber import BEREncoder, BERDecoder, decode_fast  # noqa: E402
+from noc.core.snmp import ber, pyber  # noqa: E402
+from noc.core.snmp.get import parse_get_response  # noqa: E402
+from noc.core.snmp.trap import decode_trap  # noqa: E402
+
+try:
+    from noc.speedup import ber as cber
+except ImportError:
+    cber = None
+
+
+def get_response(n: int) -> bytes:
+    """
+    Build GetResponse with IF-MIB-like varbinds
+    """
+    e = BEREncoder()
+    varbinds = []
+    for i in range(1, n // 4 + 1):
+        varbinds += [
+            [e.encode_oid(f"1.3.6.1.2.1.2.2.1.2.{i}"), e.encode_octet_string(f"Gi0/{i}")],
+            [e.encode_oid(f"1.3.6.1.2.1.2.2.1.3.{i}"), e.encode_int(6)],
+            [
+                e.encode_oid(f"1.3.6.1.2.1.31.1.1.1.6.{i}"),
+                e.encode_tlv(0x46, True, (i * 1000003).to_bytes(8, "big")),
+            ],
+            [e.encode_oid(f"1.3.6.1.2.1.2.2.1.9.{i}"), e.encode_tlv(0x43, True, b"\x01\x02\x03")],
+        ]
+    return e.encode_sequence(
+        [
+            e.encode_int(1),
+            e.encode_octet_string(b"public"),
+            e.encode_choice(
+                2,
+                [
+                    e.encode_int(12345),
+                    e.encode_int(0),
+                    e.encode_int(0),
+                    e.encode_sequence([e.encode_sequence(vb) for vb in varbinds]),
+                ],
+            ),
+        ]
+    )
+
+
+def trap() -> bytes:
+    e = BEREncoder()
+    varbinds = [
+        [e.encode_oid("1.3.6.1.2.1.1.3.0"), e.encode_tlv(0x43, True, b"\x01\x02\x03")],
+        [e.encode_oid("1.3.6.1.6.3.1.1.4.1.0"), e.encode_oid("1.3.6.1.6.3.1.1.5.3")],
+        [e.encode_oid("1.3.6.1.2.1.2.2.1.1.3"), e.encode_int(3)],
+        [e.encode_oid("1.3.6.1.2.1.2.2.1.2.3"), e.encode_octet_string(b"GigabitEthernet0/3")],
+        [e.encode_oid("1.3.6.1.2.1.2.2.1.7.3"), e.encode_int(1)],
+        [e.encode_oid("1.3.6.1.2.1.2.2.1.8.3"), e.encode_int(2)],
+    ]
+    return e.encode_sequence(
+        [
+            e.encode_int(1),
+            e.encode_octet_string(b"public"),
+            e.encode_choice(
+                7,
+                [
+                    e.encode_int(1),
+                    e.encode_int(0),
+                    e.encode_int(0),
+                    e.encode_sequence([e.encode_sequence(vb) for vb in varbinds]),
+                ],
+            ),
+        ]
+    )
+
+
+def bench(name: str, fn, number: int) -> None:
+    t = min(timeit.repeat(fn, number=number, repeat=3))
+    print("%-40s %10.2f us" % (name, t * 1_000_000 / number))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=2000, help="Iterations per test")
+    parser.add_argument("--varbinds", type=int, default=40, help="GetResponse varbinds")
+    args = parser.parse_args()
+    resp = get_response(args.varbinds)
+    tr = trap()
+    print("Compiled speedup: %s" % ("yes" if ber.HAS_SPEEDUP else "no"))
+    print("GetResponse: %d varbinds, %d octets" % (args.varbinds, len(resp)))
+    bench("BERDecoder.parse_sequence", lambda: BERDecoder().parse_sequence(resp), args.number)
+    bench("pyber.decode_message", lambda: pyber.decode_message(resp), args.number)
+    if cber:
+        bench("speedup.ber.decode_message", lambda: cber.decode_message(resp), args.number)
+    bench("decode_fast", lambda: decode_fast(resp), args.number)
+    bench("parse_get_response", lambda: parse_get_response(resp), args.number)
+    print("Trap: %d octets" % len(tr))
+    bench("BERDecoder.parse_tlv", lambda: BERDecoder().parse_tlv(tr), args.number)
+    bench("decode_trap (raw)", lambda: decode_trap(tr, raw=True), args.number)
+    bench("decode_trap", lambda: decode_trap(tr), args.number)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# ---------------------------------------------------------------------
+# ClickHouse RowBinary encoder benchmark
+# ---------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ---------------------------------------------------------------------
+"""
+Compare producer-side encoding of metrics records:
+JSONEachRow (orjson, as QBuffer does) and RowBinary.
+Usage:
+    ./scripts/bench-ch-rowbinary.py [--rows N] [--repeat N]
+"""
+
+# Python modules
+import argparse
+import time
+import sys
+import os
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+# Third-party modules
+import orjson  # noqa: E402
+
+# NOC modules
+from noc.core.clickhouse.rowbinary import RowBinaryEncoder  # noqa: E402
+
+# raw_interface-like table
+INTERFACE_FIELDS = [
+    ("date", "Date"),
+    ("ts", "DateTime"),
+    ("managed_object", "UInt64"),
+    ("path", "Array(LowCardinality(String))"),
+    ("labels", "Array(LowCardinality(String))"),
+    ("load_in", "UInt64"),
+    ("load_out", "UInt64"),
+    ("packets_in", "UInt64"),
+    ("packets_out", "UInt64"),
+    ("errors_in", "UInt64"),
+    ("errors_out", "UInt64"),
+    ("discards_in", "UInt64"),
+    ("discards_out", "UInt64"),
+    ("speed", "UInt64"),
+    ("status_oper", "UInt8"),
+    ("status_admin", "UInt8"),
+]
+
+# mac table, as sent by MAC discovery
+MAC_FIELDS = [
+    ("date", "Date"),
+    ("ts", "DateTime"),
+    ("managed_object", "UInt64"),
+    ("mac", "UInt64"),
+    ("interface", "String"),
+    ("interface_profile", "UInt64"),
+    ("segment", "UInt64"),
+    ("vlan", "UInt16"),
+    ("is_uni", "UInt8"),
+]
+
+
+def get_interface_rows(n: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "date": "2022-03-01",
+            "ts": "2022-03-01 10:%02d:%02d" % ((i // 60) % 60, i % 60),
+            "managed_object": 1000000 + i % 100,
+            "path": ["", "", "", f"Gi 0/{i % 48}"],
+            "labels": [f"noc::interface::Gi 0/{i % 48}"],
+            "load_in": 1000000 + i,
+            "load_out": 500000 + i,
+            "packets_in": 10000 + i,
+            "packets_out": 5000 + i,
+            "errors_in": i % 3,
+            "errors_out": i % 5,
+            "discards_in": 0,
+            "discards_out": 0,
+            "speed": 1000000,
+            "status_oper": 1,
+            "status_admin": 1,
+        }
+        for i in range(n)
+    ]
+
+
+def get_mac_rows(n: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "date": "2022-03-01",
+            "ts": "2022-03-01 10:00:00",
+            "managed_object": 1000000,
+            "mac": 0x001122000000 + i,
+            "interface": f"Gi 0/{i % 48}",
+            "interface_profile": 2000000,
+            "segment": 3000000,
+            "vlan": 1 + i % 100,
+            "is_uni": 1,
+        }
+        for i in range(n)
+    ]
+
+
+def bench(
+    repeat: int, modes: List[Tuple[str, Callable[[], List[bytes]]]]
+) -> Dict[str, Tuple[float, int]]:
+    """
+    Run modes interleaved, to share the machine noise. Best time is reported
+    """
+    best: Dict[str, Tuple[float, int]] = {}
+    for _ in range(repeat):
+        for name, fn in modes:
+            t0 = time.perf_counter()
+            r = fn()
+            t = time.perf_counter() - t0
+            size = sum(len(x) for x in r)
+            if name not in best or t < best[name][0]:
+                best[name] = (t, size)
+    return best
+
+
+def run(title: str, fields: List[Tuple[str, str]], rows: List[Dict[str, Any]], repeat: int):
+    encoder = RowBinaryEncoder(fields)
+    modes = [
+        ("JSONEachRow", lambda: [orjson.dumps(x) for x in rows]),
+        ("RowBinary", lambda: [encoder.encode_row(x) for x in rows]),
+    ]
+    best = bench(repeat, modes)
+    print("%s: %d rows" % (title, len(rows)))
+    for name, (t, size) in best.items():
+        print(
+            "  %-12s %10.2f ms %12.0f rows/s %10.2f MB"
+            % (name, t * 1000, len(rows) / t, size / 1_000_000)
+        )
+    (tj, sj), (tb, sb) = best["JSONEachRow"], best["RowBinary"]
+    print("  RowBinary/JSON: time %.2fx, size %.2fx" % (tb / tj, sb / sj))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50000, help="Records to encode")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeats, best is reported")
+    args = parser.parse_args()
+    run("raw_interface", INTERFACE_FIELDS, get_interface_rows(args.rows), args.repeat)
+    run("mac", MAC_FIELDS, get_mac_rows(args.rows), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# ---------------------------------------------------------------------
+# Classifier rule lookup benchmark
+# ---------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ---------------------------------------------------------------------
+"""
+Replay syslog messages through the classification rules of the profile
+from collections. Compare rule lookup solutions: RuleLookup, checking all
+rules, and XRuleLookup, checking rules preselected by keywords.
+Input files are in `noc parse-events --format syslog` format: one message per line.
+Rules descriptions, which hold the sample messages, are replayed when no files given.
+Usage:
+    ./scripts/bench-classifier-lookup.py [--profile NAME] [--repeat N] [path ...]
+"""
+
+# Python modules
+import argparse
+import glob
+import re
+import time
+import sys
+import os
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+# Third-party modules
+import orjson  # noqa: E402
+
+# NOC modules
+from noc.core.fileutils import iter_open  # noqa: E402
+from noc.services.classifier.rule import Rule  # noqa: E402
+from noc.services.classifier.rulelookup import RuleLookup  # noqa: E402
+from noc.services.classifier.xrulelookup import XRuleLookup  # noqa: E402
+from noc.services.classifier.exception import InvalidPatternException  # noqa: E402
+
+COLLECTIONS = os.path.join(os.path.dirname(__file__), "..", "collections")
+
+
+class Classifier(object):
+    dump_clone = False
+
+    def __init__(self):
+        self.enumerations: Dict[str, Dict[str, str]] = {}
+        for path in glob.glob(os.path.join(COLLECTIONS, "fm.enumerations", "*.json")):
+            with open(path) as f:
+                data = orjson.loads(f.read())
+            self.enumerations[data["name"]] = {
+                vv.lower(): k for k, v in data["values"].items() for vv in v
+            }
+
+
+class EventClass(object):
+    action = "L"
+
+    def __init__(self, name: str):
+        self.name = name
+
+
+class Pattern(object):
+    def __init__(self, key_re: str, value_re: str):
+        self.key_re = key_re
+        self.value_re = value_re
+
+
+class RuleDoc(object):
+    def __init__(self, data: Dict[str, Any]):
+        self.name = data["name"]
+        self.preference = data.get("preference", 1000)
+        self.event_class = EventClass(data["event_class__name"])
+        self.vars = data.get("vars", [])
+        self.patterns = [Pattern(p["key_re"], p["value_re"]) for p in data["patterns"]]
+        self.description = data.get("description") or ""
+
+
+class Profile(object):
+    def __init__(self, name: str):
+        self.name = name
+
+
+class ManagedObject(object):
+    id = 1
+    name = "bench"
+
+    def __init__(self, profile: str):
+        self.profile = Profile(profile)
+
+
+class Event(object):
+    id = "bench"
+    source = "syslog"
+
+    def __init__(self, managed_object: ManagedObject, message: str):
+        self.managed_object = managed_object
+        self.raw_vars = {"collector": "default", "message": message}
+
+
+def get_rules(profile: str) -> Tuple[List[Rule], List[str]]:
+    """
+    Load syslog chain rules of the profile, as RuleSet.load does
+
+    :param profile: Profile name
+    :return: List of rules, List of rules descriptions
+    """
+    classifier = Classifier()
+    rules = []
+    descriptions = []
+    for path in sorted(
+        glob.glob(
+            os.path.join(COLLECTIONS, "fm.eventclassificationrules", "**", "*.json"),
+            recursive=True,
+        )
+    ):
+        with open(path) as f:
+            doc = RuleDoc(orjson.loads(f.read()))
+        try:
+            rule = Rule(classifier, doc)
+        except InvalidPatternException:
+            continue
+        if rule.chain != "syslog" or not re.search(rule.profile, profile):
+            continue
+        rules += [rule]
+        if doc.description and "\n" not in doc.description:
+            descriptions += [doc.description]
+    return rules, descriptions
+
+
+def classify(lookup: RuleLookup, events: List[Event]) -> Tuple[List[str], int]:
+    """
+    Find first matching rule for every event, as RuleSet.find_rule does
+
+    :return: List of matched rules names, checked rules
+    """
+    r = []
+    checked = 0
+    for event in events:
+        vars = event.raw_vars
+        name = None
+        for rule in lookup.lookup_rules(event, vars):
+            checked += 1
+            try:
+                v = rule.match(event, vars)
+            except (KeyError, ValueError):
+                # Failed fixup, classifier reports it as the processing error
+                v = None
+            if v is not None:
+                name = rule.name
+                break
+        r += [name]
+    return r, checked
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--profile", default="Cisco.IOS", help="Profile name")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeats, best is reported")
+    parser.add_argument("paths", nargs="*", help="Syslog messages files")
+    args = parser.parse_args()
+    rules, messages = get_rules(args.profile)
+    if args.paths:
+        messages = []
+        for p in args.paths:
+            for f in iter_open(p):
+                messages += [line[:-1] for line in f]
+    mo = ManagedObject(args.profile)
+    events = [Event(mo, msg) for msg in messages]
+    print("Profile %s: %d rules, %d messages" % (args.profile, len(rules), len(events)))
+    modes = [("RuleLookup", RuleLookup), ("XRuleLookup", XRuleLookup)]
+    best: Dict[str, float] = {}
+    results: Dict[str, List[str]] = {}
+    checks: Dict[str, int] = defaultdict(int)
+    for name, lookup_cls in modes:
+        t0 = time.perf_counter()
+        lookup_cls(sorted(rules, key=lambda x: x.preference))
+        print("  %-12s index built in %.2f ms" % (name, (time.perf_counter() - t0) * 1000))
+    for _ in range(args.repeat):
+        # Run modes interleaved, to share the machine noise
+        for name, lookup_cls in modes:
+            lookup = lookup_cls(sorted(rules, key=lambda x: x.preference))
+            t0 = time.perf_counter()
+            results[name], checks[name] = classify(lookup, events)
+            t = time.perf_counter() - t0
+            best[name] = min(best.get(name, t), t)
+    for name, _ in modes:
+        print(
+            "  %-12s %10.2f ms %12.0f events/s %8.2f rules checked per event"
+            % (name, best[name] * 1000, len(events) / best[name], checks[name] / len(events))
+        )
+    assert results["RuleLookup"] == results["XRuleLookup"], "Classification mismatch"
+    matched = sum(1 for x in results["RuleLookup"] if x)
+    print("  Matched: %d/%d" % (matched, len(events)))
+    print("  Speedup: %.2fx" % (best["RuleLookup"] / best["XRuleLookup"]))
+
+
+if __name__ == "__main__":
+    main()
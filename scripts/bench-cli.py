@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# ---------------------------------------------------------------------
+# CLI prompt matching benchmark
+# ---------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ---------------------------------------------------------------------
+"""
+Replay beef CLI captures through CLI.read_until_prompt.
+Streaming reader is compared with legacy reader, rebuilding bytes buffer
+and running every pattern on each read.
+Usage:
+    ./scripts/bench-cli.py [--number N] [--chunk N] [--profile PROFILE] <beef> ...
+    ./scripts/bench-cli.py [--number N] [--chunk N] --synthetic LINES
+"""
+
+# Python modules
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import timeit
+from typing import List, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+# NOC modules
+from noc.core.script.beef import Beef  # noqa: E402
+from noc.core.script.cli.cli import CLI  # noqa: E402
+from noc.core.handler import get_handler  # noqa: E402
+
+
+class ReplayScript(object):
+    """
+    Minimal script interface, required by CLI
+    """
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.credentials = {}
+        self.native_encoding = "utf-8"
+        self.logger = logging.getLogger("bench")
+        self.to_track = False
+
+
+class ReplayStream(object):
+    def __init__(self, chunks: List[bytes]):
+        self.chunks = chunks
+        self.pos = 0
+
+    async def read(self, n: int) -> bytes:
+        r = self.chunks[self.pos]
+        self.pos += 1
+        return r
+
+    async def write(self, data: bytes) -> None:
+        pass
+
+    def set_timeout(self, timeout):
+        pass
+
+    def close(self):
+        pass
+
+
+class LegacyCLI(CLI):
+    """
+    Previous implementation of read_until_prompt
+    """
+
+    async def read_until_prompt(self):
+        buffer = b""
+        while True:
+            r = await self.stream.read(self.BUFFER_SIZE)
+            if buffer.find(b"\x1b", -self.MATCH_MISSED_CONTROL_TAIL) != -1:
+                buffer = self.cleaned_input(buffer + r)
+            else:
+                buffer += self.cleaned_input(r)
+            offset = max(0, len(buffer) - self.MATCH_TAIL)
+            for rx, handler in self.pattern_table.items():
+                match = rx.search(buffer, offset)
+                if match:
+                    matched = buffer[: match.start()]
+                    buffer = buffer[match.end() :]
+                    r = await handler(matched, match)
+                    if r is not None:
+                        return r
+                    break
+
+
+def split(data: bytes, chunk: int) -> List[bytes]:
+    return [data[i : i + chunk] for i in range(0, len(data), chunk)]
+
+
+def get_beef_replies(path: str, chunk: int) -> Tuple[str, List[List[bytes]]]:
+    """
+    Get profile name and CLI replies, followed by prompt
+    """
+    beef = Beef.load("osfs://%s" % os.path.dirname(os.path.abspath(path)), os.path.basename(path))
+    prompt = b"".join(beef.iter_fsm_state_reply("prompt")) or b"\nrouter#"
+    replies = []
+    for c in beef.cli:
+        data = b"".join(beef._cli_decoder(r) for r in c.reply)
+        if not data.endswith(prompt):
+            data += prompt
+        replies += [split(data, chunk)]
+    return beef.box.profile, replies
+
+
+def get_synthetic_replies(lines: int, chunk: int) -> List[List[bytes]]:
+    """
+    Generate `show running-config`-like output with some control sequences
+    """
+    out = []
+    for i in range(lines):
+        out += [
+            b"interface GigabitEthernet0/%d\r\n description \x1b[1mUplink %d\x1b[0m\r\n" % (i, i)
+        ]
+        out += [b" switchport access vlan %d\r\n!\r\n" % (i % 4094 + 1)]
+    return [split(b"".join(out) + b"\r\nrouter#", chunk)]
+
+
+def bench(name: str, cli_cls, profile, replies: List[List[bytes]], number: int) -> float:
+    script = ReplayScript(profile)
+
+    def run():
+        loop = asyncio.new_event_loop()
+        try:
+            for chunks in replies:
+                cli = cli_cls(script)
+                cli.stream = ReplayStream(chunks)
+                cli.is_started = True
+                cli.allow_empty_response = True
+                cli.command = "show"
+                cli.expect({"prompt": cli.on_prompt, "pager": cli.send_pager_reply})
+                loop.run_until_complete(cli.read_until_prompt())
+        finally:
+            loop.close()
+
+    t = min(timeit.repeat(run, number=number, repeat=3)) / number
+    size = sum(len(c) for chunks in replies for c in chunks)
+    print("%-20s %10.2f ms %10.2f MB/s" % (name, t * 1000, size / t / 1_000_000))
+    return t
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=3, help="Iterations per test")
+    parser.add_argument("--chunk", type=int, default=4096, help="Read size")
+    parser.add_argument("--profile", help="Override beef profile")
+    parser.add_argument("--synthetic", type=int, default=0, help="Synthetic output lines")
+    parser.add_argument("beef", nargs="*", help="Beef files (.json, .json.gz, .json.bz2)")
+    args = parser.parse_args()
+    if not args.beef and not args.synthetic:
+        parser.error("Either beef or --synthetic must be set")
+    suites = []
+    for path in args.beef:
+        profile_name, replies = get_beef_replies(path, args.chunk)
+        suites += [(path, args.profile or profile_name, replies)]
+    if args.synthetic:
+        suites += [
+            (
+                "synthetic, %d lines" % args.synthetic,
+                args.profile or "Cisco.IOS",
+                get_synthetic_replies(args.synthetic, args.chunk),
+            )
+        ]
+    for name, profile_name, replies in suites:
+        profile = get_handler("noc.sa.profiles.%s.profile.Profile" % profile_name)()
+        print(
+            "%s: %s, %d commands, %d octets"
+            % (name, profile_name, len(replies), sum(len(c) for r in replies for c in r))
+        )
+        legacy = bench("legacy", LegacyCLI, profile, replies, args.number)
+        streaming = bench("streaming", CLI, profile, replies, args.number)
+        print("Speedup: %.2fx" % (legacy / streaming))
+
+
+if __name__ == "__main__":
+    main()
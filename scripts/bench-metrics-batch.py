@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+# ---------------------------------------------------------------------
+# Metrics card activation benchmark
+# ---------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ---------------------------------------------------------------------
+"""
+Replay synthetic metrics messages through the interface-like cards.
+Compare per-item activation (PlanTransaction per item)
+with batch activation (BatchTransaction per key).
+Usage:
+    ./scripts/bench-metrics-batch.py [--keys N] [--samples N] [--messages N] [--repeat N]
+"""
+
+# Python modules
+import argparse
+import time
+import sys
+import os
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+# NOC modules
+from noc.core.cdag.graph import CDAG  # noqa: E402
+from noc.core.cdag.factory.yaml import YAMLCDAGFactory  # noqa: E402
+from noc.core.cdag.node.probe import ProbeNode  # noqa: E402
+
+CONFIG = """
+nodes:
+- name: load_in
+  type: probe
+  config:
+    unit: bit/s
+- name: load_out
+  type: probe
+  config:
+    unit: bit/s
+- name: errors_in
+  type: probe
+  config:
+    unit: pkt
+- name: errors_out
+  type: probe
+  config:
+    unit: pkt
+- name: total_load
+  type: add
+  inputs:
+    - name: x
+      node: load_in
+    - name: y
+      node: load_out
+- name: load_diff
+  type: sub
+  inputs:
+    - name: x
+      node: load_in
+    - name: y
+      node: load_out
+- name: load_mean
+  type: mean
+  inputs:
+    - name: x
+      node: total_load
+- name: load_dev
+  type: sub
+  inputs:
+    - name: x
+      node: total_load
+    - name: y
+      node: load_mean
+- name: load_abs_dev
+  type: abs
+  inputs:
+    - name: x
+      node: load_dev
+- name: errors
+  type: add
+  inputs:
+    - name: x
+      node: errors_in
+    - name: y
+      node: errors_out
+- name: sender
+  type: metrics
+  config:
+    scope: interface
+    spool: false
+  inputs:
+    - name: load_in
+      node: load_in
+      dynamic: true
+    - name: load_out
+      node: load_out
+      dynamic: true
+    - name: total_load
+      node: total_load
+      dynamic: true
+    - name: load_diff
+      node: load_diff
+      dynamic: true
+    - name: load_abs_dev
+      node: load_abs_dev
+      dynamic: true
+    - name: errors
+      node: errors
+      dynamic: true
+"""
+
+NS = 1_000_000_000
+TS = 1621847580000000000
+STEP = 10 * NS
+PROBES = ["load_in", "load_out", "errors_in", "errors_out"]
+UNITS = {"load_in": "bit/s", "load_out": "bit/s", "errors_in": "pkt", "errors_out": "pkt"}
+
+Activation = Tuple[Any, str, Any]
+
+
+class Card(object):
+    def __init__(self):
+        cdag = CDAG("bench", state={})
+        YAMLCDAGFactory(cdag, CONFIG).construct()
+        self.probes = {n: cdag.get_node(n) for n in PROBES}
+        self.sender = cdag.get_node("sender")
+        self.plan = cdag.compile()
+
+    def get_activations(self, item: Dict[str, Any]) -> List[Activation]:
+        ts = item["ts"]
+        r = []
+        for n, probe in self.probes.items():
+            if n in item:
+                r += [(probe, "ts", ts), (probe, "x", item[n]), (probe, "unit", UNITS[n])]
+        r += [(self.sender, "ts", ts), (self.sender, "labels", item["labels"])]
+        return r
+
+
+def get_messages(keys: int, samples: int, messages: int) -> List[List[Dict[str, Any]]]:
+    """
+    Each message holds `samples` consecutive samples for every key
+    """
+    r = []
+    for m in range(messages):
+        msg = []
+        for k in range(keys):
+            for s in range(samples):
+                i = m * samples + s
+                msg.append(
+                    {
+                        "key": k,
+                        "ts": TS + i * STEP,
+                        "labels": [f"noc::interface::Gi 0/{k}"],
+                        "load_in": 1000.0 * (k + 1) + 10.5 * i,
+                        "load_out": 500.0 * (k + 1) + 7.25 * (i % 13),
+                        "errors_in": float(i % 3),
+                        "errors_out": float(i % 5),
+                    }
+                )
+        r.append(msg)
+    return r
+
+
+def group(msg: List[Dict[str, Any]]) -> Dict[int, List[Dict[str, Any]]]:
+    r: Dict[int, List[Dict[str, Any]]] = {}
+    for item in msg:
+        r.setdefault(item["key"], []).append(item)
+    return r
+
+
+def run_per_item(cards: List[Card], messages: List[List[Dict[str, Any]]]) -> None:
+    for msg in messages:
+        for item in msg:
+            card = cards[item["key"]]
+            tx = card.plan.begin()
+            for node, name, value in card.get_activations(item):
+                tx.activate(node, name, value)
+            tx.get_changed_state()
+
+
+def run_batch(cards: List[Card], messages: List[List[Dict[str, Any]]]) -> None:
+    for msg in messages:
+        for key, items in group(msg).items():
+            card = cards[key]
+            tx = card.plan.begin_batch(len(items))
+            for i, item in enumerate(items):
+                tx.activate_sample(i, card.get_activations(item))
+            tx.commit()
+            tx.get_changed_state()
+
+
+def bench(args: argparse.Namespace, messages) -> Dict[str, float]:
+    """
+    Run modes interleaved, to share the machine noise. Best time is reported
+    """
+    best: Dict[str, float] = {}
+    for _ in range(args.repeat):
+        for name, fn in MODES:
+            # Fresh cards, as the replay changes the state
+            cards = [Card() for _ in range(args.keys)]
+            t0 = time.perf_counter()
+            fn(cards, messages)
+            t = time.perf_counter() - t0
+            best[name] = min(best.get(name, t), t)
+    n = args.keys * args.samples * args.messages
+    for name, _ in MODES:
+        print("%-30s %10.2f ms %12.0f items/s" % (name, best[name] * 1000, n / best[name]))
+    return best
+
+
+MODES = [("per-item", run_per_item), ("batch", run_batch)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--keys", type=int, default=50, help="Cards per message")
+    parser.add_argument("--samples", type=int, default=16, help="Samples per key per message")
+    parser.add_argument("--messages", type=int, default=10, help="Messages to replay")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeats, best is reported")
+    args = parser.parse_args()
+    ProbeNode.set_convert(
+        {
+            "bit/s": {"bit/s": "x"},
+            "pkt": {"pkt": "x"},
+        }
+    )
+    ProbeNode.set_scale({"1": (10, 0)})
+    messages = get_messages(args.keys, args.samples, args.messages)
+    print("Replay: %d messages x %d keys x %d samples" % (args.messages, args.keys, args.samples))
+    best = bench(args, messages)
+    print("Speedup: %.2fx" % (best["per-item"] / best["batch"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# ---------------------------------------------------------------------
+# Path finder benchmark
+# ---------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ---------------------------------------------------------------------
+"""
+Find shortest paths on synthetic flat L2 segment:
+random tree of aggregation links with additional random cross-links.
+Links are served from in-memory segment snapshot.
+Compare KSPFinder with the preceding implementation,
+sorting the open set on each step (on the smaller topology).
+Usage:
+    ./scripts/bench-topology-path.py [--nodes N] [--legacy-nodes N] [--queries N]
+"""
+
+# Python modules
+import argparse
+import random
+import time
+import sys
+import os
+from collections import defaultdict
+from typing import Dict, List, Set, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+# NOC modules
+from noc.core.topology import path  # noqa: E402
+from noc.core.topology.path import KSPFinder  # noqa: E402
+from noc.core.topology.goal.base import BaseGoal  # noqa: E402
+
+SEGMENT = "segment"
+
+
+class Segment(object):
+    id = SEGMENT
+
+
+class Object(object):
+    segment = Segment()
+
+    def __init__(self, id: int):
+        self.id = id
+
+
+class FakeLink(object):
+    def __init__(self, id: int, a: int, b: int):
+        self.id = id
+        self.linked_objects = [a, b]
+        self.l2_cost = 1
+        self.interfaces = []
+
+
+class ObjectGoal(BaseGoal):
+    def __init__(self, obj: Object):
+        super().__init__()
+        self.object = obj
+
+    def is_goal(self, obj: Object) -> bool:
+        return obj.id == self.object.id
+
+
+class Topology(object):
+    def __init__(self, nodes: int, cross_links: float, seed: int):
+        rnd = random.Random(seed)
+        edges = [(i, rnd.randrange(max(0, i - 1000), i)) for i in range(1, nodes)]
+        edges += [
+            (rnd.randrange(nodes), rnd.randrange(nodes)) for _ in range(int(nodes * cross_links))
+        ]
+        self.objects = {i: Object(i) for i in range(nodes)}
+        self.links: Dict[int, Set[FakeLink]] = defaultdict(set)
+        for link_id, (a, b) in enumerate(edges):
+            link = FakeLink(link_id, a, b)
+            self.links[a].add(link)
+            self.links[b].add(link)
+        self.n_links = len(edges)
+
+    def find(self, start: int, goal: int) -> int:
+        finder = KSPFinder(self.objects[start], ObjectGoal(self.objects[goal]), use_snapshot=True)
+        finder.mo_cache = self.objects.copy()
+        return len(finder.find_shortest_path())
+
+    def find_legacy(self, start: int, goal: int) -> int:
+        """
+        Search loop of the preceding implementation
+        """
+
+        def current_path_len(mo: Object) -> int:
+            n = 0
+            while mo in came_from:
+                mo = came_from[mo]
+                n += 1
+            return n
+
+        goal_obj = ObjectGoal(self.objects[goal])
+        start_obj = self.objects[start]
+        closed_set: Set[int] = set()
+        open_set = {start_obj}
+        came_from: Dict[Object, Object] = {}
+        g_score = defaultdict(lambda: path.MAX_PATH_LENGTH)
+        g_score[start_obj] = 0
+        f_score = defaultdict(lambda: path.MAX_PATH_LENGTH)
+        f_score[start_obj] = goal_obj.cost_estimate(start_obj)
+        while open_set:
+            current = sorted(open_set, key=lambda x: f_score[x])[0]
+            if goal_obj.is_goal(current):
+                return current_path_len(current)
+            open_set.remove(current)
+            closed_set.add(current.id)
+            if f_score[current] >= goal_obj.DROP_COST:
+                continue
+            seen_neighbors: Set[int] = set()
+            for ll in self.links.get(current.id, set()):
+                seen_neighbors |= set(ll.linked_objects) - closed_set
+            for neighbor in (self.objects[n] for n in seen_neighbors):
+                if neighbor not in open_set:
+                    open_set.add(neighbor)
+                tentative_g_score = g_score[current] + 1
+                if tentative_g_score >= g_score[neighbor]:
+                    continue
+                came_from[neighbor] = current
+                g_score[neighbor] = tentative_g_score
+                f_score[neighbor] = tentative_g_score + goal_obj.cost_estimate(neighbor, current)
+        raise ValueError("Path not found")
+
+
+def bench(topo: Topology, queries: List[Tuple[int, int]], legacy: bool) -> None:
+    path.get_segment_links = lambda segment_id: topo.links
+    modes = [("heap", topo.find)]
+    if legacy:
+        modes += [("legacy", topo.find_legacy)]
+    results: Dict[str, List[int]] = {}
+    times: Dict[str, float] = {}
+    for name, fn in modes:
+        t0 = time.perf_counter()
+        results[name] = [fn(start, goal) for start, goal in queries]
+        times[name] = time.perf_counter() - t0
+        print(
+            "  %-8s %10.2f ms/query, mean path length %.1f"
+            % (
+                name,
+                times[name] * 1000 / len(queries),
+                sum(results[name]) / len(queries),
+            )
+        )
+    if legacy:
+        assert results["heap"] == results["legacy"], "Path lengths mismatch"
+        print("  Speedup: %.1fx" % (times["legacy"] / times["heap"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--nodes", type=int, default=50000, help="Objects in the segment")
+    parser.add_argument(
+        "--legacy-nodes", type=int, default=5000, help="Objects in the segment for comparison"
+    )
+    parser.add_argument("--cross-links", type=float, default=0.2, help="Cross-links per object")
+    parser.add_argument("--queries", type=int, default=20, help="Random paths to find")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    args = parser.parse_args()
+    for nodes, legacy in [(args.legacy_nodes, True), (args.nodes, False)]:
+        topo = Topology(nodes, args.cross_links, args.seed)
+        rnd = random.Random(args.seed)
+        queries = [(rnd.randrange(nodes), rnd.randrange(nodes)) for _ in range(args.queries)]
+        print("Topology: %d objects, %d links" % (nodes, topo.n_links))
+        bench(topo, queries, legacy)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,28 +8,61 @@
 
 # Python modules
 import asyncio
+from dataclasses import dataclass
 from time import perf_counter
 from urllib.parse import quote as urllib_quote
 
 # Third-party modules
-from typing import Optional, List
+from typing import Optional, List, Tuple
 
 # NOC modules
 from noc.config import config
 from noc.core.liftbridge.message import Message
+from noc.core.clickhouse.rowbinary import CH_FORMAT_HEADER, CH_COLUMNS_HEADER, CH_RECORDS_HEADER
+
+JSON_FORMAT = "JSONEachRow"
+
+
+@dataclass
+class Batch(object):
+    """
+    Block of data, sent to ClickHouse at once
+    """
+
+    data: bytes
+    records: int
+    q_sql: str
+    # Offset and timestamp of the last message in batch
+    last_offset: int
+    last_ts: int
 
 
 class Channel(object):
+    """
+    Per-table write channel.
+    Data are collected to the current buffer while the previous batch is in flight.
+    Only one batch is in flight at time, so the batches and the cursors
+    are committed in order
+    """
+
     def __init__(self, service, table: str):
         self.service = service
         self.table = table
         self.stream = f"ch.{table}"
         self.last_offset: int = 0
+        self.last_ts: int = 0
         self.data: List[bytes] = []
         self.size: int = 0
         self.records: int = 0
         self.expired: Optional[float] = None
-        self.q_sql = urllib_quote(f"INSERT INTO raw_{table} FORMAT JSONEachRow".encode("utf-8"))
+        # Format of collected data, binary formats require explicit columns
+        self.format: str = JSON_FORMAT
+        self.columns: Optional[str] = None
+        self.q_sql = self.get_query(self.format, self.columns)
+        # Batch in flight
+        self.batch: Optional[Batch] = None
+        # Flush requested while batch is in flight
+        self.flush_pending = False
         self.feed_ready = asyncio.Event()
         self.feed_ready.set()
         self.ttl = float(config.chwriter.batch_delay_ms) / 1_000.0
@@ -40,20 +73,62 @@ class Channel(object):
         :param msg:
         :return:
         """
+        fmt, columns = self.get_message_format(msg)
         # Wait until feed became possible
         await self.feed_ready.wait()
+        if self.size and (fmt != self.format or columns != self.columns):
+            # Flush collected data before switching the format
+            await self.schedule_flush(block=True)
+            await self.feed_ready.wait()
+        if not self.size and (fmt != self.format or columns != self.columns):
+            self.format = fmt
+            self.columns = columns
+            self.q_sql = self.get_query(fmt, columns)
         # Append data
         self.data.append(msg.value)
         self.size += len(msg.value)
-        self.records += msg.value.count(b"\n") + (0 if msg.value.endswith(b"\n") else 1)
+        if fmt == JSON_FORMAT:
+            self.records += msg.value.count(b"\n") + (0 if msg.value.endswith(b"\n") else 1)
+        else:
+            self.records += int(msg.headers[CH_RECORDS_HEADER])
         self.last_offset = msg.offset
+        self.last_ts = msg.timestamp
         #
         if not self.expired:
             self.expired = perf_counter() + self.ttl
         #
         if self.is_ready_to_flush():
             await self.schedule_flush()
-            await self.feed_ready.wait()
+
+    @staticmethod
+    def get_message_format(msg: Message) -> Tuple[str, Optional[str]]:
+        """
+        Get data format and columns list of the message.
+        Messages without format header contain JSON lines
+
+        :param msg:
+        :return: (format, columns)
+        """
+        if not msg.headers or CH_FORMAT_HEADER not in msg.headers:
+            return JSON_FORMAT, None
+        return (
+            msg.headers[CH_FORMAT_HEADER].decode("utf-8"),
+            msg.headers[CH_COLUMNS_HEADER].decode("utf-8"),
+        )
+
+    def get_query(self, fmt: str, columns: Optional[str]) -> str:
+        """
+        Get quoted INSERT query for given format
+
+        :param fmt: ClickHouse input format
+        :param columns: Comma-separated list of columns
+        :return:
+        """
+        if columns:
+            q = f"INSERT INTO raw_{self.table} ({columns}) FORMAT {fmt}"
+        else:
+            q = f"INSERT INTO raw_{self.table} FORMAT {fmt}"
+        return urllib_quote(q.encode("utf-8"))
 
     def is_expired(self, ts: float) -> bool:
         """
@@ -71,22 +146,54 @@ class Channel(object):
             return False
         return self.records >= config.chwriter.batch_size
 
-    async def schedule_flush(self):
-        if not self.feed_ready.is_set():
-            return  # Already scheduled
-        self.expired = None
-        self.feed_ready.clear()
+    async def schedule_flush(self, block: bool = False):
+        """
+        Pass collected data to flush workers.
+        When previous batch is still in flight, the flush is postponed
+        until its completion. Feeding is suspended only when the buffer is full.
+
+        :param block: Suspend feeding until the data will be passed to flush
+        :return:
+        """
+        if not self.size:
+            return  # Nothing to flush
+        if self.batch:
+            # Previous batch is in flight
+            self.flush_pending = True
+            if block or self.is_ready_to_flush():
+                self.feed_ready.clear()
+            return
+        self.start_batch()
         await self.service.flush_queue.put(self)
 
-    def flush_complete(self):
+    def start_batch(self) -> None:
         """
-        Called when data are safely flushed
+        Move collected data to the batch in flight and reset buffer
         :return:
         """
+        self.batch = Batch(
+            data=self.get_data(),
+            records=self.records,
+            q_sql=self.q_sql,
+            last_offset=self.last_offset,
+            last_ts=self.last_ts,
+        )
         self.data = []
         self.size = 0
         self.records = 0
         self.expired = None
+
+    def flush_complete(self):
+        """
+        Called when data are safely flushed
+        :return:
+        """
+        self.batch = None
+        if self.flush_pending:
+            self.flush_pending = False
+            if self.size:
+                self.start_batch()
+                self.service.flush_queue.put_nowait(self)
         self.feed_ready.set()
 
     def get_data(self) -> bytes:
@@ -95,4 +202,6 @@ class Channel(object):
 
         :return:
         """
-        return b"\n".join(self.data)
+        if self.format == JSON_FORMAT:
+            return b"\n".join(self.data)
+        return b"".join(self.data)
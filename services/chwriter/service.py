@@ -8,6 +8,7 @@
 
 # Python modules
 from time import perf_counter
+import time
 import asyncio
 from typing import AsyncIterable
 
@@ -56,7 +57,8 @@ class CHWriterService(FastAPIService):
         check_callback.start()
         self.logger.info("Sending records to %s", self.ch_address)
         asyncio.create_task(self.subscribe_ch_streams())
-        asyncio.create_task(self.flush_data())
+        for _ in range(config.chwriter.flush_workers):
+            asyncio.create_task(self.flush_data())
 
     async def iter_ch_streams(self) -> AsyncIterable[str]:
         """
@@ -108,66 +110,77 @@ class CHWriterService(FastAPIService):
         :return:
         """
         async with LiftBridgeClient() as client:
-            cursor_id = self.get_cursor_id()
-            partition_id = config.chwriter.shard_id
             while not self.stopping:
                 ch = await self.flush_queue.get()
-                n_records = ch.records
-                while True:
-                    try:
-                        self.logger.info("[%s] Sending %d records", ch.table, n_records)
-                        t0 = perf_counter()
-                        url = (
-                            f"http://{self.ch_address}/?"
-                            f"database={config.clickhouse.db}&"
-                            f"query={ch.q_sql}"
-                        )
-                        code, headers, body = await fetch(
-                            url,
-                            method="POST",
-                            body=ch.get_data(),
-                            user=config.clickhouse.rw_user,
-                            password=config.clickhouse.rw_password or "",
-                            content_encoding=config.clickhouse.encoding,
-                        )
-                        if code == 200:
-                            self.logger.info(
-                                "[%s] %d records sent in %.2fms",
-                                ch.table,
-                                n_records,
-                                (perf_counter() - t0) * 1000,
-                            )
-                            metrics["records_written"] += n_records
-                            break
-                        elif code in self.CH_SUSPEND_ERRORS:
-                            self.logger.info("[%s] Timed out: %s", ch.table, body)
-                            metrics["error", ("type", "records_spool_timeouts")] += 1
-                            await asyncio.sleep(1)
-                            continue
-                        else:
-                            self.logger.info(
-                                "[%s] Failed to write records: %s %s", ch.table, code, body
-                            )
-                            metrics["error", ("type", "records_spool_failed")] += 1
-                            break
-                    except Exception as e:
-                        self.logger.error(
-                            "[%s] Failed to spool %d records due to unknown error: %s",
-                            ch.table,
-                            n_records,
-                            e,
-                        )
-                        await asyncio.sleep(1)
-                        continue
-                # Set cursor
-                await client.set_cursor(
-                    ch.stream,
-                    partition=partition_id,
-                    cursor_id=cursor_id,
-                    offset=ch.last_offset,
+                await self.flush_channel(client, ch)
+
+    async def flush_channel(self, client: LiftBridgeClient, ch: Channel) -> None:
+        """
+        Send channel's batch in flight and commit cursor
+        :param client: LiftBridgeClient instance
+        :param ch: Channel
+        :return:
+        """
+        batch = ch.batch
+        n_records = batch.records
+        while True:
+            try:
+                self.logger.info("[%s] Sending %d records", ch.table, n_records)
+                t0 = perf_counter()
+                url = (
+                    f"http://{self.ch_address}/?"
+                    f"database={config.clickhouse.db}&"
+                    f"query={batch.q_sql}"
+                )
+                code, headers, body = await fetch(
+                    url,
+                    method="POST",
+                    body=batch.data,
+                    user=config.clickhouse.rw_user,
+                    password=config.clickhouse.rw_password or "",
+                    content_encoding=config.clickhouse.encoding,
                 )
-                # Unfreeze channel
-                ch.flush_complete()
+                if code == 200:
+                    self.logger.info(
+                        "[%s] %d records sent in %.2fms",
+                        ch.table,
+                        n_records,
+                        (perf_counter() - t0) * 1000,
+                    )
+                    metrics["records_written"] += n_records
+                    break
+                elif code in self.CH_SUSPEND_ERRORS:
+                    self.logger.info("[%s] Timed out: %s", ch.table, body)
+                    metrics["error", ("type", "records_spool_timeouts")] += 1
+                    await asyncio.sleep(1)
+                    continue
+                else:
+                    self.logger.info("[%s] Failed to write records: %s %s", ch.table, code, body)
+                    metrics["error", ("type", "records_spool_failed")] += 1
+                    break
+            except Exception as e:
+                self.logger.error(
+                    "[%s] Failed to spool %d records due to unknown error: %s",
+                    ch.table,
+                    n_records,
+                    e,
+                )
+                await asyncio.sleep(1)
+                continue
+        # Set cursor
+        await client.set_cursor(
+            ch.stream,
+            partition=config.chwriter.shard_id,
+            cursor_id=self.get_cursor_id(),
+            offset=batch.last_offset,
+        )
+        # Ingestion lag, liftbridge timestamps are in nanoseconds
+        if batch.last_ts:
+            metrics["ingestion_lag_ms", ("table", ch.table)] = max(
+                0, int(time.time() * 1_000 - batch.last_ts // 1_000_000)
+            )
+        # Start next batch, unfreeze channel
+        ch.flush_complete()
 
     async def report(self):
         nm = metrics["records_written"].value
@@ -18,6 +18,10 @@ from noc.core.escape import fm_unescape
 from noc.core.comp import smart_text
 
 rx_named_group = re.compile(r"\(\?P<([^>]+)>")
+# Pattern constructs, able to tell apart the values differing only by digits:
+# digits (literals, escapes, classes, quantifiers and numbered back-references),
+# named back-references and named characters (like \N{DIGIT ONE})
+rx_shape_sensitive = re.compile(r"[0-9]|\(\?P=|\\N\{")
 
 
 class Rule(object):
@@ -65,6 +69,8 @@ class Rule(object):
         self.rxp = {}
         self.fixups = set()
         self.profile = r"^.*$"
+        # Effective (key_re, value_re) patterns, used by lookup solutions
+        self.patterns = []
         for x in rule.patterns:
             if clone_rule:
                 # Rewrite, when necessary
@@ -85,6 +91,7 @@ class Rule(object):
                 else:
                     self.chain = "other"
                 continue
+            self.patterns += [(self.unhex_re(x.key_re), self.unhex_re(x.value_re))]
             # Process key pattern
             if self.is_exact(x.key_re):
                 x_key = self.unescape(x.key_re[1:-1])
@@ -115,6 +122,12 @@ class Rule(object):
                 else:
                     c4 += [(self.get_rx(rx_key), self.get_rx(rx_value))]
         self.to_drop = self.event_class.action == "D"
+        # Patterns, referring to digits or back-references,
+        # can tell apart the events of the same shape
+        self.is_shape_sensitive = any(
+            self.is_shape_sensitive_re(key_re) or self.is_shape_sensitive_re(value_re)
+            for key_re, value_re in self.patterns
+        )
         self.compile(c1, c2, c3, c4)
 
     def __str__(self):
@@ -139,6 +152,10 @@ class Rule(object):
     def unhex_re(self, pattern):
         return self.rx_hex.sub(lambda m: chr(int(m.group(1), 16)), pattern)
 
+    @staticmethod
+    def is_shape_sensitive_re(pattern):
+        return rx_shape_sensitive.search(pattern) is not None
+
     def is_exact(self, pattern):
         return self.rx_exact.match(self.rx_escape.sub("", pattern)) is not None
 
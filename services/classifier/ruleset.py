@@ -10,6 +10,9 @@ from collections import defaultdict
 import logging
 import re
 
+# Third-party modules
+import cachetools
+
 # NOC modules
 from .rule import Rule
 from .exception import InvalidPatternException, EventProcessingFailed
@@ -37,6 +40,11 @@ logger = logging.getLogger(__name__)
 E_SRC_SYSLOG = "syslog"
 E_SRC_SNMP_TRAP = "SNMP Trap"
 
+# Mask all digits, keeping the length of the value
+SHAPE_TRANS = str.maketrans("123456789", "000000000")
+# Cached result of the lookup without matched rules
+NO_MATCH = object()
+
 
 class RuleSet(object):
     def __init__(self):
@@ -44,12 +52,18 @@ class RuleSet(object):
         self.enumerations = {}  # name -> value -> enumerated
         self.lookup_cls = None
         self.default_rule = None
+        # (profile, chain, shape) -> rule | NO_MATCH
+        self.shape_cache = None
+        # (profile, chain) -> ({rule: position}, position of first shape-sensitive rule)
+        self.shape_limits = {}
 
-    def load(self):
+    def load(self, lookup_handler=None):
         """
         Load rules from database
+
+        :param lookup_handler: Rule lookup handler, override config setting
         """
-        self.lookup_cls = get_handler(config.classifier.lookup_handler)
+        self.lookup_cls = get_handler(lookup_handler or config.classifier.lookup_handler)
         self.rules = {}
         logger.info("Loading rules")
         n = 0
@@ -104,10 +118,36 @@ class RuleSet(object):
         )
         # Apply lookup solution
         self.rules = {k: self.lookup_cls(rules[k]) for k in rules}
+        self.reset_shape_cache()
         logger.info("%d rules are loaded in the %d chains", n, len(self.rules))
         #
         self.load_enumerations()
 
+    def reset_shape_cache(self):
+        """
+        Drop cached lookup results
+        """
+        self.shape_limits = {}
+        for (profile, chain), lookup in self.rules.items():
+            positions = {rule: n for n, rule in enumerate(lookup.rules)}
+            first_sensitive = next(
+                (n for n, rule in enumerate(lookup.rules) if rule.is_shape_sensitive),
+                len(lookup.rules),
+            )
+            self.shape_limits[profile, chain] = (positions, first_sensitive)
+        if config.classifier.shape_cache_size:
+            self.shape_cache = cachetools.LRUCache(config.classifier.shape_cache_size)
+        else:
+            self.shape_cache = None
+
+    @staticmethod
+    def get_shape(vars):
+        """
+        Get shape of the event variables. Events of the same shape differ
+        only by the digits.
+        """
+        return tuple(sorted((k, str(v).translate(SHAPE_TRANS)) for k, v in vars.items()))
+
     def load_enumerations(self):
         logger.info("Loading enumerations")
         n = 0
@@ -143,8 +183,25 @@ class RuleSet(object):
         else:
             chain = "other"
         # Find rules lookup
-        lookup = self.rules.get((event.managed_object.profile.name, chain))
+        profile = event.managed_object.profile.name
+        lookup = self.rules.get((profile, chain))
         if lookup:
+            shape_key = None
+            if self.shape_cache is not None:
+                shape_key = (profile, chain, self.get_shape(vars))
+                r = self.shape_cache.get(shape_key)
+                if r is NO_MATCH:
+                    metrics["rules_shape_hits"] += 1
+                    return self.get_default_rule()
+                if r:
+                    # Check the rule which matched the event of the same shape
+                    metrics["rules_checked"] += 1
+                    v = r.match(event, vars)
+                    if v is not None:
+                        metrics["rules_shape_hits"] += 1
+                        return r, v
+                metrics["rules_shape_misses"] += 1
+            metrics["rules_lookups"] += 1
             for r in lookup.lookup_rules(event, vars):
                 # Try to match rule
                 metrics["rules_checked"] += 1
@@ -157,7 +214,31 @@ class RuleSet(object):
                         r.event_class_name,
                         r.name,
                     )
+                    if shape_key:
+                        self.update_shape_cache(shape_key, r)
                     return r, v
+            if shape_key:
+                self.update_shape_cache(shape_key, NO_MATCH)
+        return self.get_default_rule()
+
+    def update_shape_cache(self, shape_key, rule):
+        """
+        Cache lookup result for the shape.
+        The result is cacheable only when no preceding rule refers to digits.
+        Such rules may match the other event of the same shape.
+
+        :param shape_key: (profile, chain, shape)
+        :param rule: Matched rule or NO_MATCH
+        """
+        positions, first_sensitive = self.shape_limits[shape_key[:2]]
+        if rule is NO_MATCH:
+            if first_sensitive < len(positions):
+                return
+        elif positions[rule] > first_sensitive:
+            return
+        self.shape_cache[shape_key] = rule
+
+    def get_default_rule(self):
         if self.default_rule:
             return self.default_rule, {}
         return None, None
@@ -2,7 +2,7 @@
 # ---------------------------------------------------------------------
 # Classifier service
 # ---------------------------------------------------------------------
-# Copyright (C) 2007-2020 The NOC Project
+# Copyright (C) 2007-2022 The NOC Project
 # See LICENSE for details
 # ---------------------------------------------------------------------
 
@@ -14,7 +14,7 @@ from collections import defaultdict
 import operator
 import re
 from time import perf_counter
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Any
 
 # Third-party modules
 import cachetools
@@ -570,7 +570,7 @@ class ClassifierService(FastAPIService):
             se_id,
         )
         # Update suppressing event
-        ActiveEvent.log_suppression(se_id, event.timestamp)
+        ActiveEvent.log_suppression(se_id, event.timestamp, repeats=event.repeats)
         # Delete suppressed event
         metrics[CR_SUPPRESSED] += 1
         return True
@@ -738,16 +738,29 @@ class ClassifierService(FastAPIService):
         return False
 
     async def on_event(self, msg: Message):
-        # Decode message
-        event = orjson.loads(msg.value)
+        # Message may contain several newline-separated events
+        for value in msg.value.split(b"\n"):
+            await self.process_event(orjson.loads(value), msg.timestamp)
+
+    async def process_event(self, event: Dict[str, Any], timestamp: int):
+        """
+        Process decoded event
+
+        :param event: Event
+        :param timestamp: Message timestamp, in nanoseconds
+        """
         object = event.get("object")
         data = event.get("data")
         # Process event
         event_ts = datetime.datetime.fromtimestamp(event.get("ts"))
+        # Aggregated events carry the first message's timestamp
+        start_ts = event_ts
+        if "start_ts" in event:
+            start_ts = datetime.datetime.fromtimestamp(event["start_ts"])
         # Generate or reuse existing object id
         event_id = ObjectId(event.get("id"))
         # Calculate message processing delay
-        lag = (time.time() - float(msg.timestamp) / NS) * 1000
+        lag = (time.time() - float(timestamp) / NS) * 1000
         metrics["lag_us"] = int(lag * 1000)
         self.logger.debug("[%s] Receiving new event: %s (Lag: %.2fms)", event_id, data, lag)
         metrics[CR_PROCESSED] += 1
@@ -785,10 +798,10 @@ class ClassifierService(FastAPIService):
         event = ActiveEvent(
             id=event_id,
             timestamp=event_ts,
-            start_timestamp=event_ts,
+            start_timestamp=start_ts,
             managed_object=mo,
             source=source,
-            repeats=1,
+            repeats=event.get("repeats", 1),
         )  # raw_vars will be filled by classify_event()
         # Ignore event
         if self.patternset.find_ignore_rule(event, data):
@@ -1,7 +1,7 @@
 # ---------------------------------------------------------------------
 # Accelerated Rule Lookup
 # ---------------------------------------------------------------------
-# Copyright (C) 2007-2020 The NOC Project
+# Copyright (C) 2007-2022 The NOC Project
 # See LICENSE for details
 # ---------------------------------------------------------------------
 
@@ -9,21 +9,20 @@
 from collections import defaultdict
 import operator
 import logging
+import re
 import cachetools
-import sre_parse
 
-# Third-party modules
-# Manually setup esmre==1.0.0
 try:
-    import esmre as esm
-except (ModuleNotFoundError, ImportError):
-    raise NotImplementedError(
-        "XRuleLookup needed ESMRE library for worked. Please, install it from pip"
-    )
-import bitarray
+    # Python 3.11+, sre_parse and sre_constants are deprecated
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:
+    import sre_parse
+    import sre_constants
 
 # NOC modules
 from noc.services.classifier.rulelookup import RuleLookup
+from noc.core.ahocorasick import AhoCorasick
 from noc.core.perf import metrics
 
 
@@ -33,72 +32,72 @@ QSEP = "<<@>>"
 
 
 class XRuleLookup(RuleLookup):
+    """
+    Keyword prefilter over the rules.
+    Literals, mandatory for the pattern matching, are extracted from
+    the rule patterns and searched in the event variables at once.
+    Only the rules, having all their keywords found, are returned as candidates.
+    """
+
     _pattern_cache = {}
-    _parser_cache = {}
 
     def __init__(self, rules):
         super().__init__(sorted(rules, key=lambda x: x.preference))
-        self.index = esm.Index()
-        self.kwmask = None
+        self.index = AhoCorasick()
         self.rule_masks = []
-        self.initialize(rules)
+        self.initialize(self.rules)
 
     def initialize(self, rules):
         kw_rules = defaultdict(set)
-        rule_masks = {}
         # Collect keyword -> {rules} bindings
         for rule in rules:
-            for p in rule.rule.patterns:
-                if p.key_re in ("source", "^source$", "profile", "^profile$"):
-                    continue
+            for key_re, value_re in rule.patterns:
                 # Split to keywords
-                for pattern in (p.key_re, p.value_re):
+                for pattern in (key_re, value_re):
                     for keyword in self.parse(pattern):
                         kw_rules[keyword].add(rule)
-        self.kwmask = bitarray.bitarray(len(kw_rules))
-        self.kwmask.setall(False)
-        # Initialize rule keyword masks
-        for rule in rules:
-            rule_masks[rule] = self.kwmask.copy()
-        # Fill index
+        # Fill index, rule mask is a bitmask of required keywords
+        rule_masks = defaultdict(int)
         for kwi, keyword in enumerate(kw_rules):
-            self.index.enter(keyword, kwi)
+            self.index.add(keyword, kwi)
             for rule in kw_rules[keyword]:
-                rule_masks[rule][kwi] = 1
-        self.index.fix()
-        #
-        for rule in rules:
-            self.rule_masks += [(rule, rule_masks[rule])]
+                rule_masks[rule] |= 1 << kwi
+        self.index.build()
+        self.rule_masks = [(rule, rule_masks[rule]) for rule in rules]
+        logger.debug("%d rules are indexed by %d keywords", len(rules), len(kw_rules))
 
     def lookup_rules(self, event, vars):
         """
-        Perform event lookup and return first matched rules
+        Perform event lookup and return candidate rules, ordered by preference
         """
         query = QSEP.join("%s%s%s" % (k, QSEP, vars[k]) for k in vars)
-        metrics["esm_lookups"] += 1
-        kwm = self.kwmask.copy()
-        for _, kwi in self.index.query(query):
-            kwm[kwi] = 1
-        for rule, mask in self.rule_masks:
-            if mask & kwm == mask:
-                yield rule
+        metrics["xrule_lookups"] += 1
+        kwm = 0
+        for kwi in self.index.search(query):
+            kwm |= 1 << kwi
+        candidates = [rule for rule, mask in self.rule_masks if mask & kwm == mask]
+        metrics["xrule_candidates"] += len(candidates)
+        metrics["xrule_skipped"] += len(self.rule_masks) - len(candidates)
+        return candidates
 
     @classmethod
     @cachetools.cachedmethod(operator.attrgetter("_pattern_cache"))
     def parse(cls, s):
+        """
+        Extract literals, which must be present in the matched string.
+        Case-insensitive patterns have no keywords.
+        """
+        try:
+            parsed = sre_parse.parse(s)
+        except re.error:
+            return []
+        if parsed.state.flags & re.IGNORECASE:
+            return []
         keywords = []
         current = []
-        quoted = False
-        for t, x in sre_parse.parse(s):
-            if t == "literal":
-                if x == 92:  # \
-                    if quoted:
-                        current += ["\\"]
-                        quoted = False
-                    else:
-                        quoted = True
-                else:
-                    current += [chr(x)]
+        for t, x in parsed:
+            if t == sre_constants.LITERAL:
+                current += [chr(x)]
             elif current:
                 keywords += ["".join(current)]
                 current = []
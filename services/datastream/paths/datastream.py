@@ -6,7 +6,7 @@
 # ----------------------------------------------------------------------
 
 # Python modules
-from typing import Optional, List, Callable, Set
+from typing import Optional, List, Callable, Set, Dict, Tuple, AsyncIterable
 from http import HTTPStatus
 import time
 import cachetools
@@ -14,15 +14,16 @@ import logging
 import asyncio
 import threading
 import random
-from queue import Queue, Empty
 
 # Third-party modules
 from pymongo.errors import PyMongoError
 from fastapi import APIRouter, Query, Header, HTTPException, Response, Depends
+from fastapi.responses import StreamingResponse
 
 # NOC modules
 from noc.core.datastream.loader import loader
 from noc.core.datastream.base import DataStream
+from noc.core.datastream.notifier import ChangeNotifier
 from noc.config import config
 from noc.core.ioloop.util import setup_asyncio
 
@@ -32,6 +33,9 @@ logger = logging.getLogger(__name__)
 
 API_ACCESS_HEADER = "X-NOC-API-Access"
 
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+STREAM_KEEPALIVE = {"ndjson": "\n", "sse": ": keepalive\n\n"}
+
 
 @cachetools.cached
 def get_format_role(ds, fmt):
@@ -52,7 +56,11 @@ class DatastreamAPI(object):
         self.router = router
         self.openapi_tags = ["api", "datastream"]
         self.api_name = "datastream"
-        self.ds_queue = {}
+        self.ds_notifiers: Dict[str, ChangeNotifier] = {}
+        # (datastream, format) -> (expire, total)
+        self.total_cache: Dict[Tuple[str, Optional[str]], Tuple[float, int]] = {}
+        # (datastream, format) -> (expire, epoch)
+        self.epoch_cache: Dict[Tuple[str, Optional[str]], Tuple[float, Optional[str]]] = {}
         setup_asyncio()
         self.loop = asyncio.get_event_loop()
         self.setup_watchers()
@@ -72,16 +80,54 @@ class DatastreamAPI(object):
                 logger.info("[%s] Failed to initialize datastream", name)
         return r
 
-    async def wait(self, ds_name):
-        def notify(loop):
-            loop.call_soon(event.set)
-            # asyncio.get_running_loop().call_soon(event.set)
+    async def wait(self, ds_name: str, generation: Optional[int] = None) -> None:
+        """
+        Wait for datastream changes
 
-        if ds_name not in self.ds_queue:
+        :param ds_name: Datastream name
+        :param generation: Notifier generation, seen before last query
+        """
+        notifier = self.ds_notifiers.get(ds_name)
+        if not notifier:
             return
-        event = asyncio.Event()
-        self.ds_queue[ds_name].put(notify)
-        await event.wait()
+        if generation is None:
+            generation = notifier.generation
+        await notifier.wait(generation)
+
+    def get_generation(self, ds_name: str) -> Optional[int]:
+        """
+        Get current generation of datastream changes
+        """
+        notifier = self.ds_notifiers.get(ds_name)
+        if notifier:
+            return notifier.generation
+        return None
+
+    async def get_total(self, datastream: "DataStream", fmt: Optional[str] = None) -> int:
+        """
+        Get total amount of items in datastream, cached for `datastream.total_ttl`
+        """
+        key = (datastream.name, fmt)
+        now = time.monotonic()
+        r = self.total_cache.get(key)
+        if r and r[0] > now:
+            return r[1]
+        total = await datastream.get_total_async(fmt)
+        self.total_cache[key] = (now + config.datastream.total_ttl, total)
+        return total
+
+    async def get_epoch(self, datastream: "DataStream", fmt: Optional[str] = None) -> Optional[str]:
+        """
+        Get datastream epoch, cached for `datastream.total_ttl`
+        """
+        key = (datastream.name, fmt)
+        now = time.monotonic()
+        r = self.epoch_cache.get(key)
+        if r and r[0] > now:
+            return r[1]
+        epoch = await datastream.get_epoch_async(fmt)
+        self.epoch_cache[key] = (now + config.datastream.total_ttl, epoch)
+        return epoch
 
     @staticmethod
     def has_watch() -> bool:
@@ -117,39 +163,26 @@ class DatastreamAPI(object):
             logger.warning("Realtime change tracking is not available, using polling emulation.")
             has_watch = False
         # Start watcher threads
-        self.ds_queue = {}
+        self.ds_notifiers = {}
         for ds in self.get_datastreams():
             if has_watch and getattr(config.datastream, f"enable_{ds.name}_wait"):
                 waiter = self.watch_waiter
             else:
                 waiter = self.sleep_waiter
             logger.info("Starting %s waiter thread", ds.name)
-            queue = Queue()
-            self.ds_queue[ds.name] = queue
+            notifier = ChangeNotifier(self.loop)
+            self.ds_notifiers[ds.name] = notifier
             thread = threading.Thread(
-                target=waiter, args=(ds.get_collection(), queue), name=f"waiter-{ds.name}"
+                target=waiter, args=(ds.get_collection(), notifier), name=f"waiter-{ds.name}"
             )
             thread.setDaemon(True)
             thread.start()
 
-    def _run_callbacks(self, queue):
-        """
-        Execute callbacks from queue
-        :param queue:
-        :return:
-        """
-        while True:
-            try:
-                cb = queue.get(block=False)
-            except Empty:
-                break
-            cb(self.loop)
-
-    def watch_waiter(self, coll, queue):
+    def watch_waiter(self, coll, notifier: ChangeNotifier):
         """
         Waiter thread tracking mongo's ChangeStream
         :param coll:
-        :param queue:
+        :param notifier:
         :return:
         """
         while True:
@@ -159,17 +192,17 @@ class DatastreamAPI(object):
             ) as stream:
                 try:
                     for _ in stream:
-                        # Change received, call all pending callback
-                        self._run_callbacks(queue)
+                        # Change received, wake up all waiters
+                        notifier.notify()
                 except PyMongoError as e:
                     logger.error("Unrecoverable watch error: %s", e)
                     time.sleep(1)
 
-    def sleep_waiter(self, coll, queue):
+    def sleep_waiter(self, coll, notifier: ChangeNotifier):
         """
         Simple timeout waiter
         :param coll:
-        :param queue:
+        :param notifier:
         :return:
         """
         TIMEOUT = 60
@@ -177,7 +210,78 @@ class DatastreamAPI(object):
         while True:
             # Sleep timeout is random of [TIMEOUT - TIMEOUT * JITTER, TIMEOUT + TIMEOUT * JITTER]
             time.sleep(TIMEOUT + (random.random() - 0.5) * TIMEOUT * 2 * JITER)
-            self._run_callbacks(queue)
+            notifier.notify()
+
+    def get_stream_response(
+        self,
+        datastream: "DataStream",
+        mode: str,
+        limit: int,
+        filters: List[str],
+        change_id: Optional[str] = None,
+        fmt: Optional[str] = None,
+        filter_policy: Optional[str] = None,
+        total: int = 0,
+        epoch: Optional[str] = None,
+    ) -> StreamingResponse:
+        """
+        Push datastream records as soon as they are changed,
+        over single long-living response
+
+        :param mode: Streaming mode:
+            * ndjson - Newline-delimited JSON, record per line
+            * sse - Server-Sent Events, record per event, change id as event id
+        :param limit: Records per query, 0 - DEFAULT_LIMIT
+        :return:
+        """
+        # Same page size as iter_data_async uses, so the full page means more data
+        limit = min(limit or datastream.DEFAULT_LIMIT, datastream.DEFAULT_LIMIT)
+        if limit < 1:
+            raise HTTPException(status_code=HTTPStatus.BAD_REQUEST)
+        try:
+            datastream.compile_filters(filters)
+            if change_id:
+                datastream.clean_change_id(change_id)
+        except ValueError:
+            raise HTTPException(status_code=HTTPStatus.BAD_REQUEST)
+        keepalive = STREAM_KEEPALIVE[mode]
+        notifier = self.ds_notifiers.get(datastream.name)
+
+        async def iter_stream() -> AsyncIterable[str]:
+            nonlocal change_id
+            while True:
+                generation = notifier.generation if notifier else 0
+                n = 0
+                async for item_id, change_id, data in datastream.iter_data_async(
+                    limit=limit,
+                    filters=filters,
+                    change_id=change_id,
+                    fmt=fmt,
+                    filter_policy=filter_policy,
+                ):
+                    n += 1
+                    if mode == "sse":
+                        yield f"id: {change_id}\ndata: {data}\n\n"
+                    else:
+                        yield f"{data}\n"
+                if n >= limit:
+                    continue  # Has more data
+                if not notifier:
+                    break
+                if not await notifier.wait(generation, timeout=config.datastream.stream_keepalive):
+                    yield keepalive
+
+        headers = {
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            "X-NOC-DataStream-Total": str(total),
+            "X-NOC-DataStream-Limit": str(limit),
+        }
+        if epoch:
+            headers["X-NOC-DataStream-Epoch"] = epoch
+        return StreamingResponse(
+            iter_stream(), media_type=STREAM_MEDIA_TYPES[mode], headers=headers
+        )
 
     def get_datastream_handler(self, datastream: "DataStream") -> Callable:
         async def inner_datastream(
@@ -190,14 +294,29 @@ class DatastreamAPI(object):
                 None, alias="filter_policy", regex=r"^(default|delete|keep|move)$"
             ),
             block: Optional[int] = None,
+            stream: Optional[str] = Query(None, regex=r"^(ndjson|sse)$"),
+            last_event_id: Optional[str] = Header(None),
         ):
-            # Increase limit by 1 to detect datastream has more data
-            limit = min(limit, datastream.DEFAULT_LIMIT) + 1
             # Collect filters
             filters = ds_filter or []
             ids = ds_id or None
             if ids:
                 filters += ["id(%s)" % ",".join(ids)]
+            if stream:
+                # Server push mode, continue from last received event on reconnect
+                return self.get_stream_response(
+                    datastream,
+                    stream,
+                    limit=limit,
+                    filters=filters,
+                    change_id=ds_from or last_event_id,
+                    fmt=ds_format,
+                    filter_policy=ds_filter_policy,
+                    total=await self.get_total(datastream, ds_format),
+                    epoch=await self.get_epoch(datastream, ds_format),
+                )
+            # Increase limit by 1 to detect datastream has more data
+            limit = min(limit, datastream.DEFAULT_LIMIT) + 1
             # Start from change
             if ds_from:
                 change_id = ds_from
@@ -216,6 +335,7 @@ class DatastreamAPI(object):
             nr = 1
             while True:
                 r = []
+                generation = self.get_generation(datastream.name)
                 try:
                     async for item_id, change_id, data in datastream.iter_data_async(
                         limit=limit,
@@ -234,13 +354,13 @@ class DatastreamAPI(object):
                 except ValueError:
                     raise HTTPException(status_code=HTTPStatus.BAD_REQUEST)
                 if to_block and not r:
-                    await self.wait(datastream.name)
+                    await self.wait(datastream.name, generation)
                 else:
                     break
             headers = {
                 "Cache-Control": "no-cache",
                 "Content-Type": "application/json",
-                "X-NOC-DataStream-Total": str(datastream.get_total()),
+                "X-NOC-DataStream-Total": str(await self.get_total(datastream, fmt)),
                 "X-NOC-DataStream-Limit": str(limit),
             }
             if first_change:
@@ -249,6 +369,9 @@ class DatastreamAPI(object):
                 headers["X-NOC-DataStream-Last-Change"] = str(last_change)
             if nr == limit:
                 headers["X-NOC-DataStream-More"] = "1"
+            epoch = await self.get_epoch(datastream, fmt)
+            if epoch:
+                headers["X-NOC-DataStream-Epoch"] = epoch
             resp = ",".join(r)
             return Response(content=f"[{resp}]", headers=headers)
 
@@ -1,7 +1,7 @@
 # ----------------------------------------------------------------------
 # cfgsyslog datastream
 # ----------------------------------------------------------------------
-# Copyright (C) 2007-2020 The NOC Project
+# Copyright (C) 2007-2022 The NOC Project
 # See LICENSE for details
 # ----------------------------------------------------------------------
 
@@ -43,6 +43,8 @@ class CfgSyslogDataStream(DataStream):
             "object_profile__event_processing_policy",
             "syslog_archive_policy",
             "object_profile__syslog_archive_policy",
+            "object_profile__syslogcollector_rate_limit",
+            "object_profile__syslogcollector_rate_burst",
         )[:1]
         if not mo:
             raise KeyError()
@@ -68,6 +70,8 @@ class CfgSyslogDataStream(DataStream):
             mop_event_processing_policy,
             syslog_archive_policy,
             mop_syslog_archive_policy,
+            mop_syslogcollector_rate_limit,
+            mop_syslogcollector_rate_burst,
         ) = mo[0]
         # Check if object capable to receive syslog events
         if not is_managed or str(syslog_source_type) == "d":
@@ -97,6 +101,8 @@ class CfgSyslogDataStream(DataStream):
             "addresses": [],
             "process_events": effective_epp,
             "archive_events": effective_sap,
+            "rate_limit": mop_syslogcollector_rate_limit or 0,
+            "rate_burst": mop_syslogcollector_rate_burst or 0,
             "managed_object": {
                 "id": str(mo_id),
                 "bi_id": str(bi_id),
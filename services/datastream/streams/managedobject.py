@@ -8,7 +8,7 @@
 # Python modules
 from collections import defaultdict
 import operator
-from typing import Any, Optional, Dict, DefaultDict, List
+from typing import Any, Optional, Dict, DefaultDict, List, Set, Callable, Iterable
 
 # Third-party modules
 from bson import ObjectId
@@ -46,8 +46,34 @@ class ManagedObjectDataStream(DataStream):
 
     clean_id = DataStream.clean_id_int
 
+    # Section -> keys of stream object, filled by ._apply_<section>()
+    SECTIONS = {
+        "forwarding_instances": ["forwarding_instances"],
+        "interfaces": ["interfaces"],
+        "asset": ["asset"],
+    }
+
+    model_sections = {
+        "inv.Interface": ["interfaces"],
+        "inv.SubInterface": ["interfaces", "forwarding_instances"],
+        "inv.Link": ["interfaces"],
+        "inv.ForwardingInstance": ["forwarding_instances"],
+        "inv.Object": ["asset"],
+        "inv.ObjectConnection": ["asset"],
+    }
+
     @classmethod
     def get_object(cls, id):
+        return cls._get_object(id)
+
+    @classmethod
+    def get_object_sections(cls, id, sections: Set[str], current: Dict[str, Any]):
+        return cls._get_object(id, sections=sections, current=current)
+
+    @classmethod
+    def _get_object(
+        cls, id, sections: Optional[Set[str]] = None, current: Optional[Dict[str, Any]] = None
+    ):
         mo = ManagedObject.objects.filter(id=id)[:1]
         if not mo:
             raise KeyError()
@@ -84,13 +110,133 @@ class ManagedObjectDataStream(DataStream):
         cls._apply_administrative_domain(mo, r)
         cls._apply_object_profile(mo, r)
         cls._apply_chassis_id(mo, r)
-        cls._apply_forwarding_instances(mo, r)
-        cls._apply_interfaces(mo, r)
+        cls._apply_section("forwarding_instances", mo, r, sections, current)
+        cls._apply_section("interfaces", mo, r, sections, current)
         cls._apply_resource_groups(mo, r)
-        cls._apply_asset(mo, r)
+        cls._apply_section("asset", mo, r, sections, current)
         cls._apply_config(mo, r)
         return r
 
+    @classmethod
+    def _apply_section(
+        cls,
+        section: str,
+        mo: ManagedObject,
+        r,
+        sections: Optional[Set[str]],
+        current: Optional[Dict[str, Any]],
+    ):
+        """
+        Rebuild section or copy it from current object, when section is not changed
+        """
+        if current is None or section in sections:
+            getattr(cls, f"_apply_{section}")(mo, r)
+            return
+        for key in cls.SECTIONS[section]:
+            if key in current:
+                r[key] = current[key]
+
+    @staticmethod
+    def _get_related(mo: ManagedObject, name: str, query: Callable[[], Iterable]) -> List:
+        """
+        Get prefetched related data or query it directly
+        """
+        prefetched = ManagedObjectDataStream.get_prefetched(mo.id)
+        if prefetched and name in prefetched:
+            return prefetched[name]
+        return list(query())
+
+    @classmethod
+    def prefetch(
+        cls, ids: List[Any], sections: Optional[Set[str]] = None
+    ) -> Optional[Dict[Any, Dict[str, Any]]]:
+        if len(ids) < 2:
+            return None
+        ids = [cls.clean_id(x) for x in ids]
+        r: Dict[int, Dict[str, Any]] = {mo_id: {} for mo_id in ids}
+
+        def group(name: str, items: Iterable, key: Callable[[Any], Any]):
+            for mo_id in r:
+                r[mo_id][name] = []
+            for item in items:
+                mo_id = key(item)
+                if mo_id in r:
+                    r[mo_id][name] += [item]
+
+        # Chassis id is always rebuilt
+        group(
+            "discovery_id",
+            DiscoveryID.objects.filter(object__in=ids),
+            operator.attrgetter("object.id"),
+        )
+        if sections is None or "interfaces" in sections or "forwarding_instances" in sections:
+            group(
+                "subinterfaces",
+                SubInterface._get_collection().find({"managed_object": {"$in": ids}}),
+                operator.itemgetter("managed_object"),
+            )
+        if sections is None or "forwarding_instances" in sections:
+            group(
+                "forwarding_instances",
+                ForwardingInstance._get_collection().find({"managed_object": {"$in": ids}}),
+                operator.itemgetter("managed_object"),
+            )
+        if sections is None or "interfaces" in sections:
+            interfaces = list(Interface._get_collection().find({"managed_object": {"$in": ids}}))
+            group("interfaces", interfaces, operator.itemgetter("managed_object"))
+            # Links
+            for mo_id in r:
+                r[mo_id]["links"] = []
+            for link in Link._get_collection().find({"linked_objects": {"$in": ids}}):
+                for mo_id in link.get("linked_objects", []):
+                    if mo_id in r:
+                        r[mo_id]["links"] += [link]
+            # Linked interfaces
+            if_docs = {i["_id"]: i for i in interfaces}
+            missed = {
+                li
+                for mo_id in r
+                for link in r[mo_id]["links"]
+                for li in link.get("interfaces", [])
+                if li not in if_docs
+            }
+            if missed:
+                for i in Interface._get_collection().find(
+                    {"_id": {"$in": list(missed)}}, {"_id": 1, "managed_object": 1, "name": 1}
+                ):
+                    if_docs[i["_id"]] = i
+            for mo_id in r:
+                linked = {li for link in r[mo_id]["links"] for li in link.get("interfaces", [])}
+                r[mo_id]["linked_interfaces"] = [if_docs[li] for li in linked if li in if_docs]
+            # Services
+            svc_ids = [i["service"] for i in interfaces if i.get("service")]
+            services = (
+                {svc.id: svc for svc in Service.objects.filter(id__in=svc_ids)} if svc_ids else {}
+            )
+            for mo_id in r:
+                r[mo_id]["services"] = [
+                    services[i["service"]]
+                    for i in r[mo_id]["interfaces"]
+                    if i.get("service") in services
+                ]
+        if sections is None or "asset" in sections:
+            group(
+                "asset",
+                Object.objects.filter(
+                    __raw__={
+                        "data": {
+                            "$elemMatch": {
+                                "interface": "management",
+                                "attr": "managed_object",
+                                "value": {"$in": ids},
+                            }
+                        }
+                    }
+                ),
+                lambda o: o.get_data("management", "managed_object"),
+            )
+        return r
+
     @staticmethod
     def _apply_pool(mo, r):
         if mo.pool:
@@ -175,15 +321,23 @@ class ManagedObjectDataStream(DataStream):
     def _apply_forwarding_instances(mo: ManagedObject, r):
         instances = list(
             sorted(
-                ForwardingInstance._get_collection().find({"managed_object": mo.id}),
+                ManagedObjectDataStream._get_related(
+                    mo,
+                    "forwarding_instances",
+                    lambda: ForwardingInstance._get_collection().find({"managed_object": mo.id}),
+                ),
                 key=operator.itemgetter("name"),
             )
         )
         if not instances:
             return
         si_map: DefaultDict[ObjectId, List[str]] = defaultdict(list)
-        for doc in SubInterface._get_collection().find(
-            {"managed_object": mo.id}, {"_id": 0, "name": 1, "forwarding_instance": 1}
+        for doc in ManagedObjectDataStream._get_related(
+            mo,
+            "subinterfaces",
+            lambda: SubInterface._get_collection().find(
+                {"managed_object": mo.id}, {"_id": 0, "name": 1, "forwarding_instance": 1}
+            ),
         ):
             fi = doc.get("forwarding_instance")
             if fi:
@@ -212,7 +366,11 @@ class ManagedObjectDataStream(DataStream):
         ifcache = {}
         # Get interfaces
         interfaces = sorted(
-            Interface._get_collection().find({"managed_object": mo.id}),
+            ManagedObjectDataStream._get_related(
+                mo,
+                "interfaces",
+                lambda: Interface._get_collection().find({"managed_object": mo.id}),
+            ),
             key=lambda x: alnum_key(x["name"]),
         )
         # Populate cache
@@ -220,23 +378,38 @@ class ManagedObjectDataStream(DataStream):
             ifcache[i["_id"]] = (i["managed_object"], i["name"])
         # Get subs
         subs = defaultdict(list)
-        for s in SubInterface._get_collection().find({"managed_object": mo.id}):
+        for s in ManagedObjectDataStream._get_related(
+            mo,
+            "subinterfaces",
+            lambda: SubInterface._get_collection().find({"managed_object": mo.id}),
+        ):
             subs[s["interface"]] += [s]
         # Get links
         links = defaultdict(list)
-        for link in Link._get_collection().find({"linked_objects": mo.id}):
+        for link in ManagedObjectDataStream._get_related(
+            mo, "links", lambda: Link._get_collection().find({"linked_objects": mo.id})
+        ):
             for li in link.get("interfaces", []):
                 links[li] += [link]
         # Populate cache with linked interfaces
         if links:
-            for i in Interface._get_collection().find(
-                {"_id": {"$in": list(links)}}, {"_id": 1, "managed_object": 1, "name": 1}
+            for i in ManagedObjectDataStream._get_related(
+                mo,
+                "linked_interfaces",
+                lambda: Interface._get_collection().find(
+                    {"_id": {"$in": list(links)}}, {"_id": 1, "managed_object": 1, "name": 1}
+                ),
             ):
                 ifcache[i["_id"]] = (i["managed_object"], i["name"])
         # Get services
         svc_ids = [i["service"] for i in interfaces if i.get("service")]
         if svc_ids:
-            services = {svc.id: svc for svc in Service.objects.filter(id__in=svc_ids)}
+            services = {
+                svc.id: svc
+                for svc in ManagedObjectDataStream._get_related(
+                    mo, "services", lambda: Service.objects.filter(id__in=svc_ids)
+                )
+            }
         else:
             services = {}
         # Populate
@@ -339,9 +512,12 @@ class ManagedObjectDataStream(DataStream):
 
     @staticmethod
     def _apply_chassis_id(mo: ManagedObject, r):
-        di: DiscoveryID = DiscoveryID.objects.filter(object=mo.id).first()
+        di = ManagedObjectDataStream._get_related(
+            mo, "discovery_id", lambda: DiscoveryID.objects.filter(object=mo.id).limit(1)
+        )
         if not di:
             return
+        di: DiscoveryID = di[0]
         rr = {}
         if di.hostname:
             rr["hostname"] = str(di.hostname)
@@ -384,7 +560,10 @@ class ManagedObjectDataStream(DataStream):
 
     @staticmethod
     def _apply_asset(mo: ManagedObject, r):
-        asset = [ManagedObjectDataStream._get_asset(o) for o in mo.get_inventory()]
+        asset = [
+            ManagedObjectDataStream._get_asset(o)
+            for o in ManagedObjectDataStream._get_related(mo, "asset", mo.get_inventory)
+        ]
         if not asset:
             return
         r["asset"] = asset
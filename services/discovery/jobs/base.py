@@ -13,6 +13,7 @@ import zlib
 import datetime
 import types
 import operator
+import threading
 from io import StringIO
 from time import perf_counter
 
@@ -21,7 +22,7 @@ import bson
 import cachetools
 import orjson
 from pymongo import UpdateOne
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Set
 from builtins import str, object
 
 # NOC modules
@@ -49,6 +50,9 @@ from noc.core.span import Span
 from noc.core.cache.base import cache
 from noc.core.perf import metrics
 from noc.core.comp import smart_bytes
+from noc.core.script.caller import SessionContext
+from noc.config import config
+from .checkgraph import CheckGraph
 
 
 class MODiscoveryJob(PeriodicJob):
@@ -74,6 +78,9 @@ class MODiscoveryJob(PeriodicJob):
         self.service = self.scheduler.service
         # Additional artefacts can be passed between checks in one session
         self.artefacts = {}
+        # Protect shared state from concurrently running checks
+        self.caps_lock = threading.Lock()
+        self.confdb_lock = threading.Lock()
 
     def schedule_next(self, status):
         if self.check_timings:
@@ -131,6 +138,38 @@ class MODiscoveryJob(PeriodicJob):
                 return False
         return True
 
+    def run_check_graph(self, checks: List["DiscoveryCheck"]) -> None:
+        """
+        Run checks, concurrently when allowed by config and check dependencies
+
+        :param checks: List of checks, in order of preference
+        :return:
+        """
+        concurrency = config.discovery.check_concurrency
+        t = perf_counter()
+        CheckGraph(checks).run(concurrency=concurrency, worker_context=self.check_worker_context)
+        if concurrency > 1:
+            self.logger.info(
+                "%d checks are completed in %.2fms (concurrency %d)",
+                len(checks),
+                (perf_counter() - t) * 1000,
+                concurrency,
+            )
+
+    @contextlib.contextmanager
+    def check_worker_context(self):
+        """
+        Context for check's worker thread
+        """
+        smap = SessionContext.cv_sessions_smap.get()
+        if not smap or self.object.id not in smap:
+            yield
+            return
+        # CLI session cannot be shared between threads, open own one
+        SessionContext.cv_sessions_smap.set(None)
+        with self.object.open_session():
+            yield
+
     @contextlib.contextmanager
     def check_timer(self, name):
         t = perf_counter()
@@ -200,7 +239,8 @@ class MODiscoveryJob(PeriodicJob):
         return self.caps
 
     def update_caps(self, caps, source):
-        self.caps = self.object.update_caps(caps, source=source)
+        with self.caps_lock:
+            self.caps = self.object.update_caps(caps, source=source)
 
     def allow_sessions(self):
         r = self.object.can_cli_session()
@@ -495,6 +535,14 @@ class DiscoveryCheck(object):
     required_capabilities = None
     # If not None, check job has all required artefacts
     required_artefacts = None
+    # Artefacts (or pseudo-artefacts, like `caps`), set by check.
+    # Used to build dependencies between checks
+    provided_artefacts = None
+    # Artefacts, which must be set by preceding checks before the run.
+    # Unlike `required_artefacts`, missed artefacts are not a reason to skip the check
+    used_artefacts = None
+    # Run check alone, after all preceding and before all following checks
+    exclusive = False
     #
     fatal_errors = {
         ERR_CLI_AUTH_FAILED,
@@ -573,6 +621,24 @@ class DiscoveryCheck(object):
                 return False
         return True
 
+    @classmethod
+    def get_provided_artefacts(cls) -> Set[str]:
+        """
+        Get artefacts, set by check
+        """
+        return set(cls.provided_artefacts or [])
+
+    @classmethod
+    def get_used_artefacts(cls) -> Set[str]:
+        """
+        Get artefacts, which must be set by preceding checks
+        """
+        r = set(cls.used_artefacts or [])
+        r.update(cls.required_artefacts or [])
+        if cls.required_capabilities:
+            r.add("caps")
+        return r
+
     def run(self):
         if not self.is_enabled():
             self.logger.info("Check is disabled. Skipping")
@@ -880,19 +946,24 @@ class DiscoveryCheck(object):
         # Check cached value
         if hasattr(self, "confdb"):
             return self.confdb
-        # Check artefact
-        if self.has_artefact("confdb"):
-            self.confdb = self.get_artefact("confdb")
-            return self.confdb
-        # Create
-        self.logger.info("Building ConfDB")
-        self.confdb = self.object.get_confdb()
-        self.set_artefact("confdb", self.confdb)
+        # Concurrent checks must share single ConfDB
+        with self.job.confdb_lock:
+            # Check artefact
+            if self.has_artefact("confdb"):
+                self.confdb = self.get_artefact("confdb")
+                return self.confdb
+            # Create
+            self.logger.info("Building ConfDB")
+            self.confdb = self.object.get_confdb()
+            self.set_artefact("confdb", self.confdb)
         return self.confdb
 
 
 class TopologyDiscoveryCheck(DiscoveryCheck):
     NEIGHBOR_CACHE_VERSION = 1
+    # Topology methods are run one by one, most preferable first
+    provided_artefacts = ["topology"]
+    used_artefacts = ["interfaces", "topology"]
     # clean_interface settings
     aliased_names_only = False
 
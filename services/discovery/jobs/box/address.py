@@ -38,6 +38,7 @@ LOCAL_SRC = {SRC_MANAGEMENT, SRC_INTERFACE}
 
 class AddressCheck(DiscoveryCheck):
     name = "address"
+    used_artefacts = ["confdb", "interface_prefix", "vpn", "prefix"]
 
     def handler(self):
         self.propagated_prefixes = set()
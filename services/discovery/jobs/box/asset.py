@@ -40,6 +40,7 @@ class AssetCheck(DiscoveryCheck):
 
     name = "asset"
     required_script = "get_inventory"
+    provided_artefacts = ["asset"]
 
     _serial_masks = {}
     _serial_masks_lock = Lock()
@@ -20,6 +20,8 @@ class CapsCheck(PolicyDiscoveryCheck):
 
     name = "caps"
     required_script = "get_capabilities"
+    provided_artefacts = ["caps"]
+    used_artefacts = ["object_attributes", "confdb"]
 
     LLDP_QUERY = "Match('protocols', 'lldp', 'interface', X)"
     CDP_QUERY = "Match('protocols', 'cdp', 'interface', X)"
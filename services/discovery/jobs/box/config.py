@@ -17,6 +17,7 @@ class ConfigCheck(DiscoveryCheck):
 
     name = "config"
     required_script = "get_config"
+    provided_artefacts = ["config_changed", "config_acquired", "confdb"]
     fatal_errors = {}
 
     def handler(self):
@@ -16,6 +16,7 @@ class ConfigValidationCheck(DiscoveryCheck):
 
     name = "configvalidation"
     required_artefacts = ["config_acquired"]
+    used_artefacts = ["config_changed", "confdb", "interfaces"]
     umbrella_cls = "Config | Policy Violations"
 
     def handler(self):
@@ -23,6 +23,7 @@ class CPECheck(DiscoveryCheck):
     name = "cpe"
     required_script = "get_cpe"
     required_capabilities = ["CPE | Controller"]
+    provided_artefacts = ["cpe"]
 
     def handler(self):
         self.logger.info("Checking CPEs")
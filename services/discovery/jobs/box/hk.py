@@ -15,6 +15,7 @@ class HouseKeepingCheck(DiscoveryCheck):
     """
 
     name = "hk"
+    exclusive = True
 
     def handler(self):
         if self.object.object_profile.hk_handler:
@@ -17,6 +17,7 @@ class IDCheck(DiscoveryCheck):
 
     name = "id"
     required_script = "get_discovery_id"
+    used_artefacts = ["interface_macs"]
 
     def handler(self):
         self.logger.info("Checking chassis id")
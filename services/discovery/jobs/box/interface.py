@@ -33,6 +33,15 @@ class InterfaceCheck(PolicyDiscoveryCheck):
 
     name = "interface"
     required_script = "get_interfaces"
+    provided_artefacts = [
+        "interfaces",
+        "interface_macs",
+        "interface_vpn",
+        "interface_prefix",
+        "interface_assigned_vlans",
+    ]
+    # Interfaces are collated with inventory
+    used_artefacts = ["confdb", "asset"]
 
     AGG_QUERY = """Match("interfaces", if_name, "lag", "members", member)"""
 
@@ -94,59 +94,66 @@ class BoxDiscoveryJob(MODiscoveryJob):
                 self.run_checks()
 
     def run_checks(self):
-        if self.object.object_profile.enable_box_discovery_version:
-            VersionCheck(self).run()
-        if self.object.object_profile.enable_box_discovery_config:
-            ConfigCheck(self).run()
-        if self.object.object_profile.enable_box_discovery_caps:
-            CapsCheck(self).run()
-        if self.object.object_profile.enable_box_discovery_asset:
-            AssetCheck(self).run()
-        if self.object.object_profile.enable_box_discovery_interface:
-            InterfaceCheck(self).run()
-        if self.object.object_profile.enable_box_discovery_id:
-            IDCheck(self).run()
-        if self.object.object_profile.enable_box_discovery_config:
-            ConfigValidationCheck(self).run()
+        mop = self.object.object_profile
+        checks = []
+        if mop.enable_box_discovery_version:
+            checks += [VersionCheck(self)]
+        if mop.enable_box_discovery_config:
+            checks += [ConfigCheck(self)]
+        if mop.enable_box_discovery_caps:
+            checks += [CapsCheck(self)]
+        if mop.enable_box_discovery_asset:
+            checks += [AssetCheck(self)]
+        if mop.enable_box_discovery_interface:
+            checks += [InterfaceCheck(self)]
+        if mop.enable_box_discovery_id:
+            checks += [IDCheck(self)]
+        if mop.enable_box_discovery_config:
+            checks += [ConfigValidationCheck(self)]
         if VLANCheck.is_enabled_for_object(self.object):
-            VLANCheck(self).run()
-        if self.object.object_profile.enable_box_discovery_nri_portmap:
-            NRIPortmapperCheck(self).run()
-        if self.object.object_profile.enable_box_discovery_nri:
-            NRICheck(self).run()
-        if self.object.object_profile.enable_box_discovery_nri_service:
-            NRIServiceCheck(self).run()
-        if self.object.object_profile.enable_box_discovery_cpe:
-            CPECheck(self).run()
-        if self.object.object_profile.enable_box_discovery_cpestatus:
-            CPEStatusCheck(self).run()
-        if self.object.object_profile.enable_box_discovery_alarms:
-            AlarmsCheck(self).run()
-        if self.object.object_profile.enable_box_discovery_mac:
-            MACCheck(self).run()
+            checks += [VLANCheck(self)]
+        if mop.enable_box_discovery_nri_portmap:
+            checks += [NRIPortmapperCheck(self)]
+        if mop.enable_box_discovery_nri:
+            checks += [NRICheck(self)]
+        if mop.enable_box_discovery_nri_service:
+            checks += [NRIServiceCheck(self)]
+        if mop.enable_box_discovery_cpe:
+            checks += [CPECheck(self)]
+        if mop.enable_box_discovery_cpestatus:
+            checks += [CPEStatusCheck(self)]
+        if mop.enable_box_discovery_alarms:
+            checks += [AlarmsCheck(self)]
+        if mop.enable_box_discovery_mac:
+            checks += [MACCheck(self)]
         if VPNCheck.is_enabled_for_object(self.object):
-            VPNCheck(self).run()
+            checks += [VPNCheck(self)]
         if PrefixCheck.is_enabled_for_object(self.object):
-            PrefixCheck(self).run()
+            checks += [PrefixCheck(self)]
         if AddressCheck.is_enabled_for_object(self.object):
-            AddressCheck(self).run()
+            checks += [AddressCheck(self)]
         if self.object.enable_autosegmentation:
-            SegmentationCheck(self).run()
+            checks += [SegmentationCheck(self)]
+            # Segmentation may move object to the segment
+            # with other set of topology methods
+            self.run_check_graph(checks)
+            checks = []
         # Topology discovery
         # Most preferable methods first
         for m in self.object.segment.profile.get_topology_methods():
             check = self.TOPOLOGY_METHODS.get(m)
             if not check:
                 continue
-            if getattr(self.object.object_profile, "enable_box_discovery_%s" % check.name):
-                check(self).run()
-        if self.object.object_profile.enable_box_discovery_sla:
-            SLACheck(self).run()
-        if self.object.object_profile.enable_box_discovery_metrics:
-            MetricsCheck(self).run()
-        if self.object.object_profile.enable_box_discovery_hk:
-            HouseKeepingCheck(self).run()
-        DiagnosticCheck(self, run_order="E").run()
+            if getattr(mop, "enable_box_discovery_%s" % check.name):
+                checks += [check(self)]
+        if mop.enable_box_discovery_sla:
+            checks += [SLACheck(self)]
+        if mop.enable_box_discovery_metrics:
+            checks += [MetricsCheck(self)]
+        if mop.enable_box_discovery_hk:
+            checks += [HouseKeepingCheck(self)]
+        checks += [DiagnosticCheck(self, run_order="E")]
+        self.run_check_graph(checks)
 
     def get_running_policy(self):
         return self.object.get_effective_box_discovery_running_policy()
@@ -22,6 +22,8 @@ class NRICheck(TopologyDiscoveryCheck):
     """
 
     name = "nri"
+    provided_artefacts = ["topology", "nri"]
+    used_artefacts = ["interfaces", "topology", "nri_portmap"]
     aliased_names_only = True
 
     def handler(self):
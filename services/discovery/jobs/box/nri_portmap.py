@@ -24,6 +24,8 @@ class NRIPortmapperCheck(DiscoveryCheck):
     """
 
     name = "nri_portmap"
+    provided_artefacts = ["nri_portmap"]
+    used_artefacts = ["interfaces"]
 
     def handler(self):
         self.logger.info("NRI Portmapper")
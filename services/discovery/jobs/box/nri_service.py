@@ -25,6 +25,7 @@ class NRIServiceCheck(DiscoveryCheck):
     """
 
     name = "nri_service"
+    used_artefacts = ["interfaces", "nri"]
 
     def handler(self):
         self.logger.info("NRI Service Mapper")
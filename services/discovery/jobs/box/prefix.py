@@ -38,6 +38,8 @@ LOCAL_SRC = {SRC_INTERFACE}
 
 class PrefixCheck(DiscoveryCheck):
     name = "prefix"
+    provided_artefacts = ["prefix"]
+    used_artefacts = ["confdb", "interface_prefix", "vpn"]
 
     def handler(self):
         self.propagated_prefixes = set()
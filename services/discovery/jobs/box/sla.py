@@ -20,6 +20,8 @@ class SLACheck(DiscoveryCheck):
 
     name = "sla"
     required_script = "get_sla_probes"
+    provided_artefacts = ["sla"]
+    used_artefacts = ["caps"]
 
     PROFILE_CAPS = {
         #
@@ -21,6 +21,9 @@ class VersionCheck(DiscoveryCheck):
 
     name = "version"
     required_script = "get_version"
+    provided_artefacts = ["object_attributes"]
+    # Platform and firmware changes affect all following checks
+    exclusive = True
 
     def handler(self):
         self.logger.info("Checking version")
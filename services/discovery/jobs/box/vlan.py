@@ -37,6 +37,7 @@ class VLANCheck(PolicyDiscoveryCheck):
     name = "vlan"
     required_script = "get_vlans"
     # @todo: required_capabilities = ?
+    used_artefacts = ["confdb", "interface_assigned_vlans"]
 
     VLAN_QUERY = """(
         Match("virtual-router", vr, "forwarding-instance", fi, "vlans", vlan) or
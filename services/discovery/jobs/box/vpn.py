@@ -29,6 +29,8 @@ PREF_VALUE = {SRC_INTERFACE: 0, SRC_MPLS: 1, SRC_CONFDB: 2, SRC_MANUAL: 3}
 
 class VPNCheck(DiscoveryCheck):
     name = "vpn"
+    provided_artefacts = ["vpn"]
+    used_artefacts = ["confdb", "interface_vpn"]
 
     VRF_QUERY = """(Match("virtual-router", vr, "forwarding-instance", name) or
         Match("virtual-router", vr, "forwarding-instance", name, "type", type) or
@@ -21,6 +21,7 @@ class XMACCheck(TopologyDiscoveryCheck):
     """
 
     name = "xmac"
+    used_artefacts = ["interfaces", "topology", "mac_direct_downlink"]
 
     def handler(self):
         macs = self.get_artefact("mac_direct_downlink")
@@ -0,0 +1,141 @@
+# ---------------------------------------------------------------------
+# Discovery checks dependency graph
+# ---------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ---------------------------------------------------------------------
+
+# Python modules
+import contextlib
+import contextvars
+import threading
+from collections import defaultdict
+from queue import Queue
+from typing import List, Set, Dict, Optional, Callable, ContextManager, Any
+
+
+class CheckGraph(object):
+    """
+    Run discovery checks according to artefact dependencies.
+
+    Check depends on all preceding checks, providing any of artefacts it uses.
+    Exclusive check depends on all preceding checks, and all following checks
+    depend on exclusive one. Dependencies always point backwards,
+    so graph is acyclic and dependent checks keep their relative order.
+    """
+
+    def __init__(self, checks: List[Any]):
+        self.checks = checks
+        self.deps = self.get_dependencies(checks)
+
+    @staticmethod
+    def get_dependencies(checks: List[Any]) -> List[Set[int]]:
+        """
+        Build dependencies
+
+        :param checks: List of checks, in original order
+        :return: List of sets of check indexes, which must be completed before each check
+        """
+        deps: List[Set[int]] = []
+        providers: Dict[str, List[int]] = defaultdict(list)
+        last_exclusive: Optional[int] = None
+        for i, check in enumerate(checks):
+            if check.exclusive:
+                d = set(range(i))
+                last_exclusive = i
+            else:
+                d = set()
+                for a in check.get_used_artefacts():
+                    d.update(providers.get(a, []))
+                if last_exclusive is not None:
+                    d.add(last_exclusive)
+            for a in check.get_provided_artefacts():
+                providers[a] += [i]
+            deps += [d]
+        return deps
+
+    def run(
+        self,
+        concurrency: int = 1,
+        worker_context: Optional[Callable[[], ContextManager]] = None,
+    ) -> None:
+        """
+        Run checks
+
+        :param concurrency: Maximal amount of concurrently running checks.
+            Checks are run one by one in original order, when less than 2
+        :param worker_context: Context manager factory, applied around each worker thread
+        :return:
+        """
+        if concurrency < 2 or len(self.checks) < 2:
+            for check in self.checks:
+                check.run()
+            return
+        n_workers = min(concurrency, len(self.checks))
+        tasks: Queue = Queue()
+        done: Queue = Queue()
+        workers = [
+            threading.Thread(
+                target=contextvars.copy_context().run,
+                args=(self.worker, tasks, done, worker_context),
+                name="check-%d" % n,
+                daemon=True,
+            )
+            for n in range(n_workers)
+        ]
+        for w in workers:
+            w.start()
+        pending = set(range(len(self.checks)))
+        running: Set[int] = set()
+        completed: Set[int] = set()
+        error: Optional[BaseException] = None
+        try:
+            while pending or running:
+                for i in sorted(pending):
+                    if len(running) >= n_workers:
+                        break
+                    if self.deps[i] <= completed:
+                        pending.remove(i)
+                        running.add(i)
+                        tasks.put(i)
+                i, e = done.get()
+                running.remove(i)
+                completed.add(i)
+                if e and not error:
+                    # Wait for running checks and stop
+                    error = e
+                    pending = set()
+        finally:
+            for _ in workers:
+                tasks.put(None)
+            for w in workers:
+                w.join()
+        if error:
+            raise error
+
+    def worker(
+        self,
+        tasks: Queue,
+        done: Queue,
+        worker_context: Optional[Callable[[], ContextManager]] = None,
+    ) -> None:
+        stopped = False
+        try:
+            with worker_context() if worker_context else contextlib.nullcontext():
+                while True:
+                    i = tasks.get()
+                    if i is None:
+                        stopped = True
+                        break
+                    try:
+                        self.checks[i].run()
+                        done.put((i, None))
+                    except BaseException as e:
+                        done.put((i, e))
+        except BaseException as e:
+            # Worker context is failed, reject all following tasks
+            while not stopped:
+                i = tasks.get()
+                if i is None:
+                    break
+                done.put((i, e))
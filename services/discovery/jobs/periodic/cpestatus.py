@@ -20,6 +20,7 @@ class CPEStatusCheck(DiscoveryCheck):
 
     name = "cpestatus"
     required_script = "get_cpe_status"
+    used_artefacts = ["caps", "cpe"]
     possible_capabilities = {"Network | PON | OLT"}
     UNKNOWN_STATUS = "unknown"
     ACTIVE_STATUS = "active"
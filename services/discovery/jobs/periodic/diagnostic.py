@@ -36,6 +36,8 @@ class DiagnosticCheck(DiscoveryCheck):
     """
 
     name = "diagnostic"
+    # Diagnostics are built from the results of all preceding checks
+    exclusive = True
     CHECKERS: Dict[str, Checker] = {}  # Checkers Instance
     CHECK_MAP: Dict[str, str] = {}  # CheckName -> CheckerName mapping
 
@@ -18,6 +18,8 @@ from noc.services.discovery.jobs.base import DiscoveryCheck
 from noc.core.perf import metrics
 from noc.core.mac import MAC
 from noc.inv.models.discoveryid import DiscoveryID
+from noc.bi.models.mac import MAC as MACModel
+from noc.core.clickhouse.rowbinary import get_model_encoder
 
 
 class MACCheck(DiscoveryCheck):
@@ -27,6 +29,8 @@ class MACCheck(DiscoveryCheck):
 
     name = "mac"
     required_script = "get_mac_address_table"
+    provided_artefacts = ["seen_objects", "mac_direct_downlink"]
+    used_artefacts = ["interfaces"]
     XMAC_POLICIES = ("i", "c", "C")
     XMAC_FILTER_TYPE = {"D", "S"}  # Only Dynamic and Static MAC collected
 
@@ -109,7 +113,7 @@ class MACCheck(DiscoveryCheck):
         metrics["discovery_mac_ignored_macs"] += total_macs - processed_macs
         if data:
             self.logger.info("%d MAC addresses are collected. Sending", processed_macs)
-            self.service.register_metrics("mac", data)
+            self.service.register_metrics("mac", data, encoder=get_model_encoder(MACModel))
             if collect_if_objects:
                 self.build_seen_objects(if_mac)
         else:
@@ -44,6 +44,7 @@ class MetricsCheck(DiscoveryCheck):
 
     name = "metrics"
     required_script = "get_metrics"
+    used_artefacts = ["caps", "interfaces", "sla"]
 
     SLA_CAPS = ["Cisco | IP | SLA | Probes"]
 
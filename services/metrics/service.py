@@ -34,6 +34,7 @@ from noc.core.cdag.node.probe import ProbeNode, ProbeNodeConfig
 from noc.core.cdag.node.composeprobe import ComposeProbeNode, ComposeProbeNodeConfig
 from noc.core.cdag.node.alarm import AlarmNode, VarItem
 from noc.core.cdag.graph import CDAG
+from noc.core.cdag.plan import ExecutionPlan
 from noc.core.cdag.factory.scope import MetricScopeCDAGFactory
 from noc.core.cdag.factory.config import ConfigCDAGFactory, GraphConfig
 from noc.services.metrics.changelog import ChangeLog
@@ -43,6 +44,9 @@ from noc.config import config as global_config
 
 # MetricKey - scope, key ctx: (managed_object, <bi_id>), Key Labels
 MetricKey = Tuple[str, Tuple[Tuple[str, Any], ...], Tuple[str, ...]]
+# Minimal amount of the key's items in message to activate card by batch transaction.
+# See scripts/bench-metrics-batch.py
+BATCH_MIN_ITEMS = 64
 
 
 def unscope(x):
@@ -64,12 +68,13 @@ class Card(object):
     Store Input probe nodes
     """
 
-    __slots__ = ("alarms", "probes", "senders", "is_dirty", "affected_rules")
+    __slots__ = ("alarms", "probes", "senders", "is_dirty", "affected_rules", "plan")
     probes: Dict[str, BaseCDAGNode]
     senders: Tuple[BaseCDAGNode]
     alarms: List[AlarmNode]
     affected_rules: Set[str]
     is_dirty: bool
+    plan: Optional[ExecutionPlan]
 
     def get_sender(self, name: str) -> Optional[BaseCDAGNode]:
         """
@@ -79,6 +84,23 @@ class Card(object):
         """
         return next((s for s in self.senders if s.config.scope == name), None)
 
+    def get_plan(self) -> ExecutionPlan:
+        """
+        Get compiled execution plan for the card subgraph.
+        Compile on first use after the card structure has been changed
+        :return:
+        """
+        if self.plan is None:
+            self.plan = ExecutionPlan.compile(list(self.probes.values()) + list(self.senders))
+        return self.plan
+
+    def reset_plan(self):
+        """
+        Drop compiled execution plan on card structure change
+        :return:
+        """
+        self.plan = None
+
     @classmethod
     def iter_subscribed_nodes(cls, node) -> Iterable[BaseCDAGNode]:
         """
@@ -105,6 +127,7 @@ class Card(object):
                 if s.node in self.senders or s.node in self.probes or s.node in self.alarms:
                     continue
                 probe.unsubscribe(s.node, s.input)
+        self.reset_plan()
         self.set_dirty()
 
     def set_dirty(self):
@@ -160,6 +183,87 @@ class Rule(object):
         return update_configs
 
 
+class RuleIndex(object):
+    """
+    Inverted index scope -> label -> Rules.
+    Every match labels set of the rule is indexed by single label,
+    so the rule is the candidate only if source contains this label.
+    Rules with empty match labels set are matched for every source of scope
+    """
+
+    def __init__(self):
+        self.labels: Dict[str, Dict[str, Set[str]]] = defaultdict(lambda: defaultdict(set))
+        self.wildcard: Dict[str, Set[str]] = defaultdict(set)
+        # Rule id -> (scope, label). Label is None for wildcard rules
+        self.rule_keys: Dict[str, Set[Tuple[str, Optional[str]]]] = {}
+        # Rule id -> Order. Preserve rules order on apply
+        self.seq: Dict[str, int] = {}
+        self.last_seq = 0
+
+    def __len__(self) -> int:
+        return len(self.rule_keys)
+
+    def add(self, rule: Rule) -> None:
+        """
+        Add or replace rule
+        :param rule:
+        :return:
+        """
+        if rule.id in self.rule_keys:
+            self.remove(rule.id, keep_order=True)
+        keys = set()
+        for scope in rule.match_scopes:
+            for ml in rule.match_labels:
+                keys.add((scope, min(ml) if ml else None))
+        for scope, label in keys:
+            if label is None:
+                self.wildcard[scope].add(rule.id)
+            else:
+                self.labels[scope][label].add(rule.id)
+        self.rule_keys[rule.id] = keys
+        if rule.id not in self.seq:
+            self.last_seq += 1
+            self.seq[rule.id] = self.last_seq
+
+    def remove(self, rule_id: str, keep_order: bool = False) -> None:
+        """
+        Remove rule from index
+        :param rule_id: Rule Id
+        :param keep_order: Do not reset rule order (for replace)
+        :return:
+        """
+        for scope, label in self.rule_keys.pop(rule_id, ()):
+            if label is None:
+                self.wildcard[scope].discard(rule_id)
+                continue
+            s_index = self.labels[scope]
+            s_index[label].discard(rule_id)
+            if not s_index[label]:
+                del s_index[label]
+        if not keep_order:
+            self.seq.pop(rule_id, None)
+
+    def get_candidates(self, scope: str, labels: Set[str]) -> List[str]:
+        """
+        Get ordered list of rule ids that may be matched by labels
+        :param scope: Metric scope
+        :param labels: Source labels
+        :return:
+        """
+        r = set(self.wildcard.get(scope, ()))
+        s_index = self.labels.get(scope)
+        if s_index:
+            if len(labels) < len(s_index):
+                for label in labels:
+                    if label in s_index:
+                        r |= s_index[label]
+            else:
+                for label, rules in s_index.items():
+                    if label in labels:
+                        r |= rules
+        return sorted(r, key=self.seq.__getitem__)
+
+
 @dataclass(frozen=True)
 class ItemConfig(object):
     """
@@ -268,6 +372,7 @@ class MetricsService(FastAPIService):
         self.rules_ready_event = asyncio.Event()
         self.dispose_partitions: Dict[str, int] = {}
         self.rules: Dict[str, Rule] = {}  # Action -> Graph Config
+        self.rule_index = RuleIndex()
         self.lazy_init: bool = True
         self.disable_spool: bool = global_config.metrics.disable_spool
         self.source_metrics: Dict[Tuple[str, int], List[MetricKey]] = defaultdict(list)
@@ -364,6 +469,8 @@ class MetricsService(FastAPIService):
         data = orjson.loads(msg.value)
         state = {}
         metrics["messages"] += 1
+        # Group items by key, preserving order of items within the key
+        batches: Dict[MetricKey, Tuple[ScopeInfo, List[str], List[Dict[str, Any]]]] = {}
         for item in data:
             scope = item.get("scope")
             if not scope:
@@ -389,11 +496,20 @@ class MetricsService(FastAPIService):
                 self.logger.debug("Missed key label: %s", item)
                 metrics["discard", ("reason", "missed_keylabel")] += 1
                 return  # Missed key label
+            batch = batches.get(mk)
+            if batch:
+                batch[2].append(item)
+            else:
+                batches[mk] = (si, labels, [item])
+        # Resolve card once per key and activate all the key's items
+        for mk, (si, labels, items) in batches.items():
             card = await self.get_card(mk, labels)
             if not card:
-                self.logger.info("Cannot instantiate card: %s", item)
+                self.logger.info("Cannot instantiate card: %s", mk)
                 return  # Cannot instantiate card
-            state.update(self.activate_card(card, si, mk, item))
+            metrics["card_batches"] += 1
+            metrics["card_batch_items"] += len(items)
+            state.update(self.activate_card_batch(card, si, mk, items))
         # Save state change
         if state:
             await self.change_log.feed(state)
@@ -575,6 +691,7 @@ class MetricsService(FastAPIService):
             alarms=[],
             affected_rules=set(),
             is_dirty=False,
+            plan=None,
         )
 
     async def get_dispose_partitions(self, pool: str) -> int:
@@ -624,6 +741,7 @@ class MetricsService(FastAPIService):
         p.subscribe(sender, metric_field, dynamic=True, mark_bound=False)
         p.freeze()
         card.probes[unscope(metric_field)] = p
+        card.reset_plan()
         #
         metrics["cdag_nodes", ("type", p.name)] += 1
         return p
@@ -698,9 +816,16 @@ class MetricsService(FastAPIService):
             return
         s_labels = set(self.merge_labels(source.labels, labels))
         # Appy matched rules
-        for rule_id, rule in self.rules.items():
-            if k[0] not in rule.match_scopes or not rule.is_matched(s_labels):
+        candidates = self.rule_index.get_candidates(k[0], s_labels)
+        metrics["rules_index_lookups"] += 1
+        metrics["rules_index_skipped"] += len(self.rules) - len(candidates)
+        metrics["rules_index_candidates"] += len(candidates)
+        for rule_id in candidates:
+            rule = self.rules[rule_id]
+            if not rule.is_matched(s_labels):
+                metrics["rules_index_misses"] += 1
                 continue
+            metrics["rules_index_hits"] += 1
             nodes: Dict[str, BaseCDAGNode] = {}
             # Node
             for node in rule.graph.nodes.values():
@@ -767,6 +892,7 @@ class MetricsService(FastAPIService):
             #
             card.affected_rules.add(sys.intern(rule_id))
         card.is_dirty = False
+        card.reset_plan()
         # Add complex probe
         for cp_metric_filed in source.composed_metrics:
             cp = self.add_probe(cp_metric_filed, k, is_composed=True)
@@ -779,15 +905,16 @@ class MetricsService(FastAPIService):
                     p.subscribe(cp, m_field, dynamic=True, mark_bound=False)
             self.logger.debug("Add compose node: %s", cp)
 
-    def activate_card(
+    def get_activations(
         self, card: Card, si: ScopeInfo, k: MetricKey, data: Dict[str, Any]
-    ) -> Dict[str, Dict[str, Any]]:
+    ) -> List[Tuple[BaseCDAGNode, str, Any]]:
         """
-        Activate card and return changed state
+        Get card inputs for the item, in activation order.
+        Lazy probes are created on the way
         """
         units: Dict[str, str] = data.get("_units") or {}
-        tx = self.graph.begin()
         ts = data["ts"]
+        r: List[Tuple[BaseCDAGNode, str, Any]] = []
         for n in data:
             mu = units.get(n) or si.units.get(n)
             if not mu:
@@ -797,19 +924,49 @@ class MetricsService(FastAPIService):
                 probe = self.add_probe(n, k)
             if not probe or probe.name == ComposeProbeNode.name:  # Skip composed probe
                 continue
-            probe.activate(tx, "ts", ts)
-            probe.activate(tx, "x", data[n])
-            probe.activate(tx, "unit", mu)
+            r += [(probe, "ts", ts), (probe, "x", data[n]), (probe, "unit", mu)]
         # Activate senders
         for sender in card.senders:
             for kf in si.key_fields:
                 kv = data.get(kf)
                 if kv is not None:
-                    sender.activate(tx, kf, kv)
+                    r.append((sender, kf, kv))
             if si.enable_timedelta and "time_delta" in data:
-                sender.activate(tx, "time_delta", data["time_delta"])
-            sender.activate(tx, "ts", ts)
-            sender.activate(tx, "labels", data.get("labels") or [])
+                r.append((sender, "time_delta", data["time_delta"]))
+            r += [(sender, "ts", ts), (sender, "labels", data.get("labels") or [])]
+        return r
+
+    def activate_card(
+        self, card: Card, si: ScopeInfo, k: MetricKey, data: Dict[str, Any]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Activate card and return changed state
+        """
+        activations = self.get_activations(card, si, k, data)
+        # Lazy probes may change the card, so get plan after the probes are collected
+        tx = card.get_plan().begin()
+        for node, name, value in activations:
+            tx.activate(node, name, value)
+        return tx.get_changed_state()
+
+    def activate_card_batch(
+        self, card: Card, si: ScopeInfo, k: MetricKey, items: List[Dict[str, Any]]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Activate card by the sequence of the key's items and return changed state.
+        Long sequences are calculated together by the batch transaction,
+        each node sees the items in original order
+        """
+        if len(items) < BATCH_MIN_ITEMS:
+            state: Dict[str, Dict[str, Any]] = {}
+            for item in items:
+                state.update(self.activate_card(card, si, k, item))
+            return state
+        activations = [self.get_activations(card, si, k, item) for item in items]
+        tx = card.get_plan().begin_batch(len(items))
+        for i, item_activations in enumerate(activations):
+            tx.activate_sample(i, item_activations)
+        tx.commit()
         return tx.get_changed_state()
 
     @staticmethod
@@ -1002,6 +1159,7 @@ class MetricsService(FastAPIService):
             r_id = sys.intern(r.id)
             if r_id not in self.rules:
                 self.rules[r_id] = r
+                self.rule_index.add(r)
                 # For new Rules (after card create)
                 self.logger.info("[%s] Add new rule", r.id)
                 await self.invalidate_card_rules(invalidate_rules, is_new=True)
@@ -1015,6 +1173,7 @@ class MetricsService(FastAPIService):
                 # Invalidate Cards
                 self.logger.info("[%s] %s Changed. Invalidate cards for rules", r.id, diff)
                 self.rules[r_id] = r
+                self.rule_index.add(r)
                 invalidate_rules.add(r_id)
         if invalidate_rules:
             await self.invalidate_card_rules(invalidate_rules)
@@ -1034,6 +1193,7 @@ class MetricsService(FastAPIService):
             await self.invalidate_card_rules(invalidate_rules, is_delete=True)
         for r in invalidate_rules:
             del self.rules[r]
+            self.rule_index.remove(r)
 
     async def on_rules_ready(self) -> None:
         """
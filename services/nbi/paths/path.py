@@ -308,7 +308,12 @@ class PathAPI(NBIAPI):
             }
 
         finder = KSPFinder(
-            start, goal, constraint=constraints, max_depth=max_depth, n_shortest=n_shortest
+            start,
+            goal,
+            constraint=constraints,
+            max_depth=max_depth,
+            n_shortest=n_shortest,
+            use_snapshot=True,
         )
         for path in finder.iter_shortest_paths():  # type: List[PathInfo]
             last: Dict[str, ManagedObject] = {"obj": start}
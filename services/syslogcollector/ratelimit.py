@@ -0,0 +1,108 @@
+# ----------------------------------------------------------------------
+# Per-source rate limit and storm aggregation
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Python modules
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+# NOC modules
+from noc.core.perf import metrics
+from noc.core.ratelimit.tokenbucket import TokenBucket
+from .sourceconfig import SourceConfig
+
+
+@dataclass
+class AggregatedMessage(object):
+    cfg: SourceConfig
+    message: str
+    facility: int
+    severity: int
+    source_address: Optional[str]
+    first_ts: int
+    last_ts: int
+    repeats: int = 1
+
+
+class SourceRateLimit(object):
+    """
+    Per-source syslog rate limit.
+
+    Each source with non-zero `rate_limit` gets a token bucket.
+    Messages are passed while the source has tokens. Once the source is over its limit,
+    identical messages (same facility, severity and text) are collapsed into
+    the single aggregated message, keeping repeat count and first/last timestamps.
+    Aggregated messages are to be collected by `flush` periodically.
+    """
+
+    def __init__(self):
+        self.buckets: Dict[str, TokenBucket] = {}
+        # (source id, facility, severity, message) -> aggregated message
+        self.aggregated: Dict[Tuple[str, int, int, str], AggregatedMessage] = {}
+
+    def get_bucket(self, cfg: SourceConfig) -> TokenBucket:
+        bucket = self.buckets.get(cfg.id)
+        if (
+            not bucket
+            or bucket.rate != cfg.rate_limit
+            or bucket.burst != (cfg.rate_burst or max(cfg.rate_limit, 1))
+        ):
+            # New source or changed settings
+            bucket = TokenBucket(float(cfg.rate_limit), cfg.rate_burst or None)
+            self.buckets[cfg.id] = bucket
+        return bucket
+
+    def is_allowed(
+        self,
+        cfg: SourceConfig,
+        timestamp: int,
+        message: str,
+        facility: int,
+        severity: int,
+        source_address: Optional[str] = None,
+    ) -> bool:
+        """
+        Check if message may be sent. Aggregate it otherwise.
+
+        :return: True, if message may be sent, False if aggregated
+        """
+        if not cfg.rate_limit:
+            return True
+        key = (cfg.id, facility, severity, message)
+        agg = self.aggregated.get(key)
+        if agg:
+            # Storm in progress
+            agg.repeats += 1
+            agg.last_ts = max(agg.last_ts, timestamp)
+            metrics["syslog_rate_limited"] += 1
+            return False
+        if self.get_bucket(cfg).consume():
+            return True
+        self.aggregated[key] = AggregatedMessage(
+            cfg=cfg,
+            message=message,
+            facility=facility,
+            severity=severity,
+            source_address=source_address,
+            first_ts=timestamp,
+            last_ts=timestamp,
+        )
+        metrics["syslog_rate_limited"] += 1
+        return False
+
+    def flush(self) -> List[AggregatedMessage]:
+        """
+        Get and reset aggregated messages
+        """
+        r = list(self.aggregated.values())
+        self.aggregated = {}
+        return r
+
+    def reset(self, source_id: str) -> None:
+        """
+        Forget source's bucket
+        """
+        self.buckets.pop(source_id, None)
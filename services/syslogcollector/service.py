@@ -2,7 +2,7 @@
 # ---------------------------------------------------------------------
 # Syslog Collector service
 # ---------------------------------------------------------------------
-# Copyright (C) 2007-2020 The NOC Project
+# Copyright (C) 2007-2022 The NOC Project
 # See LICENSE for details
 # ---------------------------------------------------------------------
 
@@ -11,8 +11,9 @@ import datetime
 import asyncio
 import uuid
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import asdict
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Tuple, Any
 
 # Third-party modules
 import orjson
@@ -31,9 +32,11 @@ from noc.core.mx import (
     MX_H_VALUE_SPLITTER,
 )
 from noc.core.ioloop.timers import PeriodicCallback
+from noc.core.liftbridge.queuebuffer import QBuffer
 from noc.services.syslogcollector.syslogserver import SyslogServer
 from noc.services.syslogcollector.datastream import SysologDataStreamClient
 from noc.services.syslogcollector.sourceconfig import SourceConfig, ManagedObjectData
+from noc.services.syslogcollector.ratelimit import SourceRateLimit
 from noc.core.comp import DEFAULT_ENCODING
 
 
@@ -50,10 +53,15 @@ class SyslogCollectorService(FastAPIService):
         self.address_configs = {}  # address -> SourceConfig
         self.invalid_sources = defaultdict(int)  # ip -> count
         self.pool_partitions: Dict[str, int] = {}
+        self.rate_limit = SourceRateLimit()
+        self.aggregate_callback = None
 
     async def on_activate(self):
         # Listen sockets
-        server = SyslogServer(service=self)
+        executor = None
+        if config.syslogcollector.batch_size and config.syslogcollector.decode_processes:
+            executor = ProcessPoolExecutor(config.syslogcollector.decode_processes)
+        server = SyslogServer(service=self, executor=executor)
         for addr, port in server.iter_listen(config.syslogcollector.listen):
             self.logger.info("Starting syslog server at %s:%s", addr, port)
             try:
@@ -66,6 +74,11 @@ class SyslogCollectorService(FastAPIService):
         self.logger.info("Stating invalid sources reporting task")
         self.report_invalid_callback = PeriodicCallback(self.report_invalid_sources, 60000)
         self.report_invalid_callback.start()
+        # Send rate limited messages
+        self.aggregate_callback = PeriodicCallback(
+            self.flush_aggregated, config.syslogcollector.aggregate_interval * 1000
+        )
+        self.aggregate_callback.start()
         # Start tracking changes
         asyncio.get_running_loop().create_task(self.get_object_mappings())
 
@@ -102,37 +115,38 @@ class SyslogCollectorService(FastAPIService):
         """
         Spool message to be sent
         """
-        message_id = None
-        if config.fm.generate_message_id:
-            message_id = str(uuid.uuid4())
-        if cfg.process_events:
-            # Send to classifier
-            metrics["events_out"] += 1
-            self.publish(
-                orjson.dumps(
-                    {
-                        "ts": timestamp,
-                        "object": cfg.id,
-                        "data": {
-                            "source": "syslog",
-                            "collector": config.pool,
-                            "message": message,
-                            "facility": facility,
-                            "severity": severity,
-                            "message_id": message_id,
-                        },
-                    }
-                ),
-                stream=cfg.stream,
-                partition=cfg.partition,
-            )
+        self.register_messages([(cfg, timestamp, message, facility, severity, source_address)])
+
+    def register_messages(
+        self, messages: List[Tuple[SourceConfig, int, str, int, int, Optional[str]]]
+    ) -> None:
+        """
+        Spool batch of messages to be sent. Events for the same stream and
+        partition are published as a single multi-record message.
+
+        :param messages: List of (cfg, timestamp, message, facility, severity, source address)
+        """
+        events = QBuffer()
+        archive = []
         now = datetime.datetime.now().replace(microsecond=0)
-        if cfg.archive_events and cfg.bi_id:
-            # Archive message
-            metrics["events_archived"] += 1
-            self.register_metrics(
-                "syslog",
-                [
+        for cfg, timestamp, message, facility, severity, source_address in messages:
+            message_id = None
+            if config.fm.generate_message_id:
+                message_id = str(uuid.uuid4())
+            if cfg.process_events and self.rate_limit.is_allowed(
+                cfg, timestamp, message, facility, severity, source_address
+            ):
+                # Send to classifier
+                metrics["events_out"] += 1
+                events.put(
+                    cfg.stream,
+                    cfg.partition,
+                    [self.get_event(cfg, timestamp, message, facility, severity, message_id)],
+                )
+            if cfg.archive_events and cfg.bi_id:
+                # Archive message
+                metrics["events_archived"] += 1
+                archive.append(
                     {
                         "date": now.date().isoformat(),
                         "ts": now.isoformat(sep=" "),
@@ -141,39 +155,97 @@ class SyslogCollectorService(FastAPIService):
                         "severity": severity,
                         "message": message,
                     }
-                ],
-            )
-        if config.message.enable_snmptrap:
-            metrics["events_message"] += 1
-            n_partitions = get_mx_partitions()
-            self.publish(
-                value=orjson.dumps(
-                    {
-                        "timestamp": datetime.datetime.fromtimestamp(timestamp).replace(
-                            microsecond=0
-                        ),
-                        "message_id": message_id,
-                        "collector_type": "syslog",
-                        "collector": config.pool,
-                        "address": source_address,
-                        "managed_object": asdict(cfg.managed_object),
-                        "data": {
-                            "facility": facility,
-                            "severity": severity,
-                            "message": message,
-                        },
-                    }
-                ),
-                stream=MX_STREAM,
-                partition=int(cfg.id) % n_partitions,
-                headers={
-                    MX_MESSAGE_TYPE: b"syslog",
-                    MX_LABELS: MX_H_VALUE_SPLITTER.join(cfg.effective_labels).encode(
-                        DEFAULT_ENCODING
-                    ),
-                    MX_SHARDING_KEY: str(cfg.id).encode(DEFAULT_ENCODING),
-                },
+                )
+            if config.message.enable_snmptrap:
+                self.register_mx_message(
+                    cfg, timestamp, message, facility, severity, message_id, source_address
+                )
+        for stream, partition, chunk, _ in events.iter_slice():
+            self.publish(chunk, stream=stream, partition=partition)
+        if archive:
+            self.register_metrics("syslog", archive)
+
+    @staticmethod
+    def get_event(
+        cfg: SourceConfig,
+        timestamp: int,
+        message: str,
+        facility: int,
+        severity: int,
+        message_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Build classifier event
+        """
+        return {
+            "ts": timestamp,
+            "object": cfg.id,
+            "data": {
+                "source": "syslog",
+                "collector": config.pool,
+                "message": message,
+                "facility": facility,
+                "severity": severity,
+                "message_id": message_id,
+            },
+        }
+
+    async def flush_aggregated(self):
+        """
+        Send messages, aggregated by rate limit
+        """
+        events = QBuffer()
+        for agg in self.rate_limit.flush():
+            message_id = None
+            if config.fm.generate_message_id:
+                message_id = str(uuid.uuid4())
+            event = self.get_event(
+                agg.cfg, agg.last_ts, agg.message, agg.facility, agg.severity, message_id
             )
+            event["start_ts"] = agg.first_ts
+            event["repeats"] = agg.repeats
+            metrics["events_out"] += 1
+            metrics["events_aggregated_out"] += 1
+            events.put(agg.cfg.stream, agg.cfg.partition, [event])
+        for stream, partition, chunk, _ in events.iter_slice():
+            self.publish(chunk, stream=stream, partition=partition)
+
+    def register_mx_message(
+        self,
+        cfg: SourceConfig,
+        timestamp: int,
+        message: str,
+        facility: int,
+        severity: int,
+        message_id: Optional[str] = None,
+        source_address: Optional[str] = None,
+    ) -> None:
+        metrics["events_message"] += 1
+        n_partitions = get_mx_partitions()
+        self.publish(
+            value=orjson.dumps(
+                {
+                    "timestamp": datetime.datetime.fromtimestamp(timestamp).replace(microsecond=0),
+                    "message_id": message_id,
+                    "collector_type": "syslog",
+                    "collector": config.pool,
+                    "address": source_address,
+                    "managed_object": asdict(cfg.managed_object),
+                    "data": {
+                        "facility": facility,
+                        "severity": severity,
+                        "message": message,
+                    },
+                }
+            ),
+            stream=MX_STREAM,
+            partition=int(cfg.id) % n_partitions,
+            headers={
+                MX_MESSAGE_TYPE: b"syslog",
+                MX_LABELS: MX_H_VALUE_SPLITTER.join(cfg.effective_labels).encode(DEFAULT_ENCODING),
+                MX_SHARDING_KEY: str(cfg.id).encode(DEFAULT_ENCODING),
+            },
+        )
 
     async def get_object_mappings(self):
         """
@@ -229,6 +301,8 @@ class SyslogCollectorService(FastAPIService):
             stream=f"events.{fm_pool}",
             partition=int(data["id"]) % num_partitions,
             effective_labels=data.get("effective_labels", []),
+            rate_limit=data.get("rate_limit", 0),
+            rate_burst=data.get("rate_burst", 0),
         )
         if config.message.enable_syslog and "managed_object" in data:
             cfg.managed_object = ManagedObjectData(**data["managed_object"])
@@ -252,6 +326,7 @@ class SyslogCollectorService(FastAPIService):
         for addr in cfg.addresses:
             del self.address_configs[addr]
         del self.source_configs[id]
+        self.rate_limit.reset(id)
         metrics["sources_deleted"] += 1
 
 
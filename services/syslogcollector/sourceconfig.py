@@ -1,7 +1,7 @@
 # ----------------------------------------------------------------------
 # SourceConfig
 # ----------------------------------------------------------------------
-# Copyright (C) 2007-2020 The NOC Project
+# Copyright (C) 2007-2022 The NOC Project
 # See LICENSE for details
 # ----------------------------------------------------------------------
 
@@ -46,3 +46,7 @@ class SourceConfig(object):
     name: Optional[str] = None
     effective_labels: List[str] = None
     managed_object: Optional[ManagedObjectData] = None
+    # Messages per second, 0 - unlimited
+    rate_limit: int = 0
+    # Bucket size, 0 - same as rate_limit
+    rate_burst: int = 0
@@ -1,27 +1,64 @@
 # ---------------------------------------------------------------------
 # Syslog server
 # ---------------------------------------------------------------------
-# Copyright (C) 2007-2020 The NOC Project
+# Copyright (C) 2007-2022 The NOC Project
 # See LICENSE for details
 # ---------------------------------------------------------------------
 
 # Python modules
 import logging
 import time
-from typing import Tuple
+from concurrent.futures import Executor
+from typing import Tuple, Optional, List
 
 # NOC modules
 from noc.config import config
 from noc.core.perf import metrics
-from noc.core.ioloop.udpserver import UDPServer
+from noc.core.ioloop.udpserver import BatchUDPServer
 from noc.core.comp import smart_text
 
 logger = logging.getLogger(__name__)
 
 
-class SyslogServer(UDPServer):
-    def __init__(self, service):
-        super().__init__()
+def parse_message(data: bytes) -> Optional[Tuple[str, int, int]]:
+    """
+    Parse syslog message
+
+    :param data: Datagram
+    :return: message, facility, severity tuple or None for malformed message
+    """
+    # Convert data to valid UTF8
+    msg = smart_text(data, errors="ignore")
+    # Parse priority
+    priority = 0
+    if msg.startswith("<"):
+        idx = msg.find(">")
+        if idx == -1:
+            return None
+        try:
+            priority = int(msg[1:idx])
+        except ValueError:
+            pass
+        msg = msg[idx + 1 :].strip()
+    return msg, priority >> 3, priority & 7
+
+
+def parse_messages(batch: List[bytes]) -> List[Optional[Tuple[str, int, int]]]:
+    """
+    Parse batch of syslog messages. May be run in process pool
+    """
+    return [parse_message(data) for data in batch]
+
+
+class SyslogServer(BatchUDPServer):
+    name = "syslog"
+
+    def __init__(self, service, executor: Optional[Executor] = None):
+        super().__init__(
+            batch_size=config.syslogcollector.batch_size,
+            queue_size=config.syslogcollector.queue_size,
+            executor=executor,
+        )
         self.service = service
 
     def enable_reuseport(self):
@@ -31,26 +68,43 @@ class SyslogServer(UDPServer):
         return config.syslogcollector.enable_freebind
 
     def on_read(self, data: bytes, address: Tuple[str, int]):
+        if self.batch_size:
+            super().on_read(data, address)
+            return
         metrics["syslog_msg_in"] += 1
         cfg = self.service.lookup_config(address[0])
         if not cfg:
             return  # Invalid event source
-        # Convert data to valid UTF8
-        data = smart_text(data, errors="ignore")
-        # Parse priority
-        priority = 0
-        if data.startswith("<"):
-            idx = data.find(">")
-            if idx == -1:
-                return
-            try:
-                priority = int(data[1:idx])
-            except ValueError:
-                pass
-            data = data[idx + 1 :].strip()
+        parsed = parse_message(data)
+        if not parsed:
+            return
+        message, facility, severity = parsed
         # Get timestamp
         ts = int(time.time())
         #
         self.service.register_message(
-            cfg, ts, data, facility=priority >> 3, severity=priority & 7, source_address=address[0]
+            cfg, ts, message, facility=facility, severity=severity, source_address=address[0]
+        )
+
+    async def on_batch(self, batch: List[Tuple[bytes, Tuple[str, int]]]) -> None:
+        metrics["syslog_msg_in"] += len(batch)
+        sources = []
+        messages = []
+        for data, address in batch:
+            cfg = self.service.lookup_config(address[0])
+            if not cfg:
+                continue  # Invalid event source
+            sources.append((cfg, address[0]))
+            messages.append(data)
+        if not messages:
+            return
+        parsed = await self.run_in_executor(parse_messages, messages)
+        # Get timestamp
+        ts = int(time.time())
+        self.service.register_messages(
+            [
+                (cfg, ts, p[0], p[1], p[2], address)
+                for (cfg, address), p in zip(sources, parsed)
+                if p
+            ]
         )
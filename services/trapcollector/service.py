@@ -10,6 +10,7 @@
 import datetime
 import asyncio
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import asdict
 from typing import Optional, Any, Dict, List, Tuple
 import base64
@@ -35,6 +36,7 @@ from noc.services.trapcollector.trapserver import TrapServer
 from noc.services.trapcollector.datastream import TrapDataStreamClient
 from noc.services.trapcollector.sourceconfig import SourceConfig, ManagedObjectData
 from noc.core.ioloop.timers import PeriodicCallback
+from noc.core.liftbridge.queuebuffer import QBuffer
 from noc.core.comp import smart_bytes
 
 TRAPCOLLECTOR_STORM_ALARM_CLASS = "NOC | Managed Object | Storm Control | SNMP"
@@ -57,7 +59,10 @@ class TrapCollectorService(FastAPIService):
 
     async def on_activate(self):
         # Listen sockets
-        server = TrapServer(service=self)
+        executor = None
+        if config.trapcollector.batch_size and config.trapcollector.decode_processes:
+            executor = ProcessPoolExecutor(config.trapcollector.decode_processes)
+        server = TrapServer(service=self, executor=executor)
         for addr, port in server.iter_listen(config.trapcollector.listen):
             self.logger.info("Starting SNMP Trap server at %s:%s", addr, port)
             try:
@@ -131,18 +136,23 @@ class TrapCollectorService(FastAPIService):
         """
         Spool message to be sent
         """
-        metrics["events_out"] += 1
-        self.publish(
-            orjson.dumps(
-                {
-                    "ts": timestamp,
-                    "object": cfg.id,
-                    "data": data,
-                }
-            ),
-            stream=cfg.stream,
-            partition=cfg.partition,
-        )
+        self.register_messages([(cfg, timestamp, data)])
+
+    def register_messages(self, messages: List[Tuple[SourceConfig, int, Dict[str, Any]]]):
+        """
+        Spool batch of messages to be sent. Events for the same stream and
+        partition are published as a single multi-record message.
+
+        :param messages: List of (cfg, timestamp, data)
+        """
+        events = QBuffer()
+        for cfg, timestamp, data in messages:
+            metrics["events_out"] += 1
+            events.put(
+                cfg.stream, cfg.partition, [{"ts": timestamp, "object": cfg.id, "data": data}]
+            )
+        for stream, partition, chunk, _ in events.iter_slice():
+            self.publish(chunk, stream=stream, partition=partition)
 
     def register_mx_message(
         self,
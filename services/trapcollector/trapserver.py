@@ -8,24 +8,51 @@
 # Python modules
 import logging
 import time
-from typing import Tuple
+from concurrent.futures import Executor
+from typing import Tuple, Optional, List, Dict, Any
 import codecs
 import uuid
 
 # NOC modules
-from noc.core.ioloop.udpserver import UDPServer
+from noc.core.ioloop.udpserver import BatchUDPServer
 from noc.core.escape import fm_escape
 from noc.core.snmp.trap import decode_trap
 from noc.config import config
 from noc.core.perf import metrics
+from noc.services.trapcollector.sourceconfig import SourceConfig
 
 
 logger = logging.getLogger(__name__)
 
 
-class TrapServer(UDPServer):
-    def __init__(self, service):
-        super().__init__()
+def decode_traps(
+    batch: List[bytes], raw: bool = False
+) -> List[Tuple[Optional[Tuple], Optional[str]]]:
+    """
+    Decode batch of traps. May be run in process pool
+
+    :param batch: List of datagrams
+    :param raw: Return raw pdu and varbinds
+    :return: List of (decode_trap result, None) or (None, error) tuples
+    """
+    r = []
+    for data in batch:
+        try:
+            r.append((decode_trap(data, raw=raw), None))
+        except Exception as e:
+            r.append((None, str(e)))
+    return r
+
+
+class TrapServer(BatchUDPServer):
+    name = "trap"
+
+    def __init__(self, service, executor: Optional[Executor] = None):
+        super().__init__(
+            batch_size=config.trapcollector.batch_size,
+            queue_size=config.trapcollector.queue_size,
+            executor=executor,
+        )
         self.service = service
 
     def enable_reuseport(self):
@@ -35,26 +62,77 @@ class TrapServer(UDPServer):
         return config.trapcollector.enable_freebind
 
     def on_read(self, data: bytes, address: Tuple[str, int]):
+        if self.batch_size:
+            super().on_read(data, address)
+            return
         metrics["trap_msg_in"] += 1
-        cfg = self.service.lookup_config(address[0])
+        cfg = self.get_source_config(address[0])
         if not cfg:
-            return  # Invalid event source
-        if cfg.storm_policy != "D":
-            need_block = self.service.storm_protection.process_message(address[0], cfg)
-            if need_block:
-                return
+            return
         try:
-            community, varbinds, raw_pdu, raw_varbinds = decode_trap(
-                data, raw=config.message.enable_snmptrap
-            )
+            decoded = decode_trap(data, raw=config.message.enable_snmptrap)
         except Exception as e:
-            metrics["error", ("type", "decode_failed")] += 1
-            logger.error("Failed to decode trap: %s", codecs.encode(data, "hex"))
-            logger.error("Decoder error: %s", e)
+            self.on_decode_error(data, str(e))
             return
-        # @todo: Check trap community
+        ts = int(time.time())
+        self.service.register_message(cfg, ts, self.process_trap(cfg, address[0], ts, decoded))
+
+    async def on_batch(self, batch: List[Tuple[bytes, Tuple[str, int]]]) -> None:
+        metrics["trap_msg_in"] += len(batch)
+        sources = []
+        traps = []
+        for data, address in batch:
+            cfg = self.get_source_config(address[0])
+            if not cfg:
+                continue
+            sources.append((cfg, address[0]))
+            traps.append(data)
+        if not traps:
+            return
+        decoded = await self.run_in_executor(decode_traps, traps, config.message.enable_snmptrap)
         # Get timestamp
         ts = int(time.time())
+        events = []
+        for (cfg, address), data, (r, error) in zip(sources, traps, decoded):
+            if error is not None:
+                self.on_decode_error(data, error)
+                continue
+            events.append((cfg, ts, self.process_trap(cfg, address, ts, r)))
+        self.service.register_messages(events)
+
+    def get_source_config(self, address: str) -> Optional[SourceConfig]:
+        """
+        Get source config for valid event source, not blocked by storm protection
+        """
+        cfg = self.service.lookup_config(address)
+        if not cfg:
+            return None  # Invalid event source
+        if cfg.storm_policy != "D":
+            need_block = self.service.storm_protection.process_message(address, cfg)
+            if need_block:
+                return None
+        return cfg
+
+    @staticmethod
+    def on_decode_error(data: bytes, error: str) -> None:
+        metrics["error", ("type", "decode_failed")] += 1
+        logger.error("Failed to decode trap: %s", codecs.encode(data, "hex"))
+        logger.error("Decoder error: %s", error)
+
+    def process_trap(
+        self, cfg: SourceConfig, address: str, ts: int, decoded: Tuple
+    ) -> Dict[str, Any]:
+        """
+        Register MX message and build event body
+
+        :param cfg: Source config
+        :param address: Source address
+        :param ts: Timestamp
+        :param decoded: decode_trap() result
+        :return: Event body
+        """
+        community, varbinds, raw_pdu, raw_varbinds = decoded
+        # @todo: Check trap community
         # Message_id
         message_id = None
         if config.fm.generate_message_id:
@@ -64,10 +142,9 @@ class TrapServer(UDPServer):
             "source": "SNMP Trap",
             "collector": config.pool,
             "message_id": message_id,
-            "source_address": address[0],
+            "source_address": address,
         }
         body.update(varbinds)
-        body = {k: fm_escape(body[k]) for k in body}
-        self.service.register_message(cfg, ts, body)
         if config.message.enable_snmptrap:
-            self.service.register_mx_message(cfg, ts, address[0], message_id, raw_pdu, raw_varbinds)
+            self.service.register_mx_message(cfg, ts, address, message_id, raw_pdu, raw_varbinds)
+        return {k: fm_escape(body[k]) for k in body}
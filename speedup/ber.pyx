@@ -1,13 +1,15 @@
 # ----------------------------------------------------------------------
 # ASN.1 BER utitities
 # ----------------------------------------------------------------------
-# Copyright (C) 2007-2018 The NOC Project
+# Copyright (C) 2007-2022 The NOC Project
 # See LICENSE for details
 # ----------------------------------------------------------------------
 # cython: language_level=3
 
 from libc.stdio cimport snprintf
 
+from noc.core.snmp.error import UnsupportedMessage
+
 
 def parse_tlv_header(bytes msg):
     """
@@ -229,3 +231,169 @@ def encode_int(int value):
         n = _write_raw_int(out + 2, value)
         out[1] = n
         return bytes(out[:n + 2])
+
+
+cdef inline Py_ssize_t _read_tlv(
+    const unsigned char* ptr, Py_ssize_t pos, Py_ssize_t end, int* tag, Py_ssize_t* length
+) except -1:
+    """
+    Read TLV header at `pos`, store tag and value length.
+    Returns value offset
+    """
+    cdef Py_ssize_t l, n
+
+    if pos + 2 > end:
+        raise ValueError("Malformed TLV")
+    tag[0] = ptr[pos]
+    if (ptr[pos] & 0x1f) == 0x1f:
+        raise UnsupportedMessage("High tag number form")
+    l = ptr[pos + 1]
+    pos += 2
+    if l & 0x80:
+        # Long form
+        n = l & 0x7f
+        if n < 1 or n > 4:
+            raise UnsupportedMessage("Unsupported TLV length form")
+        if pos + n > end:
+            raise ValueError("Malformed TLV length")
+        l = 0
+        while n:
+            l = (l << 8) + ptr[pos]
+            pos += 1
+            n -= 1
+    if pos + l > end:
+        raise ValueError("Malformed TLV length")
+    length[0] = l
+    return pos
+
+
+cdef inline object _decode_int(bytes msg, const unsigned char* ptr, Py_ssize_t pos, Py_ssize_t l):
+    cdef unsigned long long v = 0
+    cdef Py_ssize_t i
+
+    if l == 0:
+        return 0
+    if l > 8:
+        return int.from_bytes(msg[pos:pos + l], "big", signed=True)
+    for i in range(pos, pos + l):
+        v = (v << 8) | ptr[i]
+    if l < 8 and ptr[pos] & 0x80:
+        # Negative number, extend sign
+        v |= (~(<unsigned long long>0)) << (8 * l)
+    return <long long>v
+
+
+cdef inline str _decode_oid(const unsigned char* ptr, Py_ssize_t pos, Py_ssize_t l):
+    cdef char[1024] out
+    cdef char* o_ptr = out
+    cdef unsigned int b = 0
+    cdef unsigned char v
+    cdef Py_ssize_t i
+
+    if l < 1 or l > 128:
+        raise UnsupportedMessage("Unsupported OID length")
+    v = ptr[pos]
+    if v == 0x2b:
+        o_ptr += snprintf(o_ptr, 1024 - (o_ptr - out), "1.3")
+    else:
+        o_ptr += snprintf(
+            o_ptr, 1024 - (o_ptr - out), "%u.%u", <unsigned int>(v // 40), <unsigned int>(v % 40)
+        )
+    for i in range(pos + 1, pos + l):
+        v = ptr[i]
+        b = (b << 7) + (v & 0x7f)
+        if not (v & 0x80):
+            o_ptr += snprintf(o_ptr, 1024 - (o_ptr - out), ".%u", b)
+            b = 0
+    return out[:o_ptr - out].decode("ascii")
+
+
+cdef object _decode_value(bytes msg, const unsigned char* ptr, int tag, Py_ssize_t pos, Py_ssize_t l):
+    if tag == 0x02 or tag == 0x0a or tag == 0x41 or tag == 0x42 or tag == 0x43 or tag == 0x46:
+        # INTEGER, ENUMERATED, Counter32, Gauge32, TimeTicks, Counter64
+        return _decode_int(msg, ptr, pos, l)
+    if tag == 0x04:
+        # OCTET STRING
+        return msg[pos:pos + l]
+    if tag == 0x05:
+        # NULL
+        return None
+    if tag == 0x06:
+        # OBJECT IDENTIFIER
+        return _decode_oid(ptr, pos, l)
+    if tag == 0x40 and l == 4:
+        # IpAddress
+        return "%d.%d.%d.%d" % (ptr[pos], ptr[pos + 1], ptr[pos + 2], ptr[pos + 3])
+    if 0x80 <= tag <= 0x82 and l == 0:
+        # noSuchObject, noSuchInstance, endOfMibView
+        return None
+    raise UnsupportedMessage("Unsupported type 0x%x" % tag)
+
+
+def decode_message(bytes msg):
+    """
+    Decode SNMP v1/v2c message in single pass.
+    Only common types are supported, UnsupportedMessage is raised
+    for the others, so the caller may fall back to the full decoder.
+    OCTET STRING values are returned as is.
+
+    :returns: version, community, pdu type, list of pdu header fields,
+        list of (oid, tag, value)
+    """
+    cdef const unsigned char* ptr = msg
+    cdef Py_ssize_t end = len(msg)
+    cdef Py_ssize_t pos, l, pdu_end, vb_end
+    cdef int tag, pdu_type, n_header, i
+
+    # Message
+    pos = _read_tlv(ptr, 0, end, &tag, &l)
+    if tag != 0x30 or pos + l != end:
+        raise UnsupportedMessage("Unsupported message layout")
+    # Version
+    pos = _read_tlv(ptr, pos, end, &tag, &l)
+    if tag != 0x02:
+        raise UnsupportedMessage("Unsupported message layout")
+    version = _decode_int(msg, ptr, pos, l)
+    pos += l
+    # Community
+    pos = _read_tlv(ptr, pos, end, &tag, &l)
+    if tag != 0x04:
+        raise UnsupportedMessage("Unsupported message layout")
+    community = msg[pos:pos + l]
+    pos += l
+    # PDU
+    pos = _read_tlv(ptr, pos, end, &tag, &l)
+    if (tag & 0xe0) != 0xa0 or pos + l != end:
+        raise UnsupportedMessage("Unsupported message layout")
+    pdu_type = tag & 0x1f
+    # v1 Trap-PDU: enterprise, agent-addr, generic-trap, specific-trap, time-stamp
+    # Others: request-id, error-status, error-index
+    n_header = 5 if pdu_type == 4 else 3
+    header = []
+    for i in range(n_header):
+        pos = _read_tlv(ptr, pos, end, &tag, &l)
+        if tag == 0x04 or tag == 0x30:
+            raise UnsupportedMessage("Unsupported message layout")
+        header.append(_decode_value(msg, ptr, tag, pos, l))
+        pos += l
+    # Varbinds
+    pos = _read_tlv(ptr, pos, end, &tag, &l)
+    if tag != 0x30 or pos + l != end:
+        raise UnsupportedMessage("Unsupported message layout")
+    varbinds = []
+    while pos < end:
+        pos = _read_tlv(ptr, pos, end, &tag, &l)
+        if tag != 0x30:
+            raise UnsupportedMessage("Unsupported varbind layout")
+        vb_end = pos + l
+        pos = _read_tlv(ptr, pos, vb_end, &tag, &l)
+        if tag != 0x06:
+            raise UnsupportedMessage("Unsupported varbind layout")
+        oid = _decode_oid(ptr, pos, l)
+        pos = _read_tlv(ptr, pos + l, vb_end, &tag, &l)
+        value = _decode_value(msg, ptr, tag, pos, l)
+        pos += l
+        if pos != vb_end:
+            raise UnsupportedMessage("Unsupported varbind layout")
+        varbinds.append((oid, tag, value))
+    return version, community, pdu_type, header, varbinds
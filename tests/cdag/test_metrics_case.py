@@ -246,3 +246,32 @@ def teardown_module(_module):
     from noc.core.cdag.node.probe import ProbeNode
 
     ProbeNode.reset_convert()
+
+
+def test_case_batch():
+    cdag = CDAG("test", state={})
+    factory = YAMLCDAGFactory(cdag, CONFIG)
+    factory.construct()
+    sender = cdag.nodes["sender"]
+    probes = {n.node_id: n for n in cdag.nodes.values() if n.name == "probe"}
+    default_units = {n.node_id: n.config.unit for n in probes.values()}
+    skip_fields = {"ts", "labels", "_units"}
+    tx = cdag.compile().begin_batch(len(SCENARIO))
+    for i, (data, _) in enumerate(SCENARIO):
+        units = data.get("_units") or {}
+        ts = data["ts"]
+        activations = []
+        for n in data:
+            if n in skip_fields:
+                continue
+            probe = probes[n]
+            activations += [
+                (probe, "ts", ts),
+                (probe, "x", data[n]),
+                (probe, "unit", units.get(n) or default_units[n]),
+            ]
+        activations += [(sender, "ts", ts), (sender, "labels", data["labels"])]
+        tx.activate_sample(i, activations)
+    tx.commit()
+    for i, (_, expected) in enumerate(SCENARIO):
+        assert tx.get_inputs(cdag.nodes["check"], i).get("x") == expected
@@ -0,0 +1,191 @@
+# ----------------------------------------------------------------------
+# ExecutionPlan tests
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Third-party modules
+import pytest
+
+# NOC modules
+from noc.core.cdag.graph import CDAG
+from noc.core.cdag.factory.yaml import YAMLCDAGFactory
+from noc.core.cdag.node.add import AddNode
+from noc.core.cdag.node.mul import MulNode
+from noc.core.cdag.plan import BATCH_MIN_SIZE
+
+CONFIG = """
+nodes:
+- name: n03
+  type: add
+- name: n04
+  type: value
+  config:
+    value: 3.0
+- name: n05
+  type: mul
+  inputs:
+  - name: x
+    node: n03
+  - name: y
+    node: n04
+- name: measure
+  type: none
+  inputs:
+  - name: x
+    node: n05
+"""
+
+
+def get_cdag() -> CDAG:
+    cdag = CDAG("test", {})
+    factory = YAMLCDAGFactory(cdag, CONFIG)
+    factory.construct()
+    return cdag
+
+
+def test_plan_order():
+    cdag = get_cdag()
+    plan = cdag.compile()
+    assert len(plan) == len(cdag.nodes)
+    pos = {node.node_id: i for i, node in enumerate(plan.nodes)}
+    for node in plan.nodes:
+        for s in node.iter_subscribers():
+            assert pos[node.node_id] < pos[s.node.node_id]
+
+
+@pytest.mark.parametrize("x,y,expected", [(1.0, 2.0, 9.0), (0.0, 5.0, 15.0), (-1.0, 1.0, 0.0)])
+def test_plan_activation(x, y, expected):
+    cdag = get_cdag()
+    # Reference transaction
+    tx = cdag.begin()
+    tx.activate("n03", "x", x)
+    tx.activate("n03", "y", y)
+    assert tx.get_inputs(cdag.get_node("measure")).get("x") == expected
+    # Compiled plan
+    ptx = cdag.compile().begin()
+    ptx.activate(cdag.get_node("n03"), "x", x)
+    ptx.activate(cdag.get_node("n03"), "y", y)
+    assert ptx.get_inputs(cdag.get_node("measure")).get("x") == expected
+
+
+def test_plan_partial_activation():
+    cdag = get_cdag()
+    ptx = cdag.compile().begin()
+    ptx.activate(cdag.get_node("n03"), "x", 1.0)
+    assert ptx.get_inputs(cdag.get_node("measure")).get("x") is None
+
+
+def test_plan_invalid_input():
+    cdag = get_cdag()
+    ptx = cdag.compile().begin()
+    with pytest.raises(KeyError):
+        ptx.activate(cdag.get_node("n03"), "z", 1.0)
+
+
+BATCH_CONFIG = """
+nodes:
+- name: n03
+  type: add
+- name: n04
+  type: value
+  config:
+    value: 3.0
+- name: n05
+  type: mul
+  inputs:
+  - name: x
+    node: n03
+  - name: y
+    node: n04
+- name: n06
+  type: mean
+  inputs:
+  - name: x
+    node: n05
+- name: n07
+  type: sub
+  inputs:
+  - name: x
+    node: n05
+  - name: y
+    node: n06
+- name: measure
+  type: none
+  inputs:
+  - name: x
+    node: n07
+"""
+
+
+def get_batch_cdag() -> CDAG:
+    cdag = CDAG("test", {})
+    factory = YAMLCDAGFactory(cdag, BATCH_CONFIG)
+    factory.construct()
+    return cdag
+
+
+@pytest.mark.parametrize(
+    "samples",
+    [
+        # Vectorized
+        [(float(i), 0.5 * i) for i in range(20)],
+        # Python fallback for integers
+        [(i, 2 * i) for i in range(20)],
+        # Partial samples
+        [(float(i), None if i % 3 else 1.0) for i in range(20)],
+        # Less than batch size
+        [(1.0, 2.0), (3.0, 4.0), (5.0, 6.0), (7.0, 8.0)],
+    ],
+)
+def test_plan_batch(samples):
+    # Reference: transaction per sample
+    cdag = get_batch_cdag()
+    plan = cdag.compile()
+    measure = cdag.get_node("measure")
+    expected = []
+    expected_state = {}
+    for x, y in samples:
+        ptx = plan.begin()
+        ptx.activate(cdag.get_node("n03"), "x", x)
+        if y is not None:
+            ptx.activate(cdag.get_node("n03"), "y", y)
+        expected.append(ptx.get_inputs(measure).get("x"))
+        expected_state.update(ptx.get_changed_state())
+    assert any(v is not None for v in expected)
+    # Batch
+    cdag = get_batch_cdag()
+    plan = cdag.compile()
+    measure = cdag.get_node("measure")
+    btx = plan.begin_batch(len(samples))
+    for i, (x, y) in enumerate(samples):
+        btx.activate(cdag.get_node("n03"), "x", x, i)
+        if y is not None:
+            btx.activate(cdag.get_node("n03"), "y", y, i)
+    btx.commit()
+    assert [btx.get_inputs(measure, i).get("x") for i in range(len(samples))] == expected
+    assert btx.get_changed_state() == expected_state
+
+
+def test_plan_batch_invalid_input():
+    cdag = get_batch_cdag()
+    btx = cdag.compile().begin_batch(1)
+    with pytest.raises(KeyError):
+        btx.activate(cdag.get_node("n03"), "z", 1.0, 0)
+
+
+def test_plan_batch_vectorized(monkeypatch):
+    def get_value(self, x, y):
+        raise AssertionError("Must be calculated in bulk")
+
+    monkeypatch.setattr(AddNode, "get_value", get_value)
+    monkeypatch.setattr(MulNode, "get_value", get_value)
+    cdag = get_batch_cdag()
+    n = 2 * BATCH_MIN_SIZE
+    btx = cdag.compile().begin_batch(n)
+    for i in range(n):
+        btx.activate(cdag.get_node("n03"), "x", float(i), i)
+        btx.activate(cdag.get_node("n03"), "y", 1.0, i)
+    btx.commit()
+    assert btx.get_inputs(cdag.get_node("n06"), n - 1).get("x") == 3.0 * n
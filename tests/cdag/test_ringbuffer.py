@@ -0,0 +1,80 @@
+# ----------------------------------------------------------------------
+# RingBuffer and OrderStatistics tests
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Third-party modules
+import pytest
+
+# NOC modules
+from noc.core.cdag.ringbuffer import RingBuffer, OrderStatistics
+from noc.core.cdag.node.percentile import PercentileNode
+from noc.core.cdag.node.mean import MeanNode
+
+
+@pytest.mark.parametrize(
+    "capacity,data,keep,expected",
+    [
+        (1, [1, 2, 3], 1, [3]),
+        (2, [1, 2, 3, 4, 5], 2, [4, 5]),
+        (2, list(range(100)), 3, [97, 98, 99]),
+        (4, list(range(10)), 10, list(range(10))),
+        (4, [1, 2.5, 3], 2, [2.5, 3.0]),
+    ],
+)
+def test_ring_buffer(capacity, data, keep, expected):
+    rb = RingBuffer(capacity=capacity)
+    for x in data:
+        rb.push(x)
+        rb.trim(keep)
+    assert rb.tolist() == expected
+    assert len(rb) == len(expected)
+    assert rb.first() == expected[0]
+    assert rb.last() == expected[-1]
+
+
+def test_ring_buffer_promote():
+    rb = RingBuffer([1, 2])
+    assert rb.tolist() == [1, 2]
+    assert isinstance(rb.first(), int)
+    rb.push(2**70)
+    assert rb.last() == float(2**70)
+    assert isinstance(rb.first(), float)
+
+
+def test_ring_buffer_pop():
+    rb = RingBuffer([1, 2, 3])
+    assert rb.pop() == 3
+    assert rb.shift(1).tolist() == [1]
+    assert rb.tolist() == [2]
+    rb.pop()
+    assert not rb
+
+
+def test_order_statistics():
+    stats = OrderStatistics([5, 1, 3])
+    stats.add(2)
+    stats.add(3)
+    assert [stats.nth(i) for i in range(len(stats))] == [1, 2, 3, 3, 5]
+    stats.remove_many([3, 5, 10])
+    assert [stats.nth(i) for i in range(len(stats))] == [1, 2, 3]
+
+
+def test_percentile_state_restore():
+    config = {"percentile": 50, "min_window": 0, "max_window": 3}
+    state = {}
+    for x in [5, 1, 4, 2, 3]:
+        node = PercentileNode("n01", state=state, config=config)
+        node.get_value(x)
+        state = node.get_state().dict()
+    assert state["values"] == [4, 2, 3]
+    node = PercentileNode("n01", state=state, config=config)
+    assert node.get_value(10) == 3
+
+
+def test_mean_state_format():
+    node = MeanNode("n01", state={"values": [3.0, 2.0]}, config={"min_window": 1})
+    assert node.get_value(4) == 3.0
+    assert node.get_state().dict() == {"values": [4.0, 3.0, 2.0]}
@@ -0,0 +1,78 @@
+# ----------------------------------------------------------------------
+# noc.core.datastream.notifier tests
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Python modules
+import asyncio
+import threading
+
+# NOC modules
+from noc.core.datastream.notifier import ChangeNotifier
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro(loop))
+    finally:
+        loop.close()
+
+
+def test_notify_from_thread():
+    async def inner(loop):
+        notifier = ChangeNotifier(loop)
+        generation = notifier.generation
+        t = threading.Thread(target=notifier.notify)
+        t.start()
+        assert await notifier.wait(generation, timeout=5)
+        t.join()
+        return notifier.generation
+
+    assert run(inner) == 1
+
+
+def test_wait_timeout():
+    async def inner(loop):
+        notifier = ChangeNotifier(loop)
+        return await notifier.wait(notifier.generation, timeout=0.01)
+
+    assert run(inner) is False
+
+
+def test_missed_change():
+    async def inner(loop):
+        notifier = ChangeNotifier(loop)
+        generation = notifier.generation
+        # Change between query and wait
+        notifier.notify()
+        await asyncio.sleep(0)
+        return await notifier.wait(generation, timeout=0.01)
+
+    assert run(inner) is True
+
+
+def test_coalesce():
+    async def inner(loop):
+        notifier = ChangeNotifier(loop)
+        for _ in range(10):
+            notifier.notify()
+        await asyncio.sleep(0)
+        return notifier.generation
+
+    assert run(inner) == 1
+
+
+def test_wake_all():
+    async def inner(loop):
+        notifier = ChangeNotifier(loop)
+        waiters = [
+            loop.create_task(notifier.wait(notifier.generation, timeout=5)) for _ in range(10)
+        ]
+        await asyncio.sleep(0)
+        notifier.notify()
+        return await asyncio.gather(*waiters)
+
+    assert run(inner) == [True] * 10
@@ -0,0 +1,92 @@
+# ----------------------------------------------------------------------
+# noc.core.datastream.base partial rebuild tests
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Third-party modules
+import orjson
+import pytest
+
+# NOC modules
+from noc.core.datastream.base import DataStream, cv_prefetched
+
+
+class SectionDataStream(DataStream):
+    name = "sections"
+    model_sections = {
+        "inv.Interface": ["interfaces"],
+        "inv.SubInterface": ["interfaces", "forwarding_instances"],
+        "inv.Object": ["asset"],
+    }
+    calls = []
+
+    @classmethod
+    def get_object(cls, id):
+        cls.calls += [("full", id)]
+        return {"id": str(id)}
+
+    @classmethod
+    def get_object_sections(cls, id, sections, current):
+        cls.calls += [("sections", id, sections)]
+        return {**current, "id": str(id)}
+
+
+@pytest.fixture
+def ds():
+    SectionDataStream.calls = []
+    return SectionDataStream
+
+
+@pytest.mark.parametrize(
+    "changes,expected",
+    [
+        ({1: {"inv.Interface"}}, {1: {"interfaces"}}),
+        (
+            {1: {"inv.SubInterface", "inv.Object"}},
+            {1: {"interfaces", "forwarding_instances", "asset"}},
+        ),
+        ({1: {"inv.Interface", "sa.ManagedObject"}}, {}),
+        ({1: {"inv.Interface"}, 2: {"sa.ManagedObjectProfile"}}, {1: {"interfaces"}}),
+        ({1: set()}, {}),
+    ],
+)
+def test_changed_sections(ds, changes, expected):
+    assert ds.get_changed_sections(changes) == expected
+
+
+def test_changed_sections_unsupported():
+    assert DataStream.get_changed_sections({1: {"inv.Interface"}}) == {}
+
+
+def test_current_data_sections(ds):
+    current = {ds.F_DATA: orjson.dumps({"id": "1", "interfaces": []}).decode()}
+    data, _ = ds._get_current_data(1, sections={"interfaces"}, current=current)
+    assert data == {"id": "1", "interfaces": []}
+    assert ds.calls == [("sections", 1, {"interfaces"})]
+
+
+@pytest.mark.parametrize(
+    "current",
+    [
+        None,
+        {DataStream.F_HASH: "0"},
+        {DataStream.F_DATA: orjson.dumps({"id": "1", "$deleted": True}).decode()},
+    ],
+)
+def test_current_data_fallback(ds, current):
+    data, _ = ds._get_current_data(1, sections={"interfaces"}, current=current)
+    assert data == {"id": "1"}
+    assert ds.calls == [("full", 1)]
+
+
+def test_prefetched(ds):
+    assert ds.get_prefetched(1) is None
+    token = cv_prefetched.set({1: {"interfaces": []}})
+    try:
+        assert ds.get_prefetched(1) == {"interfaces": []}
+        assert ds.get_prefetched(2) is None
+    finally:
+        cv_prefetched.reset(token)
+    assert ds.get_prefetched(1) is None
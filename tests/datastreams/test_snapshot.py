@@ -0,0 +1,169 @@
+# ----------------------------------------------------------------------
+# noc.core.datastream.snapshot tests
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Python modules
+import os
+import asyncio
+from typing import List, Dict, Any
+
+# Third-party modules
+import orjson
+import pytest
+
+# NOC modules
+from noc.core.datastream.snapshot import DataStreamSnapshot
+from noc.core.datastream.client import DataStreamClient
+from noc.core.datastream import client as ds_client
+from noc.config import config
+
+KEY = {"stream": "cfgping", "filters": ["pool(default)"], "filter_policy": "delete"}
+
+
+def item(id: int, change_id: int, **kwargs) -> Dict[str, Any]:
+    return {"id": str(id), "change_id": "%024x" % change_id, **kwargs}
+
+
+def open_snapshot(path, key=None) -> DataStreamSnapshot:
+    snapshot = DataStreamSnapshot(str(path), key or KEY)
+    assert snapshot.open()
+    return snapshot
+
+
+def test_snapshot_reload(tmp_path):
+    path = tmp_path / "ds.snapshot"
+    snapshot = open_snapshot(path)
+    assert not snapshot.items
+    snapshot.reset("epoch1")
+    snapshot.append([item(1, 1), item(2, 2), item(1, 3, name="x")])
+    snapshot.append([item(2, 4, **{"$deleted": True})])
+    snapshot.close()
+    snapshot = open_snapshot(path)
+    assert snapshot.epoch == "epoch1"
+    assert snapshot.change_id == "%024x" % 4
+    assert list(snapshot.iter_items()) == [item(1, 3, name="x")]
+
+
+def test_snapshot_locked(tmp_path):
+    path = tmp_path / "ds.snapshot"
+    snapshot = open_snapshot(path)
+    assert not DataStreamSnapshot(str(path), KEY).open()
+    snapshot.close()
+    assert DataStreamSnapshot(str(path), KEY).open()
+
+
+def test_snapshot_key_mismatch(tmp_path):
+    path = tmp_path / "ds.snapshot"
+    snapshot = open_snapshot(path)
+    snapshot.append([item(1, 1)])
+    snapshot.close()
+    snapshot = open_snapshot(path, {**KEY, "filters": ["pool(other)"]})
+    assert not snapshot.items
+    assert snapshot.change_id is None
+
+
+def test_snapshot_torn_tail(tmp_path):
+    path = tmp_path / "ds.snapshot"
+    snapshot = open_snapshot(path)
+    snapshot.append([item(1, 1), item(2, 2)])
+    snapshot.close()
+    size = os.path.getsize(path)
+    with open(path, "ab") as f:
+        f.write(DataStreamSnapshot.encode(item(3, 3))[:-5])
+    snapshot = open_snapshot(path)
+    assert [x["id"] for x in snapshot.iter_items()] == ["1", "2"]
+    assert os.path.getsize(path) == size
+    snapshot.append([item(3, 3)])
+    snapshot.close()
+    snapshot = open_snapshot(path)
+    assert [x["id"] for x in snapshot.iter_items()] == ["1", "2", "3"]
+
+
+def test_snapshot_damaged(tmp_path):
+    path = tmp_path / "ds.snapshot"
+    snapshot = open_snapshot(path)
+    snapshot.append([item(1, 1), item(2, 2)])
+    snapshot.close()
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data.replace(b'"id":"1"', b'"id":"9"'))
+    snapshot = open_snapshot(path)
+    assert not snapshot.items
+
+
+def test_snapshot_compact(tmp_path):
+    path = tmp_path / "ds.snapshot"
+    snapshot = open_snapshot(path)
+    n = DataStreamSnapshot.COMPACT_MIN_RECORDS
+    snapshot.append([item(i % 10, i) for i in range(n)])
+    assert snapshot.records == n
+    snapshot.append([item(10, n)])
+    # Compacted
+    assert snapshot.records == 11
+    snapshot.append([item(10, n + 1, **{"$deleted": True})])
+    snapshot.close()
+    with open(path, "rb") as f:
+        assert len(f.readlines()) == 1 + 11 + 1
+    snapshot = open_snapshot(path)
+    assert len(snapshot.items) == 10
+    assert snapshot.change_id == "%024x" % (n + 1)
+    assert not os.path.exists(f"{path}.tmp")
+
+
+class ClientStub(DataStreamClient):
+    def __init__(self, name, responses: List):
+        super().__init__(name)
+        self.responses = responses
+        self.urls: List[str] = []
+        self.changes: List[str] = []
+        self.deletes: List[str] = []
+
+    async def on_change(self, data):
+        self.changes += [data["id"]]
+
+    async def on_delete(self, data):
+        self.deletes += [data["id"]]
+
+
+def run_client(monkeypatch, responses, epoch="e1") -> ClientStub:
+    client = ClientStub("cfgping", responses)
+
+    async def fetch(url, resolver=None, headers=None):
+        client.urls += [url]
+        items = client.responses.pop(0)
+        h = {"X-NOC-DataStream-Epoch": epoch} if epoch else {}
+        if items:
+            h["X-NOC-DataStream-Last-Change"] = items[-1]["change_id"]
+        return 200, h, orjson.dumps(items)
+
+    monkeypatch.setattr(ds_client, "fetch", fetch)
+    asyncio.run(client.query(filters=["pool(default)"], filter_policy="delete"))
+    return client
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    prev = config.path.datastream_snapshot
+    config.path.datastream_snapshot = str(tmp_path)
+    yield tmp_path
+    config.path.datastream_snapshot = prev
+
+
+def test_client_snapshot(monkeypatch, snapshot_path):
+    # Initial run
+    client = run_client(monkeypatch, [[item(1, 1), item(2, 2)], []])
+    assert client.changes == ["1", "2"]
+    assert "from=" not in client.urls[0]
+    # Restart, continue from snapshot
+    client = run_client(monkeypatch, [[item(3, 3, **{"$deleted": True})], []])
+    assert client.changes == ["1", "2"]
+    assert client.deletes == ["3"]
+    assert client.urls[0].endswith("from=%024x" % 2)
+    # Epoch changed, full resync
+    client = run_client(monkeypatch, [[item(5, 5)], [item(4, 4)], []], epoch="e2")
+    assert client.changes == ["4"]
+    assert "from=" not in client.urls[1]
@@ -0,0 +1,97 @@
+# ----------------------------------------------------------------------
+# Datastream server push mode tests
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Python modules
+import asyncio
+from http import HTTPStatus
+
+# Third-party modules
+import pytest
+from fastapi import HTTPException
+
+# NOC modules
+from noc.core.datastream.notifier import ChangeNotifier
+from noc.services.datastream.paths.datastream import DatastreamAPI
+
+
+class FakeDataStream(object):
+    name = "fake"
+    DEFAULT_LIMIT = 3
+
+    def __init__(self, n: int):
+        self.records = [(str(i), "%04d" % i, '{"id": "%d"}' % i) for i in range(n)]
+        # Limits of the queries
+        self.queries = []
+
+    @staticmethod
+    def compile_filters(filters):
+        return {}
+
+    @staticmethod
+    def clean_change_id(change_id):
+        return change_id
+
+    async def iter_data_async(
+        self, change_id=None, limit=None, filters=None, fmt=None, filter_policy=None
+    ):
+        self.queries += [limit]
+        # Database query
+        await asyncio.sleep(0)
+        records = [r for r in self.records if not change_id or r[1] > change_id]
+        for r in records[: limit or self.DEFAULT_LIMIT]:
+            yield r
+
+
+def get_api(notifier=None) -> DatastreamAPI:
+    """
+    DatastreamAPI without routes and waiter threads
+    """
+    api = DatastreamAPI.__new__(DatastreamAPI)
+    api.ds_notifiers = {FakeDataStream.name: notifier} if notifier else {}
+    return api
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro(loop))
+    finally:
+        loop.close()
+
+
+@pytest.mark.parametrize("limit", [0, 2, 3, 100])
+def test_stream_limit(limit):
+    async def inner(loop):
+        ds = FakeDataStream(7)
+        notifier = ChangeNotifier(loop)
+        api = get_api(notifier)
+        response = api.get_stream_response(ds, "ndjson", limit=limit, filters=[])
+        page = min(limit or ds.DEFAULT_LIMIT, ds.DEFAULT_LIMIT)
+        assert response.headers["X-NOC-DataStream-Limit"] == str(page)
+        stream = response.body_iterator
+        r = [await stream.__anext__() for _ in range(7)]
+        assert r == ['{"id": "%d"}\n' % i for i in range(7)]
+        # Pushed on change
+        ds.records += [("7", "0007", '{"id": "7"}')]
+        notifier._notify()
+        assert await stream.__anext__() == '{"id": "7"}\n'
+        n_queries = len(ds.queries)
+        assert n_queries == 7 // page + 2
+        assert set(ds.queries) == {page}
+        # Waiting for changes, without database polling
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(stream.__anext__(), 0.1)
+        assert len(ds.queries) == n_queries
+
+    run(inner)
+
+
+def test_stream_negative_limit():
+    api = get_api()
+    with pytest.raises(HTTPException) as e:
+        api.get_stream_response(FakeDataStream(1), "ndjson", limit=-1, filters=[])
+    assert e.value.status_code == HTTPStatus.BAD_REQUEST
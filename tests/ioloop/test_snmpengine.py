@@ -0,0 +1,166 @@
+# ----------------------------------------------------------------------
+# Shared SNMP engine test
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Python modules
+import asyncio
+import socket
+import threading
+
+# Third-party modules
+import pytest
+
+# NOC modules
+from noc.core.ioloop.snmpengine import SNMPEngine, get_request_id
+from noc.core.snmp.get import get_pdu
+
+
+class Agent(object):
+    """
+    Echo requests back in reversed order, ignoring the ones with `drop` request ids
+    """
+
+    def __init__(self, n: int, drop=None):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.port = self.sock.getsockname()[1]
+        self.n = n
+        self.drop = drop or set()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        received = []
+        for _ in range(self.n):
+            received.append(self.sock.recvfrom(4096))
+        for data, addr in reversed(received):
+            if get_request_id(data) not in self.drop:
+                self.sock.sendto(data, addr)
+        self.sock.close()
+
+
+@pytest.mark.parametrize("request_id", [1, 127, 128, 255, 256, 65535, 0x7FFFFFFF])
+def test_get_request_id(request_id):
+    pdu = get_pdu("public", ["1.3.6.1.2.1.1.2.0"], request_id=request_id)
+    assert get_request_id(pdu) == request_id
+
+
+def test_get_request_id_malformed():
+    assert get_request_id(b"") is None
+    assert get_request_id(b"\x02\x01\x00") is None
+
+
+def test_engine_demultiplex():
+    engine = SNMPEngine(pool_size=2)
+    n = 20
+    agent = Agent(n)
+
+    async def run():
+        ids = [engine.get_request_id() for _ in range(n)]
+        pdus = [get_pdu("public", ["1.3.6.1.2.1.1.2.0"], request_id=rid) for rid in ids]
+        r = await asyncio.gather(
+            *[
+                engine.send_and_receive(pdu, ("127.0.0.1", agent.port), rid, timeout=5)
+                for pdu, rid in zip(pdus, ids)
+            ]
+        )
+        return pdus, r
+
+    try:
+        pdus, r = asyncio.run(run())
+    finally:
+        engine.shutdown()
+    assert r == pdus
+    assert not engine.requests
+
+
+def test_engine_timeout():
+    engine = SNMPEngine()
+    ids = [engine.get_request_id() for _ in range(2)]
+    agent = Agent(2, drop={ids[1]})
+
+    async def run():
+        return await asyncio.gather(
+            *[
+                engine.send_and_receive(
+                    get_pdu("public", ["1.3.6.1.2.1.1.2.0"], request_id=rid),
+                    ("127.0.0.1", agent.port),
+                    rid,
+                    timeout=0.5,
+                )
+                for rid in ids
+            ],
+            return_exceptions=True,
+        )
+
+    try:
+        r = asyncio.run(run())
+    finally:
+        engine.shutdown()
+    assert isinstance(r[0], bytes)
+    assert isinstance(r[1], asyncio.TimeoutError)
+    assert not engine.requests
+
+
+class ForeignAgent(object):
+    """
+    Reply from another socket, like multi-homed or NATed device
+    """
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.port = self.sock.getsockname()[1]
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        data, addr = self.sock.recvfrom(4096)
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as reply_sock:
+            reply_sock.sendto(data, addr)
+        self.sock.close()
+
+
+@pytest.mark.parametrize("address", ["127.0.0.1", "localhost"])
+def test_engine_foreign_source(address):
+    engine = SNMPEngine()
+    agent = ForeignAgent()
+    rid = engine.get_request_id()
+    pdu = get_pdu("public", ["1.3.6.1.2.1.1.2.0"], request_id=rid)
+
+    async def run():
+        return await engine.send_and_receive(pdu, (address, agent.port), rid, timeout=2)
+
+    try:
+        r = asyncio.run(run())
+    finally:
+        engine.shutdown()
+    assert r == pdu
+
+
+def test_engine_check_source():
+    engine = SNMPEngine(check_source=True)
+    agent = ForeignAgent()
+    rid = engine.get_request_id()
+    pdu = get_pdu("public", ["1.3.6.1.2.1.1.2.0"], request_id=rid)
+
+    async def run():
+        return await engine.send_and_receive(pdu, ("127.0.0.1", agent.port), rid, timeout=0.5)
+
+    try:
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(run())
+    finally:
+        engine.shutdown()
+    assert not engine.requests
+
+
+def test_engine_request_id():
+    engine = SNMPEngine()
+    ids = [engine.get_request_id() for _ in range(100)]
+    assert all(1 <= rid <= 0x7FFFFFFF for rid in ids)
+    # Not sequential
+    assert any(b - a != 1 for a, b in zip(ids, ids[1:]))
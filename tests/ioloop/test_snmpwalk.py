@@ -0,0 +1,195 @@
+# ----------------------------------------------------------------------
+# Adaptive table walker test
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Python modules
+import asyncio
+from typing import Tuple
+
+# Third-party modules
+import pytest
+
+# NOC modules
+from noc.core.ioloop.snmp import TableWalker, get_bulk_limit, BULK_MAX_REPETITIONS
+from noc.core.snmp.ber import BERDecoder, BEREncoder
+from noc.core.snmp.consts import PDU_GETBULK_REQUEST, PDU_RESPONSE
+from noc.core.snmp.error import NO_ERROR, TOO_BIG, SNMPError
+
+IF_DESCR = "1.3.6.1.2.1.2.2.1.2"
+IF_TYPE = "1.3.6.1.2.1.2.2.1.3"
+IF_MTU = "1.3.6.1.2.1.2.2.1.4"
+IF_SPEED = "1.3.6.1.2.1.2.2.1.5"
+IF_PHYS = "1.3.6.1.2.1.2.2.1.6"
+COLUMNS = [IF_DESCR, IF_TYPE, IF_MTU, IF_SPEED, IF_PHYS]
+N_ROWS = 150
+
+
+def oid_key(oid: str):
+    return tuple(int(x) for x in oid.split("."))
+
+
+class FakeAgent(object):
+    """
+    In-memory agent, serving GETNEXT/GETBULK requests.
+    Responses with more than `max_varbinds` varbinds are rejected with tooBig.
+    Requests with numbers from `too_big` are rejected with tooBig,
+    and ones from `drop` are left without response
+    """
+
+    def __init__(self, max_varbinds: int = 1000, too_big=None, drop=None):
+        self.mib = {}
+        for c in COLUMNS:
+            for i in range(1, N_ROWS + 1):
+                self.mib[f"{c}.{i}"] = b"\x02\x01\x01"  # INTEGER 1
+        self.mib["1.3.6.1.2.1.2.2.2.1"] = b"\x02\x01\x01"
+        self.oids = sorted(self.mib, key=oid_key)
+        self.keys = [oid_key(o) for o in self.oids]
+        self.max_varbinds = max_varbinds
+        self.too_big = too_big or set()
+        self.drop = drop or set()
+        self.requests = 0
+        self.max_reps = []
+
+    def get_next(self, oid: str):
+        key = oid_key(oid)
+        for k, o in zip(self.keys, self.oids):
+            if k > key:
+                return o, self.mib[o]
+        return oid, b"\x82\x00"  # endOfMibView
+
+    async def send_and_receive(
+        self, data: bytes, address: Tuple[str, int]
+    ) -> Tuple[bytes, Tuple[str, int]]:
+        self.requests += 1
+        msg = BERDecoder().parse_sequence(data)[0]
+        pdu = msg[2]
+        oids = [vb[0] for vb in pdu[4]]
+        reps = pdu[3] if pdu[0] == PDU_GETBULK_REQUEST else 1
+        self.max_reps.append(reps)
+        if self.requests in self.drop:
+            await asyncio.sleep(10)
+        varbinds = []
+        current = list(oids)
+        for _ in range(reps):
+            for i, oid in enumerate(current):
+                current[i], v = self.get_next(oid)
+                varbinds.append((current[i], v))
+        status = NO_ERROR
+        if len(varbinds) > self.max_varbinds or self.requests in self.too_big:
+            status, varbinds = TOO_BIG, []
+        e = BEREncoder()
+        return (
+            e.encode_sequence(
+                [
+                    e.encode_int(msg[0]),
+                    e.encode_octet_string(msg[1]),
+                    e.encode_choice(
+                        PDU_RESPONSE,
+                        [
+                            e.encode_int(pdu[1]),
+                            e.encode_int(status),
+                            e.encode_int(0),
+                            e.encode_sequence(
+                                [e.encode_sequence([e.encode_oid(o), v]) for o, v in varbinds]
+                            ),
+                        ],
+                    ),
+                ]
+            ),
+            address,
+        )
+
+
+@pytest.mark.parametrize("bulk", [False, True])
+def test_walk_tables(bulk):
+    agent = FakeAgent()
+    walker = TableWalker("192.0.2.1", bulk=bulk, udp_socket=agent)
+    r = asyncio.run(walker.walk(COLUMNS))
+    assert len(r) == len(COLUMNS)
+    for c, column in zip(COLUMNS, r):
+        assert [o for o, _ in column] == [f"{c}.{i}" for i in range(1, N_ROWS + 1)]
+        assert all(v == 1 for _, v in column)
+    if bulk:
+        assert agent.requests < N_ROWS
+    else:
+        # Each group of columns takes a request per row
+        assert agent.requests <= 2 * (N_ROWS + 1)
+
+
+def test_walk_tables_too_big():
+    agent = FakeAgent(max_varbinds=30)
+    walker = TableWalker("192.0.2.2", bulk=True, udp_socket=agent, max_columns=4)
+    r = asyncio.run(walker.walk(COLUMNS))
+    assert [len(column) for column in r] == [N_ROWS] * len(COLUMNS)
+    # Halved from 20 until 4 columns x 5 repetitions fit 30 varbinds
+    assert walker.limit == 5
+    assert get_bulk_limit("192.0.2.2") == 5
+    # Learned limit is applied to the next walk
+    agent = FakeAgent(max_varbinds=30)
+    walker = TableWalker("192.0.2.2", bulk=True, udp_socket=agent, max_columns=4)
+    asyncio.run(walker.walk(COLUMNS))
+    assert max(agent.max_reps) <= 5
+
+
+def test_walk_tables_fixed():
+    agent = FakeAgent()
+    reps = 2 * BULK_MAX_REPETITIONS
+    walker = TableWalker("192.0.2.3", bulk=True, udp_socket=agent, max_repetitions=reps)
+    r = asyncio.run(walker.walk(COLUMNS))
+    assert [len(column) for column in r] == [N_ROWS] * len(COLUMNS)
+    # Neither capped nor adapted
+    assert set(agent.max_reps) == {reps}
+    assert get_bulk_limit("192.0.2.3") is None
+
+
+def test_walk_tables_fixed_too_big():
+    agent = FakeAgent(max_varbinds=30)
+    walker = TableWalker("192.0.2.4", bulk=True, udp_socket=agent, max_repetitions=20)
+    with pytest.raises(SNMPError):
+        asyncio.run(walker.walk(COLUMNS))
+    assert get_bulk_limit("192.0.2.4") is None
+
+
+def test_walk_tables_single_too_big():
+    agent = FakeAgent(too_big={2})
+    walker = TableWalker("192.0.2.5", bulk=True, udp_socket=agent, concurrency=1)
+    r = asyncio.run(walker.walk(COLUMNS))
+    assert [len(column) for column in r] == [N_ROWS] * len(COLUMNS)
+    assert walker.limit == walker.initial_limit
+    assert get_bulk_limit("192.0.2.5") is None
+
+
+def test_walk_tables_timeout():
+    agent = FakeAgent(drop={2})
+    walker = TableWalker("192.0.2.6", bulk=True, udp_socket=agent, concurrency=1, timeout=0.1)
+    r = asyncio.run(walker.walk(COLUMNS))
+    assert [len(column) for column in r] == [N_ROWS] * len(COLUMNS)
+    # Retried with reduced max-repetitions
+    assert agent.max_reps[2] == agent.max_reps[1] // 2
+    # Limit, learned from the timeout, is never remembered
+    assert walker.limit == walker.initial_limit
+    assert get_bulk_limit("192.0.2.6") is None
+
+
+@pytest.mark.parametrize("max_retries", [0, 1, 3])
+def test_walk_tables_silent(max_retries):
+    # Device stops answering after the first response
+    agent = FakeAgent(drop=set(range(2, 100)))
+    walker = TableWalker(
+        "192.0.2.7",
+        bulk=True,
+        udp_socket=agent,
+        max_columns=len(COLUMNS),
+        timeout=0.1,
+        max_retries=max_retries,
+    )
+    with pytest.raises(SNMPError):
+        asyncio.run(walker.walk(COLUMNS))
+    # Single reduced request, then the retries
+    assert agent.requests == 1 + 1 + 1 + max_retries
+    assert agent.max_reps[2] == agent.max_reps[1] // 2
+    assert len(set(agent.max_reps[2:])) == 1
+    assert get_bulk_limit("192.0.2.7") is None
@@ -0,0 +1,120 @@
+# ----------------------------------------------------------------------
+# noc.core.ioloop.util tests
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Python modules
+import asyncio
+import threading
+
+# Third-party modules
+import pytest
+
+# NOC modules
+from noc.core.ioloop.util import (
+    IOLoopContext,
+    run_sync,
+    get_thread_loop,
+    close_thread_loop,
+    setup_asyncio,
+)
+
+
+@pytest.fixture(autouse=True)
+def thread_loop():
+    setup_asyncio()
+    yield
+    close_thread_loop()
+
+
+async def get_running_loop():
+    return asyncio.get_running_loop()
+
+
+def test_context_fresh_loop():
+    with IOLoopContext() as loop1:
+        assert loop1.run_until_complete(get_running_loop()) is loop1
+    with IOLoopContext() as loop2:
+        pass
+    assert loop1 is not loop2
+    assert loop1.is_closed()
+    assert loop2.is_closed()
+
+
+def test_context_persistent_loop():
+    with IOLoopContext(persistent=True) as loop1:
+        assert loop1.run_until_complete(get_running_loop()) is loop1
+    with IOLoopContext(persistent=True) as loop2:
+        pass
+    assert loop1 is loop2
+    assert loop1 is get_thread_loop()
+    assert not loop1.is_closed()
+    assert asyncio._get_running_loop() is None
+    close_thread_loop()
+    assert loop1.is_closed()
+    assert get_thread_loop() is not loop1
+
+
+def test_run_sync_persistent():
+    loop1 = run_sync(get_running_loop, persistent=True)
+    loop2 = run_sync(get_running_loop, persistent=True)
+    assert loop1 is loop2
+    assert run_sync(get_running_loop) is not loop1
+
+
+def test_run_sync_persistent_error():
+    async def fail():
+        raise ValueError("test")
+
+    with pytest.raises(ValueError):
+        run_sync(fail, persistent=True)
+    assert not get_thread_loop().is_closed()
+
+
+def test_persistent_cancel_tasks():
+    cancelled = []
+
+    async def sleeper():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def spawn():
+        asyncio.get_running_loop().create_task(sleeper())
+        await asyncio.sleep(0)
+
+    run_sync(spawn, persistent=True)
+    assert cancelled == [True]
+    assert not asyncio.all_tasks(get_thread_loop())
+
+
+def test_persistent_per_thread():
+    loops = []
+
+    def run():
+        loops.append(run_sync(get_running_loop, persistent=True))
+        close_thread_loop()
+
+    t = threading.Thread(target=run)
+    t.start()
+    t.join()
+    assert loops[0] is not get_thread_loop()
+    assert loops[0].is_closed()
+
+
+def test_persistent_inside_running_loop():
+    async def outer():
+        outer_loop = asyncio.get_running_loop()
+        inner_loop = run_sync(get_running_loop, persistent=True)
+        assert asyncio.get_running_loop() is outer_loop
+        return inner_loop
+
+    with IOLoopContext(persistent=True) as loop:
+        inner = loop.run_until_complete(outer())
+    # Persistent loop is busy, fresh loop is used
+    assert inner is not loop
+    assert inner.is_closed()
@@ -0,0 +1,121 @@
+# ----------------------------------------------------------------------
+# CLI.read_until_prompt tests
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Python modules
+import re
+import asyncio
+import logging
+from typing import List
+
+# Third-party modules
+import pytest
+
+# NOC modules
+from noc.core.script.cli.cli import CLI, get_prefilter
+from noc.sa.profiles.Cisco.IOS.profile import Profile
+
+FLAGS = re.DOTALL | re.MULTILINE
+
+
+class ScriptStub(object):
+    def __init__(self):
+        self.profile = Profile()
+        self.credentials = {}
+        self.native_encoding = "utf-8"
+        self.logger = logging.getLogger("test")
+        self.to_track = False
+
+
+class StreamStub(object):
+    def __init__(self, chunks: List[bytes]):
+        self.chunks = list(chunks)
+        self.sent: List[bytes] = []
+
+    async def read(self, n: int) -> bytes:
+        return self.chunks.pop(0)
+
+    async def write(self, data: bytes) -> None:
+        self.sent += [data]
+
+    def set_timeout(self, timeout):
+        pass
+
+    def close(self):
+        pass
+
+
+def read_until_prompt(chunks: List[bytes]) -> bytes:
+    cli = CLI(ScriptStub())
+    cli.stream = StreamStub(chunks)
+    cli.is_started = True
+    cli.allow_empty_response = True
+    cli.command = "show running-config"
+    cli.expect({"prompt": cli.on_prompt, "pager": cli.send_pager_reply})
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(cli.read_until_prompt())
+    finally:
+        loop.close()
+
+
+@pytest.mark.parametrize(
+    "chunks,expected",
+    [
+        ([b"line1\nline2\nsw1#"], b"line1\nline2\n"),
+        # Prompt is split across reads
+        ([b"line1\nline2\ns", b"w1", b"#"], b"line1\nline2\n"),
+        # Control sequence is split across reads
+        ([b"line1\x1b[", b"1mline2\x1b", b"[0m\nsw1#"], b"line1line2\n"),
+        # Pager
+        ([b"line1\n --More-- ", b"line2\nsw1#"], b"line1\nline2\n"),
+    ],
+)
+def test_read_until_prompt(chunks, expected):
+    assert read_until_prompt(chunks) == expected
+
+
+def test_read_until_prompt_long():
+    lines = [
+        b"interface Gi0/%d\r\n description \x1b[1mPort %d\x1b[0m\r\n" % (i, i) for i in range(2000)
+    ]
+    data = b"".join(lines) + b"sw1#"
+    # Same as cleaning whole output at once
+    expected = CLI(ScriptStub()).cleaned_input(b"".join(lines))
+    assert b"\x1b" not in expected
+    for size in (7, 64, 4096):
+        chunks = [data[i : i + size] for i in range(0, len(data), size)]
+        assert read_until_prompt(chunks) == expected
+
+
+@pytest.mark.parametrize(
+    "patterns,data,expected",
+    [
+        ((rb"^(?P<hostname>\S+)#", rb"^(?P<hostname>\S+)>"), b"xxx\nsw1>", True),
+        ((rb"^(?P<hostname>\S+)#", rb"^(?P<hostname>\S+)>"), b"xxx\nsw1#", True),
+        ((rb"^(?P<hostname>\S+)#", rb"^(?P<hostname>\S+)>"), b"xxx\nsw1", False),
+        ((rb"^(?P<hostname>\S+)(?P=hostname)#", rb"Password:"), b"xxx\nswsw#", True),
+    ],
+)
+def test_prefilter(patterns, data, expected):
+    rx = get_prefilter(tuple((p, FLAGS) for p in patterns))
+    assert rx
+    assert bool(rx.search(data)) is expected
+
+
+@pytest.mark.parametrize(
+    "patterns",
+    [
+        # Single pattern
+        ((rb"^\S+#", FLAGS),),
+        # Numbered backreference
+        ((rb"^(\S+)\1#", FLAGS), (rb"Password:", FLAGS)),
+        # Different flags
+        ((rb"^\S+#", FLAGS), (rb"Password:", re.MULTILINE)),
+    ],
+)
+def test_prefilter_fallback(patterns):
+    assert get_prefilter(patterns) is None
@@ -0,0 +1,154 @@
+# ----------------------------------------------------------------------
+# noc.services.discovery.jobs.checkgraph tests
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Python modules
+import contextlib
+import threading
+import time
+from typing import List, Optional
+
+# Third-party modules
+import pytest
+
+# NOC modules
+from noc.services.discovery.jobs.checkgraph import CheckGraph
+
+
+class Tracker(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = []
+        self.running = 0
+        self.max_running = 0
+
+    def start(self, name: str) -> None:
+        with self.lock:
+            self.events += [("start", name)]
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+
+    def stop(self, name: str) -> None:
+        with self.lock:
+            self.events += [("stop", name)]
+            self.running -= 1
+
+    def index(self, event: str, name: str) -> int:
+        return self.events.index((event, name))
+
+
+class CheckStub(object):
+    def __init__(
+        self,
+        tracker: Tracker,
+        name: str,
+        provided: Optional[List[str]] = None,
+        used: Optional[List[str]] = None,
+        exclusive: bool = False,
+        error: bool = False,
+    ):
+        self.tracker = tracker
+        self.name = name
+        self.provided = provided or []
+        self.used = used or []
+        self.exclusive = exclusive
+        self.error = error
+        self.thread = None
+
+    def get_provided_artefacts(self):
+        return set(self.provided)
+
+    def get_used_artefacts(self):
+        return set(self.used)
+
+    def run(self):
+        self.thread = threading.current_thread()
+        self.tracker.start(self.name)
+        time.sleep(0.02)
+        self.tracker.stop(self.name)
+        if self.error:
+            raise ValueError(self.name)
+
+
+def get_checks(tracker: Tracker) -> List[CheckStub]:
+    return [
+        CheckStub(tracker, "version", provided=["object_attributes"], exclusive=True),
+        CheckStub(tracker, "config", provided=["confdb"]),
+        CheckStub(tracker, "caps", provided=["caps"], used=["object_attributes", "confdb"]),
+        CheckStub(tracker, "asset", provided=["asset"]),
+        CheckStub(tracker, "interface", provided=["interfaces"], used=["confdb", "asset"]),
+        CheckStub(tracker, "alarms"),
+        CheckStub(tracker, "lldp", provided=["topology"], used=["interfaces", "topology", "caps"]),
+        CheckStub(tracker, "cdp", provided=["topology"], used=["interfaces", "topology", "caps"]),
+        CheckStub(tracker, "sla", provided=["sla"], used=["caps"]),
+        CheckStub(tracker, "diagnostic", exclusive=True),
+    ]
+
+
+def test_dependencies():
+    deps = CheckGraph.get_dependencies(get_checks(Tracker()))
+    assert deps == [
+        set(),  # version
+        {0},  # config
+        {0, 1},  # caps
+        {0},  # asset
+        {0, 1, 3},  # interface
+        {0},  # alarms
+        {0, 2, 4},  # lldp
+        {0, 2, 4, 6},  # cdp
+        {0, 2},  # sla
+        set(range(9)),  # diagnostic
+    ]
+
+
+def test_sequential():
+    tracker = Tracker()
+    checks = get_checks(tracker)
+    CheckGraph(checks).run(concurrency=1)
+    assert [name for event, name in tracker.events if event == "start"] == [c.name for c in checks]
+    assert tracker.max_running == 1
+    assert all(c.thread is threading.current_thread() for c in checks)
+
+
+@pytest.mark.parametrize("concurrency", [2, 3, 16])
+def test_concurrent(concurrency):
+    tracker = Tracker()
+    checks = get_checks(tracker)
+    graph = CheckGraph(checks)
+    graph.run(concurrency=concurrency)
+    assert 1 < tracker.max_running <= concurrency
+    for i, check in enumerate(checks):
+        for d in graph.deps[i]:
+            assert tracker.index("stop", checks[d].name) < tracker.index("start", check.name)
+    # Topology methods keep preference order
+    assert tracker.index("stop", "lldp") < tracker.index("start", "cdp")
+
+
+def test_error():
+    tracker = Tracker()
+    checks = get_checks(tracker)
+    checks[1].error = True
+    with pytest.raises(ValueError):
+        CheckGraph(checks).run(concurrency=4)
+    started = {name for event, name in tracker.events if event == "start"}
+    assert "config" in started
+    assert "diagnostic" not in started
+    assert tracker.running == 0
+
+
+def test_worker_context():
+    tracker = Tracker()
+    checks = get_checks(tracker)
+    threads = set()
+
+    @contextlib.contextmanager
+    def worker_context():
+        threads.add(threading.current_thread())
+        yield
+
+    CheckGraph(checks).run(concurrency=3, worker_context=worker_context)
+    assert len(threads) == 3
+    assert {c.thread for c in checks} <= threads
@@ -0,0 +1,129 @@
+# ----------------------------------------------------------------------
+# Metrics service rule index test
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Python modules
+import random
+from typing import Dict, List, Set
+
+# Third-party modules
+import pytest
+
+# NOC modules
+from noc.services.metrics.service import Rule, RuleIndex
+
+SCOPES = ["interface", "cpu", "environment"]
+LABELS = [f"noc::label::{n}" for n in range(12)]
+
+
+def get_rule(id: str, scopes, match_labels) -> Rule:
+    return Rule(
+        id=id,
+        match_labels=frozenset(frozenset(ml) for ml in match_labels),
+        exclude_labels=None,
+        match_scopes=set(scopes),
+        graph=None,
+        configs={},
+    )
+
+
+def get_random_rule(rnd: random.Random, id: str) -> Rule:
+    match_labels = []
+    for _ in range(rnd.randrange(4)):
+        if rnd.random() < 0.1:
+            # Empty labels set, matched by any source
+            match_labels += [[]]
+        else:
+            match_labels += [rnd.sample(LABELS, rnd.randint(1, 3))]
+    return get_rule(id, rnd.sample(SCOPES, rnd.randint(1, 2)), match_labels)
+
+
+def get_matched(rules: Dict[str, Rule], scope: str, labels: Set[str]) -> List[str]:
+    """
+    Linear scan over the rules, as it was done before the index
+    """
+    return [
+        rule_id
+        for rule_id, rule in rules.items()
+        if scope in rule.match_scopes and rule.is_matched(labels)
+    ]
+
+
+def get_indexed(
+    index: RuleIndex, rules: Dict[str, Rule], scope: str, labels: Set[str]
+) -> List[str]:
+    candidates = index.get_candidates(scope, labels)
+    assert len(candidates) == len(set(candidates))
+    return [rule_id for rule_id in candidates if rules[rule_id].is_matched(labels)]
+
+
+def get_random_labels(rnd: random.Random) -> Set[str]:
+    return set(rnd.sample(LABELS, rnd.randint(0, len(LABELS))))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_index_equivalence(seed):
+    rnd = random.Random(seed)
+    rules: Dict[str, Rule] = {}
+    index = RuleIndex()
+    for n in range(50):
+        rule = get_random_rule(rnd, f"rule{n}")
+        rules[rule.id] = rule
+        index.add(rule)
+    assert len(index) == len(rules)
+    for _ in range(100):
+        scope, labels = rnd.choice(SCOPES), get_random_labels(rnd)
+        assert get_indexed(index, rules, scope, labels) == get_matched(rules, scope, labels)
+    # Update and delete rules, as update_rules/delete_rules does
+    for n in range(50):
+        rule_id = f"rule{rnd.randrange(60)}"
+        if rule_id in rules and rnd.random() < 0.5:
+            del rules[rule_id]
+            index.remove(rule_id)
+            continue
+        rule = get_random_rule(rnd, rule_id)
+        rules[rule_id] = rule
+        index.add(rule)
+        assert len(index) == len(rules)
+        scope, labels = rnd.choice(SCOPES), get_random_labels(rnd)
+        assert get_indexed(index, rules, scope, labels) == get_matched(rules, scope, labels)
+
+
+def test_index_wildcard():
+    rules = {
+        "any": get_rule("any", ["interface"], [[]]),
+        "uplink": get_rule("uplink", ["interface"], [["noc::uplink"]]),
+        "cpu": get_rule("cpu", ["cpu"], [[]]),
+        "never": get_rule("never", ["interface"], []),
+    }
+    index = RuleIndex()
+    for rule in rules.values():
+        index.add(rule)
+    assert index.get_candidates("interface", set()) == ["any"]
+    assert index.get_candidates("interface", {"noc::uplink"}) == ["any", "uplink"]
+    assert index.get_candidates("cpu", {"noc::uplink"}) == ["cpu"]
+    assert index.get_candidates("environment", {"noc::uplink"}) == []
+
+
+def test_index_order():
+    rules = {
+        "r1": get_rule("r1", ["interface"], [["a"]]),
+        "r2": get_rule("r2", ["interface"], [["b"]]),
+        "r3": get_rule("r3", ["interface"], [["a", "b"]]),
+    }
+    index = RuleIndex()
+    for rule in rules.values():
+        index.add(rule)
+    assert index.get_candidates("interface", {"a", "b"}) == ["r1", "r2", "r3"]
+    # Changed rule keeps its position
+    index.add(get_rule("r1", ["interface"], [["b"]]))
+    assert index.get_candidates("interface", {"a", "b"}) == ["r1", "r2", "r3"]
+    assert index.get_candidates("interface", {"a"}) == ["r3"]
+    # Deleted and added again rule is moved to the end
+    index.remove("r1")
+    assert index.get_candidates("interface", {"a", "b"}) == ["r2", "r3"]
+    index.add(get_rule("r1", ["interface"], [["a"]]))
+    assert index.get_candidates("interface", {"a", "b"}) == ["r2", "r3", "r1"]
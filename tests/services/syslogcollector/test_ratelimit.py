@@ -0,0 +1,51 @@
+# ----------------------------------------------------------------------
+# Syslogcollector rate limit test
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# NOC modules
+from noc.services.syslogcollector.ratelimit import SourceRateLimit
+from noc.services.syslogcollector.sourceconfig import SourceConfig
+
+
+def get_config(id: str, rate_limit: int = 0, rate_burst: int = 0) -> SourceConfig:
+    return SourceConfig(
+        id=id,
+        addresses=("192.0.2.1",),
+        bi_id=1,
+        process_events=True,
+        archive_events=False,
+        stream="events.default",
+        partition=0,
+        rate_limit=rate_limit,
+        rate_burst=rate_burst,
+    )
+
+
+def test_unlimited():
+    limit = SourceRateLimit()
+    cfg = get_config("1")
+    assert all(limit.is_allowed(cfg, 100, "Link down", 1, 3) for _ in range(1000))
+    assert not limit.flush()
+
+
+def test_storm_aggregation():
+    limit = SourceRateLimit()
+    cfg = get_config("1", rate_limit=1, rate_burst=5)
+    other = get_config("2", rate_limit=1, rate_burst=5)
+    passed = 0
+    for i in range(100):
+        passed += limit.is_allowed(cfg, 100 + i // 10, "Link down", 1, 3, "192.0.2.1")
+        passed += limit.is_allowed(cfg, 100 + i // 10, "Link up", 1, 3, "192.0.2.1")
+    # Other sources are not affected
+    assert limit.is_allowed(other, 110, "Link down", 1, 3, "192.0.2.2")
+    assert passed == 5
+    aggregated = sorted(limit.flush(), key=lambda x: x.message)
+    assert [a.message for a in aggregated] == ["Link down", "Link up"]
+    # Counts are accurate
+    assert passed + sum(a.repeats for a in aggregated) == 200
+    assert aggregated[0].first_ts == 100
+    assert aggregated[0].last_ts == 109
+    assert not limit.flush()
@@ -0,0 +1,44 @@
+# ----------------------------------------------------------------------
+# noc.core.ahocorasick tests
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Third-party modules
+import pytest
+
+# NOC modules
+from noc.core.ahocorasick import AhoCorasick
+
+
+@pytest.mark.parametrize(
+    "keywords,text,expected",
+    [
+        (["he", "she", "his", "hers"], "ushers", {0, 1, 3}),
+        (["he", "she", "his", "hers"], "ahishers", {0, 1, 2, 3}),
+        (["link down", "link up"], "Interface Gi 0/1 link down", {0}),
+        (["a", "aa", "aaa"], "aa", {0, 1}),
+        (["abc"], "ab", set()),
+        (["abc"], "", set()),
+    ],
+)
+def test_search(keywords, text, expected):
+    ac = AhoCorasick()
+    for i, kw in enumerate(keywords):
+        ac.add(kw, i)
+    ac.build()
+    assert ac.search(text) == expected
+
+
+def test_not_built():
+    ac = AhoCorasick()
+    ac.add("abc", 1)
+    with pytest.raises(RuntimeError):
+        ac.search("abc")
+
+
+def test_empty_keyword():
+    ac = AhoCorasick()
+    with pytest.raises(ValueError):
+        ac.add("", 1)
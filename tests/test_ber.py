@@ -1,7 +1,7 @@
 # ----------------------------------------------------------------------
 # noc.core.snmp.ber tests
 # ----------------------------------------------------------------------
-# Copyright (C) 2007-2019 The NOC Project
+# Copyright (C) 2007-2022 The NOC Project
 # See LICENSE for details
 # ----------------------------------------------------------------------
 
@@ -9,7 +9,20 @@
 import pytest
 
 # NOC modules
-from noc.core.snmp.ber import BEREncoder, BERDecoder
+from noc.core.snmp.ber import BEREncoder, BERDecoder, decode_fast
+from noc.core.snmp.error import UnsupportedMessage
+from noc.core.snmp import ber, pyber
+
+try:
+    from noc.speedup import ber as cber
+except ImportError:
+    cber = None
+
+# Pure-Python and compiled implementations
+IMPLEMENTATIONS = [
+    pytest.param(pyber, id="python"),
+    pytest.param(cber, id="cython", marks=pytest.mark.skipif(not cber, reason="Not compiled")),
+]
 
 
 @pytest.mark.parametrize("raw,value", [(b"\x00", False), (b"\x01", True), (b"", False)])
@@ -288,3 +301,166 @@ def test_encode_sequence(data, result):
 def test_encode_choice(tag, data, result):
     encoder = BEREncoder()
     assert encoder.encode_choice(tag, data) == result
+
+
+def _msg(pdu_tag, header, varbinds, version=1, community=b"public"):
+    e = BEREncoder()
+    return e.encode_sequence(
+        [
+            e.encode_int(version),
+            e.encode_octet_string(community),
+            e.encode_choice(
+                pdu_tag,
+                header + [e.encode_sequence([e.encode_sequence(vb) for vb in varbinds])],
+            ),
+        ]
+    )
+
+
+_e = BEREncoder()
+_RESPONSE_HEADER = [_e.encode_int(0x1234567), _e.encode_int(0), _e.encode_int(0)]
+_SYS_DESCR = _e.encode_oid("1.3.6.1.2.1.1.1.0")
+
+MESSAGES = [
+    # GetResponse, common types
+    _msg(
+        2,
+        _RESPONSE_HEADER,
+        [
+            [_SYS_DESCR, _e.encode_octet_string(b"Test system")],
+            [_e.encode_oid("1.3.6.1.2.1.1.2.0"), _e.encode_oid("1.3.6.1.4.1.9.1.1")],
+            [_e.encode_oid("1.3.6.1.2.1.1.3.0"), _e.encode_tlv(0x43, True, b"\x01\x00\x00")],
+            [_e.encode_oid("1.3.6.1.2.1.2.1.0"), _e.encode_int(-129)],
+            [_e.encode_oid("1.3.6.1.2.1.2.2.1.10.1"), _e.encode_tlv(0x41, True, b"\x00\xff")],
+            [
+                _e.encode_oid("1.3.6.1.2.1.2.2.1.5.1"),
+                _e.encode_tlv(0x42, True, b"\x3b\x9a\xca\x00"),
+            ],
+            [
+                _e.encode_oid("1.3.6.1.2.1.31.1.1.1.6.1"),
+                _e.encode_tlv(0x46, True, b"\x00\xff\xff\xff\xff\xff\xff\xff\xff"),
+            ],
+            [_e.encode_oid("1.3.6.1.2.1.31.1.1.1.10.1"), _e.encode_tlv(0x46, True, b"\x80" * 8)],
+            [
+                _e.encode_oid("1.3.6.1.2.1.4.20.1.1.10.0.0.1"),
+                _e.encode_tlv(0x40, True, b"\n\x00\x00\x01"),
+            ],
+            [_e.encode_oid("1.3.6.1.2.1.1.4.0"), _e.encode_null()],
+            [_e.encode_oid("1.3.6.1.2.1.1.5.0"), b"\x81\x00"],
+            [_e.encode_oid("1.3.6.1.2.1.1.6.0"), _e.encode_octet_string(b"x" * 300)],
+        ],
+    ),
+    # GetResponse, error
+    _msg(2, [_e.encode_int(1), _e.encode_int(2), _e.encode_int(1)], [[_SYS_DESCR, b"\x80\x00"]]),
+    # GetResponse, empty varbinds
+    _msg(2, _RESPONSE_HEADER, []),
+    # SNMPv2 Trap
+    _msg(
+        7,
+        _RESPONSE_HEADER,
+        [
+            [_e.encode_oid("1.3.6.1.2.1.1.3.0"), _e.encode_tlv(0x43, True, b"\x10")],
+            [_e.encode_oid("1.3.6.1.6.3.1.1.4.1.0"), _e.encode_oid("1.3.6.1.6.3.1.1.5.3")],
+            [_e.encode_oid("1.3.6.1.2.1.2.2.1.1.1"), _e.encode_int(1)],
+        ],
+    ),
+    # SNMPv1 Trap
+    _msg(
+        4,
+        [
+            _e.encode_oid("1.3.6.1.4.1.9"),
+            _e.encode_tlv(0x40, True, b"\xc0\xa8\x00\x01"),
+            _e.encode_int(2),
+            _e.encode_int(0),
+            _e.encode_tlv(0x43, True, b"\x7f"),
+        ],
+        [[_e.encode_oid("1.3.6.1.2.1.2.2.1.1.1"), _e.encode_int(1)]],
+        version=0,
+    ),
+]
+
+# Messages, processed by BERDecoder only
+UNSUPPORTED_MESSAGES = [
+    # Opaque float
+    _msg(2, _RESPONSE_HEADER, [[_SYS_DESCR, b"\x44\x07\x9f\x78\x04\x42\xf6\x00\x00"]]),
+    # Trailing data
+    _msg(2, _RESPONSE_HEADER, [[_SYS_DESCR, _e.encode_null()]]) + b"\x00",
+]
+
+MALFORMED_MESSAGES = [
+    # Truncated
+    MESSAGES[0][:-3],
+    # Truncated long form length
+    b"\x30\x82\x01",
+]
+
+
+@pytest.mark.parametrize("impl", IMPLEMENTATIONS)
+@pytest.mark.parametrize("msg", [b"\x30\x03\x02\x01\x01", b"\x04\x81\x04test", MESSAGES[0]])
+def test_parse_tlv_header_impl(impl, msg):
+    assert impl.parse_tlv_header(msg) == pyber.parse_tlv_header(msg)
+    if cber:
+        assert impl.parse_tlv_header(msg) == cber.parse_tlv_header(msg)
+
+
+@pytest.mark.parametrize("impl", IMPLEMENTATIONS)
+@pytest.mark.parametrize(
+    "oid", ["1.3.6.1.2.1.1.5.0", "1.3.6.128", "1.3.6.2147483647", "1.3.6.4160759936", "2.5.4.3"]
+)
+def test_oid_impl(impl, oid):
+    raw = impl.encode_oid(oid.encode())
+    assert raw == BEREncoder().encode_oid(oid)
+    assert impl.parse_p_oid(raw[2:]) == oid.encode()
+
+
+@pytest.mark.parametrize("impl", IMPLEMENTATIONS)
+@pytest.mark.parametrize("value", [1, 127, 128, 255, 256, 0x7FFF, 0x8000, 0x208511, 0x7FFFFFFF])
+def test_encode_int_impl(impl, value):
+    assert impl.encode_int(value) == BEREncoder().encode_int(value)
+
+
+@pytest.mark.parametrize("impl", IMPLEMENTATIONS)
+@pytest.mark.parametrize("msg", MESSAGES)
+def test_decode_message_impl(impl, msg):
+    assert impl.decode_message(msg) == pyber.decode_message(msg)
+
+
+@pytest.mark.parametrize("impl", IMPLEMENTATIONS)
+@pytest.mark.parametrize("msg", UNSUPPORTED_MESSAGES)
+def test_decode_message_unsupported(impl, msg):
+    with pytest.raises(UnsupportedMessage):
+        impl.decode_message(msg)
+
+
+@pytest.mark.parametrize("impl", IMPLEMENTATIONS)
+@pytest.mark.parametrize("msg", MALFORMED_MESSAGES)
+def test_decode_message_malformed(impl, msg):
+    with pytest.raises(ValueError) as e:
+        impl.decode_message(msg)
+    assert not isinstance(e.value, UnsupportedMessage)
+
+
+@pytest.mark.parametrize("msg", MESSAGES)
+def test_decode_fast(msg):
+    assert decode_fast(msg) == BERDecoder().parse_sequence(msg)[0]
+
+
+@pytest.mark.parametrize("msg", UNSUPPORTED_MESSAGES)
+def test_decode_fast_unsupported(msg):
+    assert decode_fast(msg) is None
+
+
+@pytest.mark.parametrize("msg", MALFORMED_MESSAGES)
+def test_decode_fast_malformed(msg):
+    with pytest.raises(ValueError):
+        decode_fast(msg)
+
+
+def test_decode_fast_error(monkeypatch):
+    def decode_message(msg):
+        raise NotImplementedError()
+
+    # Errors, other than UnsupportedMessage, are not masked by fallback
+    monkeypatch.setattr(ber, "decode_message", decode_message)
+    with pytest.raises(NotImplementedError):
+        decode_fast(MESSAGES[0])
@@ -0,0 +1,129 @@
+# ----------------------------------------------------------------------
+# noc.core.cache.decorator tests
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Python modules
+import operator
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Third-party modules
+import cachetools
+import pytest
+
+# NOC modules
+from noc.core.cache import decorator
+from noc.core.cache.base import BaseCache
+from noc.core.cache.decorator import cachedmethod
+from noc.core.perf import metrics
+
+
+class DictCache(BaseCache):
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key, default=None, version=None):
+        return self.data.get(self.make_key(key, version), default)
+
+    def set(self, key, value, ttl=None, version=None):
+        self.data[self.make_key(key, version)] = value
+
+
+@pytest.fixture
+def x_cache(monkeypatch):
+    cache = DictCache()
+    monkeypatch.setattr(decorator, "x_cache", cache)
+    return cache
+
+
+def get_metric(name, *tags):
+    return metrics[(name,) + tags].value
+
+
+lock = threading.Lock()
+
+
+class Model(object):
+    _cache = cachetools.TTLCache(maxsize=100, ttl=60)
+    calls = []
+    delay = 0.0
+
+    @classmethod
+    @cachedmethod(
+        operator.attrgetter("_cache"), key="test-model-%s", lock=lambda _: lock, negative_ttl=0.1
+    )
+    def get_by_id(cls, id):
+        cls.calls += [id]
+        time.sleep(cls.delay)
+        if id < 0:
+            return None
+        if id == 0:
+            raise ValueError()
+        return {"id": id}
+
+
+@pytest.fixture
+def model():
+    Model._cache.clear()
+    Model.calls = []
+    Model.delay = 0.0
+    return Model
+
+
+def test_cache(x_cache, model):
+    assert model.get_by_id(1) == {"id": 1}
+    assert model.get_by_id(1) == {"id": 1}
+    assert model.calls == [1]
+    assert x_cache.get("test-model-1") == {"id": 1}
+    # Backfill from external cache
+    model._cache.clear()
+    assert model.get_by_id(1) == {"id": 1}
+    assert model.calls == [1]
+
+
+def test_negative(x_cache, model):
+    hits = get_metric("cache_hits", ("cache_key", "test_model"), ("cache_level", "negative"))
+    assert model.get_by_id(-1) is None
+    assert model.get_by_id(-1) is None
+    assert model.calls == [-1]
+    assert not x_cache.data
+    assert (
+        get_metric("cache_hits", ("cache_key", "test_model"), ("cache_level", "negative"))
+        == hits + 1
+    )
+    # Expired
+    time.sleep(0.15)
+    assert model.get_by_id(-1) is None
+    assert model.calls == [-1, -1]
+    # Invalidated
+    del model._cache["test-model--1"]
+    assert model.get_by_id(-1) is None
+    assert model.calls == [-1, -1, -1]
+
+
+def test_coalesce(x_cache, model):
+    model.delay = 0.1
+    coalesced = get_metric("cache_coalesced", ("cache_key", "test_model"))
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        r = list(pool.map(model.get_by_id, [2] * 8))
+    assert r == [{"id": 2}] * 8
+    assert model.calls == [2]
+    assert get_metric("cache_coalesced", ("cache_key", "test_model")) == coalesced + 7
+
+
+def test_coalesce_error(x_cache, model):
+    model.delay = 0.1
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(model.get_by_id, 0) for _ in range(4)]
+    for f in futures:
+        with pytest.raises(ValueError):
+            f.result()
+    assert model.calls == [0]
+    # Error is not cached
+    with pytest.raises(ValueError):
+        model.get_by_id(0)
+    assert model.calls == [0, 0]
@@ -0,0 +1,78 @@
+# ----------------------------------------------------------------------
+# noc.core.cache.invalidation tests
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Python modules
+from typing import List, Optional
+
+# Third-party modules
+import pytest
+
+# NOC modules
+from noc.config import config
+from noc.core.cache import invalidation
+from noc.core.cache.invalidation import (
+    cache_invalidation,
+    has_cache_invalidation,
+    apply_invalidation,
+    invalidate_all,
+    get_ttl_cache,
+)
+
+
+class Document(object):
+    _is_document = True
+
+
+@pytest.fixture
+def model(monkeypatch):
+    monkeypatch.setattr(invalidation, "_models", {})
+
+    class Stub(Document):
+        __module__ = "noc.test.models.stub"
+        _class_name = "Stub"
+        invalidated: List[Optional[str]] = []
+
+        @classmethod
+        def invalidate_caches(cls, id: Optional[str] = None) -> None:
+            cls.invalidated += [id]
+
+    return cache_invalidation(Stub)
+
+
+def test_register(model):
+    assert has_cache_invalidation("test.Stub")
+    assert not has_cache_invalidation("test.Other")
+
+
+def test_register_missed_method(monkeypatch):
+    monkeypatch.setattr(invalidation, "_models", {})
+
+    class Other(Document):
+        __module__ = "noc.test.models.other"
+        _class_name = "Other"
+
+    with pytest.raises(ValueError):
+        cache_invalidation(Other)
+
+
+def test_apply(model):
+    apply_invalidation([("test.Stub", "1"), ("test.Other", "2"), ("test.Stub", 3)])
+    assert model.invalidated == ["1", "3"]
+
+
+def test_invalidate_all(model):
+    invalidate_all()
+    assert model.invalidated == [None]
+
+
+@pytest.mark.parametrize("enabled,maxsize,ttl", [(False, 100, 60), (True, 300, 180)])
+def test_ttl_cache(monkeypatch, enabled, maxsize, ttl):
+    monkeypatch.setattr(config.cache, "enable_invalidation", enabled)
+    monkeypatch.setattr(config.cache, "invalidation_scale", 3)
+    cache = get_ttl_cache(maxsize=100, ttl=60)
+    assert cache.maxsize == maxsize
+    assert cache.ttl == ttl
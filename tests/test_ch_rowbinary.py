@@ -0,0 +1,147 @@
+# ----------------------------------------------------------------------
+# Test core.clickhouse.rowbinary
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Python modules
+import datetime
+
+# Third-party modules
+import pytest
+import pytz
+
+# NOC modules
+from noc.config import config
+from noc.core.clickhouse import rowbinary
+from noc.core.clickhouse.rowbinary import RowBinaryEncoder, get_writer
+
+
+@pytest.fixture
+def timezone(request):
+    tz = config.timezone.zone
+    config.timezone = getattr(request, "param", "UTC")
+    rowbinary._parse_timestamp.cache_clear()
+    yield
+    config.timezone = tz
+    rowbinary._parse_timestamp.cache_clear()
+
+
+@pytest.mark.parametrize(
+    "db_type,value,expected",
+    [
+        ("UInt8", 1, b"\x01"),
+        ("UInt16", 258, b"\x02\x01"),
+        ("UInt32", 1, b"\x01\x00\x00\x00"),
+        ("UInt64", None, b"\x00" * 8),
+        ("Int8", -1, b"\xff"),
+        ("Int64", -2, b"\xfe" + b"\xff" * 7),
+        ("Float64", 1.0, b"\x00\x00\x00\x00\x00\x00\xf0\x3f"),
+        ("String", "abc", b"\x03abc"),
+        ("String", None, b"\x00"),
+        ("String", "x" * 200, b"\xc8\x01" + b"x" * 200),
+        ("LowCardinality(String)", "abc", b"\x03abc"),
+        ("Date", "1970-01-02", b"\x01\x00"),
+        ("Date", datetime.date(1970, 1, 3), b"\x02\x00"),
+        ("Date", "0000-00-00", b"\x00\x00"),
+        ("DateTime", "1970-01-01 00:01:00", b"\x3c\x00\x00\x00"),
+        ("DateTime", datetime.datetime(1970, 1, 1, 0, 0, 1), b"\x01\x00\x00\x00"),
+        ("Array(UInt8)", [1, 2], b"\x02\x01\x02"),
+        ("Array(LowCardinality(String))", ["a", "bc"], b"\x02\x01a\x02bc"),
+        ("Array(String)", [], b"\x00"),
+        ("Nullable(UInt8)", None, b"\x01"),
+        ("Nullable(UInt8)", 5, b"\x00\x05"),
+        ("UInt128", 1, b"\x01" + b"\x00" * 15),
+    ],
+)
+def test_writer(timezone, db_type, value, expected):
+    buf = bytearray()
+    get_writer(db_type)(buf, value)
+    assert bytes(buf) == expected
+
+
+def test_unsupported_type():
+    with pytest.raises(ValueError):
+        get_writer("AggregateFunction(sum, UInt64)")
+
+
+def test_encoder():
+    encoder = RowBinaryEncoder([("managed_object", "UInt64"), ("path", "Array(String)")])
+    assert encoder.get_columns() == "`managed_object`,`path`"
+    row1 = {"managed_object": 1, "path": ["", "", "", "Gi 0/1"]}
+    row2 = {"managed_object": 2}
+    assert encoder.encode_row(row1) == b"\x01" + b"\x00" * 7 + b"\x04\x00\x00\x00\x06Gi 0/1"
+    assert encoder.encode([row1, row2]) == encoder.encode_row(row1) + encoder.encode_row(row2)
+    assert encoder.get_headers(2)["CH-Records"] == b"2"
+
+
+@pytest.mark.parametrize(
+    "timezone,value,expected",
+    [
+        ("UTC", "2022-03-01 10:00:00", 1646128800),
+        ("Europe/Moscow", "2022-03-01 10:00:00", 1646118000),
+        ("Europe/Moscow", datetime.datetime(2022, 3, 1, 10, 0, 0), 1646118000),
+        ("Europe/Moscow", datetime.datetime(2022, 3, 1, 10, 0, 0, tzinfo=pytz.utc), 1646128800),
+        ("Europe/Moscow", "0000-00-00 00:00:00", 0),
+        ("Europe/Moscow", 1646128800, 1646128800),
+    ],
+    indirect=["timezone"],
+)
+def test_datetime_timezone(timezone, value, expected):
+    buf = bytearray()
+    get_writer("DateTime")(buf, value)
+    assert bytes(buf) == expected.to_bytes(4, "little")
+
+
+ENCODER_FIELDS = [
+    ("date", "Date"),
+    ("ts", "DateTime"),
+    ("managed_object", "UInt64"),
+    ("path", "Array(LowCardinality(String))"),
+    ("name", "String"),
+    ("load", "Float64"),
+    ("status", "UInt8"),
+    ("speed", "Nullable(UInt32)"),
+    ("bits", "Array(UInt8)"),
+    ("uuid", "UInt128"),
+    ("delta", "Int16"),
+]
+
+
+@pytest.mark.parametrize(
+    "row",
+    [
+        {},
+        {
+            "date": "2022-03-01",
+            "ts": "2022-03-01 10:00:00",
+            "managed_object": 1,
+            "path": ["", "", "", "Gi 0/1"],
+            "name": "x" * 200,
+            "load": 1,
+            "status": True,
+            "speed": 1000,
+            "bits": [1, 2],
+            "uuid": 1 << 100,
+            "delta": -5,
+        },
+        {
+            "date": datetime.date(2022, 3, 1),
+            "ts": datetime.datetime(2022, 3, 1, 10, 0, 0),
+            "managed_object": "2",
+            "path": [b"a", "\u0442" * 100],
+            "name": 15,
+            "load": 0.5,
+            "status": 0,
+            "bits": [],
+            "delta": 5.7,
+        },
+    ],
+)
+def test_encoder_compiled(timezone, row):
+    encoder = RowBinaryEncoder(ENCODER_FIELDS)
+    buf = bytearray()
+    for name, db_type in ENCODER_FIELDS:
+        get_writer(db_type)(buf, row.get(name))
+    assert encoder.encode_row(row) == bytes(buf)
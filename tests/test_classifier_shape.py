@@ -0,0 +1,192 @@
+# ----------------------------------------------------------------------
+# Classifier shape cache tests
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Third-party modules
+import pytest
+
+# NOC modules
+from noc.config import config
+from noc.core.perf import metrics
+from noc.services.classifier.rule import Rule
+from noc.services.classifier.ruleset import RuleSet
+from noc.services.classifier.rulelookup import RuleLookup
+
+PROFILE = "Generic.Host"
+
+
+class FakeClassifier(object):
+    dump_clone = False
+
+
+class FakeEventClass(object):
+    action = "L"
+
+    def __init__(self, name):
+        self.name = name
+
+
+class FakePattern(object):
+    def __init__(self, key_re, value_re):
+        self.key_re = key_re
+        self.value_re = value_re
+
+
+class FakeRule(object):
+    vars = []
+
+    def __init__(self, name, message_re):
+        self.name = name
+        self.preference = 1000
+        self.event_class = FakeEventClass(name)
+        self.patterns = [
+            FakePattern("^source$", "^syslog$"),
+            FakePattern("^message$", message_re),
+        ]
+
+
+class FakeProfile(object):
+    name = PROFILE
+
+
+class FakeManagedObject(object):
+    name = "mo"
+    profile = FakeProfile()
+
+
+class FakeEvent(object):
+    id = "event"
+    source = "syslog"
+    managed_object = FakeManagedObject()
+
+    def __init__(self, message):
+        self.raw_vars = {"message": message}
+
+
+def get_ruleset(rules):
+    """
+    Build RuleSet over the single syslog chain
+
+    :param rules: List of (name, message_re), ordered by preference
+    :return: RuleSet
+    """
+    ruleset = RuleSet()
+    classifier = FakeClassifier()
+    ruleset.rules = {
+        (PROFILE, "syslog"): RuleLookup([Rule(classifier, FakeRule(n, rx)) for n, rx in rules])
+    }
+    ruleset.reset_shape_cache()
+    return ruleset
+
+
+def classify(ruleset, message):
+    event = FakeEvent(message)
+    rule, _ = ruleset.find_rule(event, event.raw_vars)
+    return rule.name if rule else None
+
+
+def get_shape_metrics():
+    return metrics["rules_shape_hits"].value, metrics["rules_shape_misses"].value
+
+
+@pytest.fixture
+def shape_cache(monkeypatch):
+    monkeypatch.setattr(config.classifier, "shape_cache_size", 1000)
+
+
+@pytest.mark.parametrize(
+    "pattern,expected",
+    [
+        (r"^Interface (?P<interface>\S+) is down$", False),
+        (r"^Interface \d+ is down$", False),
+        (r"^VLAN 1 is up$", True),
+        (r"^\S{2}$", True),
+        (r"^(\S+) -> \1$", True),
+        (r"^(?P<a>\S+) -> (?P=a)$", True),
+        (r"^\N{DIGIT ONE}$", True),
+    ],
+)
+def test_is_shape_sensitive(pattern, expected):
+    rule = Rule(FakeClassifier(), FakeRule("rule", pattern))
+    assert rule.is_shape_sensitive is expected
+
+
+def test_shape_cache(shape_cache):
+    ruleset = get_ruleset(
+        [
+            ("down", r"^Interface (?P<interface>\S+) is down$"),
+            ("up", r"^Interface (?P<interface>\S+) is up$"),
+        ]
+    )
+    hits, misses = get_shape_metrics()
+    assert classify(ruleset, "Interface Gi0/1 is up") == "up"
+    assert get_shape_metrics() == (hits, misses + 1)
+    # Same shape
+    assert classify(ruleset, "Interface Gi0/2 is up") == "up"
+    assert get_shape_metrics() == (hits + 1, misses + 1)
+    # Another shape
+    assert classify(ruleset, "Interface Gi0/10 is up") == "up"
+    assert get_shape_metrics() == (hits + 1, misses + 2)
+    # Unmatched shape
+    assert classify(ruleset, "Reboot 1") is None
+    assert classify(ruleset, "Reboot 2") is None
+    assert get_shape_metrics() == (hits + 2, misses + 3)
+    # Dropped cache
+    ruleset.reset_shape_cache()
+    assert classify(ruleset, "Interface Gi0/3 is up") == "up"
+    assert get_shape_metrics() == (hits + 2, misses + 4)
+
+
+def test_shape_cache_disabled(monkeypatch):
+    monkeypatch.setattr(config.classifier, "shape_cache_size", 0)
+    ruleset = get_ruleset([("up", r"^Interface (?P<interface>\S+) is up$")])
+    assert ruleset.shape_cache is None
+    hits, misses = get_shape_metrics()
+    assert classify(ruleset, "Interface Gi0/1 is up") == "up"
+    assert classify(ruleset, "Interface Gi0/2 is up") == "up"
+    assert get_shape_metrics() == (hits, misses)
+
+
+def test_shape_cache_digits(shape_cache):
+    ruleset = get_ruleset(
+        [
+            ("vlan1", r"^VLAN 1 is up$"),
+            ("vlan", r"^VLAN (?P<vlan>\S+) is up$"),
+        ]
+    )
+    hits, misses = get_shape_metrics()
+    # Match below the digit-sensitive rule is not cached
+    assert classify(ruleset, "VLAN 2 is up") == "vlan"
+    assert classify(ruleset, "VLAN 1 is up") == "vlan1"
+    assert classify(ruleset, "VLAN 3 is up") == "vlan"
+    # Digit-sensitive rule itself is cached, as it is checked first
+    assert classify(ruleset, "VLAN 1 is up") == "vlan1"
+    assert get_shape_metrics() == (hits + 1, misses + 3)
+    # No match is not cached, as the digit-sensitive rule may match
+    assert classify(ruleset, "VLAN 1 is down") is None
+    assert classify(ruleset, "VLAN 2 is down") is None
+    assert get_shape_metrics() == (hits + 1, misses + 5)
+
+
+@pytest.mark.parametrize(
+    "loop_re",
+    [
+        r"^(?P<src>\S+) -> (?P=src)$",
+        r"^(\S+) -> \1$",
+    ],
+)
+def test_shape_cache_backreference(shape_cache, loop_re):
+    ruleset = get_ruleset(
+        [
+            ("loop", loop_re),
+            ("move", r"^(?P<src>\S+) -> (?P<dst>\S+)$"),
+        ]
+    )
+    # Same shape, different classes
+    for _ in range(2):
+        assert classify(ruleset, "Gi2 -> Gi1") == "move"
+        assert classify(ruleset, "Gi1 -> Gi1") == "loop"
+        assert classify(ruleset, "Gi1 -> Gi2") == "move"
@@ -52,7 +52,7 @@ class ServiceStub(object):
         self.address = "127.0.0.1"
         self.port = 0
 
-    def register_metrics(self, table, data):
+    def register_metrics(self, table, data, key=None, encoder=None):
         self.metrics[table] += data
 
 
@@ -0,0 +1,114 @@
+# ----------------------------------------------------------------------
+# noc.core.scheduler.spread tests
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Python modules
+import datetime
+import itertools
+import threading
+
+# Third-party modules
+import pytest
+
+# NOC modules
+from noc.core.scheduler import scheduler
+from noc.core.scheduler.scheduler import Scheduler
+from noc.core.scheduler.spread import (
+    get_spread_offset,
+    get_jitter,
+    get_start_histogram,
+    get_histogram_stats,
+)
+
+JCLS = "noc.services.discovery.jobs.box.job.BoxDiscoveryJob"
+
+
+def test_spread_offset_stable():
+    assert get_spread_offset(JCLS, 1) == get_spread_offset(JCLS, 1)
+    assert get_spread_offset(JCLS, 1) != get_spread_offset(JCLS, 2)
+
+
+@pytest.mark.parametrize("key", list(range(100)))
+def test_spread_offset_range(key):
+    assert 0.0 <= get_spread_offset(JCLS, key) < 1.0
+
+
+def test_spread_offset_even():
+    interval = 60
+    n = 6000
+    hist = get_start_histogram(get_spread_offset(JCLS, key) * interval for key in range(n))
+    stats = get_histogram_stats(hist, start=0, end=interval)
+    assert stats["total"] == n
+    assert stats["mean"] == n / interval
+    assert stats["max"] < 2 * stats["mean"]
+
+
+@pytest.mark.parametrize(
+    "interval,jitter,max_jitter,limit",
+    [(300, 0.1, 0, 30), (300, 0.1, 10, 10), (300, 0.0, 10, 0), (86400, 0.02, 60, 60)],
+)
+def test_jitter(interval, jitter, max_jitter, limit):
+    for _ in range(100):
+        assert -limit <= get_jitter(interval, jitter, max_jitter) <= limit
+
+
+def test_start_histogram():
+    ts = datetime.datetime(2022, 1, 1, 0, 0, 0)
+    hist = get_start_histogram(
+        [ts, ts, ts + datetime.timedelta(seconds=1), ts + datetime.timedelta(seconds=12)],
+        resolution=10,
+    )
+    base = int(ts.timestamp())
+    assert hist == {base: 3, base + 10: 1}
+
+
+@pytest.mark.parametrize(
+    "hist,kwargs,expected",
+    [
+        ({}, {}, {"total": 0, "buckets": 0, "mean": 0.0, "max": 0, "stddev": 0.0}),
+        ({0: 2, 1: 2}, {}, {"total": 4, "buckets": 2, "mean": 2.0, "max": 2, "stddev": 0.0}),
+        (
+            {0: 4},
+            {"start": 0, "end": 4},
+            {"total": 4, "buckets": 4, "mean": 1.0, "max": 4, "stddev": 3**0.5},
+        ),
+        (
+            {0: 2, 10: 2},
+            {"resolution": 10},
+            {"total": 4, "buckets": 2, "mean": 2.0, "max": 2, "stddev": 0.0},
+        ),
+    ],
+)
+def test_histogram_stats(hist, kwargs, expected):
+    assert get_histogram_stats(hist, **kwargs) == pytest.approx(expected)
+
+
+def test_scheduler_start_histogram(monkeypatch):
+    # Each call is a next second, so histogram is pruned constantly
+    clock = itertools.count(1_000_000)
+    monkeypatch.setattr(scheduler.time, "time", lambda: next(clock))
+    sched = Scheduler("test", use_wheel=False)
+    errors = []
+
+    def register():
+        try:
+            for _ in range(2000):
+                sched.register_starts(1)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=register) for _ in range(4)]
+    for t in threads:
+        t.start()
+    # Metrics are collected from another thread while starts are registered
+    while any(t.is_alive() for t in threads):
+        d = {}
+        sched.apply_metrics(d)
+        assert d["test_jobs_start_rate_max"] <= 4
+    for t in threads:
+        t.join()
+    assert not errors
+    assert len(sched.start_histogram) <= Scheduler.START_HISTOGRAM_DEPTH + 1
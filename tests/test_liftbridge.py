@@ -5,12 +5,19 @@
 # See LICENSE for details
 # ----------------------------------------------------------------------
 
+# Python modules
+import asyncio
+from collections import deque
+
 # Third-party modules
 import pytest
 
 # NOC modules
 # from noc.core.liftbridge.base import LiftBridgeClient
 from noc.core.liftbridge.queuebuffer import QBuffer
+from noc.core.liftbridge.publisher import PublishPipeline
+from noc.core.liftbridge.queue import LiftBridgeQueue
+from noc.core.liftbridge.api_pb2 import PublishRequest
 
 
 @pytest.mark.parametrize(
@@ -24,3 +31,115 @@ from noc.core.liftbridge.queuebuffer import QBuffer
 def test_qbuffer(input, output, size):
     q = QBuffer(max_size=size)
     assert list(q._iter_chunks(input, size)) == output
+
+
+@pytest.mark.parametrize(
+    "input,output,size",
+    [
+        ([b"abc", b"def", b"ghi", b"klm"], [(b"abc", 1), (b"def", 1), (b"ghi", 1), (b"klm", 1)], 4),
+        ([b"abc", b"def", b"ghi", b"klm"], [(b"abcdef", 2), (b"ghiklm", 2)], 6),
+        ([b"abc", b"def", b"ghi", b"klm"], [(b"abcdefghi", 3), (b"klm", 1)], 11),
+    ],
+)
+def test_qbuffer_binary(input, output, size):
+    q = QBuffer(max_size=size)
+    assert list(q._iter_binary_chunks(input, size)) == output
+
+
+def test_publish_coalesce():
+    def req(value, **kwargs):
+        return PublishRequest(value=value, stream="ch.test", **kwargs)
+
+    p = PublishPipeline(queue=None, window=4, max_message_size=8)
+    lane = deque([req(b"def"), req(b"ghi"), req(b"klm")])
+    merged, n = p.coalesce(req(b"abc"), lane)
+    assert n == 2
+    assert merged.value == b"abc\ndef"
+    assert merged.stream == "ch.test"
+    # Fields are copied from the first request
+    merged, n = p.coalesce(
+        req(b"abc", partition=3, correlationId="1", ackInbox="inbox", ackPolicy=1), lane
+    )
+    assert n == 2
+    assert merged.value == b"abc\nghi"
+    assert merged.partition == 3
+    assert merged.correlationId == "1"
+    assert merged.ackInbox == "inbox"
+    assert merged.ackPolicy == 1
+    assert [r.value for r in lane] == [b"klm"]
+    # Keyed requests are not merged
+    lane = deque([req(b"def")])
+    merged, n = p.coalesce(req(b"abc", key=b"1"), lane)
+    assert n == 1
+    assert merged.value == b"abc"
+    assert len(lane) == 1
+
+
+class FakeClient(object):
+    def __init__(self, fail=None, hang=None):
+        self.fail = fail or set()
+        self.hang = hang or set()
+        self.sent = []
+
+    async def publish_sync(self, req, wait_for_stream=False):
+        if req.value in self.hang:
+            await asyncio.Event().wait()
+        if req.value in self.fail:
+            raise ValueError("Unexpected error")
+        self.sent.append(req.value)
+
+
+def test_publish_lane_error():
+    async def run():
+        queue = LiftBridgeQueue()
+        p = PublishPipeline(queue=queue, window=2, max_message_size=100)
+        for v in (b"a", b"bad", b"c"):
+            queue.put(PublishRequest(value=v, stream="test", partition=0))
+        task = asyncio.create_task(p.run(client))
+        assert await queue.drain(timeout=1)
+        assert await p.drain(timeout=1)
+        # Lane is restarted for new requests
+        queue.put(PublishRequest(value=b"d", stream="test", partition=0))
+        assert await queue.drain(timeout=1)
+        assert await p.drain(timeout=1)
+        queue.shutdown()
+        await task
+        return p
+
+    client = FakeClient(fail={b"bad"})
+    p = asyncio.run(run())
+    assert client.sent == [b"a", b"c", b"d"]
+    assert not p.lanes
+    assert not p.pending
+    assert p.window._value == 2
+
+
+def test_publish_lane_cancel():
+    async def run():
+        p = PublishPipeline(queue=None, window=2, max_message_size=100)
+        key = ("test", 0)
+        lane = deque([PublishRequest(value=v, stream="test", partition=0) for v in (b"a", b"b")])
+        p.lanes[key] = lane
+        for _ in lane:
+            await p.window.acquire()
+            p.pending += 1
+        task = asyncio.create_task(p.run_lane(client, key, lane))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return p
+
+    client = FakeClient(hang={b"a"})
+    p = asyncio.run(run())
+    assert not p.lanes
+    assert not p.pending
+    assert p.window._value == 2
+
+
+def test_queue_max_size():
+    queue = LiftBridgeQueue(max_size=1)
+    assert queue.put(PublishRequest(value=b"a"), block=True)
+    assert not queue.put(PublishRequest(value=b"b"), block=True, timeout=0.1)
+    assert queue.qsize() == 1
+    assert queue.req_blocked == 1
@@ -10,6 +10,7 @@ from time import perf_counter_ns
 
 # NOC modules
 from noc.core.ratelimit.sync import SyncRateLimit
+from noc.core.ratelimit.tokenbucket import TokenBucket
 
 RATE = 10
 TRIES = 2 * RATE
@@ -25,3 +26,23 @@ def test_sync_rate_limit():
     # TRIES - 1 as the first call should be unlimited
     min_delta = (TRIES - 1) * (NS // RATE)
     assert delta >= min_delta
+
+
+def test_token_bucket():
+    bucket = TokenBucket(10.0, burst=5)
+    # Burst
+    assert all(bucket.consume(ts=0.0) for _ in range(5))
+    assert not bucket.consume(ts=0.0)
+    # 0.25s refills 2.5 tokens
+    assert bucket.consume(ts=0.25)
+    assert bucket.consume(ts=0.25)
+    assert not bucket.consume(ts=0.25)
+    # Capped by burst
+    assert sum(bucket.consume(ts=100.0) for _ in range(10)) == 5
+
+
+def test_token_bucket_default_burst():
+    bucket = TokenBucket(2.0)
+    assert bucket.consume(ts=0.0)
+    assert bucket.consume(ts=0.0)
+    assert not bucket.consume(ts=0.0)
@@ -0,0 +1,68 @@
+# ----------------------------------------------------------------------
+# noc.core.scheduler.wheel test
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Python modules
+import random
+
+# Third-party modules
+import pytest
+
+# NOC modules
+from noc.core.scheduler.wheel import TimingWheel
+
+
+def test_wheel_expire():
+    wheel = TimingWheel(1.0, now=100.0)
+    wheel.add("a", 105.5, "a")
+    wheel.add("b", 103.0, "b")
+    wheel.add("c", 99.0, "c")  # Already expired
+    assert len(wheel) == 3
+    assert wheel.advance(100.0) == ["c"]
+    assert wheel.advance(104.0) == ["b"]
+    assert wheel.advance(105.0) == ["a"]
+    assert not wheel
+
+
+def test_wheel_reschedule():
+    wheel = TimingWheel(1.0, now=0.0)
+    wheel.add("a", 10.0, "a1")
+    wheel.add("a", 5.0, "a2")
+    assert wheel.get("a") == (5.0, "a2")
+    assert wheel.advance(5.0) == ["a2"]
+    assert wheel.advance(20.0) == []
+    wheel.add("b", 30.0, "b")
+    assert wheel.remove("b") == "b"
+    assert "b" not in wheel
+    assert wheel.advance(40.0) == []
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_wheel_random(seed):
+    rnd = random.Random(seed)
+    # 4 slots x 2 levels span 16 ticks, later items go to overflow
+    wheel = TimingWheel(1.0, slots=4, levels=2, now=100.0)
+    expected = {}
+    now = 100.0
+    for _ in range(500):
+        op = rnd.random()
+        if op < 0.5:
+            key = rnd.randrange(60)
+            ts = now + rnd.uniform(-3, 40)
+            wheel.add(key, ts, key)
+            expected[key] = ts
+        elif op < 0.6:
+            key = rnd.randrange(60)
+            wheel.remove(key)
+            expected.pop(key, None)
+        else:
+            now += rnd.choice([0.3, 1.0, 2.5, 7.0])
+            expired = wheel.advance(now)
+            assert sorted(expired) == sorted(k for k, ts in expected.items() if int(ts) <= int(now))
+            assert [expected[k] for k in expired] == sorted(expected[k] for k in expired)
+            for key in expired:
+                del expected[key]
+            assert len(wheel) == len(expected)
@@ -0,0 +1,231 @@
+# ----------------------------------------------------------------------
+# noc.core.topology.path tests
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Python modules
+import random
+from collections import defaultdict
+from typing import Dict, List, Set
+
+# Third-party modules
+import pytest
+
+# NOC modules
+from noc.core.topology import path
+from noc.core.topology.path import KSPFinder
+from noc.core.topology.goal.base import BaseGoal
+
+SEGMENT = "segment"
+
+
+class Segment(object):
+    id = SEGMENT
+
+
+class Object(object):
+    segment = Segment()
+
+    def __init__(self, id: int):
+        self.id = id
+
+    def __repr__(self):
+        return f"<Object {self.id}>"
+
+
+class FakeLink(object):
+    def __init__(self, id: int, a: int, b: int):
+        self.id = id
+        self.linked_objects = [a, b]
+        self.l2_cost = 1
+        self.interfaces = []
+
+
+class ObjectGoal(BaseGoal):
+    def __init__(self, obj: Object):
+        super().__init__()
+        self.object = obj
+
+    def is_goal(self, obj: Object) -> bool:
+        return obj.id == self.object.id
+
+
+class Graph(object):
+    def __init__(self, edges: List[List[int]], n: int):
+        self.objects = {i: Object(i) for i in range(n)}
+        self.links: Dict[int, Set[FakeLink]] = defaultdict(set)
+        for link_id, (a, b) in enumerate(edges):
+            link = FakeLink(link_id, a, b)
+            self.links[a].add(link)
+            self.links[b].add(link)
+
+    def find(self, start: int, goal: int, max_depth: int = path.MAX_PATH_LENGTH) -> List[int]:
+        finder = KSPFinder(
+            self.objects[start],
+            ObjectGoal(self.objects[goal]),
+            max_depth=max_depth,
+            use_snapshot=True,
+        )
+        finder.mo_cache = self.objects.copy()
+        r = finder.find_shortest_path()
+        return [r[0].start.id] + [pi.end.id for pi in r]
+
+    def find_legacy(
+        self, start: int, goal: int, max_depth: int = path.MAX_PATH_LENGTH
+    ) -> List[int]:
+        """
+        Search loop of the implementation, preceding the binary heap one:
+        open set is sorted on each step, depth is got from came_from chain
+        """
+
+        def current_path_len(mo: Object) -> int:
+            n = 0
+            while mo in came_from:
+                mo = came_from[mo]
+                n += 1
+            return n
+
+        goal_obj = ObjectGoal(self.objects[goal])
+        start_obj = self.objects[start]
+        closed_set: Set[int] = set()
+        open_set = {start_obj}
+        came_from: Dict[Object, Object] = {}
+        g_score = defaultdict(lambda: path.MAX_PATH_LENGTH)
+        g_score[start_obj] = 0
+        f_score = defaultdict(lambda: path.MAX_PATH_LENGTH)
+        f_score[start_obj] = goal_obj.cost_estimate(start_obj)
+        while open_set:
+            current = sorted(open_set, key=lambda x: f_score[x])[0]
+            if goal_obj.is_goal(current):
+                r = [current.id]
+                while current in came_from:
+                    current = came_from[current]
+                    r.insert(0, current.id)
+                return r
+            open_set.remove(current)
+            closed_set.add(current.id)
+            if f_score[current] >= goal_obj.DROP_COST:
+                continue
+            if current_path_len(current) >= max_depth:
+                continue
+            seen_neighbors: Set[int] = set()
+            for ll in self.links.get(current.id, set()):
+                seen_neighbors |= set(ll.linked_objects) - closed_set
+            for neighbor in (self.objects[n] for n in seen_neighbors):
+                if neighbor not in open_set:
+                    open_set.add(neighbor)
+                tentative_g_score = g_score[current] + 1
+                if tentative_g_score >= g_score[neighbor]:
+                    continue
+                came_from[neighbor] = current
+                g_score[neighbor] = tentative_g_score
+                f_score[neighbor] = tentative_g_score + goal_obj.cost_estimate(neighbor, current)
+        raise ValueError("Path not found")
+
+
+def get_tree(n: int, seed: int) -> List[List[int]]:
+    rnd = random.Random(seed)
+    return [[i, rnd.randrange(i)] for i in range(1, n)]
+
+
+def get_mesh(n: int, seed: int) -> List[List[int]]:
+    rnd = random.Random(seed)
+    return get_tree(n, seed) + [[rnd.randrange(n), rnd.randrange(n)] for _ in range(n // 2)]
+
+
+@pytest.fixture
+def snapshot(monkeypatch):
+    graphs: Dict[str, Graph] = {}
+    monkeypatch.setattr(path, "get_segment_links", lambda segment_id: graphs[segment_id].links)
+    return graphs
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_tree_path(snapshot, seed):
+    graph = snapshot[SEGMENT] = Graph(get_tree(300, seed), 300)
+    rnd = random.Random(seed)
+    for _ in range(20):
+        start, goal = rnd.randrange(300), rnd.randrange(300)
+        if start == goal:
+            continue
+        # Path is unique in the tree
+        assert graph.find(start, goal) == graph.find_legacy(start, goal)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_mesh_path(snapshot, seed):
+    graph = snapshot[SEGMENT] = Graph(get_mesh(300, seed), 300)
+    rnd = random.Random(seed)
+    for _ in range(20):
+        start, goal = rnd.randrange(300), rnd.randrange(300)
+        if start == goal:
+            continue
+        r = graph.find(start, goal)
+        legacy = graph.find_legacy(start, goal)
+        # Equal-cost paths may be tie-broken differently
+        assert len(r) == len(legacy)
+        assert r[0] == start and r[-1] == goal
+        for a, b in zip(r, r[1:]):
+            assert any(b in link.linked_objects for link in graph.links[a])
+
+
+@pytest.mark.parametrize("max_depth", [1, 2, 3, 5])
+def test_max_depth(snapshot, max_depth):
+    # Chain 0 - 1 - 2 - 3 - 4
+    graph = snapshot[SEGMENT] = Graph([[i, i + 1] for i in range(4)], 5)
+    if max_depth < 4:
+        with pytest.raises(ValueError):
+            graph.find_legacy(0, 4, max_depth=max_depth)
+        with pytest.raises(ValueError):
+            graph.find(0, 4, max_depth=max_depth)
+    else:
+        assert graph.find(0, 4, max_depth=max_depth) == graph.find_legacy(0, 4, max_depth=max_depth)
+
+
+def test_not_found(snapshot):
+    graph = snapshot[SEGMENT] = Graph([[0, 1], [2, 3]], 4)
+    with pytest.raises(ValueError):
+        graph.find_legacy(0, 3)
+    with pytest.raises(ValueError):
+        graph.find(0, 3)
+
+
+class FakeLinkModel(object):
+    """
+    Link.objects.filter(linked_segments=...) replacement.
+    Any other query fails, as invalidation must not touch database
+    """
+
+    links: List[FakeLink] = []
+    segments: Dict[int, Set[str]] = {}
+
+    class objects(object):
+        @classmethod
+        def filter(cls, linked_segments=None, **kwargs):
+            assert not kwargs and linked_segments is not None
+            return [
+                link
+                for link in FakeLinkModel.links
+                if linked_segments in FakeLinkModel.segments[link.id]
+            ]
+
+
+def test_invalidate_link_segments(monkeypatch):
+    monkeypatch.setattr(path, "Link", FakeLinkModel)
+    FakeLinkModel.links = [FakeLink(0, 0, 1), FakeLink(1, 1, 2), FakeLink(2, 3, 4)]
+    FakeLinkModel.segments = {0: {"s1"}, 1: {"s1", "s2"}, 2: {"s3"}}
+    path.invalidate_segment_links()
+    for segment_id in ("s1", "s2", "s3"):
+        path.get_segment_links(segment_id)
+    assert set(path._segment_links) == {"s1", "s2", "s3"}
+    # Link in two snapshots
+    path.invalidate_link_segments("1")
+    assert set(path._segment_links) == {"s3"}
+    # Link, not found in snapshots
+    path.invalidate_link_segments("5")
+    assert set(path._segment_links) == {"s3"}
+    path.invalidate_link_segments("2")
+    assert not path._segment_links
+    path.invalidate_segment_links()
@@ -8,9 +8,10 @@
 # Python modules
 import asyncio
 import os
+import socket
 from subprocess import Popen
 import sys
-from typing import Tuple
+from typing import List, Tuple
 
 # NOC modules
 from .udpserver.config import (
@@ -19,7 +20,7 @@ from .udpserver.config import (
     SERVER_ADDRESS,
     SERVER_PORT,
 )
-from noc.core.ioloop.udpserver import UDPServer
+from noc.core.ioloop.udpserver import UDPServer, BatchUDPServer
 
 
 class UDPServerStub(UDPServer):
@@ -55,3 +56,47 @@ def test_server_operation():
     Popen([sys.executable, "tests/udpserver/client.py"], stdout=devnull)
     # start server
     asyncio.run(server_routine())
+
+
+class BatchUDPServerStub(BatchUDPServer):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.batches = []
+
+    async def on_batch(self, batch: List[Tuple[bytes, Tuple[str, int]]]) -> None:
+        self.batches.append([data for data, _ in batch])
+        await asyncio.sleep(0.05)
+
+
+def test_batch_server():
+    n = 50
+
+    async def run():
+        server = BatchUDPServerStub(batch_size=16, queue_size=100)
+        await server.listen(0, SERVER_ADDRESS)
+        server.start()
+        port = server._transports[0].get_extra_info("socket").getsockname()[1]
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        for i in range(n):
+            sock.sendto(b"%d" % i, (SERVER_ADDRESS, port))
+        sock.close()
+        while sum(len(b) for b in server.batches) < n:
+            await asyncio.sleep(0.05)
+        kernel_drops = server.get_kernel_drops()
+        server.stop()
+        return server, kernel_drops
+
+    server, kernel_drops = asyncio.run(run())
+    assert [d for b in server.batches for d in b] == [b"%d" % i for i in range(n)]
+    assert max(len(b) for b in server.batches) <= 16
+    assert server.dropped == 0
+    if sys.platform.startswith("linux"):
+        assert kernel_drops == 0
+
+
+def test_batch_server_overflow():
+    server = BatchUDPServerStub(batch_size=16, queue_size=10)
+    for i in range(15):
+        server.on_read(b"%d" % i, (SERVER_ADDRESS, 514))
+    assert len(server.queue) == 10
+    assert server.dropped == 5
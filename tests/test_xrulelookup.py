@@ -0,0 +1,122 @@
+# ----------------------------------------------------------------------
+# XRuleLookup tests
+# ----------------------------------------------------------------------
+# Copyright (C) 2007-2022 The NOC Project
+# See LICENSE for details
+# ----------------------------------------------------------------------
+
+# Python modules
+import re
+
+# Third-party modules
+import pytest
+
+# NOC modules
+from noc.services.classifier.rulelookup import RuleLookup
+from noc.services.classifier.xrulelookup import XRuleLookup
+
+
+class FakeRule(object):
+    def __init__(self, preference, patterns):
+        self.preference = preference
+        self.patterns = patterns
+
+    def match(self, vars):
+        """
+        Every pattern must match the variable, like compiled Rule.match does
+        """
+        for key_re, value_re in self.patterns:
+            rx_key = re.compile(key_re, re.MULTILINE | re.DOTALL)
+            rx_value = re.compile(value_re, re.MULTILINE | re.DOTALL)
+            if not any(rx_key.search(k) and rx_value.search(v) for k, v in vars.items()):
+                return False
+        return True
+
+
+@pytest.mark.parametrize(
+    "pattern,expected",
+    [
+        ("^message$", ["message"]),
+        (r"Interface (?P<interface>\S+) is down", ["Interface ", " is down"]),
+        (r"Link\.Up", ["Link.Up"]),
+        ("ab?c", ["a", "c"]),
+        ("(?i)Interface down", []),
+        ("foo|bar", []),
+        ("(", []),
+    ],
+)
+def test_parse(pattern, expected):
+    assert XRuleLookup.parse(pattern) == expected
+
+
+def test_lookup():
+    r_down = FakeRule(20, [("^message$", r"Interface (?P<interface>\S+) down")])
+    r_up = FakeRule(10, [("^message$", r"Interface (?P<interface>\S+) up")])
+    r_any = FakeRule(30, [("^message$", r"(?P<msg>.+)")])
+    lookup = XRuleLookup([r_down, r_up, r_any])
+    assert lookup.lookup_rules(None, {"message": "Interface Gi 0/1 down"}) == [r_down, r_any]
+    assert lookup.lookup_rules(None, {"message": "Interface Gi 0/1 up"}) == [r_up, r_any]
+    assert lookup.lookup_rules(None, {"message": "Reboot"}) == [r_any]
+
+
+EQ_RULES = [
+    FakeRule(10, [("^message$", r"^Interface (?P<interface>\S+) changed state to down$")]),
+    FakeRule(10, [("^message$", r"^Interface (?P<interface>\S+) changed state to up$")]),
+    FakeRule(20, [("^message$", r"Link\.(?P<state>Up|Down)")]),
+    FakeRule(20, [("^message$", r"^%SYS-5-RESTART: System restarted")]),
+    FakeRule(20, [("^message$", r"^User (?P<user>\S+) logged (in|out)$")]),
+    FakeRule(20, [("^message$", r"^(?P<a>\S+) -> (?P=a)$")]),
+    FakeRule(30, [("^message$", r"ab?c\d+"), ("^collector$", "^default$")]),
+    # Rules without literals
+    FakeRule(40, [("^message$", r"(?i)interface (?P<interface>\S+) down")]),
+    FakeRule(40, [("^message$", r"^(?P<x>\d+)$")]),
+    FakeRule(40, [("^message$", r"^(up|down)$")]),
+    FakeRule(40, [(r"^\S+$", r"^\d+$")]),
+    FakeRule(50, [("^message$", r"(?P<msg>.+)")]),
+]
+
+EQ_MESSAGES = [
+    "Interface Gi0/1 changed state to down",
+    "Interface Gi0/1 changed state to up",
+    "Interface Gi0/1 changed state to testing",
+    "interface Gi0/1 changed state to down",
+    "INTERFACE Gi0/1 DOWN",
+    "Link.Up",
+    "LinkxUp",
+    "%SYS-5-RESTART: System restarted --",
+    "User admin logged in",
+    "User admin logged",
+    "Gi0/1 -> Gi0/1",
+    "Gi0/1 -> Gi0/2",
+    "abc1",
+    "ac2",
+    "ab",
+    "12345",
+    "up",
+    "down",
+    "",
+]
+
+
+@pytest.mark.parametrize("message", EQ_MESSAGES)
+def test_lookup_equivalence(message):
+    """
+    Prefilter must return the same matched rules, as the scan over all rules
+    """
+    vars = {"collector": "default", "message": message}
+    linear = [r for r in RuleLookup(EQ_RULES).lookup_rules(None, vars) if r.match(vars)]
+    candidates = XRuleLookup(EQ_RULES).lookup_rules(None, vars)
+    assert [r for r in candidates if r.match(vars)] == sorted(linear, key=lambda x: x.preference)
+
+
+def test_lookup_no_literal():
+    rules = [rule for rule in EQ_RULES if rule.preference == 40]
+    for rule in rules:
+        assert all(XRuleLookup.parse(value_re) == [] for _, value_re in rule.patterns)
+    lookup = XRuleLookup(rules)
+    # Neither key nor value literals
+    assert lookup.rule_masks[-1] == (rules[-1], 0)
+    # Rules without value literals are candidates for every message
+    assert lookup.lookup_rules(None, {"message": ""}) == rules
+    assert lookup.lookup_rules(None, {"message": "Interface Gi0/1 is down"}) == rules
+    assert lookup.lookup_rules(None, {"msg": ""}) == rules[-1:]
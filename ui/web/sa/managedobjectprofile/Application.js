@@ -906,6 +906,45 @@ Ext.define("NOC.sa.managedobjectprofile.Application", {
                                             uiStyle: "small"
                                         }
                                     ]
+                                },
+                                {
+                                    xtype: "fieldset",
+                                    layout: "hbox",
+                                    title: __("Syslog Collector Rate Limit"),
+                                    defaults: {
+                                        padding: 4
+                                    },
+                                    items: [
+                                        {
+                                            name: "syslogcollector_rate_limit",
+                                            fieldLabel: __("Rate Limit (msg/s)"),
+                                            tooltip: __("Max syslog messages per second from ManagedObject <br/>" +
+                                                "Identical messages over the limit are sent aggregated <br/>" +
+                                                "0 - Unlimited"),
+                                            labelWidth: 150,
+                                            xtype: "numberfield",
+                                            minValue: 0,
+                                            allowBlank: true,
+                                            uiStyle: "small",
+                                            listeners: {
+                                                render: me.addTooltip
+                                            }
+                                        },
+                                        {
+                                            name: "syslogcollector_rate_burst",
+                                            fieldLabel: __("Burst"),
+                                            tooltip: __("Max burst of syslog messages <br/>" +
+                                                "0 - Same as Rate Limit"),
+                                            labelWidth: 100,
+                                            xtype: "numberfield",
+                                            minValue: 0,
+                                            allowBlank: true,
+                                            uiStyle: "small",
+                                            listeners: {
+                                                render: me.addTooltip
+                                            }
+                                        }
+                                    ]
                                 }
                             ]
                         },
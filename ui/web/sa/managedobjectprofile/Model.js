@@ -915,6 +915,16 @@ Ext.define("NOC.sa.managedobjectprofile.Model", {
             type: "int",
             defaultValue: 1000
         },
+        {
+            name: "syslogcollector_rate_limit",
+            type: "int",
+            defaultValue: 0
+        },
+        {
+            name: "syslogcollector_rate_burst",
+            type: "int",
+            defaultValue: 0
+        },
         {
             name: "labels",
             type: "auto"